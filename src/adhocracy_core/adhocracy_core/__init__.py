@@ -25,11 +25,21 @@ def root_factory(request):
         return request.root
     _set_app_root_if_missing(request)
     _set_auditlog_if_missing(request)
-    add_after_commit_hooks(request)
-    add_request_callbacks(request)
+    if not _has_request_callbacks(request):
+        add_after_commit_hooks(request)
+        add_request_callbacks(request)
     return _get_zodb_root(request)['app_root']
 
 
+def _has_request_callbacks(request) -> bool:
+    """Check if the request callbacks are added already.
+
+    The conditional GET tween calls the root factory before the router.
+    """
+    from adhocracy_core.auditing import audit_resources_changes_callback
+    return audit_resources_changes_callback in request.response_callbacks
+
+
 def _set_app_root_if_missing(request):
     zodb_root = _get_zodb_root(request)
     if 'app_root' in zodb_root:
@@ -102,6 +112,7 @@ def includeme(config):
         timeout=authn_timeout)
     config.set_authentication_policy(authn_policy)
     config.include('.authentication')
+    config.include('.authorization')
     config.include('.evolution')
     config.include('.events')
     config.include('.content')
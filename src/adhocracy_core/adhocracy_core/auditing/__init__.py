@@ -1,4 +1,8 @@
 """Log which user modifies resources in additional 'audit' database."""
+import os
+from itertools import count
+from itertools import islice
+
 import transaction
 import substanced.util
 
@@ -6,6 +10,7 @@ from pyramid.traversal import resource_path
 from pyramid.request import Request
 from pyramid.response import Response
 from BTrees.OOBTree import OOBTree
+from ZODB.POSException import ConflictError
 from datetime import datetime
 from logging import getLogger
 from adhocracy_core.utils import get_user
@@ -19,22 +24,30 @@ from adhocracy_core.interfaces import AuditlogEntry
 
 logger = getLogger(__name__)
 
+COMMIT_ATTEMPTS = 3
+"""Number of attempts to commit the audit entries of one request."""
+
+_sequence = count()
+
 
 class AuditLog(OOBTree):
 
     """An Auditlog composed of audit entries.
 
     This is a dictionary (:class:`collections.abc.Mapping`) with key
-    :class:`datetime.datetime` and value
+    tuple (:class:`datetime.datetime`, process id, sequence number) and value
     :class:`adhocracy_core.interfaces.AuditlogEntry`.
+    The process id and the per process sequence number make the keys
+    unique, even if many entries are added at the same time.
 
-    The methods `items`, `keys`, and `values` have the additional kwargs
-    `max_key` and `min_key` to allow range queries::
+    Use :meth:`get_entries` to read the entries page by page::
 
        january = datetime(2015, 1, 1)
        february = datetime(2015, 2, 1)
        audit = get_auditlog(context)
-       audit.items(min=january, max=february)
+       page = audit.get_entries(start=january, end=february, limit=100)
+       next_page = audit.get_entries(start=january, end=february,
+                                     after=page[-1][0], limit=100)
        ...
     """
 
@@ -44,10 +57,34 @@ class AuditLog(OOBTree):
             user_name: str,
             user_path: str) -> None:
         """ Add an auditlog entry to the audit log."""
-        self[datetime.utcnow()] = AuditlogEntry(name,
-                                                resource_path,
-                                                user_name,
-                                                user_path)
+        key = (datetime.utcnow(), os.getpid(), next(_sequence))
+        self[key] = AuditlogEntry(name,
+                                  resource_path,
+                                  user_name,
+                                  user_path)
+
+    def get_entries(self,
+                    start: datetime=None,
+                    end: datetime=None,
+                    after: tuple=None,
+                    limit: int=100) -> [tuple]:
+        """Return list of (key, entry) tuples ordered by creation date.
+
+        :param start: only return entries created at or after `start`.
+        :param end: only return entries created before `end`.
+        :param after: only return entries with key greater than `after`,
+                      pass the last key of the previous page to get the
+                      next page.
+        :param limit: maximal number of entries to return.
+        """
+        min_key = None if start is None else (start,)
+        exclude_min = False
+        if after is not None and (min_key is None or after >= min_key):
+            min_key = after
+            exclude_min = True
+        max_key = None if end is None else (end,)
+        items = self.items(min=min_key, max=max_key, excludemin=exclude_min)
+        return list(islice(items, limit))
 
 
 def get_auditlog(context: IResource) -> AuditLog:
@@ -89,13 +126,22 @@ def audit_resources_changes_callback(request: Request,
     """Add auditlog entries to the auditlog when the resources are changed.
 
     This is a :term:`response- callback` that run after a request has
-    finished. To store the audit entry it adds an additional transaction.
+    finished. To store the audit entries it adds one additional transaction.
     """
     registry = request.registry
-    changelog_metadata = registry.changelog.values()
+    changes = [c for c in registry.changelog.values() if _is_logged(c)]
+    if not changes:
+        return
     user_name, user_path = _get_user_info(request)
-    for meta in changelog_metadata:
-        _log_change(request.context, user_name, user_path, meta)
+    for attempt in range(COMMIT_ATTEMPTS):
+        try:
+            for change in changes:
+                _log_change(request.context, user_name, user_path, change)
+            transaction.commit()
+            return
+        except ConflictError:
+            transaction.abort()
+    logger.warning('Failed to store {0} audit entries'.format(len(changes)))
 
 
 def _get_user_info(request: Request) -> (str, str):
@@ -110,20 +156,22 @@ def _get_user_info(request: Request) -> (str, str):
         return (user_name, user_path)
 
 
+def _is_logged(change: ChangelogMetadata) -> bool:
+    data_changed = change.created or change.modified
+    visibility_changed = change.visibility in [VisibilityChange.concealed,
+                                               VisibilityChange.revealed]
+    return data_changed or visibility_changed
+
+
 def _log_change(context: IResource,
                 user_name: str,
                 user_path: str,
                 change: ChangelogMetadata) -> None:
-    data_changed = change.created or change.modified
-    visibility_changed = change.visibility in [VisibilityChange.concealed,
-                                               VisibilityChange.revealed]
-    if data_changed or visibility_changed:
-        action_name = _get_entry_name(change),
-        log_auditevent(context,
-                       action_name,
-                       user_name=user_name,
-                       user_path=user_path)
-        transaction.commit()
+    action_name = _get_entry_name(change)
+    log_auditevent(context,
+                   action_name,
+                   user_name=user_name,
+                   user_path=user_path)
 
 
 def _get_entry_name(change) -> str:
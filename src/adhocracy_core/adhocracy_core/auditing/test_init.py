@@ -120,6 +120,52 @@ def test_audit_resource_changes_callback(registry, request_, changelog,
     assert len(all_entries) == 2
 
 
+@mark.usefixtures('integration')
+def test_audit_resource_changes_callback_commit_once(
+        registry, request_, changelog, mock_get_user_info, monkeypatch):
+    from adhocracy_core import auditing
+    from . import audit_resources_changes_callback
+    from . import set_auditlog
+    mock_transaction = Mock()
+    monkeypatch.setattr(auditing, 'transaction', mock_transaction)
+    set_auditlog(request_.context)
+    changelog['/'] = changelog['/']._replace(resource=context, created=True)
+    changelog['/a'] = changelog['/a']._replace(resource=context, modified=True)
+    registry.changelog = changelog
+    audit_resources_changes_callback(request_, Mock())
+    assert mock_transaction.commit.call_count == 1
+
+
+@mark.usefixtures('integration')
+def test_audit_resource_changes_callback_retry_if_conflict(
+        registry, request_, changelog, mock_get_user_info, monkeypatch):
+    from ZODB.POSException import ConflictError
+    from adhocracy_core import auditing
+    from . import audit_resources_changes_callback
+    from . import get_auditlog
+    from . import set_auditlog
+    mock_transaction = Mock()
+    mock_transaction.commit.side_effect = [ConflictError(), None]
+    monkeypatch.setattr(auditing, 'transaction', mock_transaction)
+    set_auditlog(request_.context)
+    changelog['/'] = changelog['/']._replace(resource=context, created=True)
+    registry.changelog = changelog
+    audit_resources_changes_callback(request_, Mock())
+    assert mock_transaction.abort.call_count == 1
+    assert mock_transaction.commit.call_count == 2
+
+
+@mark.usefixtures('integration')
+def test_audit_resource_changes_callback_no_commit_if_nothing_changed(
+        registry, request_, changelog, monkeypatch):
+    from adhocracy_core import auditing
+    from . import audit_resources_changes_callback
+    mock_transaction = Mock()
+    monkeypatch.setattr(auditing, 'transaction', mock_transaction)
+    audit_resources_changes_callback(request_, Mock())
+    assert not mock_transaction.commit.called
+
+
 @mark.usefixtures('integration')
 def test_get_user_info(context, registry, request_, user):
     from adhocracy_core.auditing import _get_user_info
@@ -182,7 +228,8 @@ class TestAuditlog:
         user_path = '/user1'
         inst.add(name, resource_path, user_name, user_path)
         key, value = inst.items()[0]
-        assert isinstance(key, datetime.datetime)
+        date, process_id, sequence = key
+        assert isinstance(date, datetime.datetime)
         assert isinstance(value, AuditlogEntry)
         assert value.name == name
         assert value.resource_path == resource_path
@@ -190,6 +237,58 @@ class TestAuditlog:
         assert value.user_path == user_path
 
 
+    def test_add_same_time_unique_keys(self, inst, monkeypatch):
+        from datetime import datetime
+        from adhocracy_core import auditing
+        now = datetime.utcnow()
+        mock_datetime = Mock(spec=datetime)
+        mock_datetime.utcnow.return_value = now
+        monkeypatch.setattr(auditing, 'datetime', mock_datetime)
+        inst.add('created', '/resource1', 'user1', '/user1')
+        inst.add('modified', '/resource1', 'user1', '/user1')
+        assert len(inst) == 2
+
+    @fixture
+    def inst_with_entries(self, inst):
+        from datetime import datetime
+        from adhocracy_core.interfaces import AuditlogEntry
+        for day in range(1, 6):
+            key = (datetime(2015, 1, day), 0, day)
+            inst[key] = AuditlogEntry('created', '/{}'.format(day), '', '')
+        return inst
+
+    def _get_paths(self, entries: list) -> list:
+        return [e.resource_path for k, e in entries]
+
+    def test_get_entries(self, inst_with_entries):
+        entries = inst_with_entries.get_entries()
+        assert self._get_paths(entries) == ['/1', '/2', '/3', '/4', '/5']
+
+    def test_get_entries_with_limit(self, inst_with_entries):
+        entries = inst_with_entries.get_entries(limit=2)
+        assert self._get_paths(entries) == ['/1', '/2']
+
+    def test_get_entries_with_start_and_end(self, inst_with_entries):
+        from datetime import datetime
+        entries = inst_with_entries.get_entries(start=datetime(2015, 1, 2),
+                                                end=datetime(2015, 1, 4))
+        assert self._get_paths(entries) == ['/2', '/3']
+
+    def test_get_entries_with_after(self, inst_with_entries):
+        first_page = inst_with_entries.get_entries(limit=2)
+        entries = inst_with_entries.get_entries(after=first_page[-1][0],
+                                                limit=2)
+        assert self._get_paths(entries) == ['/3', '/4']
+
+    def test_get_entries_with_start_and_after_before_start(
+            self, inst_with_entries):
+        from datetime import datetime
+        first_page = inst_with_entries.get_entries(limit=1)
+        entries = inst_with_entries.get_entries(start=datetime(2015, 1, 3),
+                                                after=first_page[-1][0])
+        assert self._get_paths(entries) == ['/3', '/4', '/5']
+
+
 class TestSetAuditlog:
 
     @fixture
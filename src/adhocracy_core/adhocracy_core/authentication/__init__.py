@@ -1,9 +1,12 @@
 """Authentication with support for token http headers."""
 import hashlib
 from datetime import datetime
+from datetime import timedelta
 
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
 from colander import Invalid
-from persistent.dict import PersistentDict
 from pyramid.authentication import CallbackAuthenticationPolicy
 from pyramid.interfaces import IAuthenticationPolicy
 from pyramid.request import Request
@@ -28,12 +31,19 @@ class TokenMangerAnnotationStorage:
 
     """Manage authentication tokens and use object annotation to store them.
 
+    The tokens are stored in a :class:`BTrees.OOBTree.OOBTree` to allow
+    concurrent logins without write conflicts. An additional expiry index
+    maps time buckets to the tokens created in this period of time,
+    so deleting expired tokens does not need to iterate all tokens.
+
     Constructor arguments:
 
     :param context: the object to annotate the authentication token storage.
     """
 
     annotation_key = '_tokenmanager_storage'
+    expiry_annotation_key = '_tokenmanager_expiry_buckets'
+    expiry_bucket_seconds = 3600
 
     def __init__(self, context):
         """Initialize self."""
@@ -43,10 +53,18 @@ class TokenMangerAnnotationStorage:
     def token_to_user_id_timestamp(self):
         tokens = getattr(self.context, self.annotation_key, None)
         if tokens is None:
-            tokens = PersistentDict()
+            tokens = OOBTree()
             setattr(self.context, self.annotation_key, tokens)
         return tokens
 
+    @property
+    def expiry_buckets(self):
+        buckets = getattr(self.context, self.expiry_annotation_key, None)
+        if buckets is None:
+            buckets = IOBTree()
+            setattr(self.context, self.expiry_annotation_key, buckets)
+        return buckets
+
     def create_token(self, userid: str, secret='', hashalg='sha512') -> str:
         """Create authentication token for user_id.
 
@@ -57,7 +75,7 @@ class TokenMangerAnnotationStorage:
         timestamp = datetime.now()
         value = self._build_token_value(userid, timestamp, secret)
         token = hashlib.new(hashalg, value).hexdigest()
-        self.token_to_user_id_timestamp[token] = (userid, timestamp)
+        self.add_token(token, userid, timestamp)
         return token
 
     def _build_token_value(self, user_id: str, timestamp: datetime,
@@ -67,6 +85,19 @@ class TokenMangerAnnotationStorage:
         user_bytes = user_id.encode('UTF-8', 'replace')
         return time_bytes + secret_bytes + user_bytes
 
+    def add_token(self, token: str, userid: str, timestamp: datetime):
+        """Store `token` for `userid` created at `timestamp`."""
+        self.token_to_user_id_timestamp[token] = (userid, timestamp)
+        bucket_key = self._get_bucket_key(timestamp)
+        bucket = self.expiry_buckets.get(bucket_key, None)
+        if bucket is None:
+            bucket = OOTreeSet()
+            self.expiry_buckets[bucket_key] = bucket
+        bucket.add(token)
+
+    def _get_bucket_key(self, timestamp: datetime) -> int:
+        return int(timestamp.timestamp() // self.expiry_bucket_seconds)
+
     def get_user_id(self, token: str, timeout: float=None) -> str:
         """Get user_id for authentication token.
 
@@ -78,7 +109,7 @@ class TokenMangerAnnotationStorage:
         """
         userid, timestamp = self.token_to_user_id_timestamp[token]
         if self._is_expired(timestamp, timeout):
-            del self.token_to_user_id_timestamp[token]
+            self.delete_token(token)
             raise KeyError
         return userid
 
@@ -91,16 +122,44 @@ class TokenMangerAnnotationStorage:
 
     def delete_token(self, token: str):
         """Delete authentication token."""
-        if token in self.token_to_user_id_timestamp:
-
-            del self.token_to_user_id_timestamp[token]
+        tokens = self.token_to_user_id_timestamp
+        if token not in tokens:
+            return
+        userid, timestamp = tokens.pop(token)
+        bucket_key = self._get_bucket_key(timestamp)
+        bucket = self.expiry_buckets.get(bucket_key, None)
+        if bucket is None or token not in bucket:
+            return
+        bucket.remove(token)
+        if not bucket:
+            del self.expiry_buckets[bucket_key]
 
     def delete_expired_tokens(self, timeout: float):
-        all = self.token_to_user_id_timestamp.items()
-        expired = [t for t, (u, date) in all if self._is_expired(date,
-                                                                 timeout)]
-        for token in expired:
-            self.delete_token(token)
+        """Delete all tokens that are older than `timeout` seconds.
+
+        Only the tokens of expiry buckets that may contain expired tokens
+        are visited.
+        """
+        expire_before = datetime.now() - timedelta(seconds=timeout)
+        max_bucket_key = self._get_bucket_key(expire_before)
+        buckets = self.expiry_buckets
+        bucket_keys = list(buckets.keys(max=max_bucket_key))
+        for bucket_key in bucket_keys:
+            bucket = buckets[bucket_key]
+            for token in list(bucket):
+                date = self._get_timestamp(token)
+                if date is None:
+                    bucket.remove(token)
+                elif self._is_expired(date, timeout):
+                    self.delete_token(token)
+            if bucket_key in buckets and not buckets[bucket_key]:
+                del buckets[bucket_key]
+
+    def _get_timestamp(self, token: str) -> datetime:
+        value = self.token_to_user_id_timestamp.get(token, None)
+        if value is None:
+            return None
+        return value[1]
 
 
 def get_tokenmanager(request: Request, **kwargs) -> ITokenManger:
@@ -192,14 +251,23 @@ class TokenHeaderAuthenticationPolicy(CallbackAuthenticationPolicy):
         return _get_raw_x_user_headers(request)[0]
 
     def authenticated_userid(self, request):
-        """Return authenticated userid."""
+        """Return authenticated userid.
+
+        THE RESULT IS CACHED for the current request in the request attribute
+        called: __cached_userid__ .
+        """
+        cached_userid = getattr(request, '__cached_userid__', None)
+        if cached_userid is not None:
+            return cached_userid
         tokenmanager = self.get_tokenmanager(request)
         if tokenmanager is None:
             return None
         try:
-            return self._get_authenticated_user_id(request, tokenmanager)
+            userid = self._get_authenticated_user_id(request, tokenmanager)
         except KeyError:
             return None
+        request.__cached_userid__ = userid
+        return userid
 
     def _get_authenticated_user_id(self, request: Request,
                                    tokenmanager: ITokenManger) -> str:
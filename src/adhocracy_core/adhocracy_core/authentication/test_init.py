@@ -77,25 +77,84 @@ class TokenManagerUnitTest(unittest.TestCase):
         inst.delete_token(self.token)
         assert self.token not in inst.token_to_user_id_timestamp
 
+    def test_add_token(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        assert inst.token_to_user_id_timestamp[self.token] == (self.userid,
+                                                               self.timestamp)
+        bucket_key = inst._get_bucket_key(self.timestamp)
+        assert self.token in inst.expiry_buckets[bucket_key]
+
+    def test_add_token_same_time_bucket(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        inst.add_token('secret_second', self.userid, self.timestamp)
+        bucket_key = inst._get_bucket_key(self.timestamp)
+        assert list(inst.expiry_buckets) == [bucket_key]
+        assert len(inst.expiry_buckets[bucket_key]) == 2
+
+    def test_delete_token_remove_from_expiry_bucket(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        inst.add_token('secret_second', self.userid, self.timestamp)
+        inst.delete_token(self.token)
+        bucket_key = inst._get_bucket_key(self.timestamp)
+        assert list(inst.expiry_buckets[bucket_key]) == ['secret_second']
+
+    def test_delete_token_remove_empty_expiry_bucket(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        inst.delete_token(self.token)
+        assert len(inst.expiry_buckets) == 0
+
+    def test_get_user_id_with_passed_timeout_remove_from_expiry_bucket(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        with pytest.raises(KeyError):
+            inst.get_user_id(self.token, timeout=0)
+        assert len(inst.expiry_buckets) == 0
+
     def test_delete_expired_tokens_delete_token_if_expired(self):
+        from datetime import timedelta
         inst = self.make_one(self.context)
-        inst.token_to_user_id_timestamp[self.token] = (self.userid, self.timestamp)
+        old = self.timestamp - timedelta(days=2)
+        inst.add_token(self.token, self.userid, old)
+        inst.delete_expired_tokens(60 * 60 * 24)
+        assert self.token not in inst.token_to_user_id_timestamp
+        assert len(inst.expiry_buckets) == 0
+
+    def test_delete_expired_tokens_ignore_token_if_not_expired(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
+        inst.delete_expired_tokens(60 * 60 * 24)
+        assert self.token in inst.token_to_user_id_timestamp
+
+    def test_delete_expired_tokens_ignore_not_expired_buckets(self):
+        inst = self.make_one(self.context)
+        inst.add_token(self.token, self.userid, self.timestamp)
         inst._is_expired = Mock(return_value=True)
-        inst.delete_token = Mock()
-        timeout = 0.1
-        inst.delete_expired_tokens(timeout)
+        inst.delete_expired_tokens(60 * 60 * 24)
+        assert not inst._is_expired.called
 
-        inst._is_expired.assert_called_with(self.timestamp, timeout)
-        inst.delete_token.assert_called_with(self.token)
+    def test_delete_expired_tokens_check_tokens_of_boundary_bucket(self):
+        from datetime import timedelta
+        inst = self.make_one(self.context)
+        inst.expiry_bucket_seconds = 60 * 60 * 24 * 365
+        old = self.timestamp - timedelta(seconds=10)
+        inst.add_token(self.token, self.userid, old)
+        inst.add_token('secret_second', self.userid, self.timestamp)
+        inst.delete_expired_tokens(5)
+        assert self.token not in inst.token_to_user_id_timestamp
+        assert 'secret_second' in inst.token_to_user_id_timestamp
 
-    def test_delete_expired_tokens_ignore_token_if_not_expired(self):
+    def test_delete_expired_tokens_remove_stale_bucket_entries(self):
+        from datetime import timedelta
         inst = self.make_one(self.context)
-        inst.token_to_user_id_timestamp[self.token] = (self.userid, self.timestamp)
-        inst._is_expired = Mock(return_value=False)
-        inst.delete_token = Mock()
-        timeout = 0.1
-        inst.delete_expired_tokens(timeout)
-        assert not inst.delete_token.called
+        old = self.timestamp - timedelta(days=2)
+        inst.add_token(self.token, self.userid, old)
+        del inst.token_to_user_id_timestamp[self.token]
+        inst.delete_expired_tokens(60 * 60 * 24)
+        assert len(inst.expiry_buckets) == 0
 
 
 class TokenHeaderAuthenticationPolicy(unittest.TestCase):
@@ -175,6 +234,21 @@ class TokenHeaderAuthenticationPolicy(unittest.TestCase):
         assert inst.authenticated_userid(self.request) == self.userid
         assert tokenmanager.get_user_id.call_args[1] == {'timeout': 10}
 
+    def test_authenticated_userid_cache_result(self):
+        tokenmanager = Mock()
+        tokenmanager.get_user_id.return_value = self.userid
+        inst = self.make_one('', get_tokenmanager=lambda x: tokenmanager)
+        self.request.headers = self.token_and_user_id_headers
+        inst.authenticated_userid(self.request)
+        assert inst.authenticated_userid(self.request) == self.userid
+        assert tokenmanager.get_user_id.call_count == 1
+        assert self.request.__cached_userid__ == self.userid
+
+    def test_authenticated_userid_with_cached_userid(self):
+        inst = self.make_one('', get_tokenmanager=lambda x: None)
+        self.request.__cached_userid__ = self.userid
+        assert inst.authenticated_userid(self.request) == self.userid
+
     def test_authenticated_userid_with_tokenmanger_valid_token_but_wrong_user_id(self):
         tokenmanager = Mock()
         tokenmanager.get_user_id.return_value = self.userid + 'WRONG_ID'
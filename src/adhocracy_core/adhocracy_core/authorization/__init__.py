@@ -1,5 +1,7 @@
 """Authorization with roles/local roles mapped to adhocracy principals."""
 from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
 from pyramid.security import ALL_PERMISSIONS
 from pyramid.security import Allow
 from pyramid.authorization import ACLAuthorizationPolicy
@@ -9,8 +11,13 @@ from pyramid.traversal import lineage
 from pyramid.registry import Registry
 from pyramid.request import Request
 from pyramid.router import Router
+from pyramid.interfaces import IAuthorizationPolicy
 from zope.interface import implementer
+from zope.interface import Interface
+from substanced.event import ACLModified
+from substanced.util import find_objectmap
 from substanced.util import get_acl
+from substanced.util import get_oid
 import substanced.util
 import transaction
 
@@ -18,6 +25,7 @@ from adhocracy_core.utils import get_root
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IRoleACLAuthorizationPolicy
 from adhocracy_core.events import LocalRolesModified
+from adhocracy_core.interfaces import ILocalRolesModfied
 from adhocracy_core.schema import ACEPrincipal
 from adhocracy_core.schema import ROLE_PRINCIPALS
 from adhocracy_core.schema import SYSTEM_PRINCIPALS
@@ -28,6 +36,43 @@ CREATOR_ROLEID = 'role:creator'
 god_all_permission_ace = (Allow, 'role:god', ALL_PERMISSIONS)
 
 
+class PermitsCache(local):
+
+    """Cache permission check results for the current transaction.
+
+    The cache is thread local and emptied if a new transaction is started.
+    `hits` and `misses` count the cache lookups of the current thread.
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self.results = {}
+        self.transaction = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> ACLPermitsResult:
+        """Return the cached result for `key` or None."""
+        current_transaction = transaction.get()
+        if current_transaction is not self.transaction:
+            self.results = {}
+            self.transaction = current_transaction
+        result = self.results.get(key, None)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key: tuple, result: ACLPermitsResult):
+        """Cache `result` for `key`."""
+        self.results[key] = result
+
+    def clear(self):
+        """Remove all cached results."""
+        self.results = {}
+
+
 @implementer(IRoleACLAuthorizationPolicy)
 class RoleACLAuthorizationPolicy(ACLAuthorizationPolicy):
 
@@ -37,12 +82,31 @@ class RoleACLAuthorizationPolicy(ACLAuthorizationPolicy):
      :func:`set_local_roles` and :func:`get_local_roles`.
 
     The local roles are inherited by children, except the `creator` role.
+
+    Results for persistent resources are cached in `cache`
+    (:class:`PermitsCache`) until the acl or local roles are modified.
     """
 
+    def __init__(self):
+        """Initialize self."""
+        self.cache = PermitsCache()
+
     def permits(self, context: IResource,
                 principals: list,
                 permission: str) -> ACLPermitsResult:
         """Check `permission` for `context`. Read interface docstring."""
+        oid = get_oid(context, None)
+        if oid is None:
+            return self._permits(context, principals, permission)
+        key = (oid, frozenset(principals), permission)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._permits(context, principals, permission)
+            self.cache.set(key, result)
+        return result
+
+    def _permits(self, context: IResource, principals: list,
+                 permission: str) -> ACLPermitsResult:
         local_roles = get_local_roles_all(context)
         principals_with_roles = set(principals)
         for principal, roles in local_roles.items():
@@ -164,9 +228,69 @@ def set_acms_for_app_root(app: Router, acms: (dict)=()):
     transaction.commit()
 
 
+class BulkACLChanges(local):
+
+    """Resources with acls set inside :func:`bulk_acl_changes`."""
+
+    resources = None
+
+
+bulk_acl_changes_state = BulkACLChanges()
+
+
 def set_acl(resource: IResource, acl: list, registry=None) -> bool:
-    """Set the acl and mark the resource as dirty."""
-    substanced.util.set_acl(resource, acl, registry)
+    """Set the acl and mark the resource as dirty.
+
+    Inside :func:`bulk_acl_changes` no
+    :class:`substanced.event.ACLModified` event is sent.
+    """
+    resources = bulk_acl_changes_state.resources
+    if resources is None:
+        return substanced.util.set_acl(resource, acl, registry)
+    if acl == getattr(resource, '__acl__', None):
+        return False
+    resource.__acl__ = acl
+    resources.append(resource)
+    return True
+
+
+@contextmanager
+def bulk_acl_changes(registry: Registry=None):
+    """Context manager to set the acls of many resources at once.
+
+    The acls set with :func:`set_acl` are stored in the objectmap acl
+    postings (used by the `allowed` index) in one pass when the context
+    exits, the permits cache is cleared once. The other
+    :class:`substanced.event.ACLModified` subscribers are not called, the
+    caller has to notify changes of the resources. Nested contexts are
+    merged into the outermost one.
+    """
+    if bulk_acl_changes_state.resources is not None:
+        yield
+        return
+    resources = []
+    bulk_acl_changes_state.resources = resources
+    try:
+        yield
+    finally:
+        bulk_acl_changes_state.resources = None
+    _update_acl_postings(resources, registry)
+
+
+def _update_acl_postings(resources: [IResource], registry: Registry):
+    if not resources:
+        return
+    objectmap = find_objectmap(resources[0])
+    if objectmap is not None:  # ease testing
+        updated = set()
+        for resource in resources:
+            if id(resource) in updated:
+                continue
+            updated.add(id(resource))
+            objectmap.set_acl(resource, resource.__acl__)
+    if registry is None:
+        registry = get_current_registry()
+    _clear_permits_cache(registry)
 
 
 def set_god_all_permissions(resource: IResource, registry=None) -> bool:
@@ -182,3 +306,35 @@ def create_fake_god_request(registry):
     request.registry = registry
     request.__cached_principals__ = ['role:god']
     return request
+
+
+def clear_permits_cache_subscriber(event):
+    """Clear the permits cache if local roles are modified.
+
+    Local roles are inherited, so all cached results are removed.
+    """
+    _clear_permits_cache(event.registry)
+
+
+def clear_permits_cache_acl_subscriber(event, resource):
+    """Clear the permits cache if the acl of `resource` is modified.
+
+    :class:`substanced.event.ACLModified` has no registry attribute,
+    like :func:`substanced.util.set_acl` the current registry is used.
+    """
+    _clear_permits_cache(get_current_registry())
+
+
+def _clear_permits_cache(registry: Registry):
+    policy = registry.queryUtility(IAuthorizationPolicy)
+    cache = getattr(policy, 'cache', None)
+    if cache is not None:
+        cache.clear()
+
+
+def includeme(config):
+    """Register subscriber to clear the permits cache."""
+    config.add_subscriber(clear_permits_cache_subscriber,
+                          ILocalRolesModfied)
+    config.add_subscriber(clear_permits_cache_acl_subscriber,
+                          [ACLModified, Interface])
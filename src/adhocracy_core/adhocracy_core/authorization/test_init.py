@@ -113,6 +113,95 @@ class TestRuleACLAuthorizationPolicy:
         assert not inst.permits(context['child']['grandchild'],
                                 ['system.Authenticated'], 'view')
 
+    def test_permits_cache_result_for_resource_with_oid(self, inst, context):
+        from pyramid.security import Allow
+        context.__oid__ = 1
+        context.__acl__ = [(Allow, 'role:admin', 'view')]
+        assert not inst.permits(context, ['system.Authenticated'], 'view')
+        context.__local_roles__ = {'system.Authenticated': {'role:admin'}}
+        assert not inst.permits(context, ['system.Authenticated'], 'view')
+        assert inst.cache.misses == 1
+        assert inst.cache.hits == 1
+
+    def test_permits_cache_key_with_principals_and_permission(self, inst,
+                                                              context):
+        from pyramid.security import Allow
+        context.__oid__ = 1
+        context.__acl__ = [(Allow, 'role:admin', 'view')]
+        assert not inst.permits(context, ['system.Authenticated'], 'view')
+        assert inst.permits(context, ['role:admin'], 'view')
+        assert not inst.permits(context, ['role:admin'], 'edit')
+        assert inst.cache.misses == 3
+
+    def test_permits_no_cache_for_resource_without_oid(self, inst, context):
+        inst.permits(context, ['system.Authenticated'], 'view')
+        inst.permits(context, ['system.Authenticated'], 'view')
+        assert inst.cache.results == {}
+
+    def test_permits_cache_cleared_if_new_transaction(self, inst, context):
+        import transaction
+        from pyramid.security import Allow
+        context.__oid__ = 1
+        context.__acl__ = [(Allow, 'role:admin', 'view')]
+        assert not inst.permits(context, ['system.Authenticated'], 'view')
+        transaction.abort()
+        context.__local_roles__ = {'system.Authenticated': {'role:admin'}}
+        assert inst.permits(context, ['system.Authenticated'], 'view')
+
+
+class TestClearPermitsCacheSubscriber:
+
+    @fixture
+    def registry(self, config):
+        from pyramid.interfaces import IAuthorizationPolicy
+        from . import RoleACLAuthorizationPolicy
+        policy = RoleACLAuthorizationPolicy()
+        config.registry.registerUtility(policy, IAuthorizationPolicy)
+        return config.registry
+
+    def call_fut(self, event):
+        from . import clear_permits_cache_subscriber
+        return clear_permits_cache_subscriber(event)
+
+    def test_call_local_roles_modified(self, registry, context):
+        from pyramid.interfaces import IAuthorizationPolicy
+        from adhocracy_core.events import LocalRolesModified
+        cache = registry.getUtility(IAuthorizationPolicy).cache
+        cache.set((1, frozenset(), 'view'), True)
+        self.call_fut(LocalRolesModified(context, {}, {}, registry))
+        assert cache.results == {}
+
+    def test_call_without_permits_cache(self, config, context):
+        from adhocracy_core.events import LocalRolesModified
+        self.call_fut(LocalRolesModified(context, {}, {}, config.registry))
+
+
+def test_includeme_register_clear_permits_cache_subscriber(config, context):
+    from pyramid.interfaces import IAuthorizationPolicy
+    from . import set_local_roles
+    from . import RoleACLAuthorizationPolicy
+    config.include('adhocracy_core.events')
+    config.include('adhocracy_core.authorization')
+    policy = RoleACLAuthorizationPolicy()
+    config.registry.registerUtility(policy, IAuthorizationPolicy)
+    policy.cache.set((1, frozenset(), 'view'), True)
+    set_local_roles(context, {'system.Everyone': {'role:reader'}},
+                    config.registry)
+    assert policy.cache.results == {}
+
+
+def test_includeme_register_clear_permits_cache_acl_subscriber(config,
+                                                               context):
+    from pyramid.interfaces import IAuthorizationPolicy
+    from substanced.util import set_acl
+    from . import RoleACLAuthorizationPolicy
+    config.include('adhocracy_core.authorization')
+    policy = RoleACLAuthorizationPolicy()
+    config.registry.registerUtility(policy, IAuthorizationPolicy)
+    policy.cache.set((1, frozenset(), 'view'), True)
+    set_acl(context, [(Allow, 'role:reader', 'view')], config.registry)
+    assert policy.cache.results == {}
+
 
 def test_set_local_roles_non_set_roles(context):
     from . import set_local_roles
@@ -291,6 +380,95 @@ def test_set_acl_set_resource_dirty():
     assert resource._p_changed is True
 
 
+class TestBulkACLChanges:
+
+    @fixture
+    def registry(self, config):
+        from pyramid.interfaces import IAuthorizationPolicy
+        from substanced.event import ACLModified
+        from zope.interface import Interface
+        from . import RoleACLAuthorizationPolicy
+        policy = RoleACLAuthorizationPolicy()
+        config.registry.registerUtility(policy, IAuthorizationPolicy)
+        events = config.registry.acl_events = []
+        config.add_subscriber(lambda event, obj: events.append(event),
+                              (ACLModified, Interface))
+        return config.registry
+
+    @fixture
+    def mock_objectmap(self, monkeypatch):
+        from adhocracy_core import authorization
+        objectmap = Mock()
+        monkeypatch.setattr(authorization, 'find_objectmap',
+                            lambda x: objectmap)
+        return objectmap
+
+    def call_fut(self, *args, **kwargs):
+        from . import bulk_acl_changes
+        return bulk_acl_changes(*args, **kwargs)
+
+    def test_set_acl_without_acl_modified_event(self, registry,
+                                                mock_objectmap):
+        from . import set_acl
+        resource = testing.DummyResource()
+        acl = [(Allow, 'role:creator', 'edit_comment')]
+        with self.call_fut(registry):
+            assert set_acl(resource, acl, registry) is True
+        assert resource.__acl__ == acl
+        assert registry.acl_events == []
+
+    def test_set_acl_ignore_if_not_changed(self, registry, mock_objectmap):
+        from . import set_acl
+        acl = [(Allow, 'role:creator', 'edit_comment')]
+        resource = testing.DummyResource(__acl__=acl)
+        with self.call_fut(registry):
+            assert set_acl(resource, acl, registry) is False
+        assert not mock_objectmap.set_acl.called
+
+    def test_update_acl_postings_once_on_exit(self, registry, mock_objectmap):
+        from . import set_acl
+        resource = testing.DummyResource()
+        acl = [(Allow, 'role:creator', 'edit_comment')]
+        with self.call_fut(registry):
+            set_acl(resource, [], registry)
+            set_acl(resource, acl, registry)
+            assert not mock_objectmap.set_acl.called
+        mock_objectmap.set_acl.assert_called_once_with(resource, acl)
+
+    def test_clear_permits_cache_on_exit(self, registry, mock_objectmap):
+        from pyramid.interfaces import IAuthorizationPolicy
+        from . import set_acl
+        cache = registry.getUtility(IAuthorizationPolicy).cache
+        with self.call_fut(registry):
+            set_acl(testing.DummyResource(), [], registry)
+            cache.set((1, frozenset(), 'view'), True)
+        assert cache.results == {}
+
+    def test_nested_merged_into_outermost(self, registry, mock_objectmap):
+        from . import set_acl
+        resource = testing.DummyResource()
+        with self.call_fut(registry):
+            with self.call_fut(registry):
+                set_acl(resource, [], registry)
+            assert not mock_objectmap.set_acl.called
+        assert mock_objectmap.set_acl.called
+
+    def test_no_acl_postings_update_on_error(self, registry, mock_objectmap):
+        from . import set_acl
+        with raises(ValueError):
+            with self.call_fut(registry):
+                set_acl(testing.DummyResource(), [], registry)
+                raise ValueError
+        assert not mock_objectmap.set_acl.called
+
+    def test_set_acl_with_event_after_exit(self, registry, mock_objectmap):
+        from . import set_acl
+        with self.call_fut(registry):
+            pass
+        set_acl(testing.DummyResource(), [], registry)
+        assert len(registry.acl_events) == 1
+
+
 def test_set_god_all_permissions():
     from pyramid.security import ALL_PERMISSIONS
     from . import set_god_all_permissions
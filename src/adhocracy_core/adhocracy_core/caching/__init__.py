@@ -1,10 +1,23 @@
 """Adapter and helper functions to set the http response caching headers."""
+from copy import copy
+from queue import Empty
+from queue import Queue
+from threading import Lock
+from threading import Thread
+from urllib.parse import quote
+import atexit
 import logging
+import time
 
 from pyramid.httpexceptions import HTTPNotModified
 from pyramid.interfaces import IRequest
+from pyramid.interfaces import IRootFactory
 from pyramid.registry import Registry
+from pyramid.response import Response
+from pyramid.traversal import find_resource
+from pyramid.traversal import find_root
 from pyramid.traversal import resource_path
+from pyramid.tweens import EXCVIEW
 from zope.interface import implementer
 from zope.interface.interfaces import IInterface
 from requests.exceptions import RequestException
@@ -15,6 +28,8 @@ from adhocracy_core.interfaces import IHTTPCacheStrategy
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.exceptions import ConfigurationError
 from adhocracy_core.resources.asset import IAssetDownload
+from adhocracy_core.sheets.asset import IAssetData
+from adhocracy_core.sheets.asset import retrieve_asset_file
 from adhocracy_core.utils import get_reason_if_blocked
 from adhocracy_core.utils import exception_to_str
 from adhocracy_core.utils import extract_events_from_changelog_metadata
@@ -22,6 +37,8 @@ from adhocracy_core.utils import extract_events_from_changelog_metadata
 
 DISABLED_VIEWS_OR_METHODS = ['PATCH', 'POST', 'PUT']
 
+_REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
 logger = logging.getLogger(__name__)
 
 
@@ -225,6 +242,25 @@ def etag_modified(context: IResource, request: IRequest) -> str:
     return modified
 
 
+def etag_version_stamp(context: IResource, request: IRequest) -> str:
+    """Return version stamp of `context` and visibility epoch of the root.
+
+    The version stamp increments for every change of `context`, including
+    changed backreferences, descendants and visibility. The visibility epoch
+    increments if any resource is hidden/deleted or revealed.
+
+    Resources and roots created before the counters were added have no
+    version stamp or visibility epoch until their first change, for them
+    the changed counters, modification date and blocked reason are used.
+    """
+    stamp = getattr(context, '__version_stamp__', None)
+    epoch = getattr(find_root(context), '__visibility_epoch__', None)
+    if stamp is None or epoch is None:
+        etags = (etag_backrefs, etag_descendants, etag_modified, etag_blocked)
+        return '|'.join(etag(context, request) for etag in etags)
+    return '{0}.{1}'.format(stamp(), epoch())
+
+
 def etag_userid(context: IResource, request: IRequest) -> str:
     """Return :term:`userid`."""
     userid = request.authenticated_userid
@@ -251,8 +287,7 @@ class HTTPCacheStrategyWeakAdapter(HTTPCacheStrategyBaseAdapter):
     browser_max_age = 0
     proxy_max_age = 60 * 60 * 24 * 30 * 12
     vary = ('Accept-Encoding', 'X-User-Path', 'X-User-Token')
-    etags = (etag_backrefs, etag_descendants, etag_modified, etag_userid,
-             etag_blocked)
+    etags = (etag_version_stamp, etag_userid)
 
 
 @implementer(IHTTPCacheStrategy)
@@ -268,43 +303,287 @@ class HTTPCacheStrategyWeakAssetDownloadAdapter(HTTPCacheStrategyBaseAdapter):
         """Initialize self."""
         parent = context.__parent__  # reuse parent cache header
         super().__init__(parent, request)
+        self.download = context
+        """The asset download, the parent asset is the context."""
+
+    def set_etag(self):
+        """Set etag, mark image variants that are not generated yet.
+
+        Pending image variants are served with the parent asset data.
+        The marker invalidates this response once the variant is generated,
+        although the parent asset is not modified.
+        """
+        super().set_etag()
+        etag = self.request.response.etag
+        if etag is not None and self._is_pending_image_variant():
+            self.request.response.etag = etag + '|pending'
+
+    def _is_pending_image_variant(self) -> bool:
+        if not IAssetData.providedBy(self.download):
+            return False
+        file = retrieve_asset_file(self.download, self.request.registry)
+        return getattr(file, 'is_pending', False)
+
+
+class VarnishPurgeQueue:
+
+    """Send PURGE requests to Varnish in a background thread.
+
+    Queued paths are deduplicated and batched into regular expression purge
+    requests, one per `batch_size` paths. The requests use one keep-alive
+    session, failing requests are retried with exponential backoff.
+
+    `depth` is the number of queued purge jobs, `latency` the duration of
+    the last purge request in seconds.
+    """
+
+    batch_size = 50
+    retries = 3
+    backoff = 0.5
+
+    def __init__(self, varnish_url: str):
+        """Initialize self."""
+        self.varnish_url = varnish_url
+        self.queue = Queue()
+        self.session = requests.Session()
+        self.latency = 0.0
+        self._thread = None
+        self._lock = Lock()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of queued purge jobs."""
+        return self.queue.qsize()
+
+    def add(self, host: str, script_name: str, paths: list):
+        """Queue `paths` to be purged for `host` and `script_name`."""
+        self.queue.put((host, script_name, paths))
+        self._start_worker()
+
+    def join(self):
+        """Block until all queued paths are purged."""
+        self.queue.join()
+
+    def _start_worker(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = Thread(target=self._work,
+                                  name='varnish_purge',
+                                  daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        while True:
+            jobs = [self.queue.get()]
+            while True:
+                try:
+                    jobs.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                self._purge_jobs(jobs)
+            except Exception as err:  # pragma: no cover
+                logger.error('Purging Varnish failed: %s',
+                             exception_to_str(err))
+            finally:
+                for job in jobs:
+                    self.queue.task_done()
+
+    def _purge_jobs(self, jobs: list):
+        paths_by_host = {}
+        for host, script_name, paths in jobs:
+            paths_by_host.setdefault((host, script_name), set()).update(paths)
+        for (host, script_name), paths in paths_by_host.items():
+            self.purge(host, script_name, paths)
+
+    def purge(self, host: str, script_name: str, paths: set):
+        """Send PURGE requests for `paths` and all their sub paths."""
+        paths = sorted(set(paths))
+        for start in range(0, len(paths), self.batch_size):
+            batch = paths[start:start + self.batch_size]
+            self._send_purge_request(host, script_name, batch)
+
+    def _send_purge_request(self, host: str, script_name: str, paths: list):
+        url = self.varnish_url + script_name + '/'
+        regex_paths = '|'.join(_escape_regex(x.lstrip('/')) for x in paths)
+        headers = {'X-Purge-Host': host,
+                   'X-Purge-Regex': '(' + regex_paths + ')/?\\??.*$',
+                   }
+        for attempt in range(self.retries):
+            start = time.monotonic()
+            try:
+                resp = self.session.request('PURGE', url, headers=headers)
+            except RequestException as err:
+                logger.error(
+                    'Couldn\'t send purge request for %s to Varnish: %s',
+                    paths, exception_to_str(err))
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            finally:
+                self.latency = time.monotonic() - start
+            if resp.status_code != 200:
+                logger.warning('Varnish responded %s to purge request for %s',
+                               resp.status_code, paths)
+            return
+        logger.error('Giving up on purge request for %s', paths)
+
+
+def _escape_regex(path: str) -> str:
+    return ''.join('\\' + x if x in _REGEX_SPECIAL_CHARS else x
+                   for x in path)
+
+
+_varnish_purge_queue_lock = Lock()
+
+
+def get_varnish_purge_queue(registry: Registry) -> VarnishPurgeQueue:
+    """Return the :class:`VarnishPurgeQueue` or None if not configured.
+
+    The queue is created on first access if `adhocracy.varnish_url` is set.
+    Concurrent first accesses are serialized, so only one queue is created.
+    """
+    purge_queue = getattr(registry, 'varnish_purge_queue', None)
+    if purge_queue is not None:
+        return purge_queue
+    varnish_url = registry.settings.get('adhocracy.varnish_url')
+    if not varnish_url:
+        return None
+    with _varnish_purge_queue_lock:
+        purge_queue = getattr(registry, 'varnish_purge_queue', None)
+        if purge_queue is None:
+            purge_queue = VarnishPurgeQueue(varnish_url)
+            atexit.register(purge_queue.join)
+            registry.varnish_purge_queue = purge_queue
+    return purge_queue
 
 
 def purge_varnish_after_commit_hook(success: bool, registry: Registry,
                                     request: IRequest):
-    """Send PURGE requests for all changed resources to Varnish."""
+    """Queue PURGE requests for all changed resources to Varnish."""
     varnish_url = registry.settings.get('adhocracy.varnish_url')
     if not (success and varnish_url):
         return
     changelog_metadata = registry.changelog.values()
-    errcount = 0
+    paths = []
     for meta in changelog_metadata:
         events = extract_events_from_changelog_metadata(meta)
         if events == []:
             continue
-        path = resource_path(meta.resource)
-        url = varnish_url + request.script_name + path
-        for event in events:
-            headers = {'X-Purge-Host': request.host}
-            headers['X-Purge-Regex'] = '/?\??.*$'
-            try:
-                resp = requests.request('PURGE', url, headers=headers)
-                if resp.status_code != 200:
-                    logger.warning(
-                        'Varnish responded %s to purge request for %s',
-                        resp.status_code, path)
-            except RequestException as err:
-                logger.error(
-                    'Couldn\'t send purge request for %s to Varnish: %s',
-                    path, exception_to_str(err))
-                errcount += 1
-                if errcount >= 3:  # pragma: no cover
-                    logger.error('Giving up on purge requests')
-                    return
+        paths.append(resource_path(meta.resource))
+    if not paths:
+        return
+    purge_queue = get_varnish_purge_queue(registry)
+    purge_queue.add(request.host, request.script_name, paths)
+
+
+class ConditionalGetStats:
+
+    """Count conditional GET requests and the ones answered with 304.
+
+    The hit ratio is logged every `log_interval` requests.
+    """
+
+    log_interval = 1000
+
+    def __init__(self):
+        """Initialize self."""
+        self.hits = 0
+        self.requests = 0
+        self._lock = Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Return the ratio of requests answered with 304."""
+        if not self.requests:
+            return 0.0
+        return self.hits / self.requests
+
+    def add(self, hit: bool):
+        """Count conditional request, `hit` is True if answered with 304."""
+        with self._lock:
+            self.requests += 1
+            if hit:
+                self.hits += 1
+            if self.requests % self.log_interval == 0:
+                logger.info('Conditional GET hit ratio %.2f (%d of %d)',
+                            self.hit_ratio, self.hits, self.requests)
+
+
+def conditional_get_tween_factory(handler, registry: Registry):
+    """Return tween to answer conditional GET requests early.
+
+    If the etag of the requested resource matches the "If-None-Match" header
+    "304 Not Modified" is returned before view lookup, request validation and
+    serialization. Blocked (deleted or hidden) resources are passed to the
+    view to answer with "410 Gone". The :class:`ConditionalGetStats` are
+    available as `registry.conditional_get_stats`.
+    """
+    stats = ConditionalGetStats()
+    registry.conditional_get_stats = stats
+
+    def conditional_get_tween(request: IRequest) -> Response:
+        if request.method not in ('GET', 'HEAD') or not request.if_none_match:
+            return handler(request)
+        response = _get_not_modified_response(request)
+        stats.add(response is not None)
+        if response is None:
+            response = handler(request)
+        return response
+
+    return conditional_get_tween
+
+
+def _get_not_modified_response(request: IRequest) -> HTTPNotModified:
+    context = _find_context(request)
+    if context is None:
+        return
+    if get_reason_if_blocked(context) is not None:
+        return  # the view answers with 410 Gone
+    check_request = _copy_request(request, context)
+    strategy = request.registry.queryMultiAdapter((context, check_request),
+                                                  IHTTPCacheStrategy,
+                                                  request.method)
+    if strategy is None or not strategy.etags:
+        return
+    if not check_request.has_permission('view', context):
+        return
+    try:
+        strategy.check_conditional_request()
+    except HTTPNotModified as not_modified:
+        not_modified.etag = check_request.response.etag
+        return not_modified
+
+
+def _find_context(request: IRequest) -> IResource:
+    """Return the resource with the path of `request` or None.
+
+    None is returned if the path has a view name or subpath.
+    """
+    root_factory = request.registry.queryUtility(IRootFactory)
+    if root_factory is None:
+        return  # ease testing
+    root = root_factory(request)
+    try:
+        return find_resource(root, quote(request.path_info))
+    except KeyError:
+        return
+
+
+def _copy_request(request: IRequest, context: IResource) -> IRequest:
+    """Return a copy of `request` with `root` and `context` set.
+
+    The authentication policy needs them to get the userid, the original
+    request is left unchanged for the router.
+    """
+    check_request = copy(request)
+    check_request.root = find_root(context)
+    check_request.context = context
+    return check_request
 
 
 def includeme(config):
-    """Register cache strategies."""
+    """Register cache strategies and the conditional GET tween."""
     register_cache_strategy(HTTPCacheStrategyWeakAdapter,
                             IResource,
                             config.registry,
@@ -321,3 +600,5 @@ def includeme(config):
                             IAssetDownload,
                             config.registry,
                             'HEAD')
+    config.add_tween('adhocracy_core.caching.conditional_get_tween_factory',
+                     under=('pyramid_tm.tm_tween_factory', EXCVIEW))
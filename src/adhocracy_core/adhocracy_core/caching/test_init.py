@@ -266,6 +266,37 @@ def test_etag_changed_backrefs_without_counter(context):
     assert etag_backrefs(context, None) == 'None'
 
 
+def test_etag_version_stamp_without_counters(context):
+    from . import etag_version_stamp
+    assert etag_version_stamp(context, None) == 'None|None|None|None'
+
+
+def test_etag_version_stamp_without_version_stamp(context):
+    from BTrees.Length import Length
+    from . import etag_version_stamp
+    root = testing.DummyResource(__visibility_epoch__=Length(2))
+    root['child'] = context
+    context.modification_date = 'date'
+    assert etag_version_stamp(context, None) == 'None|None|date|None'
+
+
+def test_etag_version_stamp_without_visibility_epoch(context):
+    from BTrees.Length import Length
+    from . import etag_version_stamp
+    context.__version_stamp__ = Length(1)
+    context.__changed_backrefs_counter__ = Length(3)
+    assert etag_version_stamp(context, None) == '3|None|None|None'
+
+
+def test_etag_version_stamp_with_counters(context):
+    from BTrees.Length import Length
+    from . import etag_version_stamp
+    root = testing.DummyResource(__visibility_epoch__=Length(2))
+    root['child'] = context
+    context.__version_stamp__ = Length(1)
+    assert etag_version_stamp(context, None) == '1.2'
+
+
 class TestHTTPCacheStrategyWeakAdapter:
 
     @fixture
@@ -276,14 +307,12 @@ class TestHTTPCacheStrategyWeakAdapter:
     def test_create(self, inst):
         from zope.interface.verify import verifyObject
         from adhocracy_core.interfaces import IHTTPCacheStrategy
-        from . import etag_backrefs, etag_descendants, etag_modified, \
-            etag_userid, etag_blocked
+        from . import etag_version_stamp, etag_userid
         assert verifyObject(IHTTPCacheStrategy, inst)
         assert inst.browser_max_age == 0
         assert inst.proxy_max_age == 31104000
         assert inst.vary == ('Accept-Encoding', 'X-User-Path', 'X-User-Token')
-        assert inst.etags == (etag_backrefs, etag_descendants, etag_modified,
-                              etag_userid, etag_blocked)
+        assert inst.etags == (etag_version_stamp, etag_userid)
 
 
 class TestHTTPCacheStrategyWeakAssetDownloadAdapter:
@@ -333,9 +362,12 @@ class TestIntegrationCaching:
 
     @fixture
     def app_user(self, config, context):
+        from BTrees.Length import Length
         from webtest import TestApp
+        context.__version_stamp__ = Length()
+        context.__visibility_epoch__ = Length()
+        config.set_root_factory(lambda x: context)
         app = config.make_wsgi_app()
-        app.root_factory = lambda x: context
         return TestApp(app)
 
     def test_registered_strategies_iresource(self, context, registry, request_):
@@ -378,7 +410,7 @@ class TestIntegrationCaching:
              HTTPCacheMode.without_proxy_cache.name
         resp = app_user.get('/', status=200)
         assert resp.headers['Cache-control'] == 'max-age=0, must-revalidate'
-        assert resp.headers['etag'] == '"None|None|None|None|None"'
+        assert resp.headers['etag'] == '"0.0|None"'
 
     def test_strategy_with_mode_proxy_cache_get(self, app_user, registry):
         from adhocracy_core.interfaces import HTTPCacheMode
@@ -388,7 +420,7 @@ class TestIntegrationCaching:
         assert resp.headers['Cache-control'] ==\
                'max-age=0, proxy-revalidate, s-maxage=31104000'
         assert resp.headers['Vary'] == 'Accept-Encoding, X-User-Path, X-User-Token'
-        assert resp.headers['etag'] == '"None|None|None|None|None"'
+        assert resp.headers['etag'] == '"0.0|None"'
 
     def test_strategy_modified_if_modified_since_request(self, app_user,
                                                          context):
@@ -415,126 +447,333 @@ class TestIntegrationCaching:
 
     def test_strategy_not_modified_if_none_match_request(self, app_user):
         resp = app_user.get('/', status=304, headers={'If-None-Match':
-                                                      'None|None|None|None|None'})
+                                                      '0.0|None'})
         assert resp.status == '304 Not Modified'
 
+    def test_conditional_get_not_modified_before_view_is_called(
+            self, app_user, registry):
+        resp = app_user.get('/?error=True', status=304,
+                            headers={'If-None-Match': '0.0|None'})
+        assert resp.headers['etag'] == '"0.0|None"'
+        assert registry.conditional_get_stats.hits == 1
+
+    def test_conditional_get_modified_calls_view(self, app_user, registry):
+        app_user.get('/?error=True', status=400,
+                     headers={'If-None-Match': 'modified'})
+        assert registry.conditional_get_stats.hits == 0
+        assert registry.conditional_get_stats.requests == 1
+
+    def test_conditional_get_with_view_name_calls_view(self, app_user,
+                                                       registry):
+        app_user.get('/no_strategy_registered', status=200,
+                     headers={'If-None-Match': '0.0|None'})
+        assert registry.conditional_get_stats.hits == 0
+
+    def test_conditional_get_without_view_permission_calls_view(
+            self, app_user, config, registry):
+        from pyramid.authorization import ACLAuthorizationPolicy
+        from pyramid.authentication import RemoteUserAuthenticationPolicy
+        config.set_authorization_policy(ACLAuthorizationPolicy())
+        config.set_authentication_policy(RemoteUserAuthenticationPolicy())
+        config.commit()
+        app_user.get('/?error=True', status=400,
+                     headers={'If-None-Match': '0.0|None'})
+        assert registry.conditional_get_stats.hits == 0
+
+    def test_conditional_get_with_token_authentication(
+            self, app_user, config, registry, context):
+        from pyramid.authorization import ACLAuthorizationPolicy
+        from pyramid.security import Allow
+        from pyramid.security import Everyone
+        from adhocracy_core.authentication import \
+            TokenHeaderAuthenticationPolicy
+        tokenmanager = mock.Mock()
+        tokenmanager.get_user_id.return_value = None
+        config.set_authorization_policy(ACLAuthorizationPolicy())
+        config.set_authentication_policy(TokenHeaderAuthenticationPolicy(
+            'secret', get_tokenmanager=lambda request: tokenmanager))
+        config.commit()
+        context.__acl__ = [(Allow, Everyone, 'view')]
+        app_user.get('/?error=True', status=304,
+                     headers={'If-None-Match': '0.0|None'})
+        assert registry.conditional_get_stats.hits == 1
+
+    def test_conditional_get_blocked_calls_view(self, app_user, registry,
+                                                context):
+        context.hidden = True
+        app_user.get('/?error=True', status=400,
+                     headers={'If-None-Match': '0.0|None'})
+        assert registry.conditional_get_stats.hits == 0
+
+    def test_get_without_if_none_match_is_not_counted(self, app_user,
+                                                      registry):
+        app_user.get('/', status=200)
+        assert registry.conditional_get_stats.requests == 0
+
     def test_strategy_ok_if_none_match_request_without_etag(self, app_user):
         from adhocracy_core.caching import HTTPCacheStrategyWeakAdapter
         HTTPCacheStrategyWeakAdapter.etags = tuple()  # braking test isolation
         resp = app_user.get('/', status=200, headers={'If-None-Match':
-                                                      'None|None|None|None|None'})
+                                                      '0.0|None'})
         assert resp.status == '200 OK'
 
 
+@mark.usefixtures('integration')
+class TestGetNotModifiedResponse:
+
+    def call_fut(self, request):
+        from . import _get_not_modified_response
+        return _get_not_modified_response(request)
+
+    @fixture
+    def request_(self, request_, registry, context):
+        from pyramid.interfaces import IRootFactory
+        registry.registerUtility(lambda x: context, IRootFactory)
+        request_.registry = registry
+        request_.path_info = '/'
+        request_.if_none_match = None
+        request_.if_modified_since = None
+        return request_
+
+    def test_keep_request_unchanged(self, request_):
+        self.call_fut(request_)
+        assert request_.context is None
+        assert request_.root is None
+
+
+class TestConditionalGetStats:
+
+    @fixture
+    def inst(self):
+        from . import ConditionalGetStats
+        return ConditionalGetStats()
+
+    def test_create(self, inst):
+        assert inst.hits == 0
+        assert inst.requests == 0
+        assert inst.hit_ratio == 0
+
+    def test_add(self, inst):
+        inst.add(True)
+        inst.add(False)
+        assert inst.hits == 1
+        assert inst.requests == 2
+        assert inst.hit_ratio == 0.5
+
+    def test_add_log_hit_ratio(self, inst, monkeypatch):
+        from adhocracy_core import caching
+        mock_logger = mock.Mock()
+        monkeypatch.setattr(caching, 'logger', mock_logger)
+        inst.log_interval = 2
+        inst.add(True)
+        assert not mock_logger.info.called
+        inst.add(True)
+        mock_logger.info.assert_called_with(
+            'Conditional GET hit ratio %.2f (%d of %d)', 1.0, 2, 2)
+
+
+class TestVarnishPurgeQueue:
+
+    @fixture
+    def mock_session(self):
+        from requests import Response
+        mock_response = mock.Mock(spec=Response)
+        mock_response.status_code = 200
+        session = mock.Mock()
+        session.request.return_value = mock_response
+        return session
+
+    @fixture
+    def inst(self, mock_session):
+        from adhocracy_core.caching import VarnishPurgeQueue
+        inst = VarnishPurgeQueue('http://localhost')
+        inst.session = mock_session
+        inst.backoff = 0
+        return inst
+
+    def test_create(self, inst):
+        assert inst.varnish_url == 'http://localhost'
+        assert inst.depth == 0
+        assert inst.latency == 0
+
+    def test_purge(self, inst, mock_session):
+        inst.purge('host', '', {'/a', '/'})
+        mock_session.request.assert_called_once_with(
+            'PURGE', 'http://localhost/',
+            headers={'X-Purge-Host': 'host',
+                     'X-Purge-Regex': '(|a)/?\\??.*$'})
+
+    def test_purge_with_script_name(self, inst, mock_session):
+        inst.purge('host', '/api', {'/a'})
+        assert mock_session.request.call_args[0][1] == 'http://localhost/api/'
+
+    def test_purge_escape_paths(self, inst, mock_session):
+        inst.purge('host', '', {'/a.b'})
+        headers = mock_session.request.call_args[1]['headers']
+        assert headers['X-Purge-Regex'] == '(a\\.b)/?\\??.*$'
+
+    def test_purge_send_batches(self, inst, mock_session):
+        inst.batch_size = 2
+        inst.purge('host', '', {'/a', '/b', '/c'})
+        assert mock_session.request.call_count == 2
+
+    def test_purge_unexpected_status_code(self, inst, mock_session,
+                                          monkeypatch):
+        from adhocracy_core import caching
+        mock_logger = mock.Mock()
+        monkeypatch.setattr(caching, 'logger', mock_logger)
+        mock_session.request.return_value.status_code = 444
+        inst.purge('host', '', {'/'})
+        assert mock_session.request.call_count == 1
+        assert mock_logger.warning.called
+
+    def test_purge_retry_if_exception_raised(self, inst, mock_session,
+                                             monkeypatch):
+        from requests.exceptions import RequestException
+        from adhocracy_core import caching
+        mock_logger = mock.Mock()
+        monkeypatch.setattr(caching, 'logger', mock_logger)
+        response = mock_session.request.return_value
+        mock_session.request.side_effect = [RequestException('Nope!'),
+                                            response]
+        inst.purge('host', '', {'/'})
+        assert mock_session.request.call_count == 2
+        assert mock_logger.error.call_count == 1
+
+    def test_purge_give_up_after_retries(self, inst, mock_session,
+                                         monkeypatch):
+        from requests.exceptions import RequestException
+        from adhocracy_core import caching
+        mock_logger = mock.Mock()
+        monkeypatch.setattr(caching, 'logger', mock_logger)
+        mock_session.request.side_effect = RequestException('Nope!')
+        inst.purge('host', '', {'/'})
+        assert mock_session.request.call_count == inst.retries
+        assert mock_logger.error.call_count == inst.retries + 1
+
+    def test_add_purge_in_background(self, inst, mock_session):
+        inst.add('host', '', ['/a'])
+        inst.join()
+        assert inst.depth == 0
+        assert mock_session.request.called
+
+    def test_add_deduplicate_queued_paths(self, inst, mock_session):
+        inst.queue.put(('host', '', ['/a']))
+        inst.queue.put(('host', '', ['/a', '/b']))
+        inst.add('host', '', ['/b'])
+        inst.join()
+        assert mock_session.request.call_count == 1
+        headers = mock_session.request.call_args[1]['headers']
+        assert headers['X-Purge-Regex'] == '(a|b)/?\\??.*$'
+
+
+class TestGetVarnishPurgeQueue:
+
+    def call_fut(self, registry):
+        from adhocracy_core.caching import get_varnish_purge_queue
+        return get_varnish_purge_queue(registry)
+
+    def test_no_varnish_url(self, registry_with_changelog):
+        assert self.call_fut(registry_with_changelog) is None
+
+    def test_varnish_url(self, registry_with_changelog):
+        from adhocracy_core.caching import VarnishPurgeQueue
+        registry_with_changelog.settings[
+            'adhocracy.varnish_url'] = 'http://localhost'
+        purge_queue = self.call_fut(registry_with_changelog)
+        assert isinstance(purge_queue, VarnishPurgeQueue)
+        assert self.call_fut(registry_with_changelog) is purge_queue
+
+    def test_varnish_url_concurrent_first_access(self, registry_with_changelog,
+                                                 monkeypatch):
+        from threading import Thread
+        from time import sleep
+        from adhocracy_core import caching
+        registry_with_changelog.settings[
+            'adhocracy.varnish_url'] = 'http://localhost'
+        init = caching.VarnishPurgeQueue.__init__
+        created = []
+
+        def slow_init(self, varnish_url):
+            created.append(self)
+            sleep(0.01)
+            init(self, varnish_url)
+        monkeypatch.setattr(caching.VarnishPurgeQueue, '__init__', slow_init)
+        threads = [Thread(target=self.call_fut,
+                          args=(registry_with_changelog,))
+                   for x in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(created) == 1
+
+
 class TestPurgeVarnishAfterCommitHook:
 
     @fixture
-    def registry_for_varnish(self, registry_with_changelog):
+    def mock_purge_queue(self):
+        from adhocracy_core.caching import VarnishPurgeQueue
+        return mock.Mock(spec=VarnishPurgeQueue)
+
+    @fixture
+    def registry_for_varnish(self, registry_with_changelog, mock_purge_queue):
         registry_with_changelog.settings[
             'adhocracy.varnish_url'] = 'http://localhost'
+        registry_with_changelog.varnish_purge_queue = mock_purge_queue
         return registry_with_changelog
 
     @fixture
     def request_(self):
         return testing.DummyRequest()
 
-    def _monkeypatch_requests(self, monkeypatch, status_code=200,
-                              side_effect=None):
-        from adhocracy_core import caching
-        from requests import Response
-        mock_requests = mock.Mock()
-        mock_response = mock.Mock(spec=Response)
-        mock_response.status_code = status_code
-        mock_requests.request = mock.Mock(return_value=mock_response,
-                                          side_effect=side_effect)
-        monkeypatch.setattr(caching, 'requests', mock_requests)
-        return mock_requests
-
-    def test_empty_changelog(self, monkeypatch, registry_for_varnish, request_):
+    def call_fut(self, success, registry, request):
         from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert not mock_requests.request.called
+        return purge_varnish_after_commit_hook(success, registry, request)
 
-    def test_modified_in_changelog(self, monkeypatch, registry_for_varnish,
-                                   changelog_meta, context, request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
+    def test_empty_changelog(self, registry_for_varnish, request_,
+                             mock_purge_queue):
+        self.call_fut(True, registry_for_varnish, request_)
+        assert not mock_purge_queue.add.called
+
+    def test_modified_in_changelog(self, registry_for_varnish, changelog_meta,
+                                   context, request_, mock_purge_queue):
         request_.host = 'host'
-        mock_requests = self._monkeypatch_requests(monkeypatch)
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        mock_requests.request.assert_called_once_with(
-            'PURGE', 'http://localhost/', headers={'X-Purge-Host': 'host',
-                                                   'X-Purge-Regex': '/?\??.*$'})
+        self.call_fut(True, registry_for_varnish, request_)
+        mock_purge_queue.add.assert_called_once_with('host', '', ['/'])
 
     def test_change_descendants_in_changelog(
-            self, monkeypatch, registry_for_varnish, changelog_meta, context,
-            request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
+            self, registry_for_varnish, changelog_meta, context, request_,
+            mock_purge_queue):
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context,
                                            changed_descendants=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.call_args[1]['headers']['X-Purge-Regex']\
-            == '/?\??.*$'
+        self.call_fut(True, registry_for_varnish, request_)
+        assert mock_purge_queue.add.call_args[0][2] == ['/']
 
     def test_non_empty_changelog_but_unchanged_resource(
-            self, monkeypatch, registry_for_varnish, changelog_meta, context,
-            request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
+            self, registry_for_varnish, changelog_meta, context, request_,
+            mock_purge_queue):
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert not mock_requests.request.called
+        self.call_fut(True, registry_for_varnish, request_)
+        assert not mock_purge_queue.add.called
 
-    def test_success_false(self, monkeypatch, registry_for_varnish,
-                           changelog_meta, context, request_):
+    def test_success_false(self, registry_for_varnish, changelog_meta,
+                           context, request_, mock_purge_queue):
         """Nothing should happen if the transaction was unsuccessful."""
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(False, registry_for_varnish, request_)
-        assert not mock_requests.request.called
+        self.call_fut(False, registry_for_varnish, request_)
+        assert not mock_purge_queue.add.called
 
-    def test_no_varnish_url(self, monkeypatch, registry_with_changelog,
-                            changelog_meta, context, request_):
+    def test_no_varnish_url(self, registry_with_changelog, changelog_meta,
+                            context, request_, mock_purge_queue):
         """Nothing should happen if no varnish_url is configured."""
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
+        registry_with_changelog.varnish_purge_queue = mock_purge_queue
         registry_with_changelog.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_with_changelog, request_)
-        assert not mock_requests.request.called
-
-    def test_unexpected_status_code(self, monkeypatch, registry_for_varnish,
-                                 changelog_meta, context, request_):
-        from adhocracy_core import caching
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch,
-                                                   status_code=444)
-        mock_logger = mock.Mock()
-        monkeypatch.setattr(caching, 'logger', mock_logger)
-        registry_for_varnish.changelog[
-            '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.called
-        assert mock_logger.warning.called
-
-    def test_exception_raised(self, monkeypatch, registry_for_varnish,
-                              changelog_meta, context, request_):
-        from requests.exceptions import RequestException
-        from adhocracy_core import caching
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(
-            monkeypatch, side_effect=RequestException('Nope!'))
-        mock_logger = mock.Mock()
-        monkeypatch.setattr(caching, 'logger', mock_logger)
-        registry_for_varnish.changelog[
-            '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.called
-        assert mock_logger.error.called
+        self.call_fut(True, registry_with_changelog, request_)
+        assert not mock_purge_queue.add.called
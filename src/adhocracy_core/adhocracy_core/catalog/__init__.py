@@ -2,13 +2,26 @@
 from zope.interface import Interface
 from pyramid.registry import Registry
 from itertools import islice
+import heapq
+from collections import Counter
+from collections import namedtuple
+from collections import defaultdict
 from collections.abc import Iterable
+from collections.abc import Iterator
 from substanced import catalog
 from substanced.interfaces import IIndexingActionProcessor
 from substanced.catalog import CatalogsService
+from substanced.util import find_objectmap
+from substanced.util import get_oid
 from hypatia.interfaces import IIndex
 from hypatia.interfaces import IResultSet
+from hypatia.interfaces import NBEST
+from hypatia.field import fwscan_wins
 from hypatia.util import ResultSet
+from hypatia.keyword import KeywordIndex
+from pyramid.traversal import resource_path_tuple
+from BTrees import family64 as _family
+import transaction
 from adhocracy_core.interfaces import IServicePool
 from adhocracy_core.interfaces import FieldComparator
 from adhocracy_core.interfaces import FieldSequenceComparator
@@ -21,6 +34,70 @@ from adhocracy_core.interfaces import IResource
 from adhocracy_core.resources.service import service_meta
 from adhocracy_core.resources import add_resource_type_to_registry
 from adhocracy_core.utils import normalize_to_tuple
+from adhocracy_core.utils import decode_cursor
+from adhocracy_core.utils import encode_cursor
+
+
+_marker = object()
+
+TOP_K_MAX_LIMIT = 300
+"""Max number of sorted elements to select with a heap based n-best sort."""
+
+CONCEALED_ANCESTORS_MAX_ELEMENTS = 1000
+"""Max number of elements to check for deleted or hidden ancestors one by
+   one instead of removing all concealed subtrees.
+"""
+
+_QueryOperand = namedtuple('QueryOperand',
+                           ['name', 'estimate', 'query', 'filter'])
+
+
+class _DocidsQuery:
+
+    """Query operand for already searched docids, e.g. references."""
+
+    def __init__(self, docids: Iterable):
+        self.docids = _family.IF.Set(docids)
+
+    def flush(self, *args, **kwargs):
+        """Do nothing, there are no pending index actions."""
+
+    def _apply(self, names) -> object:
+        return self.docids
+
+    def intersect(self, docids: object, names) -> object:
+        """Return the intersection with `docids`."""
+        return _family.IF.intersection(docids, self.docids)
+
+
+def _get_index_value_matcher(is_keyword: bool, comparator: str,
+                             values: tuple) -> callable:
+    """Return function to check if an indexed value matches `values`."""
+    if not is_keyword:
+        return lambda value: value is not _marker and value in values
+    elif comparator == 'all':
+        return lambda value: value is not _marker\
+            and all(x in value for x in values)
+    else:
+        return lambda value: value is not _marker\
+            and any(x in value for x in values)
+
+
+def _iter_tree_keys(tree: object, after: object=_marker,
+                    reverse=False) -> Iterator:
+    """Iterate the keys of BTree or TreeSet `tree` following `after`.
+
+    :param after: key to start after, the default is to start with the
+        first key.
+    :param reverse: iterate in descending order
+    """
+    if after is _marker:
+        keys = tree.keys()
+    elif reverse:
+        keys = tree.keys(max=after, excludemax=True)
+    else:
+        keys = tree.keys(min=after, excludemin=True)
+    return reversed(keys) if reverse else iter(keys)
 
 
 class ICatalogsService(IServicePool):
@@ -32,6 +109,7 @@ class CatalogsServiceAdhocracy(CatalogsService):
 
     def reindex_all(self, resource: IResource):
         """Reindex `resource` with all indexes."""
+        self._v_concealed_docids = None
         for value in self.values():
             value.reindex_resource(resource)
 
@@ -44,6 +122,8 @@ class CatalogsServiceAdhocracy(CatalogsService):
         if index is None:
             msg = 'catalog index {0} does not exist.'.format(index_name)
             raise KeyError(msg)
+        if index_name == 'private_visibility':
+            self._v_concealed_docids = None
         index.reindex_resource(resource)
 
     def search(self, query: SearchQuery) -> SearchResult:
@@ -51,88 +131,368 @@ class CatalogsServiceAdhocracy(CatalogsService):
         elements = self._search_elements(query)
         frequency_of = self._get_frequency_of(elements, query)
         group_by = self._get_group_by(elements, query)
-        sorted_elements = self._sort_elements(elements, query)
-        count = len(sorted_elements)
-        elements_slice = self._get_slice(sorted_elements, query)
+        next_cursor = None
+        count = len(elements)
+        if query.only_count:  # performance tweak, don't sort and resolve
+            elements_slice = []
+        elif query.cursor is None:
+            sorted_elements = self._sort_elements(elements, query)
+            elements_slice = self._get_slice(sorted_elements, query)
+        else:
+            elements_slice, next_cursor = self._get_page_after_cursor(elements,
+                                                                      query)
         resolved = self._resolve(elements_slice, query)
         result = search_result._replace(elements=resolved,
                                         count=count,
                                         group_by=group_by,
-                                        frequency_of=frequency_of)
+                                        frequency_of=frequency_of,
+                                        next_cursor=next_cursor)
         return result
 
-    def _search_elements(self, query) -> IResultSet:
+    def explain(self, query: SearchQuery) -> list:
+        """Execute the filters of `query` and explain the query plan.
+
+        :returns: list with one dictionary per executed filter step with the
+            keys `name`, `estimate` (estimated number of matching resources
+            or None if not estimated), `strategy` (`apply`: query the index,
+            `intersect`: query the index and intersect with the previous
+            result, `filter`: check the previous result docids one by one)
+            and `count` (number of resources after this step).
+        """
+        explain = []
+        self._search_elements(query, explain=explain)
+        return explain
+
+    def search_references(self, query: SearchQuery,
+                          references: Iterable) -> dict:
+        """Search resources with `query` for every reference in `references`.
+
+        This is the same as searching with one query per reference, but the
+        query filters are executed only once for the reference targets or
+        sources of all `references`. Sorting, slicing and aggregations are
+        not supported, the reference order is kept.
+
+        :returns: dictionary with key reference and value list of resources
+            or docids if not `query.resolve`.
+        """
+        reference_index = self.get_index('reference')
+        references_docids = {x: reference_index.search_with_order(x).ids
+                             for x in references}
+        all_docids = set()
+        for docids in references_docids.values():
+            all_docids.update(docids)
+        query = query._replace(references=())
+        elements = self._search_elements(query, docids=all_docids)
+        matching = _family.IF.Set(elements.ids)
+        found = {}
+        for reference, docids in references_docids.items():
+            docids = [x for x in docids if x in matching]
+            if query.resolve:
+                found[reference] = [elements.resolver(x) for x in docids]
+            else:
+                found[reference] = docids
+        return found
+
+    def _search_elements(self, query, explain: list=None,
+                         docids: Iterable=None) -> IResultSet:
         interfaces_index = self.get_index('interfaces')
         if interfaces_index is None:  # pragma: no branch
             return ResultSet(set(), 0, None)
+        reference_index = self.get_index('reference')
+        references_docids = [reference_index.search_with_order(x).ids
+                             for x in query.references]
+        if docids is not None:
+            references_docids.append(docids)
+        operands = self._get_query_operands(query, interfaces_index,
+                                            references_docids)
+        docids = self._execute_query_operands(operands, explain)
+        resolver = find_objectmap(self).object_for
+        elements = ResultSet(docids, len(docids), resolver)
+        if query.only_visible:
+            elements = self._exclude_concealed_descendants(elements, query)
+        if references_docids:  # keep the reference order
+            reference_docids = references_docids[-1]
+            elements = ResultSet(reference_docids, len(reference_docids),
+                                 resolver).intersect(elements)
+        return elements
+
+    def _get_query_operands(self, query: SearchQuery,
+                            interfaces_index: IIndex,
+                            references_docids: list) -> list:
+        """Get query operands ordered by estimated number of results.
+
+        The estimates are the number of docids per index value, or the
+        number of all indexed resources if there is no cheap estimate.
+        The `allowed` operand can only intersect and is always last.
+        """
+        operands = []
+        all_count = interfaces_index.indexed_count()
         interfaces_value = self._get_query_value(query.interfaces)
         if not interfaces_value:
             interfaces_value = (IResource,)
         interfaces_comparator = self._get_query_comparator(query.interfaces)
         if interfaces_comparator is None:
+            interfaces_comparator = 'all'
             interfaces_value = normalize_to_tuple(interfaces_value)
-            index_query = interfaces_index.all(interfaces_value)
-        else:
-            index_comparator = getattr(interfaces_index, interfaces_comparator)
-            index_query = index_comparator(interfaces_value)
+        operands.append(self._make_index_operand('interfaces',
+                                                 interfaces_index,
+                                                 interfaces_comparator,
+                                                 interfaces_value,
+                                                 all_count))
         if query.root is not None:
-            depth = query.depth or None
-            path_index = self.get_index('path')
-            index_query &= path_index.eq(query.root,
-                                         depth=depth,
-                                         include_origin=False)
-        if query.indexes:
-            for index_name, value in query.indexes.items():
-                index = self.get_index(index_name)
-                comparator = self._get_query_comparator(value)
-                if comparator is None:
-                    index_comparator = index.eq
-                else:
-                    index_comparator = getattr(index, comparator)
-                index_value = self._get_query_value(value)
-                index_query &= index_comparator(index_value)
+            operands.append(self._make_path_operand(query.root, query.depth,
+                                                    all_count))
+        for index_name, value in (query.indexes or {}).items():
+            index = self.get_index(index_name)
+            comparator = self._get_query_comparator(value) or 'eq'
+            index_value = self._get_query_value(value)
+            if index_name == 'private_visibility':
+                operands.append(self._make_visibility_operand(comparator,
+                                                              index_value))
+                continue
+            operands.append(self._make_index_operand(index_name, index,
+                                                     comparator, index_value,
+                                                     all_count))
         if query.only_visible:
             visibility_index = self.get_index('private_visibility')
-            index_query &= visibility_index.eq('visible')
+            operands.append(self._make_index_operand('private_visibility',
+                                                     visibility_index, 'eq',
+                                                     'visible', all_count))
+        for docids in references_docids:
+            operands.append(self._make_docids_operand('reference', docids))
+        operands.sort(key=lambda x: x.estimate)
         if query.allows:
             allowed_index = self.get_index('allowed')
             principals, permission = query.allows
-            index_query &= allowed_index.allows(principals, permission)
-        elements = index_query.execute(resolver=None)
-        if query.references:
-            index = self.get_index('reference')
-            for reference in query.references:
-                referencence_elements = index.search_with_order(reference)
-                referencence_elements.resolver = elements.resolver
-                elements = referencence_elements.intersect(elements)
-        return elements
+            index_query = allowed_index.allows(principals, permission)
+            operands.append(_QueryOperand('allowed', None, index_query, None))
+        return operands
+
+    def _make_index_operand(self, name: str, index: IIndex, comparator: str,
+                            value: object, all_count: int) -> tuple:
+        index_query = getattr(index, comparator)(value)
+        fwd_index = getattr(index, '_fwd_index', None)
+        rev_index = getattr(index, '_rev_index', None)
+        is_keyword = isinstance(index, KeywordIndex)
+        is_sequence = isinstance(value, (list, tuple))
+        if fwd_index is None or rev_index is None\
+                or comparator not in ('eq', 'any', 'all')\
+                or (comparator == 'eq' and is_sequence)\
+                or (comparator == 'all' and not is_keyword):
+            return _QueryOperand(name, all_count, index_query, None)
+        index.flush()
+        values = normalize_to_tuple(value)
+        if is_keyword:
+            values = tuple(index.normalize(values))
+        counts = [len(fwd_index.get(x, ())) for x in values]
+        if comparator == 'all':
+            estimate = min(counts, default=0)
+        else:
+            estimate = sum(counts)
+        match = _get_index_value_matcher(is_keyword, comparator, values)
+
+        def filter_docids(docids):
+            return [x for x in docids
+                    if match(rev_index.get(x, _marker))]
+        return _QueryOperand(name, estimate, index_query, filter_docids)
+
+    def _make_path_operand(self, root: IResource, depth: int,
+                           all_count: int) -> tuple:
+        depth = depth or None
+        path_index = self.get_index('path')
+        index_query = path_index.eq(root, depth=depth, include_origin=False)
+        estimate = all_count
+        if depth == 1 and hasattr(root, '__len__'):
+            estimate = len(root)
+        objectmap = find_objectmap(self)
+        root_path = resource_path_tuple(root)
+        root_length = len(root_path)
+        max_length = None if depth is None else root_length + depth
+
+        def filter_docids(docids):
+            result = []
+            for docid in docids:
+                path = objectmap.objectid_to_path.get(docid, ())
+                if len(path) <= root_length\
+                        or path[:root_length] != root_path:
+                    continue
+                if max_length is not None and len(path) > max_length:
+                    continue
+                result.append(docid)
+            return result
+        return _QueryOperand('path', estimate, index_query, filter_docids)
+
+    def _make_visibility_operand(self, comparator: str,
+                                 value: object) -> tuple:
+        """Make operand to filter by the inherited visibility.
+
+        Descendants of deleted or hidden resources are deleted or hidden
+        too, but the `private_visibility` index only stores the visibility
+        of the resource itself. So the concealed subtrees are added here.
+        """
+        index = self.get_index('private_visibility')
+        index.flush()
+        family = index.family
+        inherited = {x: self._get_concealed_docids(x)
+                     for x in ('deleted', 'hidden')}
+        visible = family.IF.Set(index._fwd_index.get('visible', ()))
+        concealed = family.IF.union(*inherited.values())
+        inherited['visible'] = family.IF.difference(visible, concealed)
+        values = index.normalize(normalize_to_tuple(value))
+        docids_per_value = [inherited.get(x, family.IF.Set()) for x in values]
+        if comparator in ('all', 'notall'):
+            docids = docids_per_value[0] if docids_per_value\
+                else family.IF.Set()
+            for other in docids_per_value[1:]:
+                docids = family.IF.intersection(docids, other)
+        else:
+            docids = family.IF.multiunion(docids_per_value)
+        if comparator.startswith('not'):
+            docids = family.IF.difference(index.docids(), docids)
+        return self._make_docids_operand('private_visibility', docids)
+
+    def _make_docids_operand(self, name: str, docids: list) -> tuple:
+        docids_query = _DocidsQuery(docids)
+
+        def filter_docids(candidates):
+            return [x for x in candidates if x in docids_query.docids]
+        return _QueryOperand(name, len(docids), docids_query, filter_docids)
+
+    def _execute_query_operands(self, operands: list, explain: list=None):
+        """Execute the operands, the most selective operand first.
+
+        Other operands are checked docid by docid if the previous result
+        is smaller than their estimated result, else intersected.
+        The result is always a BTrees set, so containment checks of later
+        intersections are fast.
+        """
+        docids = None
+        family = self.get_index('interfaces').family
+        for operand in operands:
+            operand.query.flush()
+            if docids is None:
+                strategy = 'apply'
+                docids = operand.query._apply(None)
+            elif operand.filter is not None \
+                    and len(docids) < operand.estimate:
+                strategy = 'filter'
+                docids = family.IF.Set(operand.filter(docids))
+            else:
+                strategy = 'intersect'
+                docids = operand.query.intersect(family.IF.Set(docids), None)
+            if explain is not None:
+                explain.append({'name': operand.name,
+                                'estimate': operand.estimate,
+                                'strategy': strategy,
+                                'count': len(docids)})
+            if not docids:
+                break
+        return docids
+
+    def _exclude_concealed_descendants(self, elements: IResultSet,
+                                       query: SearchQuery) -> IResultSet:
+        """Remove descendants of deleted or hidden resources.
+
+        The `private_visibility` index only stores the visibility of the
+        resource itself, the descendants inherit it. Up to
+        `CONCEALED_ANCESTORS_MAX_ELEMENTS` elements are checked for
+        concealed ancestors, else the concealed subtrees are removed with
+        one set difference.
+        """
+        index = self.get_index('private_visibility')
+        index.flush()
+        concealed = [index._fwd_index.get(x, None)
+                     for x in ('deleted', 'hidden')]
+        concealed = [x for x in concealed if x]
+        if not concealed:
+            return elements
+        if len(elements) <= CONCEALED_ANCESTORS_MAX_ELEMENTS:
+            return self._exclude_concealed_ancestors(elements, concealed)
+        family = index.family
+        concealed = family.IF.union(self._get_concealed_docids('deleted'),
+                                    self._get_concealed_docids('hidden'))
+        if not concealed:
+            return elements
+        root_oid = get_oid(query.root, None)
+        if root_oid is not None and root_oid in concealed:
+            return ResultSet((), 0, elements.resolver)
+        ids = family.IF.difference(family.IF.Set(elements.ids), concealed)
+        return ResultSet(ids, len(ids), elements.resolver)
+
+    def _exclude_concealed_ancestors(self, elements: IResultSet,
+                                     concealed: list) -> IResultSet:
+        """Remove elements with a resource of `concealed` in their path."""
+        objectmap = find_objectmap(self)
+        paths = objectmap.objectid_to_path
+        path_oids = objectmap.path_to_objectid
+        ids = []
+        for docid in elements.ids:
+            path = paths.get(docid, ())
+            ancestors = [path_oids.get(path[:x], None)
+                         for x in range(1, len(path) + 1)]
+            if any(oid in docids for oid in ancestors if oid is not None
+                   for docids in concealed):
+                continue
+            ids.append(docid)
+        ids = _family.IF.Set(ids)
+        return ResultSet(ids, len(ids), elements.resolver)
+
+    def _get_concealed_docids(self, keyword: str) -> IResultSet:
+        """Return the `keyword` resources and their descendants.
+
+        `keyword` is `deleted` or `hidden`. The subtrees are looked up
+        with the objectmap path index only if there are `keyword`
+        resources. The result is cached for the current transaction,
+        the cache is emptied if the `private_visibility` index is modified.
+        """
+        index = self.get_index('private_visibility')
+        index.flush()
+        cache = self._get_concealed_docids_cache(index)
+        docids = cache.get(keyword, None)
+        if docids is not None:
+            return docids
+        concealed = index._fwd_index.get(keyword, ())
+        docids = index.family.IF.Set(concealed)
+        if concealed:
+            objectmap = find_objectmap(self)
+            for oid in concealed:
+                path = objectmap.objectid_to_path.get(oid, None)
+                if path is None:
+                    continue
+                docids.update(objectmap.pathlookup(path,
+                                                   include_origin=False))
+        cache[keyword] = docids
+        return docids
+
+    def _get_concealed_docids_cache(self, index: IIndex) -> dict:
+        # adding or removing resources changes the subtrees
+        key = (transaction.get(), index.indexed_count())
+        cached = getattr(self, '_v_concealed_docids', None)
+        if cached is None or cached[0] != key:
+            cached = (key, {})
+            self._v_concealed_docids = cached
+        return cached[1]
 
     def _get_frequency_of(self, elements: IResultSet,
                           query: SearchQuery) -> dict:
         frequency_of = {}
         if query.frequency_of:
             index = self.get_index(query.frequency_of)
-            for value in index.unique_values():
-                value_query = index.eq(value)
-                value_elements = value_query.execute(resolver=None)
-                intersect = elements.intersect(value_elements)
-                count = len(intersect)
-                if count == 0:
-                    continue
-                frequency_of[value] = count
+            values = self._iter_index_values(elements, index)
+            frequency_of = dict(Counter(value for docid, value in values))
         return frequency_of
 
     def _get_group_by(self, elements: IResultSet, query: SearchQuery) -> dict:
         group_by = {}
         if query.group_by:
             index = self.get_index(query.group_by)
-            for value in index.unique_values():
-                value_query = index.eq(value)
-                value_elements = value_query.execute(resolver=None)
-                intersect = elements.intersect(value_elements)
-                if len(intersect) == 0:
-                    continue
-                group_by[value] = intersect
+            docids_by_value = defaultdict(list)
+            for docid, value in self._iter_index_values(elements, index):
+                docids_by_value[value].append(docid)
+            for value, docids in docids_by_value.items():
+                docids = index.family.IF.Set(docids)
+                group_by[value] = ResultSet(docids, len(docids),
+                                            elements.resolver)
         sort_index = self.get_index(query.sort_by)
         if sort_index is not None:
             for key, intersect in group_by.items():
@@ -146,6 +506,37 @@ class CatalogsServiceAdhocracy(CatalogsService):
                 group_by[key] = intersect_resolved
         return group_by
 
+    def _iter_index_values(self, elements: IResultSet,
+                           index: IIndex) -> Iterator:
+        """Iterate (docid, value) for all `elements` indexed by `index`.
+
+        The forward docid to value mapping of field and keyword indexes is
+        used to get all values with one pass over the result docids.
+        Keyword indexes yield one tuple per keyword.
+        Other indexes fall back to query every unique index value.
+        """
+        rev_index = getattr(index, '_rev_index', None)
+        if rev_index is None:
+            yield from self._iter_index_values_by_query(elements, index)
+            return
+        is_keyword = isinstance(index, KeywordIndex)
+        for docid in elements.ids:
+            value = rev_index.get(docid, _marker)
+            if value is _marker:
+                continue
+            if is_keyword:
+                for keyword in value:
+                    yield docid, keyword
+            else:
+                yield docid, value
+
+    def _iter_index_values_by_query(self, elements: IResultSet,
+                                    index: IIndex) -> Iterator:
+        for value in index.unique_values():
+            value_elements = index.eq(value).execute(resolver=None)
+            for docid in elements.intersect(value_elements).ids:
+                yield docid, value
+
     def _sort_elements(self, elements: IResultSet,
                        query: SearchQuery) -> IResultSet:
         sort_index = self.get_index(query.sort_by)
@@ -153,11 +544,32 @@ class CatalogsServiceAdhocracy(CatalogsService):
             # TODO: We should assert the IIndexSort interface here, but
             # hypatia.field.FieldIndex is missing this interface.
             assert 'sort' in sort_index.__dir__()
+            limit = query.offset + query.limit if query.limit else None
+            sort_type = self._get_sort_type(elements, sort_index, limit)
             elements = elements.sort(sort_index,
                                      reverse=query.reverse,
-                                     limit=query.limit or None)
+                                     limit=limit,
+                                     sort_type=sort_type)
         return elements
 
+    def _get_sort_type(self, elements: IResultSet, sort_index: IIndex,
+                       limit: int) -> str:
+        """Get the n-best (heap based top-k) sort type for small limits.
+
+        hypatia chooses timsort for many small limits, sorting all elements.
+        Forward scan is kept if it wins over n-best.
+
+        :returns: None to let the sort index choose the sort type
+        """
+        if not limit or limit > TOP_K_MAX_LIMIT:
+            return None
+        num_docs = getattr(sort_index, '_num_docs', None)
+        if num_docs is None or not num_docs():
+            return None
+        if fwscan_wins(limit, len(elements), num_docs()):
+            return None
+        return NBEST
+
     def _get_slice(self, elements: IResultSet, query: IResultSet) -> Iterable:
         """Get slice defined by `query.limit` and `query.offset`.
 
@@ -171,6 +583,102 @@ class CatalogsServiceAdhocracy(CatalogsService):
             elements_slice = [elements.resolver(x) for x in docids_slice]
         return elements_slice
 
+    def _get_page_after_cursor(self, elements: IResultSet,
+                               query: SearchQuery) -> tuple:
+        """Get page of `query.limit` elements following `query.cursor`.
+
+        The elements are ordered by (sort index value, docid). Without
+        `query.sort_by` the elements are ordered by docid. Elements without
+        sort index value are not part of any cursor page, but counted.
+
+        The sort index is walked in sort order starting at the cursor
+        value until the page is complete, so the costs don't depend on the
+        page position like with `query.offset`. If the elements are only a
+        small part of the sort index a bounded heap over the elements after
+        the cursor is used instead.
+
+        :returns: ([IResource], next cursor or None if this is the last page)
+        """
+        sort_index = self.get_index(query.sort_by)
+        after = decode_cursor(query.cursor) if query.cursor else None
+        docids = _family.IF.Set(elements.ids)
+        limit = query.limit + 1 if query.limit else None
+        if self._is_sort_index_walk_faster(sort_index, docids, limit):
+            keys = self._walk_sort_index(sort_index, docids, after,
+                                         query.reverse)
+            page = list(islice(keys, limit))
+        else:
+            keys = self._iter_sort_keys(docids, sort_index)
+            page = self._get_page_with_heap(keys, after, limit,
+                                            query.reverse)
+        next_cursor = None
+        if query.limit and len(page) > query.limit:
+            page = page[:query.limit]
+            next_cursor = encode_cursor(*page[-1])
+        resolved = [elements.resolver(docid) for value, docid in page]
+        return resolved, next_cursor
+
+    def _is_sort_index_walk_faster(self, sort_index: IIndex, docids: object,
+                                   limit: int) -> bool:
+        if sort_index is None:
+            return True
+        fwd_index = getattr(sort_index, '_fwd_index', None)
+        num_docs = getattr(sort_index, '_num_docs', None)
+        if fwd_index is None or num_docs is None:
+            return False
+        if not num_docs():
+            return True
+        return fwscan_wins(limit, len(docids), num_docs())
+
+    def _walk_sort_index(self, sort_index: IIndex, docids: object,
+                         after: tuple, reverse: bool) -> Iterator:
+        """Iterate (sort index value, docid) of `docids` after `after`.
+
+        Without `sort_index` the docids are walked instead.
+        """
+        after_value, after_docid = after or (_marker, _marker)
+        if sort_index is None:
+            for docid in _iter_tree_keys(docids, after_docid, reverse):
+                yield docid, docid
+            return
+        fwd_index = sort_index._fwd_index
+        if after is not None and after_value in fwd_index:
+            value_docids = fwd_index[after_value]
+            for docid in _iter_tree_keys(value_docids, after_docid, reverse):
+                if docid in docids:
+                    yield after_value, docid
+        for value in _iter_tree_keys(fwd_index, after_value, reverse):
+            for docid in _iter_tree_keys(fwd_index[value], reverse=reverse):
+                if docid in docids:
+                    yield value, docid
+
+    def _get_page_with_heap(self, keys: Iterator, after: tuple, limit: int,
+                            reverse: bool) -> list:
+        if after is not None:
+            if reverse:
+                keys = (x for x in keys if x < after)
+            else:
+                keys = (x for x in keys if x > after)
+        if not limit:
+            return sorted(keys, reverse=reverse)
+        elif reverse:
+            return heapq.nlargest(limit, keys)
+        else:
+            return heapq.nsmallest(limit, keys)
+
+    def _iter_sort_keys(self, docids: Iterable,
+                        sort_index: IIndex) -> Iterator:
+        """Iterate (sort index value, docid) for all `docids`."""
+        rev_index = getattr(sort_index, '_rev_index', None)
+        if sort_index is None or rev_index is None:
+            for docid in docids:
+                yield docid, docid
+            return
+        for docid in docids:
+            value = rev_index.get(docid, _marker)
+            if value is not _marker:
+                yield value, docid
+
     def _resolve(self, elements: Iterable, query: SearchQuery) -> Iterable:
         if query.resolve:
             elements = [x for x in elements]
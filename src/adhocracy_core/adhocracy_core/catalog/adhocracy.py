@@ -6,13 +6,14 @@ from substanced.catalog import IndexFactory
 from substanced.util import find_service
 from adhocracy_core.catalog.index import ReferenceIndex
 from adhocracy_core.exceptions import RuntimeConfigurationError
-from adhocracy_core.utils import is_deleted
-from adhocracy_core.utils import is_hidden
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import search_query
+from adhocracy_core.resources.rate import count_rates
+from adhocracy_core.resources.rate import get_rate_tally
 from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.rate import IRate
 from adhocracy_core.sheets.rate import IRateable
+from adhocracy_core.sheets.rate import get_rate_key
 from adhocracy_core.sheets.tags import TagElementsReference
 from adhocracy_core.sheets.title import ITitle
 from adhocracy_core.sheets.badge import IBadgeAssignment
@@ -54,6 +55,7 @@ class AdhocracyCatalogIndexes:
     user_name = catalog.Field()
     private_user_email = catalog.Field()
     private_user_activation_path = catalog.Field()
+    private_rate_subject_object = catalog.Field()
 
 
 def index_creator(resource, default) -> str:
@@ -76,13 +78,16 @@ def index_visibility(resource, default) -> [str]:
 
     The return value will be one of [visible], [deleted], [hidden], or
     [deleted, hidden].
+
+    Only the visibility of `resource` itself is indexed. The visibility
+    is inherited by the descendants, so concealing a resource does not
+    require to reindex all descendants, see
+    :meth:`adhocracy_core.catalog.CatalogsServiceAdhocracy.search`.
     """
-    # FIXME: be more dry, this almost the same like what
-    # utils.get_reason_if_blocked is doing
     result = []
-    if is_deleted(resource):
+    if getattr(resource, 'deleted', False):
         result.append('deleted')
-    if is_hidden(resource):
+    if getattr(resource, 'hidden', False):
         result.append('hidden')
     if not result:
         result.append('visible')
@@ -107,18 +112,19 @@ def index_rates(resource, default) -> int:
 
     Only the LAST version of each rate is counted.
     """
-    catalogs = find_service(resource, 'catalogs')
-    query = search_query._replace(interfaces=IRate,
-                                  frequency_of='rate',
-                                  indexes={'tag': 'LAST'},
-                                  references=[(None, IRate, 'object', resource)
-                                              ],
-                                  )
-    result = catalogs.search(query)
-    rate_sum = 0
-    for value, count in result.frequency_of.items():
-        rate_sum += value * count
-    return rate_sum
+    tally = get_rate_tally(resource)
+    if tally is None:  # not rated since the tallies exist
+        counts = count_rates(resource)
+        return sum(rate * count for rate, count in counts.items())
+    return tally.sum
+
+
+def index_rate_subject_object(resource, default) -> str:
+    """Return `subject` and `object` oids for :class:`IRate` resources."""
+    subject = get_sheet_field(resource, IRate, 'subject')
+    object = get_sheet_field(resource, IRate, 'object')
+    key = get_rate_key(subject, object)
+    return default if key is None else key
 
 
 def index_tag(resource, default) -> [str]:
@@ -225,6 +231,10 @@ def includeme(config):
                          catalog_name='adhocracy',
                          index_name='rates',
                          context=IRateable)
+    config.add_indexview(index_rate_subject_object,
+                         catalog_name='adhocracy',
+                         index_name='private_rate_subject_object',
+                         context=IRate)
     config.add_indexview(index_tag,
                          catalog_name='adhocracy',
                          index_name='tag',
@@ -121,8 +121,8 @@ class ReferenceIndex(SDIndex, BaseIndexMixin, Persistent):
             get_resources_ids = self._objectmap.sourceids
         else:
             get_resources_ids = self._objectmap.targetids
-        for isheet, field, reftype in self._graph.get_reftypes(isheet):
-            if isheet_field and field != isheet_field:
-                continue
+        reftypes = self._graph.get_reftypes(isheet,
+                                            isheet_field=isheet_field)
+        for isheet, field, reftype in reftypes:
             for oid in get_resources_ids(resource, reftype):
                 yield oid
@@ -7,7 +7,6 @@ from substanced.util import find_service
 
 from adhocracy_core.utils import get_visibility_change
 from adhocracy_core.interfaces import VisibilityChange
-from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IResourceSheetModified
 from adhocracy_core.interfaces import ISheetBackReferenceModified
 from adhocracy_core.interfaces import IResourceCreatedAndAdded
@@ -20,8 +19,8 @@ from adhocracy_core.sheets.badge import IBadgeable
 from adhocracy_core.sheets.principal import IUserBasic
 from adhocracy_core.sheets.principal import IUserExtended
 from adhocracy_core.sheets.workflow import IWorkflowAssignment
-from adhocracy_core.utils import list_resource_with_descendants
 from adhocracy_core.utils import get_sheet_field
+from adhocracy_core.utils import get_item_versions
 
 
 def reindex_tag(event):
@@ -66,38 +65,31 @@ def reindex_badge(event):
 
 
 def reindex_visibility(event):
-    """Reindex the private_visibility index for all descendants if modified."""
+    """Reindex the private_visibility index if modified.
+
+    The descendants inherit the visibility and are not reindexed.
+    """
     visibility = get_visibility_change(event)
     if visibility in (VisibilityChange.concealed, VisibilityChange.revealed):
-        _reindex_resource_and_descendants(event.object)
-
-
-def _reindex_resource_and_descendants(resource: IResource):
-    catalogs = find_service(resource, 'catalogs')
-    if catalogs is None:  # ease testing
-        return
-    resource_and_descendants = list_resource_with_descendants(resource)
-    for res in resource_and_descendants:
-        catalogs.reindex_index(res, 'private_visibility')
+        catalogs = find_service(event.object, 'catalogs')
+        if catalogs is None:  # ease testing
+            return
+        catalogs.reindex_index(event.object, 'private_visibility')
 
 
 def reindex_item_badge(event):
     """Reindex `item_badge` for all item versions of èvent.object."""
     catalogs = find_service(event.object, 'catalogs')
-    children = event.object.values()
-    versionables = (c for c in children if IVersionable.providedBy(c))
-    for versionable in versionables:
-        catalogs.reindex_index(versionable, 'item_badge')
+    for version in get_item_versions(event.object):
+        catalogs.reindex_index(version, 'item_badge')
 
 
 def reindex_workflow_state(event):
     """Reindex the workflow_state index for item and its versions."""
     catalogs = find_service(event.object, 'catalogs')
     catalogs.reindex_index(event.object, 'workflow_state')
-    children = event.object.values()
-    versionables = (c for c in children if IVersionable.providedBy(c))
-    for versionable in versionables:
-        catalogs.reindex_index(versionable, 'workflow_state')
+    for version in get_item_versions(event.object):
+        catalogs.reindex_index(version, 'workflow_state')
 
 
 def includeme(config):
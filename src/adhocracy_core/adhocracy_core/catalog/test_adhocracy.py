@@ -36,6 +36,7 @@ def test_create_adhocracy_catalog(pool_graph, registry):
     assert 'user_name' in catalogs['adhocracy']
     assert 'private_user_email' in catalogs['adhocracy']
     assert 'private_user_activation_path' in catalogs['adhocracy']
+    assert 'private_rate_subject_object' in catalogs['adhocracy']
 
 
 class TestIndexMetadata:
@@ -154,24 +155,39 @@ class TestIndexRate:
         mock_rate_sheet.get.return_value = {'rate': 1}
         assert index_rate(context['rateable'], None) == 1
 
-    def test_index_rates_with_last_tag(self, item, mock_catalogs, search_result):
+    def test_index_rate_subject_object(self, context, mock_rate_sheet,
+                                       registry):
+        from .adhocracy import index_rate_subject_object
+        context['rate'] = testing.DummyResource()
+        registry.content.get_sheet.return_value = mock_rate_sheet
+        mock_rate_sheet.get.return_value = {
+            'subject': testing.DummyResource(__oid__=1),
+            'object': testing.DummyResource(__oid__=2)}
+        assert index_rate_subject_object(context['rate'], None) == '1:2'
+
+    def test_index_rate_subject_object_without_subject(
+            self, context, mock_rate_sheet, registry):
+        from .adhocracy import index_rate_subject_object
+        context['rate'] = testing.DummyResource()
+        registry.content.get_sheet.return_value = mock_rate_sheet
+        mock_rate_sheet.get.return_value = {
+            'subject': None,
+            'object': testing.DummyResource(__oid__=2)}
+        assert index_rate_subject_object(context['rate'], 'default')\
+            == 'default'
+
+    def test_index_rates_with_tally(self, context):
+        from adhocracy_core.resources.rate import RateTally
         from .adhocracy import index_rates
-        dummy_rateable = testing.DummyResource()
-        search_result = search_result._replace(frequency_of={1: 5})
-        mock_catalogs.search.return_value = search_result
-        item['rates']['rate'] = testing.DummyResource()
-        item['rateable'] = dummy_rateable
-        assert index_rates(item['rateable'], None) == 5
-
-    def test_index_rates_with_another_tag(self, item, mock_catalogs,
-                                          search_result):
-        dummy_rateable = testing.DummyResource()
-        search_result = search_result._replace(frequency_of={})
-        mock_catalogs.search.return_value = search_result
-        item['rates']['rate'] = testing.DummyResource()
+        context._rate_tally = RateTally({1: 5, -1: 2, 0: 1})
+        assert index_rates(context, None) == 3
+
+    def test_index_rates_without_tally(self, context, monkeypatch):
+        from . import adhocracy
         from .adhocracy import index_rates
-        item['rateable'] = dummy_rateable
-        assert index_rates(item['rateable'], None) == 0
+        monkeypatch.setattr(adhocracy, 'count_rates', lambda x: {1: 5, -1: 1})
+        assert index_rates(context, None) == 4
+        assert getattr(context, '_rate_tally', None) is None
 
 
 @mark.usefixtures('integration')
@@ -190,6 +206,14 @@ def test_includeme_register_index_rates(registry):
                                     name='adhocracy|rates')
 
 
+@mark.usefixtures('integration')
+def test_includeme_register_index_rate_subject_object(registry):
+    from adhocracy_core.sheets.rate import IRate
+    from substanced.interfaces import IIndexView
+    name = 'adhocracy|private_rate_subject_object'
+    assert registry.adapters.lookup((IRate,), IIndexView, name=name)
+
+
 def test_index_tag_with_tags(context, mock_graph):
     from .adhocracy import index_tag
     context.__graph__ = mock_graph
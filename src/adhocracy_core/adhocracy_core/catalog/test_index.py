@@ -140,6 +140,19 @@ class TestReference:
         mock_objectmap.targetids.assert_called_with(source, SheetToSheet)
         assert list(result) == [oid1, oid2]  # order is not preserver
 
+    def test_search_with_isheet_field(self, mock_graph, mock_objectmap):
+        from adhocracy_core.interfaces import ISheet
+        from adhocracy_core.interfaces import Reference
+        source = testing.DummyResource()
+        inst = self.make_one()
+        inst.__graph__ = mock_graph
+        mock_graph.get_reftypes.return_value = []
+        inst._objectmap = mock_objectmap
+        reference = Reference(source, ISheet, 'field', None)
+        inst._search(reference)
+        mock_graph.get_reftypes.assert_called_with(ISheet,
+                                                   isheet_field='field')
+
     def test_search_with_order_targets(self, mock_graph, mock_objectmap):
         from adhocracy_core.interfaces import ISheet
         from adhocracy_core.interfaces import Reference
@@ -227,6 +227,136 @@ class TestCatalogsServiceAdhocracy:
         result = inst.search(query._replace(only_visible=True))
         assert list(result.elements) == []
 
+    def test_search_with_only_visible_and_hidden_ancestor(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        other = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst['adhocracy']['private_visibility'].reindex_resource(child)
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [other]
+
+    @fixture
+    def mock_pathlookup(self, pool, monkeypatch):
+        from substanced.util import find_objectmap
+        objectmap = find_objectmap(pool)
+        mock = Mock(wraps=objectmap.pathlookup)
+        monkeypatch.setattr(objectmap, 'pathlookup', mock)
+        return mock
+
+    def test_search_with_only_visible_without_concealed(
+            self, registry, pool, inst, query, mock_pathlookup):
+        child = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [child]
+        assert not mock_pathlookup.called
+
+    def test_search_with_only_visible_check_ancestors_of_few_elements(
+            self, registry, pool, inst, query, mock_pathlookup):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        other = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [other]
+        assert not mock_pathlookup.called
+
+    def test_search_with_only_visible_check_ancestors_returns_btrees_set(
+            self, registry, pool, inst, query):
+        from BTrees import family64
+        from hypatia.util import ResultSet
+        child = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        elements = ResultSet([child.__oid__], 1, None)
+        result = inst._exclude_concealed_descendants(elements, query)
+        assert isinstance(result.ids, family64.IF.Set)
+        assert list(result.ids) == []
+
+    def test_search_with_only_visible_exclude_subtrees_of_many_elements(
+            self, registry, pool, inst, query, monkeypatch):
+        from adhocracy_core import catalog
+        monkeypatch.setattr(catalog, 'CONCEALED_ANCESTORS_MAX_ELEMENTS', 1)
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        other = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [other]
+
+    def test_search_with_only_visible_lookup_concealed_subtrees_once(
+            self, registry, pool, inst, query, mock_pathlookup, monkeypatch):
+        from adhocracy_core import catalog
+        monkeypatch.setattr(catalog, 'CONCEALED_ANCESTORS_MAX_ELEMENTS', 0)
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        inst.search(query._replace(only_visible=True))
+        inst.search(query._replace(only_visible=True))
+        assert mock_pathlookup.call_count == 1
+
+    def test_search_with_only_visible_after_child_is_added_to_hidden(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        inst.search(query._replace(only_visible=True))
+        grandchild = self._make_resource(registry, parent=child)
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == []
+
+    def test_search_with_only_visible_and_revealed_ancestor(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        child.hidden = True
+        inst['adhocracy']['private_visibility'].reindex_resource(child)
+        child.hidden = False
+        inst['adhocracy']['private_visibility'].reindex_resource(child)
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [child, grandchild]
+
+    def test_search_with_only_visible_and_hidden_root(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        child.hidden = True
+        inst['adhocracy']['private_visibility'].reindex_resource(child)
+        result = inst.search(query._replace(root=child, only_visible=True))
+        assert list(result.elements) == []
+
+    def test_search_with_only_visible_after_ancestor_is_hidden(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == [child, grandchild]
+        child.hidden = True
+        inst.reindex_index(child, 'private_visibility')
+        result = inst.search(query._replace(only_visible=True))
+        assert list(result.elements) == []
+
+    def test_search_with_indexes_private_visibility_inherited(
+            self, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        grandchild = self._make_resource(registry, parent=child)
+        other = self._make_resource(registry, parent=pool)
+        child.hidden = True
+        inst['adhocracy']['private_visibility'].reindex_resource(child)
+        hidden = inst.search(query._replace(
+            indexes={'private_visibility': 'hidden'}))
+        visible = inst.search(query._replace(
+            indexes={'private_visibility': 'visible'}))
+        not_hidden = inst.search(query._replace(
+            indexes={'private_visibility': ('notany', ['hidden'])}))
+        assert list(hidden.elements) == [child, grandchild]
+        assert list(visible.elements) == [other]
+        assert list(not_hidden.elements) == [other]
+
     def test_search_with_only_visible_false(self, registry, pool, inst, query):
         child = self._make_resource(registry, parent=pool)
         child.hidden = True
@@ -333,6 +463,117 @@ class TestCatalogsServiceAdhocracy:
         result = inst.search(query._replace(references=[reference]))
         assert list(result.elements) == [referenced3, referenced1, referenced2]
 
+    def test_search_with_back_references_and_interfaces(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import IItemVersion
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referenced1 = self._make_resource(registry, parent=pool)
+        referenced2 = self._make_resource(registry, parent=pool,
+                                          iresource=IItemVersion)
+        referencing = self._make_resource(registry, parent=pool, iresource=ITag)
+        sheet = get_sheet(referencing, sheets.tags.ITag)
+        sheet.set({'elements': [referenced2, referenced1]})
+        reference = Reference(referencing, sheets.tags.ITag, 'elements', None)
+        result = inst.search(query._replace(references=[reference],
+                                            interfaces=IItemVersion))
+        assert list(result.elements) == [referenced2]
+
+    def test_search_with_multiple_back_references(self, registry, pool, inst,
+                                                  query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referenced1 = self._make_resource(registry, parent=pool)
+        referenced2 = self._make_resource(registry, parent=pool)
+        referencing1 = self._make_resource(registry, parent=pool,
+                                           iresource=ITag)
+        referencing2 = self._make_resource(registry, parent=pool,
+                                           iresource=ITag)
+        get_sheet(referencing1, sheets.tags.ITag).set(
+            {'elements': [referenced1, referenced2]})
+        get_sheet(referencing2, sheets.tags.ITag).set(
+            {'elements': [referenced2]})
+        reference1 = Reference(referencing1, sheets.tags.ITag, 'elements',
+                               None)
+        reference2 = Reference(referencing2, sheets.tags.ITag, 'elements',
+                               None)
+        result = inst.search(query._replace(references=[reference1,
+                                                        reference2]))
+        assert list(result.elements) == [referenced2]
+
+    def test_search_with_back_references_and_only_visible(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referenced = self._make_resource(registry, parent=pool)
+        referencing = self._make_resource(registry, parent=pool, iresource=ITag)
+        sheet = get_sheet(referencing, sheets.tags.ITag)
+        sheet.set({'elements': [referenced]})
+        reference = Reference(referencing, sheets.tags.ITag, 'elements', None)
+        result = inst.search(query._replace(references=[reference],
+                                            only_visible=True))
+        assert list(result.elements) == [referenced]
+
+    def test_search_references(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import IItemVersion
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referenced1 = self._make_resource(registry, parent=pool)
+        referenced2 = self._make_resource(registry, parent=pool,
+                                          iresource=IItemVersion)
+        referencing1 = self._make_resource(registry, parent=pool,
+                                           iresource=ITag)
+        referencing2 = self._make_resource(registry, parent=pool,
+                                           iresource=ITag)
+        get_sheet(referencing1, sheets.tags.ITag).set(
+            {'elements': [referenced2, referenced1]})
+        get_sheet(referencing2, sheets.tags.ITag).set(
+            {'elements': [referenced1]})
+        reference1 = Reference(referencing1, sheets.tags.ITag, 'elements',
+                               None)
+        reference2 = Reference(referencing2, sheets.tags.ITag, 'elements',
+                               None)
+        reference3 = Reference(None, sheets.tags.ITag, 'elements',
+                               referenced2)
+        result = inst.search_references(query._replace(resolve=True),
+                                        [reference1, reference2, reference3])
+        assert result == {reference1: [referenced2, referenced1],
+                          reference2: [referenced1],
+                          reference3: [referencing1],
+                          }
+
+    def test_search_references_with_interfaces(self, registry, pool, inst,
+                                               query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import IItemVersion
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referenced1 = self._make_resource(registry, parent=pool)
+        referenced2 = self._make_resource(registry, parent=pool,
+                                          iresource=IItemVersion)
+        referencing = self._make_resource(registry, parent=pool,
+                                          iresource=ITag)
+        get_sheet(referencing, sheets.tags.ITag).set(
+            {'elements': [referenced2, referenced1]})
+        reference = Reference(referencing, sheets.tags.ITag, 'elements',
+                              None)
+        result = inst.search_references(
+            query._replace(interfaces=IItemVersion, resolve=False),
+            [reference])
+        assert result == {reference: [referenced2.__oid__]}
+
+    def test_search_references_without_references(self, inst, query):
+        assert inst.search_references(query, []) == {}
+
     def test_search_with_sort_by(self, registry, pool, inst, query):
         child = self._make_resource(registry, parent=pool)
         child2 = self._make_resource(registry, parent=pool)
@@ -365,12 +606,296 @@ class TestCatalogsServiceAdhocracy:
                                             offset=1))
         assert list(result.elements) == [child2]
 
+    def test_search_with_sort_by_limit_and_offset(self, registry, pool, inst,
+                                                  query):
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        child3 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(sort_by='name', limit=1,
+                                            offset=1))
+        assert list(result.elements) == [child2]
+        assert result.count == 3
+
+    def test_search_with_sort_by_limit_and_offset_get_sort_type(
+            self, registry, pool, inst, query):
+        self._make_resource(registry, parent=pool)
+        inst._get_sort_type = Mock(wraps=inst._get_sort_type)
+        inst.search(query._replace(sort_by='name', limit=1, offset=2))
+        assert inst._get_sort_type.call_args[0][2] == 3
+
+    def test_get_sort_type_nbest_if_small_limit(self, inst):
+        from hypatia.interfaces import NBEST
+        index = Mock(_num_docs=lambda: 100000)
+        assert inst._get_sort_type(range(10), index, 10) == NBEST
+
+    def test_get_sort_type_none_if_no_limit(self, inst):
+        index = Mock(_num_docs=lambda: 100000)
+        assert inst._get_sort_type(range(10), index, None) is None
+
+    def test_get_sort_type_none_if_big_limit(self, inst):
+        from . import TOP_K_MAX_LIMIT
+        index = Mock(_num_docs=lambda: 100000)
+        assert inst._get_sort_type(range(10), index, TOP_K_MAX_LIMIT + 1)\
+            is None
+
+    def test_get_sort_type_none_if_forward_scan_wins(self, inst):
+        index = Mock(_num_docs=lambda: 100000)
+        assert inst._get_sort_type(range(90000), index, 10) is None
+
+    def test_get_sort_type_none_if_index_without_num_docs(self, inst):
+        index = Mock(spec=['sort'])
+        assert inst._get_sort_type(range(10), index, 10) is None
+
+    def test_search_with_only_count(self, registry, pool, inst, query):
+        self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(only_count=True,
+                                            sort_by='interfaces',  # no sort
+                                            limit=1))
+        assert result.elements == []
+        assert result.count == 2
+
+    @fixture(params=['walk_sort_index', 'heap'])
+    def cursor_strategy(self, request, monkeypatch, inst):
+        """Test cursor pages with both sort strategies."""
+        is_walk = request.param == 'walk_sort_index'
+        monkeypatch.setattr(inst, '_is_sort_index_walk_faster',
+                            lambda *args: is_walk)
+        return request.param
+
+    def test_search_with_cursor_none(self, registry, pool, inst, query):
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(limit=1))
+        assert result.next_cursor is None
+
+    def test_search_with_cursor_empty_first_page(self, cursor_strategy, registry, pool, inst,
+                                                 query):
+        child = self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(sort_by='name', limit=1,
+                                            cursor=''))
+        assert result.elements == [child]
+        assert result.count == 2
+        assert result.next_cursor
+
+    def test_search_with_cursor_next_page(self, cursor_strategy, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        child3 = self._make_resource(registry, parent=pool)
+        query = query._replace(sort_by='name', limit=2, cursor='')
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.next_cursor))
+        assert result.elements == [child, child2]
+        assert result2.elements == [child3]
+        assert result2.next_cursor is None
+
+    def test_search_with_cursor_and_reverse(self, cursor_strategy, registry, pool, inst,
+                                            query):
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        query = query._replace(sort_by='name', limit=1, cursor='',
+                               reverse=True)
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.next_cursor))
+        assert result.elements == [child2]
+        assert result2.elements == [child]
+
+    def test_search_with_cursor_ignore_offset(self, cursor_strategy, registry, pool, inst,
+                                              query):
+        child = self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(sort_by='name', limit=1, offset=1,
+                                            cursor=''))
+        assert result.elements == [child]
+
+    def test_search_with_cursor_without_sort_by(self, cursor_strategy, registry, pool, inst,
+                                                query):
+        from substanced.util import get_oid
+        children = [self._make_resource(registry, parent=pool),
+                    self._make_resource(registry, parent=pool)]
+        children.sort(key=get_oid)
+        query = query._replace(limit=1, cursor='')
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.next_cursor))
+        assert result.elements + result2.elements == children
+
+    def test_search_with_cursor_same_sort_values(self, cursor_strategy, registry, pool, inst,
+                                                 query):
+        from substanced.util import get_oid
+        children = [self._make_resource(registry, parent=pool)
+                    for x in range(3)]
+        index = inst['system']['name']
+        index.discriminate = lambda obj, default: obj
+        for child in children:
+            index.reindex_doc(get_oid(child), 'same')
+        index.reindex_doc = Mock()
+        children.sort(key=get_oid)
+        query = query._replace(sort_by='name', limit=2, cursor='')
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.next_cursor))
+        assert result.elements + result2.elements == children
+
+    def test_search_with_cursor_no_limit(self, cursor_strategy, registry, pool, inst, query):
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(sort_by='name', cursor=''))
+        assert result.elements == [child, child2]
+        assert result.next_cursor is None
+
+    def test_search_with_cursor_omit_elements_without_sort_value(
+            self, cursor_strategy, registry, pool, inst, query):
+        from substanced.util import get_oid
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        inst['system']['name'].unindex_doc(get_oid(child))
+        result = inst.search(query._replace(sort_by='name', limit=2,
+                                            cursor=''))
+        assert result.elements == [child2]
+        assert result.count == 2
+
+    def test_search_with_cursor_walk_sort_index_until_page_is_complete(
+            self, registry, pool, inst, query):
+        children = [self._make_resource(registry, parent=pool)
+                    for x in range(4)]
+        index = inst['system']['name']
+        fwd_index = index._fwd_index
+        visited = []
+
+        class VisitedFwdIndex:
+
+            def __getitem__(self, value):
+                visited.append(value)
+                return fwd_index[value]
+
+            def __getattr__(self, name):
+                return getattr(fwd_index, name)
+
+            def __contains__(self, value):
+                return value in fwd_index
+
+        index._fwd_index = VisitedFwdIndex()
+        inst._is_sort_index_walk_faster = lambda *args: True
+        query = query._replace(sort_by='name', limit=1, cursor='')
+        result = inst.search(query)
+        assert result.elements == children[:1]
+        assert visited == [x.__name__ for x in children[:2]]
+        result2 = inst.search(query._replace(cursor=result.next_cursor))
+        assert result2.elements == children[1:2]
+
+    def test_search_with_cursor_heap_if_few_elements(self, registry, pool,
+                                                     inst, query):
+        from substanced.util import get_oid
+        child = self._make_resource(registry, parent=pool)
+        index = inst['system']['name']
+        for docid in range(1000):
+            index.index_doc(docid, 'name' + str(docid))
+        inst._walk_sort_index = Mock()
+        result = inst.search(query._replace(sort_by='name', limit=1,
+                                            cursor='',
+                                            root=pool, depth=1))
+        assert result.elements == [child]
+        assert not inst._walk_sort_index.called
+
+    def test_search_with_indexes_and_root_filter_by_path(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IItem
+        item = self._make_resource(registry, parent=pool, iresource=IItem)
+        has_tag = item['VERSION_0000000']
+        query = query._replace(indexes={'tag': 'FIRST'}, depth=1)
+        assert list(inst.search(query._replace(root=item)).elements)\
+            == [has_tag]
+        assert list(inst.search(query._replace(root=pool)).elements) == []
+
+    def test_explain_most_selective_operand_first(self, registry, pool,
+                                                   inst, query):
+        from adhocracy_core.interfaces import IItem
+        item = self._make_resource(registry, parent=pool, iresource=IItem)
+        self._make_resource(registry, parent=pool)
+        explain = inst.explain(query._replace(indexes={'tag': 'FIRST'},
+                                              root=pool))
+        assert [x['name'] for x in explain] == ['tag', 'interfaces', 'path']
+        assert explain[0] == {'name': 'tag',
+                              'estimate': 1,
+                              'strategy': 'apply',
+                              'count': 1}
+        assert explain[1]['strategy'] == 'filter'
+        assert explain[2]['strategy'] == 'filter'
+        assert explain[2]['count'] == 1
+
+    def test_execute_query_operands_filter_returns_btrees_set(self, inst):
+        from BTrees import family64
+        operands = [inst._make_docids_operand('a', [1, 2]),
+                    inst._make_docids_operand('b', [2, 3, 4])]
+        docids = inst._execute_query_operands(operands)
+        assert isinstance(docids, family64.IF.Set)
+        assert list(docids) == [2]
+
+    def test_explain_intersect_if_no_estimate(self, registry, pool, inst,
+                                              query):
+        self._make_resource(registry, parent=pool)
+        explain = inst.explain(query._replace(
+            indexes={'name': ('noteq', 'WRONG')}))
+        assert explain[1]['name'] == 'name'
+        assert explain[1]['strategy'] == 'intersect'
+
+    def test_explain_references_first(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import ITag
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        referencing = self._make_resource(registry, parent=pool, iresource=ITag)
+        self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        get_sheet(referencing, sheets.tags.ITag).set({'elements': [pool]})
+        reference = Reference(None, sheets.tags.ITag, 'elements', pool)
+        explain = inst.explain(query._replace(references=[reference],
+                                              root=pool, depth=1))
+        assert explain[0]['name'] == 'reference'
+        assert explain[0]['count'] == 1
+        assert [x['strategy'] for x in explain[1:]] == ['filter', 'filter']
+
+    def test_explain_allowed_last(self, registry, pool, inst, query):
+        self._make_resource(registry, parent=pool)
+        explain = inst.explain(query._replace(allows=(['system.Everyone'],
+                                                      'view'),
+                                              indexes={'tag': 'WRONG'}))
+        assert [x['name'] for x in explain] == ['tag']
+        explain = inst.explain(query._replace(allows=(['system.Everyone'],
+                                                      'view')))
+        assert explain[-1]['name'] == 'allowed'
+        assert explain[-1]['estimate'] is None
+        assert explain[-1]['strategy'] == 'intersect'
+
     def test_search_with_frequency_of(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import ISimple
         child = self._make_resource(registry, parent=pool, iresource=ISimple)
         result = inst.search(query._replace(frequency_of='interfaces'))
         assert result.frequency_of[ISimple] == 1
 
+    def test_search_with_frequency_of_field_index(self, registry, pool, inst,
+                                                  query):
+        inst['system']['name'].unique_values = Mock()
+        child = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(frequency_of='name'))
+        assert result.frequency_of == {child.__name__: 1}
+        assert not inst['system']['name'].unique_values.called
+
+    def test_search_with_frequency_of_ignore_not_indexed(self, registry,
+                                                         pool, inst, query):
+        from adhocracy_core.interfaces import IItem
+        item = self._make_resource(registry, parent=pool, iresource=IItem)
+        result = inst.search(query._replace(frequency_of='tag'))
+        assert result.frequency_of == {'FIRST': 1, 'LAST': 1}
+
+    def test_iter_index_values_index_without_rev_index(self, inst):
+        from hypatia.util import ResultSet
+        index = Mock(spec=['unique_values', 'eq'])
+        index.unique_values.return_value = ['value']
+        index.eq.return_value.execute.return_value = [1]
+        elements = ResultSet([1, 2], 2, None)
+        result = inst._iter_index_values(elements, index)
+        assert list(result) == [(1, 'value')]
+
     def test_search_with_group_by(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import ISimple
         child = self._make_resource(registry, parent=pool, iresource=ISimple)
@@ -387,6 +912,17 @@ class TestCatalogsServiceAdhocracy:
                                             resolve=False))
         assert IResultSet.providedBy(result.group_by[ISimple])
 
+    def test_search_with_group_by_returns_btrees_sets(self, registry, pool,
+                                                      inst, query):
+        from BTrees import family64
+        from adhocracy_core.interfaces import ISimple
+        child = self._make_resource(registry, parent=pool, iresource=ISimple)
+        result = inst.search(query._replace(group_by='interfaces',
+                                            resolve=False))
+        group = result.group_by[ISimple]
+        assert isinstance(group.ids, family64.IF.Set)
+        assert len(group) == 1
+
     def test_search_with_group_by_and_sort_by(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import ISimple
         child = self._make_resource(registry, parent=pool, iresource=ISimple)
@@ -413,4 +949,3 @@ class TestCatalogsServiceAdhocracy:
         inst['system']['allowed'].reindex_resource(child)
         result = inst.search(query._replace(allows=(['principal'], 'view')))
         assert list(result.elements) == [child]
-
@@ -71,8 +71,8 @@ def test_reindex_badge_index(event, catalog, mock_sheet, registry_with_content):
 def test_reindex_item_badge(event, catalog):
     from unittest.mock import call
     from .subscriber import reindex_item_badge
-    from adhocracy_core.sheets.versions import IVersionable
-    event.object['version'] = testing.DummyResource(__provides__=IVersionable)
+    from adhocracy_core.interfaces import IItemVersion
+    event.object['version'] = testing.DummyResource(__provides__=IItemVersion)
     event.object['other'] = testing.DummyResource()
     reindex_item_badge(event)
 
@@ -81,16 +81,6 @@ def test_reindex_item_badge(event, catalog):
     assert call(event.object['other'], 'item_badge') not in index_calls
 
 
-@fixture
-def mock_reindex(monkeypatch):
-    from . import subscriber
-    mock_reindex = Mock(spec=subscriber._reindex_resource_and_descendants)
-    monkeypatch.setattr(subscriber,
-                        '_reindex_resource_and_descendants',
-                        mock_reindex)
-    return mock_reindex
-
-
 @fixture
 def mock_visibility(monkeypatch):
     from . import subscriber
@@ -101,79 +91,55 @@ def mock_visibility(monkeypatch):
     return mock_visibility
 
 
-def test_reindex_visibility_concealed(event, mock_reindex, mock_visibility):
+def test_reindex_visibility_concealed(event, catalog, mock_visibility):
+    from adhocracy_core.interfaces import VisibilityChange
+    from .subscriber import reindex_visibility
+    mock_visibility.return_value = VisibilityChange.concealed
+    reindex_visibility(event)
+    catalog.reindex_index.assert_called_once_with(event.object,
+                                                  'private_visibility')
+
+
+def test_reindex_visibility_concealed_ignore_descendants(event, catalog,
+                                                         mock_visibility):
     from adhocracy_core.interfaces import VisibilityChange
     from .subscriber import reindex_visibility
+    event.object['child'] = testing.DummyResource()
     mock_visibility.return_value = VisibilityChange.concealed
     reindex_visibility(event)
-    assert mock_reindex.called
+    assert catalog.reindex_index.call_count == 1
 
 
-def test_reindex_visibility_revealed(event, mock_reindex, mock_visibility):
+def test_reindex_visibility_revealed(event, catalog, mock_visibility):
     from adhocracy_core.interfaces import VisibilityChange
     from .subscriber import reindex_visibility
     mock_visibility.return_value = VisibilityChange.revealed
     reindex_visibility(event)
-    assert mock_reindex.called
+    catalog.reindex_index.assert_called_once_with(event.object,
+                                                  'private_visibility')
 
 
-def test_reindex_visibility_invisible(event, mock_reindex, mock_visibility):
+def test_reindex_visibility_invisible(event, catalog, mock_visibility):
     from adhocracy_core.interfaces import VisibilityChange
     from .subscriber import reindex_visibility
     mock_visibility.return_value = VisibilityChange.invisible
     reindex_visibility(event)
-    assert not mock_reindex.called
+    assert not catalog.reindex_index.called
 
 
-def test_reindex_visibility_visible(event, mock_reindex, mock_visibility):
+def test_reindex_visibility_visible(event, catalog, mock_visibility):
     from adhocracy_core.interfaces import VisibilityChange
     from .subscriber import reindex_visibility
     mock_visibility.return_value = VisibilityChange.visible
     reindex_visibility(event)
-    assert not mock_reindex.called
-
-
-class TestReindexResourceAndDescendants:
-
-    @fixture
-    def mock_path_query(self):
-        mock_query = Mock()
-        return mock_query
-
-    @fixture
-    def catalog(self, catalog, mock_path_query):
-        from substanced.interfaces import IService
-        from substanced.interfaces import IFolder
-        from substanced.catalog.indexes import PathIndex
-        catalog['system'] = testing.DummyResource(__provides__=(IFolder,
-                                                                IService))
-        mock_path_index = Mock(spec=PathIndex)
-        mock_path_index.eq.return_value = mock_path_query
-        catalog['system']['path'] = mock_path_index
-        return catalog
-
-    def call_fut(self, context):
-        from .subscriber import _reindex_resource_and_descendants
-        return _reindex_resource_and_descendants(context)
-
-    def test_resource_and_descentdants_reindexed(self, context, catalog,
-                                                 mock_path_query):
-        from pyramid.traversal import resource_path
-        child = testing.DummyResource()
-        mock_path_query.execute.return_value = [context, child]
-        self.call_fut(context)
-        assert catalog['system']['path'].eq.call_args == \
-               call(resource_path(context), include_origin=True)
-        mock_reindex = catalog.reindex_index
-        assert call(child, 'private_visibility') in mock_reindex.call_args_list
-        assert mock_reindex.call_count == 2
+    assert not catalog.reindex_index.called
 
 
 def test_reindex_workflow_state(event, catalog):
     from unittest.mock import call
     from .subscriber import reindex_workflow_state
-    from adhocracy_core.sheets.versions import IVersionable
-    event.object['version'] = testing.DummyResource(__provides__=IVersionable)
+    from adhocracy_core.interfaces import IItemVersion
+    event.object['version'] = testing.DummyResource(__provides__=IItemVersion)
     event.object['other'] = testing.DummyResource()
     reindex_workflow_state(event)
 
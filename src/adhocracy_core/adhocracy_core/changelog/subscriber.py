@@ -1,7 +1,9 @@
 """Update transaction changelog."""
+from BTrees.Length import Length
 from pyramid.location import lineage
 from pyramid.registry import Registry
 from pyramid.traversal import find_interface, resource_path
+from pyramid.traversal import find_root
 from pyramid.threadlocal import get_current_registry
 from substanced.event import ACLModified
 
@@ -15,7 +17,6 @@ from adhocracy_core.interfaces import VisibilityChange
 from adhocracy_core.utils import get_visibility_change
 from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.utils import find_graph
-from adhocracy_core.utils import list_resource_with_descendants
 from adhocracy_core.resources.principal import IPasswordReset
 
 
@@ -90,6 +91,8 @@ def _add_changelog(registry: Registry, resource: IResource, key: str,
                    value: object) -> bool:
     """Add metadata `key/value` to the transaction changelog if needed.
 
+    The version stamp of `resource` is incremented if a new value is added.
+
     Return: True if new metadata value was added else False (no value change)
     """
     changelog = registry.changelog
@@ -99,11 +102,26 @@ def _add_changelog(registry: Registry, resource: IResource, key: str,
     if old_value is not value:
         changelog[path] = metadata._replace(**{'resource': resource,
                                                key: value})
+        _increment_version_stamp(resource)
         return True
     else:
         return False
 
 
+def _increment_version_stamp(resource: IResource):
+    if resource is None:
+        return  # ease testing
+    _increment_counter(resource, '__version_stamp__')
+
+
+def _increment_counter(context, name: str):
+    counter = getattr(context, name, None)
+    if counter is None:  # resources created before the counter was added
+        setattr(context, name, Length(1))
+    else:
+        counter.change(1)
+
+
 def add_changelog_visibility(event):
     """Add new visibility message to the transaction_changelog."""
     visibility = get_visibility_change(event)
@@ -112,16 +130,27 @@ def add_changelog_visibility(event):
     if value_changed and visibility in (VisibilityChange.concealed,
                                         VisibilityChange.revealed):
         _mark_referenced_resources_as_changed(event.object, event.registry)
+        _increment_visibility_epoch(event.object)
+
+
+def _increment_visibility_epoch(resource: IResource):
+    """Increment the visibility epoch of the root resource.
+
+    The blocked status is inherited by all descendants, so this invalidates
+    the version stamps of all resources.
+    """
+    root = find_root(resource)
+    _increment_counter(root, '__visibility_epoch__')
 
 
 def _mark_referenced_resources_as_changed(resource: IResource,
                                           registry: Registry):
     graph = find_graph(resource)
-    resource_and_descendants = list_resource_with_descendants(resource)
-    for res in resource_and_descendants:
-        references = graph.get_references(res)
-        for ref in references:
-            _add_changelog_backrefs_for_resource(ref.target, registry)
+    if graph is None:  # ease testing
+        return
+    targets = graph.get_descendants_references_targets(resource)
+    for target in targets:
+        _add_changelog_backrefs_for_resource(target, registry)
 
 
 def includeme(config):
@@ -36,6 +36,28 @@ def test_add_changelog_created_with_parent(event, pool, changelog):
     assert changelog['parent'].modified is True
 
 
+def test_add_changelog_increments_version_stamp(event, changelog):
+    from BTrees.Length import Length
+    from .subscriber import add_changelog_created
+    event.object.__version_stamp__ = Length()
+    add_changelog_created(event)
+    assert event.object.__version_stamp__() == 1
+
+
+def test_add_changelog_increments_version_stamp_only_if_value_changed(
+        event, changelog):
+    from .subscriber import add_changelog_created
+    add_changelog_created(event)
+    add_changelog_created(event)
+    assert event.object.__version_stamp__() == 1
+
+
+def test_add_changelog_creates_missing_version_stamp(event, changelog):
+    from .subscriber import add_changelog_created
+    add_changelog_created(event)
+    assert event.object.__version_stamp__() == 1
+
+
 def test_add_changelog_followed_with_has_no_follows(event, changelog):
     from .subscriber import add_changelog_followed
     event.new_version = None
@@ -162,6 +184,26 @@ def test_add_changelog_visibility(event, changelog, mock_visibility):
     assert changelog['/'].visibility == 'consealed'
 
 
+def test_add_changelog_visibility_concealed_increments_visibility_epoch(
+        event, changelog, mock_visibility):
+    from adhocracy_core.interfaces import VisibilityChange
+    from .subscriber import add_changelog_visibility
+    root = testing.DummyResource()
+    root['child'] = event.object
+    mock_visibility.return_value = VisibilityChange.concealed
+    add_changelog_visibility(event)
+    assert root.__visibility_epoch__() == 1
+
+
+def test_add_changelog_visibility_visible_keeps_visibility_epoch(
+        event, changelog, mock_visibility):
+    from adhocracy_core.interfaces import VisibilityChange
+    from .subscriber import add_changelog_visibility
+    mock_visibility.return_value = VisibilityChange.visible
+    add_changelog_visibility(event)
+    assert not hasattr(event.object, '__visibility_epoch__')
+
+
 @fixture()
 def integration(config):
     config.include('adhocracy_core.events')
@@ -16,6 +16,8 @@ from adhocracy_core.interfaces import ISheet
 from adhocracy_core.interfaces import IItemVersion
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import ResourceMetadata
+from adhocracy_core.schema import get_sheet_schema
+from adhocracy_core.utils import count_item_versions
 from adhocracy_core.utils import get_iresource
 
 
@@ -85,9 +87,7 @@ class ResourceContentRegistry(ContentRegistry):
         is_item_version = meta.iresource.isOrExtends(IItemVersion)
         has_item_parent = IItem.providedBy(context)
         if has_item_parent and is_item_version:
-            children = context.values()
-            versions = [x for x in children if IItemVersion.providedBy(x)]
-            only_first_version = len(versions) == 1
+            only_first_version = count_item_versions(context) == 1
         return only_first_version
 
     @reify
@@ -217,9 +217,13 @@ class ResourceContentRegistry(ContentRegistry):
         if request is None:
             return
         sheets_candiates = copy(sheets)
+        allowed = {}
         for sheet in sheets_candiates:
             permission = getattr(sheet.meta, permission_attr)
-            if not request.has_permission(permission, context):
+            if permission not in allowed:
+                allowed[permission] = request.has_permission(permission,
+                                                             context)
+            if not allowed[permission]:
                 sheets.remove(sheet)
 
     @reify
@@ -306,7 +310,8 @@ class ResourceContentRegistry(ContentRegistry):
             raise ValueError('No such sheet: {}'.format(name))
         if not (IInterface.providedBy(isheet) and isheet.isOrExtends(ISheet)):
             raise ValueError('Not a sheet: {}'.format(name))
-        schema = self.sheets_meta[isheet].schema_class()
+        schema = get_sheet_schema(self.sheets_meta[isheet].schema_class,
+                                  self.registry)
         node = schema.get(field, None)
         if not node:
             raise ValueError('No such field: {}'.format(dotted))
@@ -135,6 +135,14 @@ class TestResourceContentRegistry:
         config.testing_securitypolicy(userid='hank', permissive=True)
         assert inst.get_sheets_read(context, request_) == [mock_sheet]
 
+    def test_get_sheets_read_with_request_check_permission_once(
+           self, inst, context, request_, mock_sheet):
+        inst.sheets_read[IResource] = [mock_sheet, mock_sheet]
+        request_.has_permission = Mock(return_value=True)
+        assert inst.get_sheets_read(context, request_) == [mock_sheet,
+                                                            mock_sheet]
+        assert request_.has_permission.call_count == 1
+
     def test_get_sheets_edit(self, inst, context, mock_sheet):
         assert inst.get_sheets_edit(context) == [mock_sheet]
         assert mock_sheet.context is context
@@ -1,11 +1,16 @@
 """Scripts to migrate legacy objects in existing databases."""
 import logging
+import time
+from bisect import bisect_right
 from functools import wraps
+import transaction
 
 from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
 from persistent.mapping import PersistentMapping
 from pyramid.registry import Registry
 from pyramid.threadlocal import get_current_registry
+from pyramid.traversal import find_root
 from zope.interface.interfaces import IInterface
 from zope.interface import alsoProvides
 from zope.interface import noLongerProvides
@@ -14,12 +19,19 @@ from substanced.evolution import add_evolution_step
 from substanced.util import find_service
 from substanced.interfaces import IFolder
 
+from adhocracy_core.auditing import AuditLog
+from adhocracy_core.auditing import get_auditlog
 from adhocracy_core.catalog import ICatalogsService
+from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import ISimple
 from adhocracy_core.interfaces import ResourceMetadata
 from adhocracy_core.interfaces import search_query
+from adhocracy_core.resources.asset import IAsset
 from adhocracy_core.resources.asset import IPoolWithAssets
+from adhocracy_core.resources.asset import ImageVariantsCache
+from adhocracy_core.resources.asset import add_image_variants_cache
+from adhocracy_core.resources.asset import generate_image_variants
 from adhocracy_core.resources.badge import IBadgeAssignmentsService
 from adhocracy_core.resources.badge import add_badge_assignments_service
 from adhocracy_core.resources.badge import add_badges_service
@@ -32,17 +44,109 @@ from adhocracy_core.resources.proposal import IProposalVersion
 from adhocracy_core.resources.relation import add_relationsservice
 from adhocracy_core.sheets.badge import IBadgeable
 from adhocracy_core.sheets.badge import IHasBadgesPool
+from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.pool import IPool
 from adhocracy_core.sheets.principal import IUserExtended
 from adhocracy_core.sheets.relation import ICanPolarize
 from adhocracy_core.sheets.relation import IPolarizable
 from adhocracy_core.sheets.title import ITitle
 from adhocracy_core.sheets.workflow import IWorkflowAssignment
+from adhocracy_core.utils import find_graph
 from adhocracy_core.utils import get_sheet
 
 
 logger = logging.getLogger(__name__)
 
+MIGRATION_CHUNK_SIZE = 1000
+"""Number of resources migrated per transaction commit."""
+
+
+def migrate_resources(context: IResource,
+                      interfaces: (IInterface),
+                      migrate: callable,
+                      name: str,
+                      chunk_size: int=MIGRATION_CHUNK_SIZE,
+                      commit: bool=None) -> int:
+    """Call `migrate` with every resource providing `interfaces`.
+
+    :param context: resource to find the catalogs and the root
+    :param migrate: callable with the resource as only argument
+    :param name: unique name of the migration, used to store the checkpoint
+    :param chunk_size: number of resources migrated per commit
+    :param commit: commit every chunk. Default value None means the
+        `commit_migration_chunks` attribute of the registry, it is only
+        set by the `evolve_chunked` console script, see
+        :mod:`adhocracy_core.scripts.evolve_chunked`.
+    :returns: number of migrated resources
+
+    The resources are resolved one at a time in docid order. If `commit`
+    is set, after every `chunk_size` resources the transaction is committed
+    and the last migrated docid is stored as checkpoint. If the migration
+    is interrupted, calling it again with the same `name` resumes after the
+    checkpoint. Else all resources are migrated in the current transaction,
+    so dry runs and the evolution on startup have no side effects until
+    the evolution step is committed.
+    """
+    if commit is None:
+        registry = get_current_registry(context)
+        commit = getattr(registry, 'commit_migration_chunks', False)
+    catalogs = find_service(context, 'catalogs')
+    checkpoints = _get_migration_checkpoints(context, create=commit)
+    query = search_query._replace(interfaces=interfaces, resolve=False)
+    elements = catalogs.search(query).elements
+    docids = sorted(elements.ids)
+    checkpoint = checkpoints.get(name, None)
+    start = 0
+    if checkpoint is not None:
+        start = bisect_right(docids, checkpoint)
+        logger.info('Resume migration {0} after resource {1} of {2}'
+                    .format(name, start, len(docids)))
+    count = len(docids) - start
+    started = time.time()
+    migrated = 0
+    for docid in docids[start:]:
+        resource = elements.resolver(docid)
+        if resource is not None:
+            migrate(resource)
+        migrated += 1
+        if migrated % chunk_size == 0:
+            if commit:
+                checkpoints[name] = docid
+                _commit_migration_chunk(context)
+            _log_migration_progress(name, migrated, count, started)
+    if name in checkpoints:
+        del checkpoints[name]
+    return migrated
+
+
+def _get_migration_checkpoints(context: IResource, create=True) -> OOBTree:
+    """Return mapping migration name to last migrated docid."""
+    root = find_root(context)
+    checkpoints = getattr(root, '_migration_checkpoints', None)
+    if checkpoints is None and not create:
+        return {}
+    if checkpoints is None:
+        checkpoints = OOBTree()
+        root._migration_checkpoints = checkpoints
+    return checkpoints
+
+
+def _commit_migration_chunk(context: IResource):
+    transaction.commit()
+    jar = getattr(context, '_p_jar', None)
+    if jar is not None:
+        jar.cacheGC()
+
+
+def _log_migration_progress(name: str, migrated: int, count: int,
+                            started: float):
+    seconds = max(time.time() - started, 0.001)
+    rate = migrated / seconds
+    eta = (count - migrated) / rate
+    logger.info('Migration {0}: {1} of {2} resources, {3:.1f} per second,'
+                ' ETA {4:.0f} seconds'.format(name, migrated, count, rate,
+                                              eta))
+
 
 def migrate_to_attribute_storage(context: IPool, isheet: IInterface):
     """Migrate sheet data for`isheet` from annotation to attribute storage."""
@@ -50,21 +154,19 @@ def migrate_to_attribute_storage(context: IPool, isheet: IInterface):
     sheet_meta = registry.content.sheets_meta[isheet]
     isheet_name = sheet_meta.isheet.__identifier__
     annotation_key = '_sheet_' + isheet_name.replace('.', '_')
-    catalogs = find_service(context, 'catalogs')
-    resources = _search_for_interfaces(catalogs, isheet)
-    count = len(resources)
-    logger.info('Migrating {0} resources with {1} to attribute storage'
-                .format(count, isheet))
-    for index, resource in enumerate(resources):
+    logger.info('Migrating resources with {0} to attribute storage'
+                .format(isheet))
+
+    def migrate(resource):
         data = resource.__dict__
         if annotation_key in data:
-            logger.info('Migrating resource {0} of {1}'
-                        .format(index + 1, count))
+            logger.info('Migrating resource {0}'.format(resource))
             for field, value in data[annotation_key].items():
                 setattr(resource, field, value)
             delattr(resource, annotation_key)
-        else:
-            continue
+
+    name = 'migrate_to_attribute_storage:' + isheet_name
+    migrate_resources(context, isheet, migrate, name)
 
 
 def migrate_new_sheet(context: IPool,
@@ -85,16 +187,11 @@ def migrate_new_sheet(context: IPool,
                            migrate field values.
     """
     registry = get_current_registry(context)
-    catalogs = find_service(context, 'catalogs')
     interfaces = isheet_old and (isheet_old, iresource) or iresource
-    query = search_query._replace(interfaces=interfaces)
-    resources = catalogs.search(query).elements
-    count = len(resources)
-    logger.info('Migrating {0} {1} to new sheet {2}'.format(count, iresource,
-                                                            isheet))
-    for index, resource in enumerate(resources):
-        logger.info('Migrating {0} of {1}: {2}'.format(index + 1, count,
-                                                       resource))
+    logger.info('Migrating {0} to new sheet {1}'.format(iresource, isheet))
+
+    def migrate(resource):
+        logger.info('Migrating {0}'.format(resource))
         logger.info('Add {0}  sheet'.format(isheet))
         alsoProvides(resource, isheet)
         if fields_mapping:
@@ -104,6 +201,10 @@ def migrate_new_sheet(context: IPool,
             logger.info('Remove {0} sheet'.format(isheet_old))
             noLongerProvides(resource, isheet_old)
 
+    name = 'migrate_new_sheet:{0}:{1}'.format(iresource.__identifier__,
+                                              isheet.__identifier__)
+    migrate_resources(context, interfaces, migrate, name)
+
 
 def migrate_new_iresource(context: IResource,
                           old_iresource: IInterface,
@@ -111,8 +212,8 @@ def migrate_new_iresource(context: IResource,
     """Migrate resources with `old_iresource` interface to `new_iresource`."""
     meta = _get_resource_meta(context, new_iresource)
     catalogs = find_service(context, 'catalogs')
-    resources = _search_for_interfaces(catalogs, old_iresource)
-    for resource in resources:
+
+    def migrate(resource):
         logger.info('Migrate iresource of {0}'.format(resource))
         noLongerProvides(resource, old_iresource)
         directlyProvides(resource, new_iresource)
@@ -120,6 +221,10 @@ def migrate_new_iresource(context: IResource,
             alsoProvides(resource, sheet)
         catalogs.reindex_index(resource, 'interfaces')
 
+    name = 'migrate_new_iresource:{0}:{1}'.format(
+        old_iresource.__identifier__, new_iresource.__identifier__)
+    migrate_resources(context, old_iresource, migrate, name)
+
 
 def _get_resource_meta(context: IResource,
                        iresource: IInterface) -> ResourceMetadata:
@@ -413,6 +518,101 @@ def move_sheet_annotation_data_to_attributes(root):  # pragma: no cover
         delattr(resource, '_sheets')
 
 
+@log_migration
+def move_authentication_tokens_to_btree(root):  # pragma: no cover
+    """Move authentication tokens to BTree storage with expiry index."""
+    from adhocracy_core.authentication import TokenMangerAnnotationStorage
+    annotation_key = TokenMangerAnnotationStorage.annotation_key
+    old_tokens = getattr(root, annotation_key, None)
+    if old_tokens is None or isinstance(old_tokens, OOBTree):
+        return
+    delattr(root, annotation_key)
+    token_manager = TokenMangerAnnotationStorage(root)
+    count = len(old_tokens)
+    logger.info('Migrating {0} authentication tokens'.format(count))
+    for token, (userid, timestamp) in old_tokens.items():
+        token_manager.add_token(token, userid, timestamp)
+
+
+@log_migration
+def reindex_visibility_of_concealed_descendants(root):  # pragma: no cover
+    """Reindex private_visibility, descendants inherit the visibility now."""
+    catalogs = find_service(root, 'catalogs')
+
+    def reindex(resource):
+        catalogs.reindex_index(resource, 'private_visibility')
+
+    migrate_resources(root, IMetadata, reindex,
+                      'reindex_visibility_of_concealed_descendants')
+
+
+@log_migration
+def add_sequence_number_to_auditlog_keys(root):  # pragma: no cover
+    """Change auditlog keys to (date, process id, sequence number) tuples."""
+    auditlog = get_auditlog(root)
+    if not auditlog or isinstance(auditlog.minKey(), tuple):
+        return
+    logger.info('Migrating {0} auditlog entries'.format(len(auditlog)))
+    new_auditlog = AuditLog()
+    for sequence, (date, entry) in enumerate(auditlog.items()):
+        new_auditlog[(date, 0, sequence)] = entry
+    audit_root = root._p_jar.get_connection('audit').root()
+    audit_root['auditlog'] = new_auditlog
+
+
+@log_migration
+def add_versions_index_to_items(root):  # pragma: no cover
+    """Add versions index to all items."""
+    def add_versions_index(item):
+        item.create_versions_index()
+
+    migrate_resources(root, IItem, add_versions_index,
+                      'add_versions_index_to_items')
+
+
+@log_migration
+def add_rate_subject_object_index(root):  # pragma: no cover
+    """Add private_rate_subject_object index and index all rate versions."""
+    from adhocracy_core.sheets.rate import IRate
+    registry = get_current_registry()
+    catalogs = find_service(root, 'catalogs')
+    catalogs['adhocracy'].update_indexes(registry=registry)
+
+    def reindex(rate):
+        catalogs.reindex_index(rate, 'private_rate_subject_object')
+
+    migrate_resources(root, IRate, reindex, 'add_rate_subject_object_index')
+
+
+@log_migration
+def add_reftypes_index_to_graph(root):  # pragma: no cover
+    """Add (isheet, field) -> reference types index to the graph."""
+    graph = find_graph(root)
+    graph.rebuild_reftypes_index()
+
+
+@log_migration
+def count_reftypes_of_graph(root):  # pragma: no cover
+    """Rebuild graph reftypes index and count the indexed reftypes."""
+    graph = find_graph(root)
+    graph.rebuild_reftypes_index()
+
+
+@log_migration
+def generate_pending_image_variants(root):  # pragma: no cover
+    """Add image variants cache and generate pending image variants."""
+    registry = get_current_registry(root)
+    cache = getattr(root, '_image_variants_cache', None)
+    if not isinstance(cache, ImageVariantsCache):
+        add_image_variants_cache(root)
+
+    def generate(asset):
+        generate_image_variants(asset, registry)
+
+    migrate_resources(root, IAsset, generate,
+                      'generate_pending_image_variants')
+
+
 def includeme(config):  # pragma: no cover
     """Register evolution utilities and add evolution steps."""
     config.add_directive('add_evolution_step', add_evolution_step)
@@ -432,3 +632,11 @@ def includeme(config):  # pragma: no cover
     config.add_evolution_step(move_autoname_last_counters_to_attributes)
     config.add_evolution_step(make_proposalversions_polarizable)
     config.add_evolution_step(add_icanpolarize_sheet_to_comments)
+    config.add_evolution_step(move_authentication_tokens_to_btree)
+    config.add_evolution_step(reindex_visibility_of_concealed_descendants)
+    config.add_evolution_step(add_sequence_number_to_auditlog_keys)
+    config.add_evolution_step(add_versions_index_to_items)
+    config.add_evolution_step(add_rate_subject_object_index)
+    config.add_evolution_step(add_reftypes_index_to_graph)
+    config.add_evolution_step(count_reftypes_of_graph)
+    config.add_evolution_step(generate_pending_image_variants)
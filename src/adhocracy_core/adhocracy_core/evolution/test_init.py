@@ -37,6 +37,12 @@ class ISheetB(ISheet):
 class IResourceA(IResource):
     pass
 
+
+def _make_elements(*resources):
+    from hypatia.util import ResultSet
+    docids = list(range(len(resources)))
+    return ResultSet(docids, len(docids), resources.__getitem__)
+
 ################
 #  tests       #
 ################
@@ -55,6 +61,97 @@ class ResourceFactoryIntegrationTest(unittest.TestCase):
 
 
 
+class TestMigrateResources:
+
+    @fixture
+    def context(self, pool, mock_catalogs):
+        pool['catalogs'] = mock_catalogs
+        return pool
+
+    @fixture
+    def mock_transaction(self, monkeypatch):
+        from adhocracy_core import evolution
+        mock = Mock()
+        monkeypatch.setattr(evolution, 'transaction', mock)
+        return mock
+
+    @fixture
+    def resources(self, context, mock_catalogs, search_result):
+        resources = [testing.DummyResource(__name__=str(x)) for x in range(5)]
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=_make_elements(*resources))
+        return resources
+
+    def call_fut(self, *args, **kwargs):
+        from . import migrate_resources
+        return migrate_resources(*args, **kwargs)
+
+    def test_migrate_all_resources(self, context, mock_catalogs, query,
+                                   resources, mock_transaction):
+        migrate = Mock()
+        assert self.call_fut(context, ISheetA, migrate, 'name') == 5
+        assert migrate.call_args_list == [call(x) for x in resources]
+        assert mock_catalogs.search.call_args[0][0] == \
+            query._replace(interfaces=ISheetA, resolve=False)
+        assert not mock_transaction.commit.called
+
+    def test_ignore_missing_resources(self, context, mock_catalogs,
+                                      search_result, mock_transaction):
+        from hypatia.util import ResultSet
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=ResultSet([1], 1, lambda x: None))
+        migrate = Mock()
+        self.call_fut(context, ISheetA, migrate, 'name')
+        assert not migrate.called
+
+    def test_commit_chunks(self, context, resources, mock_transaction):
+        self.call_fut(context, ISheetA, Mock(), 'name', chunk_size=2,
+                      commit=True)
+        assert mock_transaction.commit.call_count == 2
+
+    def test_no_commit_by_default(self, context, resources,
+                                  mock_transaction):
+        self.call_fut(context, ISheetA, Mock(), 'name', chunk_size=2)
+        assert not mock_transaction.commit.called
+        assert not hasattr(context, '_migration_checkpoints')
+
+    def test_commit_chunks_if_set_in_registry(self, context, resources,
+                                              mock_transaction, registry):
+        registry.commit_migration_chunks = True
+        self.call_fut(context, ISheetA, Mock(), 'name', chunk_size=2)
+        assert mock_transaction.commit.call_count == 2
+
+    def test_store_checkpoint_after_chunk(self, context, resources,
+                                          mock_transaction):
+        checkpoints = []
+        mock_transaction.commit.side_effect = lambda: checkpoints.append(
+            context._migration_checkpoints['name'])
+        self.call_fut(context, ISheetA, Mock(), 'name', chunk_size=2,
+                      commit=True)
+        assert checkpoints == [1, 3]
+
+    def test_remove_checkpoint_if_finished(self, context, resources,
+                                           mock_transaction):
+        self.call_fut(context, ISheetA, Mock(), 'name', chunk_size=2,
+                      commit=True)
+        assert 'name' not in context._migration_checkpoints
+
+    def test_resume_after_checkpoint(self, context, resources,
+                                     mock_transaction):
+        from BTrees.OOBTree import OOBTree
+        context._migration_checkpoints = OOBTree({'name': 2})
+        migrate = Mock()
+        assert self.call_fut(context, ISheetA, migrate, 'name') == 2
+        assert migrate.call_args_list == [call(x) for x in resources[3:]]
+
+    def test_ignore_checkpoints_of_other_migrations(self, context, resources,
+                                                    mock_transaction):
+        from BTrees.OOBTree import OOBTree
+        context._migration_checkpoints = OOBTree({'other': 2})
+        assert self.call_fut(context, ISheetA, Mock(), 'name') == 5
+        assert context._migration_checkpoints['other'] == 2
+
+
 class TestMigrateNewSheet:
 
     @fixture
@@ -92,22 +189,24 @@ class TestMigrateNewSheet:
     def test_ignore_if_no_resources_to_migrate(
             self, context, mock_catalogs, search_result, query):
         from adhocracy_core.interfaces import IResource
-        mock_catalogs.search.return_value = search_result
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=_make_elements())
         self.call_fut(context, IResource, ISheetB)
 
     def test_add_new_isheet(self, context, mock_catalogs, search_result, query):
         from adhocracy_core.interfaces import IResource
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         self.call_fut(context, IResource, ISheetA)
         assert ISheetA.providedBy(context)
-        search_query = query._replace(interfaces=(IResource))
+        search_query = query._replace(interfaces=(IResource),
+                                      resolve=False)
         assert mock_catalogs.search.call_args[0][0] == search_query
 
     def test_remove_old_isheet(self, context, mock_catalogs, search_result):
         from adhocracy_core.interfaces import IResource
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         self.call_fut(context, IResource, ISheetA,
                       isheet_old=ISheetB,
                       remove_isheet_old=True)
@@ -117,7 +216,7 @@ class TestMigrateNewSheet:
                                      search_result, a_sheet, b_sheet):
         from adhocracy_core.interfaces import IResource
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         b_sheet.get.return_value = {'field_b': 'value'}
         self.call_fut(context, IResource, ISheetA, ISheetB,
                       fields_mapping=[('field_a', 'field_b')])
@@ -128,7 +227,7 @@ class TestMigrateNewSheet:
             b_sheet):
         from adhocracy_core.interfaces import IResource
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         b_sheet.get.return_value = {}
         self.call_fut(context, IResource, ISheetA, ISheetB,
                       fields_mapping=[('field_a', 'field_b')])
@@ -138,7 +237,7 @@ class TestMigrateNewSheet:
                                      search_result, a_sheet, b_sheet):
         from adhocracy_core.interfaces import IResource
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         b_sheet.get.return_value = {'field_b': 'value'}
         self.call_fut(context, IResource, ISheetA, ISheetB,
                       fields_mapping=[('field_a', 'field_b')])
@@ -166,18 +265,20 @@ class TestChangeIResource:
 
     def test_ignore_if_no_old_resources_are_found(self, context, registry,
                                                   mock_catalogs, search_result):
-        mock_catalogs.search.return_value = search_result
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=_make_elements())
         self.call_fut(context, IResource, IResourceA)
         assert mock_catalogs.search.called
 
     def test_add_new_iresource_and_resource_type_isheets(
             self, context, registry, mock_catalogs, query, search_result):
         old = testing.DummyResource(__provides__=(IResource, ISheet))
-        mock_catalogs.search.return_value = search_result._replace(elements=[old])
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=_make_elements(old))
         self.call_fut(context, IResource, IResourceA)
         assert [x for x in old.__provides__] == [IResourceA, ISheetA]
         assert mock_catalogs.search.call_args[0][0] == \
-               query._replace(interfaces=IResource)
+               query._replace(interfaces=IResource, resolve=False)
         assert mock_catalogs.reindex_index.call_args[0] == (old, 'interfaces')
 
 
@@ -272,21 +373,22 @@ class TestMigrateToAttributeStorageSheet:
 
     def test_ignore_if_no_resources_with_sheet(
             self, context, mock_catalogs, search_result, registry, query):
-        mock_catalogs.search.return_value = search_result._replace(elements=[])
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=_make_elements())
         self.call_fut(context, ISheet)
-        search_query = query._replace(interfaces=ISheet)
+        search_query = query._replace(interfaces=ISheet, resolve=False)
         assert mock_catalogs.search.call_args[0][0] == search_query
 
     def test_ignore_if_resources_with_sheet_but_no_annotation_data(
             self, context, registry, mock_catalogs, search_result):
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         assert self.call_fut(context, ISheet) is None
 
     def test_cp_annotation_sheet_data_to_attribute_storage(
             self, context, registry, mock_catalogs, search_result, mock_sheet):
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         annotation_key = '_sheet_' + mock_sheet.meta.isheet\
             .__identifier__.replace('.', '_')
         appstruct = {'field1': 'value'}
@@ -298,7 +400,7 @@ class TestMigrateToAttributeStorageSheet:
             self, context, registry, mock_catalogs, search_result,
             mock_sheet):
         mock_catalogs.search.return_value = search_result._replace(
-            elements=[context])
+            elements=_make_elements(context))
         annotation_key = '_sheet_' + mock_sheet.meta.isheet \
             .__identifier__.replace('.', '_')
         appstruct = {'field1': 'value'}
@@ -5,6 +5,9 @@ from collections.abc import Iterable
 from collections.abc import Iterator
 from collections.abc import Sequence
 
+from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
+from BTrees.OOBTree import intersection
 from persistent import Persistent
 from pyramid.registry import Registry
 
@@ -19,6 +22,7 @@ from adhocracy_core.interfaces import SheetReference
 from adhocracy_core.interfaces import SheetToSheet
 from adhocracy_core.events import SheetBackReferenceRemoved
 from adhocracy_core.events import SheetBackReferenceAdded
+from adhocracy_core.schema import get_sheet_schema
 
 
 class SheetReftype(namedtuple('ISheetReftype', 'isheet field reftype')):
@@ -38,39 +42,111 @@ class Graph(Persistent):
     """
 
     # TODO: add interface for graph to make it a nice droppable dependency
+
+    _reftypes_index = None
+    """(isheet, field) -> SheetReftypes lookup, None for old databases."""
+
+    _reftypes_count = None
+    """Number of objectmap reftypes when `_reftypes_index` was updated."""
+
     def __init__(self, context):
         """Initialize self."""
         self.context = context
+        self._reftypes_index = OOBTree()
+        if self._objectmap is not None:
+            self.rebuild_reftypes_index()
 
     @property
     def _objectmap(self):
         return find_objectmap(self.context)
 
     def get_reftypes(self, base_isheet=ISheet,
-                     base_reftype=SheetReference) -> Iterator:
+                     base_reftype=SheetReference,
+                     isheet_field='') -> Iterator:
         """Collect all used SheetReferenceTypes.
 
         :param base_reftype: Skip types that are not subclasses of this.
         :param base_isheet: Skip types with a source isheet that is not a
                             subclass of this.
+        :param isheet_field: Skip types with another source isheet field.
+                             Default value '' means all fields.
         :returns: Generator of :class:`adhocracy_core.graph.SheetReftype`
         """
         if not self._objectmap:
             return []
+        if self._is_reftypes_index_outdated():
+            sheet_reftypes = self._find_sheet_reftypes(base_isheet,
+                                                       isheet_field)
+        else:
+            sheet_reftypes = self._reftypes_index.get(
+                (base_isheet, isheet_field), ())
+        for sheet_reftype in sheet_reftypes:
+            if not sheet_reftype.reftype.isOrExtends(base_reftype):
+                continue
+            yield sheet_reftype
+
+    def _is_reftypes_index_outdated(self) -> bool:
+        """Check if the objectmap has reftypes that are not indexed.
+
+        This happens if references are connected with the objectmap
+        directly, in this case the reftypes are searched without index
+        until the next :meth:`set_references` call updates the index.
+        """
+        if self._reftypes_index is None:
+            return True
+        return self._reftypes_count != len(self._objectmap.get_reftypes())
+
+    def _find_sheet_reftypes(self, base_isheet, isheet_field) -> Iterator:
         all_reftypes = self._objectmap.get_reftypes()
-        for reftype in all_reftypes:
+        for sheet_reftype in self._iter_sheet_reftypes(all_reftypes):
+            isheet, field, reftype = sheet_reftype
+            if not isheet.isOrExtends(base_isheet):
+                continue
+            if isheet_field and field != isheet_field:
+                continue
+            yield sheet_reftype
+
+    def _iter_sheet_reftypes(self, reftypes: Iterable) -> Iterator:
+        for reftype in reftypes:
             if isinstance(reftype, str):
                 continue
             if not issubclass(reftype, SheetReference):
                 continue
-            if not reftype.isOrExtends(base_reftype):
-                continue
             isheet = reftype.queryTaggedValue('source_isheet')
-            if not isheet.isOrExtends(base_isheet):
-                continue
             field = reftype.queryTaggedValue('source_isheet_field')
             yield SheetReftype(isheet, field, reftype)
 
+    def rebuild_reftypes_index(self):
+        """Build the (isheet, field) -> SheetReftypes lookup.
+
+        The lookup has one entry for every base interface of the reference
+        source isheet, once for the source isheet field and once for all
+        fields (''). So finding the reftypes is a single BTree probe
+        instead of checking every reftype of the objectmap.
+        """
+        self._reftypes_index = OOBTree()
+        all_reftypes = list(self._objectmap.get_reftypes())
+        for sheet_reftype in self._iter_sheet_reftypes(all_reftypes):
+            self._add_to_reftypes_index(sheet_reftype)
+        self._reftypes_count = len(all_reftypes)
+
+    def _validate_reftype(self, reftype: SheetReference):
+        if reftype.queryTaggedValue('source_isheet') is None:
+            msg = 'Reference type {0} has no source_isheet tagged value'
+            raise ValueError(msg.format(reftype.__identifier__))
+
+    def _add_to_reftypes_index(self, sheet_reftype: SheetReftype):
+        index = self._reftypes_index
+        isheet, field, reftype = sheet_reftype
+        if isheet is None:
+            msg = 'Reference type {0} has no source_isheet tagged value'
+            raise ValueError(msg.format(reftype.__identifier__))
+        if sheet_reftype in index.get((isheet, field), ()):
+            return
+        for base_isheet in isheet.__iro__:
+            for key in {(base_isheet, field), (base_isheet, '')}:
+                index[key] = index.get(key, ()) + (sheet_reftype,)
+
     def set_references(self, source, targets: Iterable,
                        reftype: SheetReference, registry: Registry=None):
         """Set references of this source.
@@ -82,10 +158,14 @@ class Graph(Persistent):
                          Default value is None to ease testing.
         """
         assert reftype.isOrExtends(SheetReference)
+        self._validate_reftype(reftype)
         multireference = self._create_multireference(source, targets, reftype)
         old = set([x for x in multireference])
         multireference.clear()
         multireference.connect(targets)
+        if self._reftypes_index is not None \
+                and self._is_reftypes_index_outdated():
+            self.rebuild_reftypes_index()
         if registry is None:
             return
         new = set(targets)
@@ -135,6 +215,31 @@ class Graph(Persistent):
             for target in ObjectMap.targets(self._objectmap, source, reftype):
                 yield Reference(source, isheet, field, target)
 
+    def get_descendants_references_targets(self, resource,
+                                           base_isheet=ISheet,
+                                           base_reftype=SheetReference)\
+            -> Iterator:
+        """Get generator of reference targets of `resource` and descendants.
+
+        Every target is only listed once.
+        """
+        om = self._objectmap
+        sources = OOTreeSet(om.pathlookup(resource, include_origin=True))
+        reftypes = set(r for i, f, r in self.get_reftypes(base_isheet,
+                                                          base_reftype))
+        target_oids = OOTreeSet()
+        for reftype in reftypes:
+            refset = om.referencemap.refmap.get(reftype, None)
+            if refset is None:
+                continue
+            # performance tweak, only look up sources with references
+            for source in intersection(refset.src2target, sources):
+                target_oids.update(refset.src2target[source])
+        for oid in target_oids:
+            target = om.object_for(oid)
+            if target is not None:
+                yield target
+
     def get_back_references(self, target, base_isheet=ISheet,
                             base_reftype=SheetReference) -> Iterator:
         """Get generator of :class:`Reference` with this `target`."""
@@ -169,7 +274,7 @@ class Graph(Persistent):
                          attribute named `content`.
         """
         sheet_meta = registry.content.sheets_meta[isheet]
-        schema = sheet_meta.schema_class()
+        schema = get_sheet_schema(sheet_meta.schema_class, registry)
         for field_name, targets in references.items():
             assert field_name in schema
             if targets is None:
@@ -61,56 +61,63 @@ class TestGraph:
 
 class TestGraphGetReftypes:
 
-    def call_fut(self, mock_objectmap, **kwargs):
-        from adhocracy_core.graph import Graph
-        context = testing.DummyResource()
-        context.__objectmap__ = mock_objectmap
-        graph = Graph(context=context)
-        return Graph.get_reftypes(graph, **kwargs)
-
-    def test_no_objectmap(self):
-        assert list(self.call_fut(None)) == []
-
-    def test_no_reftpyes(self, mock_objectmap):
+    @fixture(params=[True, False], ids=['indexed', 'not_indexed'])
+    def call_fut(self, request):
+        def call_fut(mock_objectmap, **kwargs):
+            from adhocracy_core.graph import Graph
+            context = testing.DummyResource()
+            context.__objectmap__ = mock_objectmap
+            graph = Graph(context=context)
+            if not request.param:
+                graph._reftypes_index = None
+            elif mock_objectmap is not None:
+                graph.rebuild_reftypes_index()
+            return Graph.get_reftypes(graph, **kwargs)
+        return call_fut
+
+    def test_no_objectmap(self, call_fut):
+        assert list(call_fut(None)) == []
+
+    def test_no_reftpyes(self, call_fut, mock_objectmap):
         mock_objectmap.get_reftypes.return_value = []
-        assert list(self.call_fut(mock_objectmap)) == []
+        assert list(call_fut(mock_objectmap)) == []
 
-    def test_one_wrong_str_reftype(self, mock_objectmap):
+    def test_one_wrong_str_reftype(self, call_fut, mock_objectmap):
         mock_objectmap.get_reftypes.return_value = ["NoneSheetToSheet"]
-        assert list(self.call_fut(mock_objectmap)) == []
+        assert list(call_fut(mock_objectmap)) == []
 
-    def test_one_wrong_no_sheetreference_reftype(self, mock_objectmap):
+    def test_one_wrong_no_sheetreference_reftype(self, call_fut, mock_objectmap):
         mock_objectmap.get_reftypes.return_value = [Interface]
-        assert list(self.call_fut(mock_objectmap)) == []
+        assert list(call_fut(mock_objectmap)) == []
 
-    def test_one_wrong_source_isheet(self, mock_objectmap):
+    def test_one_wrong_source_isheet(self, call_fut, mock_objectmap):
         class SubSheetToSheet(SheetToSheet):
             source_isheet = Interface
         mock_objectmap.get_reftypes.return_value = [SubSheetToSheet]
-        assert list(self.call_fut(mock_objectmap)) == []
+        assert list(call_fut(mock_objectmap)) == []
 
-    def test_one_valid_reftype(self, mock_objectmap):
+    def test_one_valid_reftype(self, call_fut, mock_objectmap):
         mock_objectmap.get_reftypes.return_value = [SheetToSheet]
-        reftypes = list(self.call_fut(mock_objectmap))
+        reftypes = list(call_fut(mock_objectmap))
         assert reftypes[0] == (ISheet, '', SheetToSheet)
 
-    def test_with_base_reftype(self, mock_objectmap):
+    def test_with_base_reftype(self, call_fut, mock_objectmap):
         class SubSheetToSheet(SheetToSheet):
             pass
         mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
                                                     SheetToSheet]
-        reftypes = list(self.call_fut(mock_objectmap, base_reftype=SubSheetToSheet))
+        reftypes = list(call_fut(mock_objectmap, base_reftype=SubSheetToSheet))
         assert len(reftypes) == 1
 
-    def test_with_base_reftype_that_has_subclass(self, mock_objectmap):
+    def test_with_base_reftype_that_has_subclass(self, call_fut, mock_objectmap):
         class SubSheetToSheet(SheetToSheet):
             pass
         mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
                                                SheetToSheet]
-        reftypes = list(self.call_fut(mock_objectmap, base_reftype=SheetToSheet))
+        reftypes = list(call_fut(mock_objectmap, base_reftype=SheetToSheet))
         assert len(reftypes) == 2
 
-    def test_with_base_isheet(self, mock_objectmap):
+    def test_with_base_isheet(self, call_fut, mock_objectmap):
         class ISheetA(ISheet):
             pass
 
@@ -119,10 +126,10 @@ class TestGraphGetReftypes:
 
         mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
                                                     SheetToSheet]
-        reftypes = list(self.call_fut(mock_objectmap, base_isheet=ISheetA))
+        reftypes = list(call_fut(mock_objectmap, base_isheet=ISheetA))
         assert len(reftypes) == 1
 
-    def test_with_base_isheet_that_has_subclass(self, mock_objectmap):
+    def test_with_base_isheet_that_has_subclass(self, call_fut, mock_objectmap):
         class ISheetA(ISheet):
             pass
 
@@ -131,10 +138,54 @@ class TestGraphGetReftypes:
 
         mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
                                                     SheetToSheet]
-        reftypes = list(self.call_fut(mock_objectmap, base_isheet=ISheet))
+        reftypes = list(call_fut(mock_objectmap, base_isheet=ISheet))
         assert len(reftypes) == 2
 
 
+    def test_with_isheet_field(self, call_fut, mock_objectmap):
+        class SubSheetToSheet(SheetToSheet):
+            source_isheet_field = 'field'
+
+        mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
+                                                    SheetToSheet]
+        reftypes = list(call_fut(mock_objectmap, isheet_field='field'))
+        assert reftypes == [(ISheet, 'field', SubSheetToSheet)]
+
+    def test_create_builds_reftypes_index(self, mock_objectmap):
+        from adhocracy_core.graph import Graph
+        context = testing.DummyResource(__objectmap__=mock_objectmap)
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        graph = Graph(context=context)
+        assert list(graph.get_reftypes()) == [(ISheet, '', SheetToSheet)]
+
+    def test_get_reftypes_not_indexed_without_update(self, mock_objectmap):
+        from adhocracy_core.graph import Graph
+        context = testing.DummyResource(__objectmap__=mock_objectmap)
+        graph = Graph(context=context)
+        index = graph._reftypes_index
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        assert list(graph.get_reftypes()) == [(ISheet, '', SheetToSheet)]
+        assert graph._reftypes_index is index
+        assert len(index) == 0
+
+    def test_get_reftypes_connected_with_objectmap(self, context, objectmap):
+        from adhocracy_core.graph import Graph
+        source, target = create_dummy_resources(parent=context, count=2)
+        graph = Graph(context)
+        objectmap.connect(source, target, SheetToSheet)
+        assert list(graph.get_reftypes()) == [(ISheet, '', SheetToSheet)]
+
+    def test_rebuild_reftypes_index(self, mock_objectmap):
+        from adhocracy_core.graph import Graph
+        context = testing.DummyResource(__objectmap__=mock_objectmap)
+        graph = Graph(context=context)
+        graph._reftypes_index = None
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        graph.rebuild_reftypes_index()
+        assert list(graph._reftypes_index[(ISheet, '')]) ==\
+            [(ISheet, '', SheetToSheet)]
+
+
 class TestGraphSetReferences:
 
     def call_fut(self, objectmap, *args):
@@ -202,6 +253,46 @@ class TestGraphSetReferences:
         references = objectmap.targetids(source, SheetReference)
         assert list(references) == [target.__oid__]
 
+    def test_targets_add_reftype_to_index(self, context, objectmap):
+        from adhocracy_core.graph import Graph
+        source, target = create_dummy_resources(parent=context, count=2)
+        graph = Graph(objectmap.root)
+        graph.set_references(source, [target], SheetReference)
+        assert list(graph.get_reftypes()) == [(ISheet, '', SheetReference)]
+
+    def test_targets_add_reftypes_connected_with_objectmap_to_index(
+            self, context, objectmap):
+        from adhocracy_core.graph import Graph
+        source, target = create_dummy_resources(parent=context, count=2)
+        graph = Graph(objectmap.root)
+        objectmap.connect(source, target, SheetToSheet)
+        graph.set_references(source, [target], SheetReference)
+        assert not graph._is_reftypes_index_outdated()
+        assert set(graph._reftypes_index[(ISheet, '')]) ==\
+            {(ISheet, '', SheetToSheet), (ISheet, '', SheetReference)}
+
+    def test_targets_without_index(self, context, objectmap):
+        from adhocracy_core.graph import Graph
+        source, target = create_dummy_resources(parent=context, count=2)
+        graph = Graph(objectmap.root)
+        graph._reftypes_index = None
+        graph.set_references(source, [target], SheetReference)
+        assert graph._reftypes_index is None
+
+    def test_targets_reftype_without_source_isheet(self, context,
+                                                  objectmap):
+        from adhocracy_core.graph import Graph
+        source, target = create_dummy_resources(parent=context, count=2)
+        graph = Graph(objectmap.root)
+
+        class NoSourceReference(SheetReference):
+            pass
+        NoSourceReference.setTaggedValue('source_isheet', None)
+        with raises(ValueError) as err:
+            graph.set_references(source, [target], NoSourceReference)
+        assert 'has no source_isheet' in str(err.value)
+        assert list(objectmap.targetids(source, NoSourceReference)) == []
+
     def test_targets_set_add_with_registry(self, context, objectmap, config, registry):
         from adhocracy_core.testing import create_event_listener
         from adhocracy_core.interfaces import ISheetBackReferenceAdded
@@ -292,6 +383,53 @@ class TestGraphGetReferences:
         assert len(list(result)) == 1
 
 
+class TestGraphGetDescendantsReferencesTargets:
+
+    def call_fut(self, objectmap, resource, **kwargs):
+        from adhocracy_core.graph import Graph
+        graph = Graph(objectmap.root)
+        return Graph.get_descendants_references_targets(graph, resource,
+                                                        **kwargs)
+
+    def test_no_reference(self, context, objectmap):
+        resource = create_dummy_resources(parent=context)
+        result = self.call_fut(objectmap, resource)
+        assert list(result) == []
+
+    def test_sheetreferences_of_resource_and_descendants(self, context,
+                                                         objectmap):
+        resource, target, target2 = create_dummy_resources(parent=context,
+                                                           count=3)
+        resource.__objectmap__ = objectmap
+        child = create_dummy_resources(parent=resource)
+        objectmap.connect(resource, target, SheetToSheet)
+        objectmap.connect(child, target2, SheetToSheet)
+        result = self.call_fut(objectmap, resource)
+        assert set(result) == {target, target2}
+
+    def test_ignore_references_of_non_descendants(self, context, objectmap):
+        resource, other, target = create_dummy_resources(parent=context,
+                                                         count=3)
+        objectmap.connect(other, target, SheetToSheet)
+        result = self.call_fut(objectmap, resource)
+        assert list(result) == []
+
+    def test_list_targets_only_once(self, context, objectmap):
+        resource, target = create_dummy_resources(parent=context, count=2)
+        resource.__objectmap__ = objectmap
+        child = create_dummy_resources(parent=resource)
+        objectmap.connect(resource, target, SheetToSheet)
+        objectmap.connect(child, target, SheetToSheet)
+        result = self.call_fut(objectmap, resource)
+        assert list(result) == [target]
+
+    def test_no_sheetreferences(self, context, objectmap):
+        resource, target = create_dummy_resources(parent=context, count=2)
+        objectmap.connect(resource, target, 'NoSheetReference')
+        result = self.call_fut(objectmap, resource)
+        assert list(result) == []
+
+
 class TestGraphGetBackReferences:
 
     def call_fut(self, objectmap, resource, **kwargs):
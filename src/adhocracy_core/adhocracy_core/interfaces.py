@@ -1,5 +1,6 @@
 """Interfaces for plugable dependencies, basic metadata structures."""
 from collections import Iterable
+from datetime import datetime
 from enum import Enum
 import collections
 
@@ -486,6 +487,12 @@ class ITokenManger(Interface):  # pragma: no cover
     def create_token(userid: str) -> str:
         """ Create authentication token for :term:`userid`."""
 
+    def add_token(token: str, userid: str, timestamp: datetime):
+        """ Store authentication `token` for :term:`userid`.
+
+        :param timestamp: creation date, used to expire the token
+        """
+
     def get_user_id(token: str) -> str:
         """ Get :term:`userid` for authentication token.
 
@@ -588,13 +595,15 @@ class AuditlogAction(Enum):
 SearchResult = namedtuple('SearchResult', ['elements',
                                            'count',
                                            'frequency_of',
-                                           'group_by'])
+                                           'group_by',
+                                           'next_cursor'])
 
 
 search_result = SearchResult(elements=[],
                              count=0,
                              frequency_of={},
-                             group_by={})
+                             group_by={},
+                             next_cursor=None)
 
 
 class Comparator(Enum):
@@ -665,6 +674,8 @@ class SearchQuery(namedtuple('Query', ['interfaces',
                                        'offset',
                                        'frequency_of',
                                        'group_by',
+                                       'cursor',
+                                       'only_count',
                                        ])):
 
     """Query parameters to search resources.
@@ -719,6 +730,15 @@ class SearchQuery(namedtuple('Query', ['interfaces',
         index name to count frequency of indexed values.
     group_by (str):
         index name to group result resources by indexed value.
+    cursor (str):
+        opaque position to continue the sorted search result after, the
+        search result `next_cursor` of the previous page. An empty string
+        starts with the first page, None disables cursor pagination.
+        Ignores `offset`. Resources without `sort_by` index value are not
+        part of any page, but counted.
+    only_count (bool):
+        only count the resources, don't sort and resolve them. The search
+        result `elements` is empty.
     """
 
 
@@ -736,6 +756,8 @@ search_query = SearchQuery(interfaces=(),
                            offset=0,
                            frequency_of='',
                            group_by='',
+                           cursor=None,
+                           only_count=False,
                            )
 
 
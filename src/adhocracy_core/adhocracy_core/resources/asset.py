@@ -1,8 +1,21 @@
 """Resources for managing assets."""
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+import hashlib
+import threading
 
+from BTrees.OOBTree import OOBTree
+from persistent import Persistent
 from pyramid.registry import Registry
+from pyramid.traversal import find_resource
+from pyramid.traversal import find_root
+from pyramid.traversal import resource_path
 from substanced.file import File
+from substanced.interfaces import IObjectWillBeRemoved
+from zope.interface import Interface
+from ZODB.POSException import ConflictError
 from zope.deprecation import deprecated
+import transaction
 
 from adhocracy_core.interfaces import Dimensions
 from adhocracy_core.interfaces import IPool
@@ -15,6 +28,7 @@ from adhocracy_core.resources.simple import simple_meta
 from adhocracy_core.sheets.asset import AssetFileDownload
 from adhocracy_core.sheets.asset import IAssetData
 from adhocracy_core.sheets.asset import IAssetMetadata
+from adhocracy_core.sheets.asset import retrieve_asset_file
 from adhocracy_core.sheets.name import IName
 from adhocracy_core.utils import get_matching_isheet
 from adhocracy_core.utils import get_sheet
@@ -24,6 +38,9 @@ import adhocracy_core.sheets.asset
 import adhocracy_core.sheets.title
 
 
+logger = getLogger(__name__)
+
+
 class IAssetDownload(ISimple):
 
     """Downloadable binary file for Assets."""
@@ -59,6 +76,7 @@ def validate_and_complete_asset(context: IAsset,
                                          metadata_sheet,
                                          registry=registry)
     _add_downloads_as_children(context, metadata_sheet, registry)
+    generate_image_variants_later(context, registry)
 
 
 def _validate_mime_type(file: File,
@@ -127,6 +145,218 @@ def _create_asset_download(context: IAsset, name: str, registry: Registry,
                             registry=registry)
 
 
+def generate_image_variants(context: IAsset, registry: Registry):
+    """Generate the missing image variants (thumbnails etc.) of `context`.
+
+    The variants are cached by content hash and dimensions,
+    uploading the same image again reuses the existing variants,
+    see :class:`ImageVariantsCache`. Nothing is cached if the app root
+    has no cache, see :func:`add_image_variants_cache`.
+    """
+    downloads = [retrieve_asset_file(c, registry) for c in context.values()
+                 if IAssetDownload.providedBy(c)]
+    pending = [d for d in downloads if getattr(d, 'is_pending', False)]
+    if not pending:
+        return
+    parent_file = retrieve_asset_file(context, registry)
+    content_hash = _get_content_hash(parent_file)
+    cache = _get_image_variants_cache(context)
+    for download in pending:
+        download.generate_image_variant(parent_file, cache, content_hash)
+
+
+def _get_content_hash(file: File) -> str:
+    content_hash = hashlib.sha256()
+    with file.blob.open('r') as blobdata:
+        for chunk in iter(lambda: blobdata.read(65536), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+class ImageVariantsCache(Persistent):
+
+    """Share image variants with the same content hash and dimensions.
+
+    The asset downloads using a variant are counted, the variant is
+    removed if the last download is removed, see
+    :func:`release_image_variants`.
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self.files = OOBTree()
+        self.users = OOBTree()
+
+    def acquire(self, key: tuple) -> File:
+        """Return the image variant for `key` and count the user or None."""
+        file = self.files.get(key, None)
+        if file is not None:
+            self.users[key] += 1
+        return file
+
+    def add(self, key: tuple, file: File):
+        """Add the image variant `file` with one user."""
+        self.files[key] = file
+        self.users[key] = 1
+
+    def release(self, key: tuple):
+        """Uncount one user and remove the image variant if unused."""
+        users = self.users.get(key, 0) - 1
+        if users > 0:
+            self.users[key] = users
+        elif key in self.files:
+            del self.files[key]
+            del self.users[key]
+
+
+def add_image_variants_cache(root: IPool):
+    """Add the :class:`ImageVariantsCache` to the app `root`.
+
+    The cache is not added lazily, this would modify the app root
+    in the background jobs and conflict with concurrent requests.
+    """
+    root._image_variants_cache = ImageVariantsCache()
+
+
+def _get_image_variants_cache(context: IAsset) -> ImageVariantsCache:
+    cache = getattr(find_root(context), '_image_variants_cache', None)
+    return cache if isinstance(cache, ImageVariantsCache) else None
+
+
+def release_image_variants(event):
+    """Release the image variants of removed assets or asset downloads."""
+    if event.moving not in (None, False):  # moving keeps the downloads
+        return
+    context = event.object
+    cache = getattr(find_root(context), '_image_variants_cache', None)
+    if not isinstance(cache, ImageVariantsCache):
+        return
+    downloads = [context] if IAssetDownload.providedBy(context)\
+        else [c for c in context.values() if IAssetDownload.providedBy(c)]
+    for download in downloads:
+        file = retrieve_asset_file(download, event.registry)
+        if isinstance(file, AssetFileDownload):
+            file.release_image_variant(cache)
+
+
+class ImageVariantsGenerator:
+
+    """Generate image variants of assets in background threads.
+
+    Every job uses its own database connection and transaction.
+    Assets are only added once while they are waiting to be processed.
+    Jobs are not persistent, failed or lost jobs are added again if a
+    pending image variant is downloaded.
+
+    :param db: the ZODB database with the `app_root`.
+    :param registry: the registry passed to
+                     :func:`generate_image_variants`.
+    """
+
+    max_workers = 2
+    attempts = 3
+
+    def __init__(self, db, registry: Registry):
+        """Initialize self."""
+        self.db = db
+        self.registry = registry
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def add(self, path: str):
+        """Add job to generate the image variants of asset `path`."""
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        self.executor.submit(self._run, path)
+
+    def _run(self, path: str):
+        try:
+            for attempt in range(self.attempts):
+                try:
+                    self.generate(path)
+                    return
+                except ConflictError:
+                    logger.info('Conflict generating image variants for {0}'
+                                .format(path))
+            logger.warning('Failed to generate image variants for {0}'
+                           .format(path))
+        except Exception:
+            logger.exception('Error generating image variants for {0}'
+                             .format(path))
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def generate(self, path: str):
+        """Generate the image variants of asset `path` and commit."""
+        manager = transaction.TransactionManager()
+        connection = self.db.open(transaction_manager=manager)
+        try:
+            manager.begin()
+            root = connection.root()['app_root']
+            try:
+                asset = find_resource(root, path)
+            except KeyError:
+                return  # asset was removed in the meantime
+            generate_image_variants(asset, self.registry)
+            manager.commit()
+        finally:
+            manager.abort()
+            connection.close()
+
+
+def get_image_variants_generator(registry: Registry) -> ImageVariantsGenerator:
+    """Return the :class:`ImageVariantsGenerator` or None.
+
+    The generator is only available if the app database is configured.
+    """
+    generator = getattr(registry, 'image_variants_generator', None)
+    if generator is None:
+        databases = getattr(registry, '_zodb_databases', None) or {}
+        db = databases.get('', None)
+        if db is None:
+            return None
+        generator = ImageVariantsGenerator(db, registry)
+        registry.image_variants_generator = generator
+    return generator
+
+
+def generate_image_variants_later(context: IAsset, registry: Registry):
+    """Generate image variants in the background after the commit."""
+    generator = get_image_variants_generator(registry)
+    if generator is None:  # ease testing
+        return
+    path = resource_path(context)
+    current_transaction = transaction.get()
+    current_transaction.addAfterCommitHook(
+        generate_image_variants_after_commit_hook, args=(generator, path))
+
+
+def generate_image_variants_soon(context: IAsset, registry: Registry):
+    """Generate image variants in the background now.
+
+    This recovers pending image variants if the job added by
+    :func:`generate_image_variants_later` was lost, e.g. because the
+    process was restarted or the job failed.
+    """
+    generator = get_image_variants_generator(registry)
+    if generator is None:  # ease testing
+        return
+    generator.add(resource_path(context))
+
+
+def generate_image_variants_after_commit_hook(success: bool,
+                                              generator:
+                                              ImageVariantsGenerator,
+                                              path: str):
+    """Add job to generate image variants if the transaction succeeded."""
+    if success:
+        generator.add(path)
+
+
 asset_meta = pool_meta._replace(
     content_name='Asset',
     iresource=IAsset,
@@ -184,3 +414,8 @@ def includeme(config):
     add_resource_type_to_registry(asset_meta, config)
     add_resource_type_to_registry(assets_service_meta, config)
     add_resource_type_to_registry(pool_with_assets_meta, config)
+    config.add_content_subscriber(release_image_variants,
+                                  [IObjectWillBeRemoved, IAsset, Interface])
+    config.add_content_subscriber(release_image_variants,
+                                  [IObjectWillBeRemoved, IAssetDownload,
+                                   Interface])
@@ -19,6 +19,8 @@ class Base(Persistent):
         """Initialize self."""
         self.__changed_backrefs_counter__ = Length()
         """Counter that should increment if backreferences are changed."""
+        self.__version_stamp__ = Length()
+        """Counter that should increment if the resource is changed."""
 
     def __repr__(self):
         """Return representation of self."""
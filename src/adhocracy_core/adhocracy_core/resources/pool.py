@@ -1,5 +1,7 @@
 """Basic type with children typically to create process structures."""
 from BTrees.Length import Length
+from BTrees.OOBTree import OOTreeSet
+from persistent import Persistent
 from substanced.folder import Folder
 from substanced.util import find_service
 from substanced.interfaces import IFolder
@@ -12,6 +14,8 @@ import adhocracy_core.sheets.metadata
 import adhocracy_core.sheets.title
 import adhocracy_core.sheets.workflow
 from adhocracy_core.interfaces import IPool
+from adhocracy_core.interfaces import IItem
+from adhocracy_core.interfaces import IItemVersion
 from adhocracy_core.resources import add_resource_type_to_registry
 from adhocracy_core.resources import resource_meta
 from adhocracy_core.resources.base import Base
@@ -26,6 +30,50 @@ class IBasicPool(IPool):
 deprecated('IBasicPool', 'Backward compatible code, use organisation or pool')
 
 
+class VersionsIndex(Persistent):
+
+    """Index the names of the item versions inside an item.
+
+    `first` is the name of the first added version, `last` the name of the
+    last added version (the LAST head, forking is not allowed).
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self.first = None
+        self.last = None
+        self._names = OOTreeSet()
+        self._count = Length()
+
+    def add(self, name: str):
+        """Add version `name`."""
+        if not self._names.insert(name):
+            return
+        self._count.change(1)
+        if self.first is None:
+            self.first = name
+        self.last = name
+
+    def remove(self, name: str):
+        """Remove version `name`."""
+        if name not in self._names:
+            return
+        self._names.remove(name)
+        self._count.change(-1)
+        if self.first == name:
+            self.first = self._names.minKey() if self._names else None
+        if self.last == name:
+            self.last = self._names.maxKey() if self._names else None
+
+    def __len__(self):
+        """Return number of versions."""
+        return self._count()
+
+    def __iter__(self):
+        """Iterate version names, sorted by name."""
+        return iter(self._names)
+
+
 @implementer(IPool, IFolder)
 class Pool(Base, Folder):
 
@@ -76,6 +124,33 @@ class Pool(Base, Folder):
         name = self.next_name(subobject, prefix=prefix)
         return self.add(name, subobject, send_events=False)
 
+    def add(self, name, other, *args, **kwargs) -> str:
+        """Add subobject `other` and update the versions index for items."""
+        name = super().add(name, other, *args, **kwargs)
+        if IItem.providedBy(self) and IItemVersion.providedBy(other):
+            index = getattr(self, '_versions_index', None)
+            if index is None:
+                index = self.create_versions_index()
+            index.add(name)
+        return name
+
+    def create_versions_index(self) -> VersionsIndex:
+        """Create the versions index with all item versions of this item."""
+        index = VersionsIndex()
+        for name, child in self.items():
+            if IItemVersion.providedBy(child):
+                index.add(name)
+        self._versions_index = index
+        return index
+
+    def remove(self, name, *args, **kwargs) -> object:
+        """Remove subobject `name` and update the versions index."""
+        other = super().remove(name, *args, **kwargs)
+        index = getattr(self, '_versions_index', None)
+        if index is not None:
+            index.remove(name)
+        return other
+
     def _zfill(self, name):
         return str(int(name)).zfill(self._autoname_length)
 
@@ -1,5 +1,9 @@
 """Principal types (user/group) and helpers to search/get user information."""
+from collections import OrderedDict
 from logging import getLogger
+import threading
+
+from BTrees.Length import Length
 
 from pyramid.registry import Registry
 from pyramid.traversal import find_resource
@@ -363,13 +367,108 @@ class UserLocatorAdapter(object):
         return sorted(list(roleids))
 
 
+class PrincipalsCache:
+
+    """Process wide cache mapping :term:`userid` to effective principals.
+
+    Entries are stored together with the principals version (see
+    :func:`get_principals_version`) they were computed for. Outdated entries
+    are ignored, so changes made in other processes are respected as well.
+    """
+
+    max_entries = 10000
+
+    def __init__(self):
+        """Initialize self."""
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, userid: str, version: int) -> list:
+        """Return cached principals for `userid` and `version` or None."""
+        with self._lock:
+            entry = self._entries.get(userid)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(userid)
+            return entry[1]
+
+    def set(self, userid: str, version: int, principals: list):
+        """Store `principals` for `userid` and `version`."""
+        with self._lock:
+            self._entries[userid] = (version, principals)
+            self._entries.move_to_end(userid)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+def get_principals_cache(registry: Registry) -> PrincipalsCache:
+    """Return the principals cache of this process."""
+    cache = getattr(registry, 'principals_cache', None)
+    if cache is None:
+        cache = PrincipalsCache()
+        registry.principals_cache = cache
+    return cache
+
+
+def get_principals_version(context: IResource) -> int:
+    """Return the version of user/group permissions or None.
+
+    None is returned if there is no principals service.
+    """
+    principals = find_service(context, 'principals')
+    if principals is None:
+        return None
+    version = getattr(principals, '_principals_version', None)
+    return 0 if version is None else version()
+
+
+def increment_principals_version(context: IResource):
+    """Increment the version of user/group permissions.
+
+    This invalidates all principals cache entries in all processes.
+    """
+    principals = find_service(context, 'principals')
+    if principals is None:
+        return
+    if getattr(principals, '_principals_version', None) is None:
+        principals._principals_version = Length()
+    principals._principals_version.change(1)
+
+
 def groups_and_roles_finder(userid: str, request: Request) -> list:
-    """A Pyramid authentication policy groupfinder callback."""
-    userlocator = request.registry.getMultiAdapter((request.context, request),
+    """A Pyramid authentication policy groupfinder callback.
+
+    The result is cached per process, see :class:`PrincipalsCache`.
+    This does not need `request.context`, it may be called before
+    traversal.
+    """
+    version = get_principals_version(request.root)
+    cache = get_principals_cache(request.registry)
+    principals = None
+    if version is not None:
+        principals = cache.get(userid, version)
+    if principals is None:
+        principals = _find_groups_and_roles(userid, request)
+        if principals is None:
+            return []
+        if version is not None:
+            cache.set(userid, version, principals)
+    return list(principals)
+
+
+def _find_groups_and_roles(userid: str, request: Request) -> tuple:
+    userlocator = request.registry.getMultiAdapter((request.root, request),
                                                    IRolesUserLocator)
-    groupids = userlocator.get_groupids(userid) or []
-    roleids = userlocator.get_role_and_group_roleids(userid) or []
-    return groupids + roleids
+    groupids = userlocator.get_groupids(userid)
+    roleids = userlocator.get_role_and_group_roleids(userid)
+    if groupids is None and roleids is None:
+        return None
+    return tuple((groupids or []) + (roleids or []))
 
 
 def delete_not_activated_users(request: Request, age_in_days: int):
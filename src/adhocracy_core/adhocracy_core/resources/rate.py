@@ -1,7 +1,11 @@
 """Rate resource type."""
+from persistent import Persistent
 from pyramid.registry import Registry
+from substanced.util import find_objectmap
+from substanced.util import find_service
 
 from adhocracy_core.interfaces import IItemVersion
+from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import IServicePool
 from adhocracy_core.interfaces import IPool
@@ -10,7 +14,12 @@ from adhocracy_core.resources.itemversion import itemversion_meta
 from adhocracy_core.resources.item import item_meta
 from adhocracy_core.resources.service import service_meta
 
-from adhocracy_core.sheets.rate import IRate
+from adhocracy_core.sheets.rate import RateObjectReference
+from adhocracy_core.sheets.rate import find_rate_versions
+from adhocracy_core.utils import find_graph
+from adhocracy_core.utils import get_last_item_version
+from adhocracy_core.utils import get_sheet_field
+import adhocracy_core.sheets.rate
 
 
 class IRateVersion(IItemVersion):
@@ -20,7 +29,7 @@ class IRateVersion(IItemVersion):
 
 rateversion_meta = itemversion_meta._replace(
     iresource=IRateVersion,
-    extended_sheets=(IRate,),
+    extended_sheets=(adhocracy_core.sheets.rate.IRate,),
     permission_create='edit_rate',
 )
 
@@ -57,6 +66,136 @@ def add_ratesservice(context: IPool, registry: Registry, options: dict):
     registry.content.create(IRatesService.__identifier__, parent=context)
 
 
+class RateTally(Persistent):
+
+    """Number of rates per rate value about a rateable resource.
+
+    Only the LAST version of each rate is counted. Concurrent changes are
+    merged like with :class:`BTrees.Length.Length`.
+    """
+
+    def __init__(self, counts: dict=None):
+        """Initialize self."""
+        self._counts = dict(counts or {})
+
+    @property
+    def pro(self) -> int:
+        """Number of pro (1) rates."""
+        return self._counts.get(1, 0)
+
+    @property
+    def contra(self) -> int:
+        """Number of contra (-1) rates."""
+        return self._counts.get(-1, 0)
+
+    @property
+    def neutral(self) -> int:
+        """Number of neutral (0) rates."""
+        return self._counts.get(0, 0)
+
+    @property
+    def counts(self) -> dict:
+        """Mapping rate value to the number of rates."""
+        return {k: v for k, v in self._counts.items() if v}
+
+    @property
+    def sum(self) -> int:
+        """Sum of all rate values."""
+        return sum(k * v for k, v in self._counts.items())
+
+    def change(self, rate: int, delta: int):
+        """Add `delta` to the number of rates with value `rate`."""
+        counts = dict(self._counts)
+        counts[rate] = counts.get(rate, 0) + delta
+        self._counts = counts
+
+    def set(self, counts: dict):
+        """Replace the number of rates per rate value."""
+        self._counts = dict(counts)
+
+    def _p_resolveConflict(self, old: dict, committed: dict,
+                           new: dict) -> dict:
+        old_counts = old.get('_counts', {})
+        committed_counts = committed.get('_counts', {})
+        new_counts = new.get('_counts', {})
+        counts = {}
+        for rate in set(old_counts) | set(committed_counts) | set(new_counts):
+            counts[rate] = committed_counts.get(rate, 0)\
+                + new_counts.get(rate, 0) - old_counts.get(rate, 0)
+        state = dict(committed)
+        state['_counts'] = counts
+        return state
+
+
+def count_rates(rateable: IResource) -> dict:
+    """Count the number of rates per rate value about `rateable`.
+
+    Only the last version of each rate is counted. The rate versions are
+    found with the graph, not the catalog, so the numbers are up to date
+    during the transaction.
+    """
+    graph = find_graph(rateable)
+    counts = {}
+    for version in graph.get_back_reference_sources(rateable,
+                                                    RateObjectReference):
+        item = version.__parent__
+        if item is not None and get_last_item_version(item) is not version:
+            continue
+        rate = get_sheet_field(version, adhocracy_core.sheets.rate.IRate,
+                               'rate')
+        counts[rate] = counts.get(rate, 0) + 1
+    return counts
+
+
+def get_rate_tally(rateable: IResource, create=False) -> RateTally:
+    """Return the :class:`RateTally` of `rateable`.
+
+    :param create: create the tally if missing, the initial numbers are
+        counted with :func:`count_rates`.
+    :returns: None if there is no tally and `create` is False.
+    """
+    tally = getattr(rateable, '_rate_tally', None)
+    if tally is None and create:
+        tally = RateTally(count_rates(rateable))
+        rateable._rate_tally = tally
+    return tally
+
+
+def update_rate_tally(rateable: IResource, deltas: dict):
+    """Change the number of rates per rate value about `rateable`.
+
+    :param deltas: mapping rate value to the change of the number of rates.
+
+    The tally is created if missing, the `rates` index is updated.
+    """
+    tally = get_rate_tally(rateable)
+    if tally is None:
+        # the graph already contains the change
+        get_rate_tally(rateable, create=True)
+    else:
+        for rate, delta in deltas.items():
+            tally.change(rate, delta)
+    catalogs = find_service(rateable, 'catalogs')
+    if catalogs is not None:  # ease testing
+        catalogs.reindex_index(rateable, 'rates')
+
+
+def get_current_rate(context: IResource, subject: IResource,
+                     object: IResource) -> IRateVersion:
+    """Return the last version of the rate of `subject` about `object`.
+
+    :returns: None if `subject` did not rate `object`.
+    """
+    oids = find_rate_versions(context, subject, object)
+    if not oids:
+        return None
+    objectmap = find_objectmap(context)
+    version = objectmap.object_for(oids[0])
+    if version is None:
+        return None
+    return get_last_item_version(version.__parent__)
+
+
 def includeme(config):
     """Add resource type to registry."""
     add_resource_type_to_registry(rate_meta, config)
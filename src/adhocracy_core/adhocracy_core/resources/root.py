@@ -11,6 +11,7 @@ from substanced.util import find_service
 
 from adhocracy_core.interfaces import IPool
 from adhocracy_core.resources import add_resource_type_to_registry
+from adhocracy_core.resources.asset import add_image_variants_cache
 from adhocracy_core.resources.organisation import IOrganisation
 from adhocracy_core.resources.organisation import organisation_meta
 from adhocracy_core.resources.principal import IPrincipalsService
@@ -85,6 +86,7 @@ def create_initial_content_for_app_root(context: IPool, registry: Registry,
     _add_default_group(context, registry)
     _add_initial_user_and_group(context, registry)
     add_locations_service(context, registry, {})
+    add_image_variants_cache(context)
 
 
 def _add_objectmap_to_app_root(root):
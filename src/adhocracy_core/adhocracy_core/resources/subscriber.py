@@ -22,7 +22,12 @@ from adhocracy_core.interfaces import IResourceSheetModified
 from adhocracy_core.resources.principal import IGroup
 from adhocracy_core.resources.principal import IUser
 from adhocracy_core.resources.principal import IPasswordReset
+from adhocracy_core.resources.principal import increment_principals_version
+from adhocracy_core.resources.rate import IRateVersion
+from adhocracy_core.resources.rate import update_rate_tally
 from adhocracy_core.sheets.principal import IPermissions
+from adhocracy_core.sheets.principal import IGroup as IGroupSheet
+from adhocracy_core.sheets.rate import IRate
 from adhocracy_core.exceptions import AutoUpdateNoForkAllowedError
 from adhocracy_core.utils import find_graph
 from adhocracy_core.utils import get_following_new_version
@@ -31,6 +36,7 @@ from adhocracy_core.utils import get_sheet
 from adhocracy_core.utils import get_sheet_field
 from adhocracy_core.utils import get_iresource
 from adhocracy_core.utils import get_last_version
+from adhocracy_core.utils import get_last_item_version
 from adhocracy_core.utils import get_modification_date
 from adhocracy_core.utils import get_user
 from adhocracy_core.sheets.versions import IVersionable
@@ -93,6 +99,53 @@ def _add_user_to_group(user: IUser, group: IGroup, registry: Registry):
     sheet.set({'groups': groups})
 
 
+def invalidate_principals_cache(event):
+    """Invalidate cached principals if user/group permissions are modified."""
+    increment_principals_version(event.object)
+
+
+def update_rate_tally_new_rate_version(event):
+    """Count the new rate version instead of the preceding version."""
+    version = event.object
+    if get_last_item_version(version.__parent__) is not version:
+        return
+    registry = event.registry
+    changes = []
+    follows = get_sheet_field(version, IVersionable, 'follows',
+                              registry=registry)
+    for predecessor in follows:
+        appstruct = get_sheet(predecessor, IRate, registry=registry).get()
+        changes.append((appstruct, -1))
+    appstruct = get_sheet(version, IRate, registry=registry).get()
+    changes.append((appstruct, 1))
+    _update_rate_tallies(changes)
+
+
+def update_rate_tally_rate_modified(event):
+    """Update the counted rates if the last rate version is modified."""
+    version = event.object
+    if get_last_item_version(version.__parent__) is not version:
+        return
+    new_appstruct = dict(event.old_appstruct)
+    new_appstruct.update(event.new_appstruct)  # only modified fields
+    _update_rate_tallies([(event.old_appstruct, -1),
+                          (new_appstruct, 1)])
+
+
+def _update_rate_tallies(changes: list):
+    """Update the rate tallies for a list of (rate appstruct, delta)."""
+    rateables = {}
+    for appstruct, delta in changes:
+        rateable = appstruct.get('object', None)
+        if rateable is None:
+            continue
+        _, deltas = rateables.setdefault(id(rateable), (rateable, {}))
+        rate = appstruct['rate']
+        deltas[rate] = deltas.get(rate, 0) + delta
+    for rateable, deltas in rateables.values():
+        update_rate_tally(rateable, deltas)
+
+
 def autoupdate_versionable_has_new_version(event):
     """Auto updated versionable resource if a reference has new version.
 
@@ -273,9 +326,22 @@ def includeme(config):
     config.add_subscriber(autoupdate_tag_has_new_version,
                           ISheetReferenceNewVersion,
                           event_isheet=ITag)
+    config.add_subscriber(update_rate_tally_new_rate_version,
+                          IResourceCreatedAndAdded,
+                          object_iface=IRateVersion)
+    config.add_subscriber(update_rate_tally_rate_modified,
+                          IResourceSheetModified,
+                          object_iface=IRateVersion,
+                          event_isheet=IRate)
     config.add_subscriber(add_default_group_to_user,
                           IResourceCreatedAndAdded,
                           object_iface=IUser)
+    config.add_subscriber(invalidate_principals_cache,
+                          IResourceSheetModified,
+                          event_isheet=IPermissions)
+    config.add_subscriber(invalidate_principals_cache,
+                          IResourceSheetModified,
+                          event_isheet=IGroupSheet)
     config.add_subscriber(send_activation_mail_or_activate_user,
                           IResourceCreatedAndAdded,
                           object_iface=IUser)
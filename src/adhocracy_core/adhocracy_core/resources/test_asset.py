@@ -140,3 +140,360 @@ class TestValidateAndCompleteAsset:
         with raises(colander.Invalid) as err_info:
             validate_and_complete_asset(asset, registry)
         assert 'Sheet is abstract' in err_info.value.msg
+
+
+@mark.usefixtures('integration')
+class TestGenerateImageVariants:
+
+    @fixture
+    def pool(self, pool):
+        from .asset import add_image_variants_cache
+        add_image_variants_cache(pool)
+        return pool
+
+    @fixture
+    def asset(self, pool, registry):
+        return self._make_asset(pool, registry)
+
+    def _make_asset(self, pool, registry):
+        from adhocracy_core.resources.asset import validate_and_complete_asset
+        from adhocracy_core.sheets.asset import IAssetData
+        mock_file = Mock()
+        mock_file.mimetype = 'image/png'
+        appstructs = {IAssetData.__identifier__: {'data': mock_file},
+                      IImageMetadata.__identifier__: {'mime_type':
+                                                      'image/png'}}
+        asset = registry.content.create(IImage.__identifier__,
+                                        appstructs=appstructs,
+                                        parent=pool,
+                                        run_after_creation=False)
+        validate_and_complete_asset(asset, registry)
+        return asset
+
+    @fixture
+    def mock_content_hash(self, monkeypatch):
+        from adhocracy_core.resources import asset
+        mock = Mock(spec=asset._get_content_hash, return_value='hash')
+        monkeypatch.setattr(asset, '_get_content_hash', mock)
+        return mock
+
+    @fixture
+    def mock_crop_and_resize(self, monkeypatch):
+        from adhocracy_core.sheets.asset import AssetFileDownload
+        mock = Mock(spec=AssetFileDownload._crop_and_resize_image)
+        monkeypatch.setattr(AssetFileDownload, '_crop_and_resize_image',
+                            mock)
+        return mock
+
+    def call_fut(self, context, registry):
+        from .asset import generate_image_variants
+        return generate_image_variants(context, registry)
+
+    def _get_download(self, asset, name, registry):
+        from adhocracy_core.sheets.asset import retrieve_asset_file
+        return retrieve_asset_file(asset[name], registry)
+
+    def test_generate_pending_image_variants(
+            self, asset, registry, mock_content_hash, mock_crop_and_resize):
+        self.call_fut(asset, registry)
+        thumbnail = self._get_download(asset, 'thumbnail', registry)
+        raw = self._get_download(asset, 'raw', registry)
+        assert thumbnail.file == mock_crop_and_resize.return_value
+        assert raw.file is None
+
+    def test_ignore_generated_image_variants(
+            self, asset, registry, mock_content_hash, mock_crop_and_resize):
+        self.call_fut(asset, registry)
+        count = mock_crop_and_resize.call_count
+        mock_content_hash.reset_mock()
+        self.call_fut(asset, registry)
+        assert mock_crop_and_resize.call_count == count
+        assert not mock_content_hash.called
+
+    def test_reuse_image_variants_with_same_content_hash(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        self.call_fut(asset, registry)
+        count = mock_crop_and_resize.call_count
+        for download in asset.values():
+            self._get_download(asset, download.__name__, registry).file = None
+        self.call_fut(asset, registry)
+        assert mock_crop_and_resize.call_count == count
+        assert pool._image_variants_cache.files
+
+    def test_ignore_image_variants_cache_without_refcount(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        from BTrees.OOBTree import OOBTree
+        pool._image_variants_cache = OOBTree()
+        self.call_fut(asset, registry)
+        thumbnail = self._get_download(asset, 'thumbnail', registry)
+        assert thumbnail.file == mock_crop_and_resize.return_value
+        assert len(pool._image_variants_cache) == 0
+
+    def test_do_not_add_missing_image_variants_cache(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        del pool._image_variants_cache
+        self.call_fut(asset, registry)
+        thumbnail = self._get_download(asset, 'thumbnail', registry)
+        assert thumbnail.file == mock_crop_and_resize.return_value
+        assert not hasattr(pool, '_image_variants_cache')
+
+    def test_release_image_variants_if_downloads_are_replaced(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        from .asset import validate_and_complete_asset
+        self.call_fut(asset, registry)
+        assert pool._image_variants_cache.files
+        validate_and_complete_asset(asset, registry)
+        assert not pool._image_variants_cache.files
+
+    def test_release_image_variants_if_asset_is_removed(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        from substanced.event import ObjectWillBeRemoved
+        from .asset import release_image_variants
+        self.call_fut(asset, registry)
+        event = ObjectWillBeRemoved(asset, pool, asset.__name__)
+        event.registry = registry
+        release_image_variants(event)
+        assert not pool._image_variants_cache.files
+
+    def test_keep_image_variants_if_asset_is_moved(
+            self, asset, pool, registry, mock_content_hash,
+            mock_crop_and_resize):
+        from substanced.event import ObjectWillBeRemoved
+        from .asset import release_image_variants
+        self.call_fut(asset, registry)
+        event = ObjectWillBeRemoved(asset, pool, asset.__name__,
+                                    moving=pool)
+        event.registry = registry
+        release_image_variants(event)
+        assert pool._image_variants_cache.files
+
+    def _get_etag(self, download, request_):
+        from adhocracy_core.caching import \
+            HTTPCacheStrategyWeakAssetDownloadAdapter
+        strategy = HTTPCacheStrategyWeakAssetDownloadAdapter(download,
+                                                            request_)
+        strategy.set_etag()
+        return request_.response.etag
+
+    def _check_conditional_request(self, download, request_, etag):
+        from webob.etag import ETagMatcher
+        from adhocracy_core.caching import \
+            HTTPCacheStrategyWeakAssetDownloadAdapter
+        request_.if_none_match = ETagMatcher([etag])
+        strategy = HTTPCacheStrategyWeakAssetDownloadAdapter(download,
+                                                            request_)
+        strategy.check_conditional_request()
+
+    def test_mark_etag_of_pending_image_variants(self, asset, request_):
+        etag = self._get_etag(asset['thumbnail'], request_)
+        assert etag.endswith('|pending')
+        etag = self._get_etag(asset['raw'], request_)
+        assert not etag.endswith('|pending')
+
+    def test_modified_after_pending_response_and_generation(
+            self, asset, registry, request_, mock_content_hash,
+            mock_crop_and_resize):
+        from pyramid.httpexceptions import HTTPNotModified
+        pending_etag = self._get_etag(asset['thumbnail'], request_)
+        self.call_fut(asset, registry)
+        self._check_conditional_request(asset['thumbnail'], request_,
+                                        pending_etag)
+        generated_etag = request_.response.etag
+        assert generated_etag != pending_etag
+        with raises(HTTPNotModified):
+            self._check_conditional_request(asset['thumbnail'], request_,
+                                            generated_etag)
+
+
+def test_add_image_variants_cache(pool):
+    from .asset import add_image_variants_cache
+    from .asset import ImageVariantsCache
+    add_image_variants_cache(pool)
+    assert isinstance(pool._image_variants_cache, ImageVariantsCache)
+
+
+class TestImageVariantsCache:
+
+    @fixture
+    def inst(self):
+        from .asset import ImageVariantsCache
+        return ImageVariantsCache()
+
+    def test_acquire_missing(self, inst):
+        assert inst.acquire(('hash', 1, 1)) is None
+
+    def test_add_and_acquire(self, inst):
+        file = Mock()
+        inst.add(('hash', 1, 1), file)
+        assert inst.acquire(('hash', 1, 1)) is file
+        assert inst.users[('hash', 1, 1)] == 2
+
+    def test_release_remove_if_unused(self, inst):
+        inst.add(('hash', 1, 1), Mock())
+        inst.acquire(('hash', 1, 1))
+        inst.release(('hash', 1, 1))
+        assert ('hash', 1, 1) in inst.files
+        inst.release(('hash', 1, 1))
+        assert ('hash', 1, 1) not in inst.files
+        assert ('hash', 1, 1) not in inst.users
+
+    def test_release_missing(self, inst):
+        inst.release(('hash', 1, 1))
+        assert len(inst.files) == 0
+
+
+class TestGetContentHash:
+
+    def call_fut(self, file):
+        from .asset import _get_content_hash
+        return _get_content_hash(file)
+
+    def test_get_content_hash(self):
+        import hashlib
+        import io
+        file = Mock()
+        file.blob.open.return_value = io.BytesIO(b'data')
+        assert self.call_fut(file) == hashlib.sha256(b'data').hexdigest()
+
+
+class TestImageVariantsGenerator:
+
+    @fixture
+    def mock_db(self):
+        return Mock()
+
+    @fixture
+    def inst(self, mock_db, registry):
+        from .asset import ImageVariantsGenerator
+        inst = ImageVariantsGenerator(mock_db, registry)
+        inst.executor = Mock()
+        return inst
+
+    def test_add(self, inst):
+        inst.add('/asset')
+        inst.executor.submit.assert_called_with(inst._run, '/asset')
+
+    def test_add_ignore_if_pending(self, inst):
+        inst.add('/asset')
+        inst.add('/asset')
+        assert inst.executor.submit.call_count == 1
+
+    def test_run(self, inst):
+        inst.generate = Mock()
+        inst.add('/asset')
+        inst._run('/asset')
+        inst.generate.assert_called_with('/asset')
+        assert inst._pending == set()
+
+    def test_run_retry_if_conflict(self, inst):
+        from ZODB.POSException import ConflictError
+        inst.generate = Mock(side_effect=[ConflictError(), None])
+        inst._run('/asset')
+        assert inst.generate.call_count == 2
+
+    def test_run_log_errors(self, inst):
+        inst.generate = Mock(side_effect=ValueError())
+        inst.add('/asset')
+        inst._run('/asset')
+        assert inst._pending == set()
+
+    def test_generate(self, inst, mock_db, pool, monkeypatch):
+        from . import asset
+        mock_generate = Mock(spec=asset.generate_image_variants)
+        monkeypatch.setattr(asset, 'generate_image_variants', mock_generate)
+        pool['asset'] = Mock()
+        connection = mock_db.open.return_value
+        connection.root.return_value = {'app_root': pool}
+        inst.generate('/asset')
+        assert mock_generate.call_args[0] == (pool['asset'], inst.registry)
+        assert connection.close.called
+
+    def test_generate_ignore_removed_asset(self, inst, mock_db, pool,
+                                           monkeypatch):
+        from . import asset
+        mock_generate = Mock(spec=asset.generate_image_variants)
+        monkeypatch.setattr(asset, 'generate_image_variants', mock_generate)
+        connection = mock_db.open.return_value
+        connection.root.return_value = {'app_root': pool}
+        inst.generate('/asset')
+        assert not mock_generate.called
+        assert connection.close.called
+
+
+class TestGetImageVariantsGenerator:
+
+    def call_fut(self, registry):
+        from .asset import get_image_variants_generator
+        return get_image_variants_generator(registry)
+
+    def test_return_none_without_database(self, registry):
+        assert self.call_fut(registry) is None
+
+    def test_return_generator(self, registry):
+        from .asset import ImageVariantsGenerator
+        registry._zodb_databases = {'': Mock()}
+        generator = self.call_fut(registry)
+        assert isinstance(generator, ImageVariantsGenerator)
+        assert self.call_fut(registry) is generator
+
+
+class TestGenerateImageVariantsLater:
+
+    def call_fut(self, context, registry):
+        from .asset import generate_image_variants_later
+        return generate_image_variants_later(context, registry)
+
+    def test_ignore_without_generator(self, context, registry):
+        import transaction
+        self.call_fut(context, registry)
+        assert list(transaction.get().getAfterCommitHooks()) == []
+
+    def test_add_after_commit_hook(self, context, registry):
+        import transaction
+        from .asset import generate_image_variants_after_commit_hook
+        generator = Mock()
+        registry.image_variants_generator = generator
+        self.call_fut(context, registry)
+        hooks = list(transaction.get().getAfterCommitHooks())
+        transaction.abort()
+        assert hooks == [(generate_image_variants_after_commit_hook,
+                          (generator, '/'), {})]
+
+
+class TestGenerateImageVariantsSoon:
+
+    def call_fut(self, context, registry):
+        from .asset import generate_image_variants_soon
+        return generate_image_variants_soon(context, registry)
+
+    def test_ignore_without_generator(self, context, registry):
+        assert self.call_fut(context, registry) is None
+
+    def test_add_job(self, context, registry):
+        generator = Mock()
+        registry.image_variants_generator = generator
+        self.call_fut(context, registry)
+        generator.add.assert_called_with('/')
+
+
+class TestGenerateImageVariantsAfterCommitHook:
+
+    def call_fut(self, success, generator, path):
+        from .asset import generate_image_variants_after_commit_hook
+        return generate_image_variants_after_commit_hook(success, generator,
+                                                         path)
+
+    def test_add_job_if_success(self):
+        generator = Mock()
+        self.call_fut(True, generator, '/asset')
+        generator.add.assert_called_with('/asset')
+
+    def test_ignore_if_no_success(self):
+        generator = Mock()
+        self.call_fut(False, generator, '/asset')
+        assert not generator.add.called
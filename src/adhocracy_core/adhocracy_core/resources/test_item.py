@@ -99,6 +99,15 @@ class TestItem:
         last_targets = context.__graph__.get_references_for_isheet(last_tag, ITagS)['elements']
         assert last_targets == [version1]
 
+    def test_update_versions_index(self, context, registry):
+        item = self.make_one(context, registry)
+        version0 = item['VERSION_0000000']
+        version1 = make_itemversion(parent=item, follows=[version0])
+        index = item._versions_index
+        assert index.first == version0.__name__
+        assert index.last == version1.__name__
+        assert len(index) == 2
+
     @mark.xfail(reason="Forkables resources are not yet supported")
     def test_update_last_tag_two_versions_with_forkable(self, context, registry):
         """Test branching off two versions from the same version,
@@ -97,8 +97,99 @@ class TestPoolClass:
         inst.add_next(context, prefix='prefix')
         assert 'prefix' + '0'.zfill(7) in inst
 
+    def test_add_item_version_to_item(self, context):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.interfaces import IItemVersion
+        inst = self._makeOne()
+        inst.__provides__ = IItem
+        version = testing.DummyResource(__provides__=IItemVersion)
+        inst.add('VERSION_0000000', version)
+        inst.add('other', context)
+        assert list(inst._versions_index) == ['VERSION_0000000']
+
+    def test_add_item_version_to_item_without_versions_index(self):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.interfaces import IItemVersion
+        inst = self._makeOne()
+        inst.__provides__ = IItem
+        inst.add('VERSION_0000000',
+                 testing.DummyResource(__provides__=IItemVersion))
+        inst.add('VERSION_0000001',
+                 testing.DummyResource(__provides__=IItemVersion))
+        del inst._versions_index  # item created before the index existed
+        inst.add('VERSION_0000002',
+                 testing.DummyResource(__provides__=IItemVersion))
+        index = inst._versions_index
+        assert len(index) == 3
+        assert index.first == 'VERSION_0000000'
+        assert index.last == 'VERSION_0000002'
+
+    def test_add_item_version_to_non_item(self):
+        from adhocracy_core.interfaces import IItemVersion
+        inst = self._makeOne()
+        version = testing.DummyResource(__provides__=IItemVersion)
+        inst.add('VERSION_0000000', version)
+        assert not hasattr(inst, '_versions_index')
+
+    def test_remove_item_version_from_item(self):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.interfaces import IItemVersion
+        inst = self._makeOne()
+        inst.__provides__ = IItem
+        version = testing.DummyResource(__provides__=IItemVersion)
+        inst.add('VERSION_0000000', version)
+        inst.remove('VERSION_0000000')
+        assert list(inst._versions_index) == []
+
     def test_find_service(self, service):
         inst = self._makeOne()
         inst['service'] = service
         service = inst.find_service('service')
         assert service is inst['service']
+
+
+class TestVersionsIndex:
+
+    @fixture
+    def inst(self):
+        from .pool import VersionsIndex
+        return VersionsIndex()
+
+    def test_create(self, inst):
+        assert inst.first is None
+        assert inst.last is None
+        assert len(inst) == 0
+        assert list(inst) == []
+
+    def test_add(self, inst):
+        inst.add('VERSION_0000000')
+        inst.add('VERSION_0000001')
+        assert inst.first == 'VERSION_0000000'
+        assert inst.last == 'VERSION_0000001'
+        assert len(inst) == 2
+        assert list(inst) == ['VERSION_0000000', 'VERSION_0000001']
+
+    def test_add_twice(self, inst):
+        inst.add('VERSION_0000000')
+        inst.add('VERSION_0000000')
+        assert len(inst) == 1
+
+    def test_remove(self, inst):
+        inst.add('VERSION_0000000')
+        inst.add('VERSION_0000001')
+        inst.add('VERSION_0000002')
+        inst.remove('VERSION_0000000')
+        inst.remove('VERSION_0000002')
+        assert inst.first == 'VERSION_0000001'
+        assert inst.last == 'VERSION_0000001'
+        assert len(inst) == 1
+
+    def test_remove_last_one(self, inst):
+        inst.add('VERSION_0000000')
+        inst.remove('VERSION_0000000')
+        assert inst.first is None
+        assert inst.last is None
+
+    def test_remove_not_existing(self, inst):
+        inst.remove('VERSION_0000000')
+        assert len(inst) == 0
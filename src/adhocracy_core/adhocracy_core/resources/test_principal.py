@@ -472,7 +472,7 @@ class TestGroupsAndRolesFinder:
 
     @fixture
     def request(self, context, registry):
-        request = testing.DummyRequest(context=context)
+        request = testing.DummyRequest(root=context)
         request.registry = registry
         return request
 
@@ -493,6 +493,121 @@ class TestGroupsAndRolesFinder:
         mock_user_locator.get_role_and_group_roleids.return_value = ['group:Readers']
         assert self.call_fut('userid', request) == ['group:Readers']
 
+    def test_userid_with_groups_and_roles(self, request, mock_user_locator):
+        mock_user_locator.get_groupids.return_value = ['group:gods']
+        mock_user_locator.get_role_and_group_roleids.return_value = ['role:god']
+        assert self.call_fut('userid', request) == ['group:gods', 'role:god']
+
+    def test_principals_version_incremented_in_same_request(
+            self, request, pool, service, mock_user_locator):
+        from adhocracy_core.resources.principal import\
+            increment_principals_version
+        pool['principals'] = service
+        request.root = pool
+        mock_user_locator.get_groupids.return_value = ['group:gods']
+        self.call_fut('userid', request)
+        mock_user_locator.get_groupids.return_value = []
+        increment_principals_version(pool)
+        assert self.call_fut('userid', request) == []
+
+    def test_without_request_context(self, request, mock_user_locator):
+        request.__dict__.pop('context', None)
+        mock_user_locator.get_groupids.return_value = ['group:gods']
+        assert self.call_fut('userid', request) == ['group:gods']
+
+    def test_cache_principals_per_principals_version(
+            self, request, pool, service, mock_user_locator):
+        from adhocracy_core.resources.principal import\
+            increment_principals_version
+        registry = request.registry
+        pool['principals'] = service
+        mock_user_locator.get_groupids.return_value = ['group:gods']
+        request = testing.DummyRequest(root=pool, registry=registry)
+        self.call_fut('userid', request)
+        mock_user_locator.get_groupids.return_value = []
+        request_other = testing.DummyRequest(root=pool, registry=registry)
+        assert self.call_fut('userid', request_other) == ['group:gods']
+        increment_principals_version(pool)
+        request_new = testing.DummyRequest(root=pool, registry=registry)
+        assert self.call_fut('userid', request_new) == []
+
+    def test_not_cache_principals_without_principals_service(
+            self, request, context, mock_user_locator):
+        mock_user_locator.get_groupids.return_value = ['group:gods']
+        self.call_fut('userid', request)
+        mock_user_locator.get_groupids.return_value = []
+        request_other = testing.DummyRequest(root=context,
+                                             registry=request.registry)
+        assert self.call_fut('userid', request_other) == []
+
+    def test_not_cache_wrong_userid(self, request, pool, service,
+                                    mock_user_locator):
+        pool['principals'] = service
+        request.root = pool
+        self.call_fut('WRONG', request)
+        cache = request.registry.principals_cache
+        assert cache.get('WRONG', 0) is None
+
+
+class TestPrincipalsCache:
+
+    @fixture
+    def inst(self):
+        from adhocracy_core.resources.principal import PrincipalsCache
+        return PrincipalsCache()
+
+    def test_get_empty(self, inst):
+        assert inst.get('userid', 0) is None
+
+    def test_set_and_get(self, inst):
+        inst.set('userid', 0, ('role:god',))
+        assert inst.get('userid', 0) == ('role:god',)
+
+    def test_get_outdated_version(self, inst):
+        inst.set('userid', 0, ('role:god',))
+        assert inst.get('userid', 1) is None
+
+    def test_set_remove_least_recently_used(self, inst):
+        inst.max_entries = 2
+        inst.set('user1', 0, ())
+        inst.set('user2', 0, ())
+        inst.get('user1', 0)
+        inst.set('user3', 0, ())
+        assert inst.get('user2', 0) is None
+        assert inst.get('user1', 0) == ()
+
+    def test_clear(self, inst):
+        inst.set('userid', 0, ())
+        inst.clear()
+        assert inst.get('userid', 0) is None
+
+
+class TestPrincipalsVersion:
+
+    def test_get_without_principals_service(self, pool):
+        from adhocracy_core.resources.principal import get_principals_version
+        assert get_principals_version(pool) is None
+
+    def test_get_default(self, pool, service):
+        from adhocracy_core.resources.principal import get_principals_version
+        pool['principals'] = service
+        assert get_principals_version(pool) == 0
+
+    def test_increment(self, pool, service):
+        from adhocracy_core.resources.principal import get_principals_version
+        from adhocracy_core.resources.principal import\
+            increment_principals_version
+        pool['principals'] = service
+        increment_principals_version(pool)
+        increment_principals_version(pool)
+        assert get_principals_version(pool) == 2
+
+    def test_increment_without_principals_service(self, pool):
+        from adhocracy_core.resources.principal import\
+            increment_principals_version
+        increment_principals_version(pool)
+        assert 'principals' not in pool
+
 
 class TestDeleteNotActiveUsers:
 
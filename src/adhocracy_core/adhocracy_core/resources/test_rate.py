@@ -1,5 +1,6 @@
 from pytest import mark
 from pytest import fixture
+from pytest import raises
 
 
 def test_rateversion_meta():
@@ -56,3 +57,257 @@ class TestRate:
         rate_index.reindex_resource(rate)
         search_result = set(rate_index.eq(0).execute())
         assert rate in search_result
+
+
+@mark.usefixtures('integration')
+class TestRateTallyIntegration:
+
+    @fixture
+    def rateable(self, registry, pool_with_catalogs):
+        from substanced.interfaces import MODE_IMMEDIATE
+        from adhocracy_core.resources.document import IDocument
+        catalog = pool_with_catalogs['catalogs']['adhocracy']
+        catalog['rates'].action_mode = MODE_IMMEDIATE
+        document = registry.content.create(IDocument.__identifier__,
+                                           parent=pool_with_catalogs)
+        return document['VERSION_0000000']
+
+    @fixture
+    def rate_item(self, registry, pool_with_catalogs):
+        from .rate import IRate
+        return registry.content.create(IRate.__identifier__,
+                                       parent=pool_with_catalogs)
+
+    def _make_version(self, registry, rate_item, rateable, rate, follows):
+        from adhocracy_core.sheets.rate import IRate
+        from adhocracy_core.sheets.versions import IVersionable
+        from .rate import IRateVersion
+        appstructs = {IRate.__identifier__: {'object': rateable,
+                                             'rate': rate},
+                      IVersionable.__identifier__: {'follows': [follows]}}
+        return registry.content.create(IRateVersion.__identifier__,
+                                       parent=rate_item,
+                                       appstructs=appstructs)
+
+    def test_create_rate_version(self, registry, rate_item, rateable):
+        from .rate import get_rate_tally
+        self._make_version(registry, rate_item, rateable, 1,
+                           rate_item['VERSION_0000000'])
+        tally = get_rate_tally(rateable)
+        assert tally.counts == {1: 1}
+
+    def test_create_rate_version_follows_rate_version(self, registry,
+                                                      rate_item, rateable):
+        from substanced.util import find_service
+        from .rate import get_rate_tally
+        version = self._make_version(registry, rate_item, rateable, 1,
+                                     rate_item['VERSION_0000000'])
+        self._make_version(registry, rate_item, rateable, -1, version)
+        tally = get_rate_tally(rateable)
+        assert tally.counts == {-1: 1}
+        assert (tally.pro, tally.contra, tally.neutral) == (0, 1, 0)
+        catalogs = find_service(rateable, 'catalogs')
+        assert catalogs['adhocracy']['rates']._rev_index[rateable.__oid__]\
+            == -1
+
+    def test_modify_last_rate_version(self, registry, rate_item, rateable):
+        from adhocracy_core.sheets.rate import IRate
+        from adhocracy_core.utils import get_sheet
+        from .rate import get_rate_tally
+        version = self._make_version(registry, rate_item, rateable, 1,
+                                     rate_item['VERSION_0000000'])
+        get_sheet(version, IRate, registry=registry).set({'rate': 0})
+        assert get_rate_tally(rateable).counts == {0: 1}
+
+    def test_count_rates_only_last_versions(self, registry, rate_item,
+                                            rateable):
+        from .rate import count_rates
+        version = self._make_version(registry, rate_item, rateable, 1,
+                                     rate_item['VERSION_0000000'])
+        self._make_version(registry, rate_item, rateable, -1, version)
+        assert count_rates(rateable) == {-1: 1}
+
+    def test_update_rate_tally_create_missing_tally(self, registry,
+                                                    rate_item, rateable):
+        from .rate import get_rate_tally
+        from .rate import update_rate_tally
+        self._make_version(registry, rate_item, rateable, 1,
+                           rate_item['VERSION_0000000'])
+        del rateable._rate_tally
+        update_rate_tally(rateable, {1: 1})
+        assert get_rate_tally(rateable).counts == {1: 1}
+
+
+@mark.usefixtures('integration')
+class TestGetCurrentRate:
+
+    @fixture
+    def pool(self, registry, pool_with_catalogs):
+        from substanced.interfaces import MODE_IMMEDIATE
+        catalog = pool_with_catalogs['catalogs']['adhocracy']
+        catalog['private_rate_subject_object'].action_mode = MODE_IMMEDIATE
+        return pool_with_catalogs
+
+    @fixture
+    def subject(self, registry, pool):
+        from adhocracy_core.resources.document import IDocument
+        return registry.content.create(IDocument.__identifier__,
+                                       parent=pool)
+
+    @fixture
+    def rateable(self, registry, pool):
+        from adhocracy_core.resources.document import IDocument
+        document = registry.content.create(IDocument.__identifier__,
+                                           parent=pool)
+        return document['VERSION_0000000']
+
+    @fixture
+    def rate_item(self, registry, pool):
+        from .rate import IRate
+        return registry.content.create(IRate.__identifier__, parent=pool)
+
+    def _make_version(self, registry, rate_item, subject, rateable, follows):
+        from adhocracy_core.sheets.rate import IRate
+        from adhocracy_core.sheets.versions import IVersionable
+        from .rate import IRateVersion
+        appstructs = {IRate.__identifier__: {'subject': subject,
+                                             'object': rateable,
+                                             'rate': 1},
+                      IVersionable.__identifier__: {'follows': [follows]}}
+        version = registry.content.create(IRateVersion.__identifier__,
+                                          parent=rate_item,
+                                          appstructs=appstructs)
+        catalogs = rate_item.__parent__['catalogs']
+        catalogs.reindex_index(version, 'private_rate_subject_object')
+        return version
+
+    def test_get_current_rate_none(self, pool, subject, rateable):
+        from .rate import get_current_rate
+        assert get_current_rate(pool, subject, rateable) is None
+
+    def test_get_current_rate(self, registry, pool, rate_item, subject,
+                              rateable):
+        from .rate import get_current_rate
+        version = self._make_version(registry, rate_item, subject, rateable,
+                                     rate_item['VERSION_0000000'])
+        last = self._make_version(registry, rate_item, subject, rateable,
+                                  version)
+        assert get_current_rate(pool, subject, rateable) is last
+
+    def test_get_current_rate_other_object(self, registry, pool, rate_item,
+                                           subject, rateable):
+        from .rate import get_current_rate
+        self._make_version(registry, rate_item, subject, rateable,
+                           rate_item['VERSION_0000000'])
+        assert get_current_rate(pool, subject, rate_item) is None
+
+
+@mark.usefixtures('integration')
+class TestEnsureRateIsUnique:
+
+    @fixture
+    def pool(self, registry, pool_with_catalogs):
+        from substanced.interfaces import MODE_IMMEDIATE
+        catalog = pool_with_catalogs['catalogs']['adhocracy']
+        catalog['private_rate_subject_object'].action_mode = MODE_IMMEDIATE
+        return pool_with_catalogs
+
+    @fixture
+    def subject(self, registry, pool):
+        from adhocracy_core.resources.document import IDocument
+        return registry.content.create(IDocument.__identifier__,
+                                       parent=pool)
+
+    @fixture
+    def rateable(self, registry, pool):
+        from adhocracy_core.resources.document import IDocument
+        document = registry.content.create(IDocument.__identifier__,
+                                           parent=pool)
+        return document['VERSION_0000000']
+
+    @fixture
+    def rate_item(self, registry, pool):
+        from .rate import IRate
+        return registry.content.create(IRate.__identifier__, parent=pool)
+
+    def _make_version(self, registry, rate_item, subject, rateable, follows):
+        from adhocracy_core.sheets.rate import IRate
+        from adhocracy_core.sheets.versions import IVersionable
+        from .rate import IRateVersion
+        appstructs = {IRate.__identifier__: {'subject': subject,
+                                             'object': rateable,
+                                             'rate': 1},
+                      IVersionable.__identifier__: {'follows': [follows]}}
+        version = registry.content.create(IRateVersion.__identifier__,
+                                          parent=rate_item,
+                                          appstructs=appstructs)
+        catalogs = rate_item.__parent__['catalogs']
+        catalogs.reindex_index(version, 'private_rate_subject_object')
+        return version
+
+    def _ensure_rate_is_unique(self, request_, context, subject, rateable):
+        from adhocracy_core.sheets.rate import RateSchema
+        request_.context = context
+        schema = RateSchema().bind(request=request_, context=context)
+        value = {'subject': subject, 'object': rateable, 'rate': 1}
+        schema._ensure_rate_is_unique(schema, value, request_)
+
+    def test_rerate_same_rate_item(self, registry, request_, rate_item,
+                                   subject, rateable):
+        self._make_version(registry, rate_item, subject, rateable,
+                           rate_item['VERSION_0000000'])
+        self._ensure_rate_is_unique(request_, rate_item, subject, rateable)
+
+    def test_rerate_other_rate_item(self, registry, request_, pool,
+                                    rate_item, subject, rateable):
+        import colander
+        from .rate import IRate
+        self._make_version(registry, rate_item, subject, rateable,
+                           rate_item['VERSION_0000000'])
+        other_item = registry.content.create(IRate.__identifier__,
+                                             parent=pool)
+        with raises(colander.Invalid):
+            self._ensure_rate_is_unique(request_, other_item, subject,
+                                        rateable)
+
+
+class TestRateTally:
+
+    @fixture
+    def inst(self):
+        from .rate import RateTally
+        return RateTally()
+
+    def test_create(self, inst):
+        from persistent import Persistent
+        assert isinstance(inst, Persistent)
+        assert inst.counts == {}
+        assert inst.sum == 0
+
+    def test_change(self, inst):
+        inst.change(1, 2)
+        inst.change(-1, 1)
+        inst.change(0, 1)
+        assert (inst.pro, inst.contra, inst.neutral) == (2, 1, 1)
+        assert inst.sum == 1
+
+    def test_change_ignore_zero_counts(self, inst):
+        inst.change(1, 1)
+        inst.change(1, -1)
+        assert inst.counts == {}
+
+    def test_set(self, inst):
+        inst.set({1: 3})
+        assert inst.counts == {1: 3}
+
+    def test_resolve_conflict(self, inst):
+        old = {'_counts': {1: 1}}
+        committed = {'_counts': {1: 2}}
+        new = {'_counts': {1: 1, -1: 1}}
+        state = inst._p_resolveConflict(old, committed, new)
+        assert state == {'_counts': {1: 2, -1: 1}}
+
+
+def test_get_rate_tally_none(context):
+    from .rate import get_rate_tally
+    assert get_rate_tally(context) is None
@@ -38,6 +38,7 @@ class TestRoot:
                                        run_after_create=False)
 
     def test_create_root_with_initial_content(self, registry):
+        from adhocracy_core.resources.asset import ImageVariantsCache
         from adhocracy_core.resources.root import IRootPool
         from adhocracy_core.utils import find_graph
         from substanced.util import find_objectmap
@@ -48,6 +49,7 @@ class TestRoot:
         assert find_objectmap(inst) is not None
         assert find_graph(inst) is not None
         assert find_graph(inst)._objectmap is not None
+        assert isinstance(inst._image_variants_cache, ImageVariantsCache)
         assert find_catalog(inst, 'system') is not None
         assert find_catalog(inst, 'adhocracy') is not None
         assert find_service(inst, 'principals', 'users') is not None
@@ -371,6 +371,57 @@ class TestAutoupdateTagHasNewVersion:
         assert mock_sheet.set.called is False
 
 
+class TestInvalidatePrincipalsCache:
+
+    def call_fut(self, event):
+        from adhocracy_core.resources.subscriber import\
+            invalidate_principals_cache
+        return invalidate_principals_cache(event)
+
+    def test_increment_principals_version(self, pool, service, event):
+        from adhocracy_core.resources.principal import get_principals_version
+        pool['principals'] = service
+        event.object = pool
+        self.call_fut(event)
+        assert get_principals_version(pool) == 1
+
+
+class TestUpdateRateTallyRateModified:
+
+    @fixture
+    def mock_update(self, monkeypatch):
+        from adhocracy_core.resources import subscriber
+        mock = Mock()
+        monkeypatch.setattr(subscriber, 'update_rate_tally', mock)
+        return mock
+
+    def call_fut(self, event):
+        from adhocracy_core.resources.subscriber import\
+            update_rate_tally_rate_modified
+        return update_rate_tally_rate_modified(event)
+
+    def test_ignore_if_not_last_version(self, item, event, mock_update):
+        from adhocracy_core.interfaces import IItemVersion
+        item['VERSION_0000000'] = testing.DummyResource(
+            __provides__=IItemVersion)
+        item['VERSION_0000001'] = testing.DummyResource(
+            __provides__=IItemVersion)
+        event.object = item['VERSION_0000000']
+        self.call_fut(event)
+        assert not mock_update.called
+
+    def test_update_if_last_version(self, item, event, mock_update):
+        from adhocracy_core.interfaces import IItemVersion
+        rateable = testing.DummyResource()
+        item['VERSION_0000000'] = testing.DummyResource(
+            __provides__=IItemVersion)
+        event.object = item['VERSION_0000000']
+        event.old_appstruct = {'object': rateable, 'rate': 1}
+        event.new_appstruct = {'rate': -1}
+        self.call_fut(event)
+        mock_update.assert_called_with(rateable, {1: -1, -1: 1})
+
+
 class TestAddDefaultGroupToUserSubscriber:
 
     @fixture
@@ -539,6 +590,9 @@ def test_register_subscriber(registry):
     assert subscriber.autoupdate_versionable_has_new_version.__name__ in handlers
     assert subscriber.autoupdate_tag_has_new_version.__name__ in handlers
     assert subscriber.add_default_group_to_user.__name__ in handlers
+    assert subscriber.invalidate_principals_cache.__name__ in handlers
+    assert subscriber.update_rate_tally_new_rate_version.__name__ in handlers
+    assert subscriber.update_rate_tally_rate_modified.__name__ in handlers
     assert subscriber.update_modification_date_modified_by.__name__ in handlers
     assert subscriber.send_password_reset_mail.__name__ in handlers
     assert subscriber.send_activation_mail_or_activate_user.__name__ in handlers
@@ -23,6 +23,9 @@ from adhocracy_core.utils import set_batchmode
 logger = getLogger(__name__)
 
 
+BATCH_ITEM_RENDERER = 'batch_item'
+
+
 class BatchItemResponse:
 
     """Wrap the response to a nested request in a batch request.
@@ -174,8 +177,10 @@ class BatchView(RESTView):
 
         request = Request.blank(path, **keywords_args)
         set_batchmode(request)
+        request.override_renderer = BATCH_ITEM_RENDERER
         self.copy_attr_if_exists('root', request)
         self.copy_attr_if_exists('__cached_principals__', request)
+        self.copy_attr_if_exists('__cached_userid__', request)
         self.copy_header_if_exists('X-User-Path', request)
         self.copy_header_if_exists('X-User-Token', request)
 
@@ -198,10 +203,13 @@ class BatchView(RESTView):
             self, subrequest: Request) -> BatchItemResponse:
         try:
             subresponse = self.request.invoke_subrequest(subrequest)
+            body = getattr(subrequest, '__batch_item_body__', None)
         except Exception as err:
             error_view = self._get_error_view(err)
             subresponse = error_view(err, subrequest)
-        body = get_json_body(subresponse)
+            body = None
+        if body is None:
+            body = get_json_body(subresponse)
         return BatchItemResponse(subresponse.status_code,
                                  subresponse.status,
                                  body)
@@ -220,13 +228,8 @@ class BatchView(RESTView):
             error_view = handle_error_500_exception
         if isinstance(error, HTTPClientError):
             error_view = handle_error_40x_exception
-        instrospector = self.request.registry.introspector
-        for view in instrospector.get_category('views'):
-            context = view['introspectable']['context']
-            if context == error.__class__:
-                error_view = view['introspectable']['callable']
-                break
-        return error_view
+        error_views = _get_error_views(self.request.registry)
+        return error_views.get(error.__class__, error_view)
 
     def _extend_path_map(self, path_map: dict, result_path: str,
                          result_first_version_path: str,
@@ -253,6 +256,39 @@ class BatchView(RESTView):
             setattr(request, attributename, value)
 
 
+def _get_error_views(registry) -> dict:
+    """Return mapping from view context to view callable.
+
+    The mapping is created once and stored in the registry attribute
+    `batch_error_views`.
+    """
+    error_views = getattr(registry, 'batch_error_views', None)
+    if error_views is None:
+        error_views = {}
+        for view in registry.introspector.get_category('views'):
+            context = view['introspectable']['context']
+            view_callable = view['introspectable']['callable']
+            error_views.setdefault(context, view_callable)
+        registry.batch_error_views = error_views
+    return error_views
+
+
+def batch_item_renderer_factory(info) -> callable:
+    """Create renderer that stores the view result in the request.
+
+    Batch item subrequests use this renderer instead of `json` to avoid
+    encoding the view result and decoding the subresponse body again.
+    The view result is stored in the request attribute
+    `__batch_item_body__`.
+    """
+    def render(value, system) -> str:
+        request = system['request']
+        request.__batch_item_body__ = value
+        return ''
+    return render
+
+
 def includeme(config):  # pragma: no cover
     """Register batch view."""
+    config.add_renderer(BATCH_ITEM_RENDERER, batch_item_renderer_factory)
     config.scan('.batchview')
@@ -1,5 +1,6 @@
 """Data structures / validation specific to rest api requests."""
 from datetime import datetime
+from numbers import Real
 
 import colander
 from colander import SchemaNode
@@ -52,6 +53,7 @@ from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.principal import IPasswordAuthentication
 from adhocracy_core.sheets.principal import IUserExtended
 from adhocracy_core.catalog import ICatalogsService
+from adhocracy_core.utils import decode_cursor
 from adhocracy_core.catalog.index import ReferenceIndex
 from adhocracy_core.utils import get_sheet
 from adhocracy_core.utils import now
@@ -391,6 +393,35 @@ def deferred_validate_sort(node: SchemaNode, kw: dict):
     return colander.OneOf(valid_indexes)
 
 
+def validate_cursor(node: SchemaNode, value: str):
+    """Validate if value is a valid search cursor."""
+    try:
+        decode_cursor(value)
+    except ValueError:
+        raise colander.Invalid(node, 'Invalid cursor')
+
+
+def _is_valid_cursor_value(value: object, sort_index: object) -> bool:
+    """Check if the cursor `value` has the type of the sort values.
+
+    Without sort index the cursor value is a docid. Numbers match all
+    numeric sort values, datetimes only match if both or neither are
+    timezone aware.
+    """
+    if sort_index is None:
+        return isinstance(value, int) and not isinstance(value, bool)
+    fwd_index = getattr(sort_index, '_fwd_index', None)
+    if not fwd_index:
+        return True
+    key = fwd_index.minKey()
+    if isinstance(key, Real):
+        return isinstance(value, Real)
+    if isinstance(key, datetime):
+        return isinstance(value, datetime) \
+            and (value.tzinfo is None) == (key.tzinfo is None)
+    return isinstance(value, type(key))
+
+
 def _get_indexes(context) -> list:
     indexes = []
     system = find_catalog(context, 'system') or {}
@@ -432,9 +463,29 @@ class GETPoolRequestSchema(colander.Schema):
     # TODO: validate limit, offset to be multiple of 10, 20, 50, 100, 200, 500
     limit = SchemaNode(colander.Int(), missing=colander.drop)
     offset = SchemaNode(colander.Int(), missing=colander.drop)
+    cursor = SchemaNode(colander.String(),
+                        missing=colander.drop,
+                        validator=validate_cursor)
     aggregateby = SchemaNode(colander.String(),
                              missing=colander.drop,
                              validator=deferred_validate_aggregateby)
+    stream = SchemaNode(colander.Boolean(), missing=colander.drop)
+
+    def validator(self, node, value):
+        """Validate that the cursor value matches the `sort` index."""
+        cursor = value.get('cursor', '')
+        if not cursor:
+            return
+        cursor_value, docid = decode_cursor(cursor)
+        sort = value.get('sort', '')
+        sort_index = None
+        if sort:
+            indexes = _get_indexes(self.bindings['context'])
+            sort_index = {x.__name__: x for x in indexes}.get(sort, None)
+        if not _is_valid_cursor_value(cursor_value, sort_index):
+            err = colander.Invalid(node)
+            err['cursor'] = 'Invalid cursor'
+            raise err
 
     def deserialize(self, cstruct=colander.null):  # noqa
         """ Deserialize the :term:`cstruct` into an :term:`appstruct`.
@@ -447,6 +498,8 @@ class GETPoolRequestSchema(colander.Schema):
         depth_cstruct = cstruct.get('depth', None)
         if depth_cstruct == 'all':
             cstruct['depth'] = 100
+        # an empty cursor starts cursor pagination with the first page
+        is_first_cursor_page = cstruct.get('cursor', None) == ''
         appstruct = super().deserialize(cstruct)
         search_query = {}
         if appstruct:
@@ -461,6 +514,7 @@ class GETPoolRequestSchema(colander.Schema):
             search_query['serialization_form'] = elements
             if elements == 'omit':
                 search_query['resolve'] = False
+                search_query['only_count'] = True
         interfaces = ()
         if 'sheet' in appstruct:
             interfaces = appstruct['sheet']
@@ -477,8 +531,14 @@ class GETPoolRequestSchema(colander.Schema):
             search_query['offset'] = appstruct['offset']
         if 'reverse' in appstruct:
             search_query['reverse'] = appstruct['reverse']
+        if 'cursor' in appstruct:
+            search_query['cursor'] = appstruct['cursor']
+        elif is_first_cursor_page:
+            search_query['cursor'] = ''
         if 'count' in appstruct:
             search_query['show_count'] = appstruct['count']
+        if 'stream' in appstruct:
+            search_query['stream'] = appstruct['stream']
         fields = tuple([x.name for x in GETPoolRequestSchema().children])
         fields += ('sheet',)
         for filter, query in appstruct.items():
@@ -0,0 +1,78 @@
+"""Stream large JSON responses instead of encoding them at once."""
+from itertools import count
+from json import dumps
+from tempfile import SpooledTemporaryFile
+from types import GeneratorType
+
+from pyramid.request import Request
+from pyramid.response import FileIter
+from pyramid.response import Response
+
+
+SPOOL_MAX_SIZE = 1024 * 1024
+"""Bytes kept in memory before the response body is written to disk."""
+
+CACHE_GC_INTERVAL = 100
+"""Number of streamed elements after which the zodb cache is minimized."""
+
+
+def iter_json_chunks(cstruct, element_streamed: callable=None) -> str:
+    """Encode `cstruct` to JSON and yield the encoded chunks.
+
+    Generators are encoded as arrays, element by element, so the generated
+    data is never kept in memory completely.
+
+    :param element_streamed: callable without arguments, called after
+        every encoded generator element.
+    """
+    if isinstance(cstruct, dict):
+        yield '{'
+        for index, (key, value) in enumerate(cstruct.items()):
+            if index:
+                yield ', '
+            yield dumps(key) + ': '
+            yield from iter_json_chunks(value, element_streamed)
+        yield '}'
+    elif isinstance(cstruct, GeneratorType):
+        yield '['
+        for index, value in enumerate(cstruct):
+            if index:
+                yield ', '
+            yield from iter_json_chunks(value, element_streamed)
+            if element_streamed is not None:
+                element_streamed()
+        yield ']'
+    else:
+        yield dumps(cstruct)
+
+
+def build_streaming_json_response(cstruct: dict, request: Request) -> Response:
+    """Return `request.response` with JSON encoded `cstruct` as body.
+
+    The body is written chunk by chunk to a spooled temporary file, large
+    bodies are written to disk. Every `CACHE_GC_INTERVAL` streamed
+    generator elements the zodb cache is minimized, the resources are not
+    modified in GET requests.
+
+    The whole body is written before the response is returned: the
+    transaction and zodb connection are closed before the WSGI server
+    iterates the `app_iter`, so the elements cannot be serialized lazily.
+    This keeps the memory usage flat, but does not reduce the time to the
+    first byte.
+    """
+    body = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    jar = getattr(request.context, '_p_jar', None)
+    streamed = count(1)
+
+    def minimize_cache():
+        if jar is not None and next(streamed) % CACHE_GC_INTERVAL == 0:
+            jar.cacheGC()
+    for chunk in iter_json_chunks(cstruct, minimize_cache):
+        body.write(chunk.encode())
+    response = request.response
+    response.content_type = 'application/json'
+    length = body.tell()
+    body.seek(0)
+    response.app_iter = FileIter(body)
+    response.content_length = length
+    return response
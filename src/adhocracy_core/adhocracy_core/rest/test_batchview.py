@@ -108,6 +108,7 @@ class TestBatchView:
         request_.body = self._make_json_with_subrequest_cstructs(
             path='http://a.org/virtual/adhocracy/blah')
         request_.__cached_principals__ = [1]
+        request_.__cached_userid__ = resource_path(context)
         date = object()
         request_.headers['X-User-Path'] = 2
         request_.headers['X-User-Token'] = 3
@@ -125,6 +126,8 @@ class TestBatchView:
         subrequest  = mock_invoke_subrequest.call_args[0][0]
         assert is_batchmode(subrequest)
         assert subrequest.__cached_principals__ == [1]
+        assert subrequest.__cached_userid__ == resource_path(context)
+        assert subrequest.override_renderer == 'batch_item'
         assert subrequest.headers.get('X-User-Path') == 2
         assert subrequest.headers.get('X-User-Token') == 3
         assert subrequest.script_name == '/virtual'
@@ -227,6 +230,28 @@ class TestBatchView:
             inst.post()
         assert err.value.status_code == 500
 
+    def test_post_successful_subrequest_with_batch_item_body(
+            self, context, request_, mock_invoke_subrequest):
+        request_.body = self._make_json_with_subrequest_cstructs()
+        inst = self.make_one(context, request_)
+        body = {'path': '/pool/item'}
+
+        def invoke_subrequest(subrequest):
+            subrequest.__batch_item_body__ = body
+            return DummySubresponse(code=200, json={})
+        mock_invoke_subrequest.side_effect = invoke_subrequest
+        response = inst.post()
+        assert response['responses'] == [{'body': body, 'code': 200}]
+
+    def test_get_error_view_cache_error_views(self, context, request_,
+                                              integration):
+        from pyramid.httpexceptions import HTTPGone
+        from .exceptions import handle_error_410_exception
+        request_.registry = integration.registry
+        inst = self.make_one(context, request_)
+        assert inst._get_error_view(HTTPGone()) == handle_error_410_exception
+        assert HTTPGone in request_.registry.batch_error_views
+
     def _make_batch_response(self, code=200, title='Ok', path=None,
                              first_version_path=None):
         from adhocracy_core.rest.batchview import BatchItemResponse
@@ -399,3 +424,48 @@ class TestBatchView:
     def test_options_empty(self, context, request_):
         inst = self.make_one(context, request_)
         assert inst.options() == {}
+
+
+def test_batch_item_renderer_factory():
+    from pyramid import testing
+    from .batchview import batch_item_renderer_factory
+    request = testing.DummyRequest()
+    render = batch_item_renderer_factory(None)
+    assert render({'path': '/'}, {'request': request}) == ''
+    assert request.__batch_item_body__ == {'path': '/'}
+
+
+@mark.functional
+class TestBatchViewFunctional:
+
+    def test_post_create_and_get_resource(self, app_god):
+        from adhocracy_core.resources.organisation import IOrganisation
+        subrequests = [{'method': 'POST',
+                        'path': 'http://localhost/',
+                        'body': {'content_type': IOrganisation.__identifier__,
+                                 'data': {'adhocracy_core.sheets.name.IName':
+                                          {'name': 'pool'}}},
+                        'result_path': '@pool',
+                        'result_first_version_path': ''},
+                       {'method': 'GET',
+                        'path': '@pool',
+                        'body': {},
+                        'result_path': '',
+                        'result_first_version_path': ''}]
+        resp = app_god.batch(subrequests)
+        assert resp.status_code == 200
+        responses = resp.json['responses']
+        assert responses[0]['body']['path'] == 'http://localhost/pool/'
+        assert responses[1]['body']['path'] == 'http://localhost/pool/'
+        assert responses[1]['body']['content_type'] == \
+            IOrganisation.__identifier__
+
+    def test_post_failing_item(self, app_god):
+        subrequests = [{'method': 'GET',
+                        'path': 'http://localhost/missing',
+                        'body': {},
+                        'result_path': '',
+                        'result_first_version_path': ''}]
+        resp = app_god.batch(subrequests)
+        assert resp.status_code == 404
+        assert resp.json['responses'][0]['code'] == 404
@@ -649,6 +649,7 @@ class TestGETPoolRequestSchema:
         appstruct = inst.deserialize(cstruct)
         assert appstruct['serialization_form'] ==  'omit'
         assert appstruct['resolve'] is False
+        assert appstruct['only_count'] is True
 
     def test_deserialize_valid_aggregateby_system_index(self, inst, context):
         catalog = context['catalogs']['system']
@@ -706,6 +707,66 @@ class TestGETPoolRequestSchema:
         inst = inst.bind(context=context)
         assert inst.deserialize(data)['show_count'] is False
 
+    def test_deserialize_stream(self, inst, context):
+        data = {'stream': 'true'}
+        inst = inst.bind(context=context)
+        assert inst.deserialize(data)['stream'] is True
+
+    def test_deserialize_cursor(self, inst, context):
+        from adhocracy_core.utils import encode_cursor
+        cursor = encode_cursor(1, 1)
+        data = {'cursor': cursor}
+        inst = inst.bind(context=context)
+        assert inst.deserialize(data)['cursor'] == cursor
+
+    def test_deserialize_cursor_value_not_docid(self, inst, context):
+        from adhocracy_core.utils import encode_cursor
+        data = {'cursor': encode_cursor('name', 1)}
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize(data)
+
+    @fixture
+    def sort_index(self, context):
+        from hypatia.field import FieldIndex
+        from datetime import datetime
+        index = FieldIndex('item_creation_date')
+        index.__name__ = 'item_creation_date'
+        index.index_doc(1, testing.DummyResource(
+            item_creation_date=datetime(2015, 1, 1)))
+        context['catalogs']['system']['item_creation_date'] = index
+        return index
+
+    def test_deserialize_cursor_with_sort(self, inst, context, sort_index):
+        from datetime import datetime
+        from adhocracy_core.utils import encode_cursor
+        cursor = encode_cursor(datetime(2015, 1, 2), 1)
+        data = {'cursor': cursor, 'sort': 'item_creation_date'}
+        inst = inst.bind(context=context)
+        assert inst.deserialize(data)['cursor'] == cursor
+
+    @mark.parametrize('value', ['name', None, 2.5])
+    def test_deserialize_cursor_with_sort_value_mismatch(
+            self, inst, context, sort_index, value):
+        from adhocracy_core.utils import encode_cursor
+        data = {'cursor': encode_cursor(value, 1),
+                'sort': 'item_creation_date'}
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid) as err:
+            inst.deserialize(data)
+        assert err.value.asdict() == {'cursor': 'Invalid cursor'}
+
+    def test_deserialize_cursor_empty(self, inst, context):
+        data = {'cursor': ''}
+        inst = inst.bind(context=context)
+        assert inst.deserialize(data)['cursor'] == ''
+
+    def test_deserialize_cursor_invalid(self, inst, context):
+        data = {'cursor': 'wrong'}
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize(data)
+
     def test_deserialize_raise_if_extra_value(self, inst, context):
         data = {'extra1': 'blah',
                 'another_extra': 'blub'}
@@ -747,6 +808,54 @@ class TestGETPoolRequestSchema:
             inst.deserialize(data)
 
 
+class TestIsValidCursorValue:
+
+    def call_fut(self, value, sort_index):
+        from .schemas import _is_valid_cursor_value
+        return _is_valid_cursor_value(value, sort_index)
+
+    def make_index(self, key):
+        from hypatia.field import FieldIndex
+        index = FieldIndex('key')
+        index.index_doc(1, testing.DummyResource(key=key))
+        return index
+
+    def test_without_sort_index_docid(self):
+        assert self.call_fut(1, None)
+
+    @mark.parametrize('value', ['1', True, 1.0, None])
+    def test_without_sort_index_no_docid(self, value):
+        assert not self.call_fut(value, None)
+
+    def test_with_empty_sort_index(self):
+        from hypatia.field import FieldIndex
+        assert self.call_fut('name', FieldIndex('key'))
+
+    @mark.parametrize('value, key', [('b', 'a'),
+                                     (2, 1),
+                                     (2.5, 1),
+                                     (2, 1.5),
+                                     ])
+    def test_with_sort_index_value_type_match(self, value, key):
+        assert self.call_fut(value, self.make_index(key))
+
+    @mark.parametrize('value, key', [(1, 'a'),
+                                     ('1', 1),
+                                     (None, 1),
+                                     (None, 'a'),
+                                     ])
+    def test_with_sort_index_value_type_mismatch(self, value, key):
+        assert not self.call_fut(value, self.make_index(key))
+
+    def test_with_sort_index_datetime(self):
+        from datetime import datetime
+        from pytz import UTC
+        index = self.make_index(datetime(2015, 1, 1))
+        assert self.call_fut(datetime(2015, 1, 2), index)
+        assert not self.call_fut(datetime(2015, 1, 2, tzinfo=UTC), index)
+        assert not self.call_fut(1, index)
+
+
 class TestKeywordComparableSingeLine:
 
     @fixture
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import Mock
+
+from pyramid import testing
+from pytest import fixture
+
+
+class TestIterJsonChunks:
+
+    def call_fut(self, cstruct):
+        from .streaming import iter_json_chunks
+        return ''.join(iter_json_chunks(cstruct))
+
+    def test_encode_value(self):
+        assert self.call_fut('value') == '"value"'
+
+    def test_encode_dict(self):
+        cstruct = {'a': [1, 'x'], 'b': {'c': None}}
+        assert json.loads(self.call_fut(cstruct)) == cstruct
+
+    def test_encode_empty_dict(self):
+        assert self.call_fut({}) == '{}'
+
+    def test_encode_generator(self):
+        cstruct = {'elements': ({'path': x} for x in ['/a', '/b'])}
+        assert json.loads(self.call_fut(cstruct)) ==\
+            {'elements': [{'path': '/a'}, {'path': '/b'}]}
+
+    def test_encode_empty_generator(self):
+        assert self.call_fut((x for x in [])) == '[]'
+
+    def test_encode_generator_element_by_element(self):
+        from .streaming import iter_json_chunks
+        consumed = []
+
+        def elements():
+            for x in range(2):
+                consumed.append(x)
+                yield x
+        chunks = iter_json_chunks(elements())
+        assert next(chunks) == '['
+        assert next(chunks) == '0'
+        assert consumed == [0]
+
+    def test_encode_generator_call_element_streamed(self):
+        from .streaming import iter_json_chunks
+        element_streamed = Mock()
+        cstruct = {'a': 1, 'elements': (x for x in [{'b': 2}, 3])}
+        ''.join(iter_json_chunks(cstruct, element_streamed))
+        assert element_streamed.call_count == 2
+
+
+class TestBuildStreamingJsonResponse:
+
+    @fixture
+    def request_(self, context):
+        return testing.DummyRequest(context=context)
+
+    def call_fut(self, cstruct, request):
+        from .streaming import build_streaming_json_response
+        return build_streaming_json_response(cstruct, request)
+
+    def test_build_response(self, request_):
+        cstruct = {'elements': (x for x in [1, 2])}
+        response = self.call_fut(cstruct, request_)
+        body = b''.join(response.app_iter)
+        assert json.loads(body.decode()) == {'elements': [1, 2]}
+        assert response.content_length == len(body)
+        assert response.content_type == 'application/json'
+
+    def test_minimize_zodb_cache(self, request_, monkeypatch):
+        from . import streaming
+        monkeypatch.setattr(streaming, 'CACHE_GC_INTERVAL', 2)
+        request_.context._p_jar = Mock()
+        self.call_fut({'elements': (x for x in [1, 2, 3])}, request_)
+        assert request_.context._p_jar.cacheGC.call_count == 1
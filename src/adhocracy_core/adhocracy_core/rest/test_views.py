@@ -622,6 +622,35 @@ class TestPoolRESTView:
                                                        'root': context,
                                                        }}
 
+    def test_get_valid_pool_sheet_with_stream(self, request_, context,
+                                              mock_sheet):
+        import json
+        from adhocracy_core.sheets.pool import IPool
+        mock_sheet.meta = mock_sheet.meta._replace(isheet=IPool)
+        mock_sheet.get_cstruct.return_value = {'elements': (x for x in [1])}
+        request_.registry.content.get_sheets_read.return_value = [mock_sheet]
+        request_.validated['stream'] = True
+        inst = self.make_one(context, request_)
+        response = inst.get()
+        assert response is request_.response
+        assert response.content_type == 'application/json'
+        body = json.loads(b''.join(response.app_iter).decode())
+        assert body['data'] == {IPool.__identifier__: {'elements': [1]}}
+
+    def test_get_valid_pool_sheet_with_stream_batchmode(
+            self, request_, context, mock_sheet):
+        from adhocracy_core.utils import set_batchmode
+        from adhocracy_core.sheets.pool import IPool
+        mock_sheet.meta = mock_sheet.meta._replace(isheet=IPool)
+        mock_sheet.get_cstruct.return_value = {}
+        request_.registry.content.get_sheets_read.return_value = [mock_sheet]
+        request_.validated['stream'] = True
+        set_batchmode(request_)
+        inst = self.make_one(context, request_)
+        response = inst.get()
+        assert response['data'] == {IPool.__identifier__: {}}
+        assert 'stream' not in mock_sheet.get_cstruct.call_args[1]['params']
+
     def test_post_valid(self, request_, context):
         request_.root = context
         child = testing.DummyResource(__provides__=IResourceX)
@@ -1548,6 +1577,26 @@ class TestAssetDownloadRESTView:
         assert inst.get() == mock_response
 
 
+    def test_get_pending_image_variant(self, monkeypatch, request_, context):
+        from adhocracy_core.rest import views
+        from adhocracy_core.sheets.asset import AssetFileDownload
+        from adhocracy_core.interfaces import Dimensions
+        download = AssetFileDownload(Dimensions(width=10, height=10))
+        download.get_response = Mock(return_value=Mock())
+        mock_retrieve = Mock(spec=views.retrieve_asset_file,
+                             return_value=download)
+        monkeypatch.setattr(views, 'retrieve_asset_file', mock_retrieve)
+        mock_generate = Mock(spec=views.generate_image_variants_soon)
+        monkeypatch.setattr(views, 'generate_image_variants_soon',
+                            mock_generate)
+        context['download'] = testing.DummyResource()
+        inst = self.make_one(context['download'], request_)
+        response = inst.get()
+        assert response.cache_control == 'no-cache'
+        assert mock_generate.call_args[0] == (context,
+                                              request_.registry)
+
+
 class TestCreatePasswordResetView:
 
     @fixture
@@ -32,6 +32,7 @@ from adhocracy_core.interfaces import ILocation
 from adhocracy_core.resources.asset import IAsset
 from adhocracy_core.resources.asset import IAssetDownload
 from adhocracy_core.resources.asset import IAssetsService
+from adhocracy_core.resources.asset import generate_image_variants_soon
 from adhocracy_core.resources.asset import validate_and_complete_asset
 from adhocracy_core.resources.principal import IUsersService
 from adhocracy_core.resources.principal import IPasswordReset
@@ -49,6 +50,7 @@ from adhocracy_core.rest.schemas import POSTReportAbuseViewRequestSchema
 from adhocracy_core.rest.schemas import POSTResourceRequestSchema
 from adhocracy_core.rest.schemas import PUTResourceRequestSchema
 from adhocracy_core.rest.schemas import GETPoolRequestSchema
+from adhocracy_core.rest.streaming import build_streaming_json_response
 from adhocracy_core.rest.schemas import GETItemResponseSchema
 from adhocracy_core.rest.schemas import GETResourceResponseSchema
 from adhocracy_core.rest.schemas import options_resource_response_data_dict
@@ -56,6 +58,8 @@ from adhocracy_core.rest.schemas import add_arbitrary_filter_nodes
 from adhocracy_core.rest.exceptions import error_entry
 from adhocracy_core.schema import AbsolutePath
 from adhocracy_core.schema import References
+from adhocracy_core.schema import get_sheet_schema
+from adhocracy_core.sheets.asset import AssetFileDownload
 from adhocracy_core.sheets.asset import retrieve_asset_file
 from adhocracy_core.sheets.badge import get_assignable_badges
 from adhocracy_core.sheets.badge import IBadgeAssignment
@@ -66,6 +70,7 @@ from adhocracy_core.sheets.principal import IPasswordAuthentication
 from adhocracy_core.sheets.pool import IPool as IPoolSheet
 from adhocracy_core.sheets.principal import IUserBasic
 from adhocracy_core.utils import extract_events_from_changelog_metadata
+from adhocracy_core.utils import get_first_item_version
 from adhocracy_core.utils import get_sheet
 from adhocracy_core.utils import get_user
 from adhocracy_core.utils import is_batchmode
@@ -529,7 +534,20 @@ class PoolRESTView(SimpleRESTView):
         """Get resource data."""
         # This delegation method is necessary since otherwise validation_GET
         # won't be found.
-        return super().get()
+        cstruct = super().get()
+        return self._build_get_response(cstruct)
+
+    def _build_get_response(self, cstruct: dict) -> object:
+        """Return `cstruct` or stream response if requested."""
+        queryparams = self.request.validated or {}
+        if queryparams.get('stream', False):
+            return build_streaming_json_response(cstruct, self.request)
+        return cstruct
+
+    def _get_sheets_data_cstruct(self):
+        if is_batchmode(self.request):  # streaming needs a response object
+            self.request.validated.pop('stream', None)
+        return super()._get_sheets_data_cstruct()
 
     def build_post_response(self, resource) -> dict:
         """Build response data structure for a POST request. """
@@ -548,9 +566,7 @@ class PoolRESTView(SimpleRESTView):
         return schema.serialize(appstruct)
 
     def _get_first_version(self, item: IItem) -> IItemVersion:
-        for child in item.values():
-            if IItemVersion.providedBy(child):
-                return child
+        return get_first_item_version(item)
 
     @view_config(request_method='POST',
                  permission='create',
@@ -599,7 +615,7 @@ class ItemRESTView(PoolRESTView):
             appstruct['first_version_path'] = first_version
         cstruct = schema.serialize(appstruct)
         cstruct['data'] = self._get_sheets_data_cstruct()
-        return cstruct
+        return self._build_get_response(cstruct)
 
     @view_config(request_method='POST',
                  permission='create',
@@ -750,9 +766,14 @@ class AssetDownloadRESTView(SimpleRESTView):
                  permission='view')
     def get(self) -> dict:
         """Get asset data (unless deleted or hidden)."""
-        file = retrieve_asset_file(self.context, self.request.registry)
-        response = file.get_response(self.context, self.request.registry)
+        registry = self.request.registry
+        file = retrieve_asset_file(self.context, registry)
+        response = file.get_response(self.context, registry)
         self.ensure_caching_headers(response)
+        if isinstance(file, AssetFileDownload) and file.is_pending:
+            # serve the raw image until the image variant is generated
+            generate_image_variants_soon(self.context.__parent__, registry)
+            response.cache_control = 'no-cache'
         return response
 
     def ensure_caching_headers(self, response):
@@ -844,7 +865,9 @@ class MetaApiView(RESTView):
             fields = []
 
             # Create field definitions
-            for node in sheet_meta.schema_class().children:
+            schema = get_sheet_schema(sheet_meta.schema_class,
+                                      self.request.registry)
+            for node in schema.children:
 
                 fieldname = node.name
                 valuetype = type(node)
@@ -8,6 +8,7 @@ import os
 import re
 
 from pyramid.path import DottedNameResolver
+from pyramid.registry import Registry
 from pyramid.traversal import find_resource
 from pyramid.traversal import resource_path
 from pyramid.traversal import lineage
@@ -352,6 +353,21 @@ class ContentType(AdhocracySchemaNode):
     default = deferred_content_type_default
 
 
+def get_sheet_schema(schema_class: type,
+                     registry: Registry) -> colander.MappingSchema:
+    """Return the unbound schema instance for `schema_class`.
+
+    The schema is only created once for every schema class and stored in
+    the `sheet_schemas` attribute of `registry`.
+    It must not be modified, bind the schema to get a modifiable copy.
+    """
+    schemas = vars(registry).setdefault('sheet_schemas', {})
+    schema = schemas.get(schema_class, None)
+    if schema is None:
+        schema = schemas.setdefault(schema_class, schema_class())
+    return schema
+
+
 def get_sheet_cstructs(context: IResource, request) -> dict:
     """Serialize and return the `viewable`resource sheet data."""
     sheets = request.registry.content.get_sheets_read(context, request)
@@ -310,6 +310,28 @@ def test_deferred_content_type_default_call_without_iresource():
     assert deferred_content_type_default(node, bindings) == IResource
 
 
+class TestGetSheetSchema:
+
+    def call_fut(self, schema_class, registry):
+        from . import get_sheet_schema
+        return get_sheet_schema(schema_class, registry)
+
+    def test_create_schema(self, sheet_meta, registry):
+        schema = self.call_fut(sheet_meta.schema_class, registry)
+        assert isinstance(schema, sheet_meta.schema_class)
+
+    def test_create_schema_only_once(self, sheet_meta, registry):
+        schema = self.call_fut(sheet_meta.schema_class, registry)
+        assert self.call_fut(sheet_meta.schema_class, registry) is schema
+        assert registry.sheet_schemas == {sheet_meta.schema_class: schema}
+
+    def test_create_schema_for_every_registry(self, sheet_meta, registry):
+        from pyramid.registry import Registry
+        schema = self.call_fut(sheet_meta.schema_class, registry)
+        other = self.call_fut(sheet_meta.schema_class, Registry())
+        assert other is not schema
+
+
 class TestGetSheetCstructs:
 
     @fixture
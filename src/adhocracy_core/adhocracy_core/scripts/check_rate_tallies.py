@@ -0,0 +1,72 @@
+"""Verify and repair the rate tallies of rateable resources.
+
+This is registered as console script 'check_rate_tallies' in setup.py.
+"""
+import argparse
+import inspect
+import logging
+import transaction
+
+from pyramid.paster import bootstrap
+from pyramid.traversal import resource_path
+from substanced.util import find_service
+
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import search_query
+from adhocracy_core.resources.rate import count_rates
+from adhocracy_core.resources.rate import get_rate_tally
+from adhocracy_core.sheets.rate import IRateable
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_rate_tallies():  # pragma: no cover
+    """Compare the rate tallies with the rates counted with the graph.
+
+    usage::
+
+        bin/check_rate_tallies etc/development.ini --repair
+    """
+    docstring = inspect.getdoc(check_rate_tallies)
+    parser = argparse.ArgumentParser(description=docstring)
+    parser.add_argument('ini_file',
+                        help='path to the adhocracy backend ini file')
+    parser.add_argument('-r',
+                        '--repair',
+                        help='set the wrong tallies to the counted rates '
+                             'and reindex the rates index',
+                        action='store_true')
+    args = parser.parse_args()
+    env = bootstrap(args.ini_file)
+    wrong = _check_rate_tallies(env['root'], repair=args.repair)
+    for rateable, tally_counts, counts in wrong:
+        print('{0}: tally {1}, counted {2}'.format(resource_path(rateable),
+                                                   tally_counts,
+                                                   counts))
+    print('{0} wrong rate tallies'.format(len(wrong)))
+    if args.repair:
+        transaction.commit()
+    env['closer']()
+
+
+def _check_rate_tallies(root: IResource, repair=False) -> list:
+    """Return list of (rateable, tally counts, counted rates) if different.
+
+    The tally counts are None if there is no tally.
+    """
+    catalogs = find_service(root, 'catalogs')
+    query = search_query._replace(interfaces=IRateable, resolve=True)
+    wrong = []
+    for rateable in catalogs.search(query).elements:
+        tally = get_rate_tally(rateable)
+        counts = count_rates(rateable)
+        tally_counts = None if tally is None else tally.counts
+        if tally_counts == counts or (tally is None and not counts):
+            continue
+        wrong.append((rateable, tally_counts, counts))
+        if repair:
+            logger.info('Repair rate tally of {0}'.format(rateable))
+            get_rate_tally(rateable, create=True).set(counts)
+            catalogs.reindex_index(rateable, 'rates')
+    return wrong
@@ -0,0 +1,73 @@
+"""Run the unfinished evolution steps and commit migrations in chunks.
+
+This is registered as console script 'evolve_chunked' in setup.py.
+"""
+import argparse
+import inspect
+import logging
+import transaction
+
+from pyramid.paster import bootstrap
+from pyramid.registry import Registry
+from substanced.evolution import EvolutionManager
+
+from adhocracy_core.interfaces import IResource
+
+
+logger = logging.getLogger(__name__)
+
+
+def evolve_chunked():  # pragma: no cover
+    """Run the unfinished evolution steps.
+
+    Unlike `sd_evolve` the resource migrations commit every chunk of
+    resources, an interrupted migration resumes after the last committed
+    chunk, see :func:`adhocracy_core.evolution.migrate_resources`.
+    With --dry-run nothing is committed.
+
+    usage::
+
+        bin/evolve_chunked etc/development.ini --dry-run
+    """
+    docstring = inspect.getdoc(evolve_chunked)
+    parser = argparse.ArgumentParser(description=docstring)
+    parser.add_argument('ini_file',
+                        help='path to the adhocracy backend ini file')
+    parser.add_argument('-d',
+                        '--dry-run',
+                        help='run the evolution steps without commit',
+                        action='store_true')
+    args = parser.parse_args()
+    env = bootstrap(args.ini_file)
+    finished = _evolve_chunked(env['root'], env['registry'],
+                               commit=not args.dry_run)
+    for name in finished:
+        print('Finished evolution step {0}'.format(name))
+    if args.dry_run:
+        print('Dry run, nothing committed')
+    env['closer']()
+
+
+def _evolve_chunked(root: IResource, registry: Registry,
+                    commit=True) -> [str]:
+    """Run the unfinished evolution steps and return their names.
+
+    If `commit` is set, every evolution step is committed and the
+    resource migrations commit every chunk. Else everything is aborted.
+    """
+    registry.commit_migration_chunks = commit
+    manager = EvolutionManager(root, registry)
+    finished = []
+    try:
+        for name, step in manager.get_unfinished_steps():
+            logger.info('Run evolution step {0}'.format(name))
+            step(root)
+            manager.add_finished_step(name)
+            if commit:
+                transaction.commit()
+            finished.append(name)
+    finally:
+        registry.commit_migration_chunks = False
+        if not commit:
+            transaction.abort()
+    return finished
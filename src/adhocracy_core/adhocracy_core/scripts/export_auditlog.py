@@ -0,0 +1,77 @@
+"""Export the auditlog.
+
+This is registered as console script 'export_auditlog' in setup.py.
+"""
+import argparse
+import csv
+import inspect
+import sys
+from datetime import datetime
+
+from pyramid.paster import bootstrap
+
+from adhocracy_core.auditing import get_auditlog
+from adhocracy_core.interfaces import AuditlogAction
+
+
+def export_auditlog():  # pragma: no cover
+    """Export the auditlog entries as csv to stdout.
+
+    usage::
+
+        bin/export_auditlog etc/development.ini --start 2015-01-01
+        --end 2015-02-01
+    """
+    docstring = inspect.getdoc(export_auditlog)
+    parser = argparse.ArgumentParser(description=docstring)
+    parser.add_argument('ini_file',
+                        help='path to the adhocracy backend ini file')
+    parser.add_argument('-s',
+                        '--start',
+                        help='only export entries created at or after this '
+                             'date (YYYY-MM-DD)',
+                        default=None,
+                        type=_parse_date)
+    parser.add_argument('-e',
+                        '--end',
+                        help='only export entries created before this '
+                             'date (YYYY-MM-DD)',
+                        default=None,
+                        type=_parse_date)
+    args = parser.parse_args()
+    env = bootstrap(args.ini_file)
+    _export_auditlog(env['root'], sys.stdout, args.start, args.end)
+    env['closer']()
+
+
+def _parse_date(value: str) -> datetime:  # pragma: no cover
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def _export_auditlog(root, output, start: datetime=None,
+                     end: datetime=None, page_size=1000):
+    auditlog = get_auditlog(root)
+    if auditlog is None:
+        return
+    writer = csv.writer(output)
+    after = None
+    while True:
+        page = auditlog.get_entries(start=start, end=end, after=after,
+                                    limit=page_size)
+        for key, entry in page:
+            writer.writerow([key[0].isoformat(),
+                             _get_action_name(entry.name),
+                             entry.resource_path,
+                             entry.user_name,
+                             entry.user_path])
+        if len(page) < page_size:
+            break
+        after = page[-1][0]
+
+
+def _get_action_name(name) -> str:
+    if isinstance(name, tuple):  # entries written by older versions
+        name = name[0]
+    if isinstance(name, AuditlogAction):
+        name = name.value
+    return name
@@ -0,0 +1,68 @@
+from unittest.mock import Mock
+from pyramid import testing
+from pytest import fixture
+
+
+class TestCheckRateTallies:
+
+    def call_fut(self, *args, **kwargs):
+        from .check_rate_tallies import _check_rate_tallies
+        return _check_rate_tallies(*args, **kwargs)
+
+    @fixture
+    def rateable(self):
+        return testing.DummyResource()
+
+    @fixture
+    def catalogs(self, monkeypatch, mock_catalogs, search_result, rateable):
+        from . import check_rate_tallies
+        mock_catalogs.search.return_value = search_result._replace(
+            elements=[rateable])
+        mock_catalogs.reindex_index = Mock()
+        monkeypatch.setattr(check_rate_tallies, 'find_service',
+                            lambda x, y: mock_catalogs)
+        return mock_catalogs
+
+    @fixture
+    def mock_count_rates(self, monkeypatch):
+        from . import check_rate_tallies
+        mock = Mock(return_value={1: 2})
+        monkeypatch.setattr(check_rate_tallies, 'count_rates', mock)
+        return mock
+
+    def test_search_rateables(self, context, catalogs, mock_count_rates):
+        from adhocracy_core.sheets.rate import IRateable
+        self.call_fut(context)
+        query = catalogs.search.call_args[0][0]
+        assert query.interfaces == IRateable
+        assert query.resolve
+
+    def test_tally_ok(self, context, catalogs, mock_count_rates, rateable):
+        from adhocracy_core.resources.rate import RateTally
+        rateable._rate_tally = RateTally({1: 2})
+        assert self.call_fut(context) == []
+
+    def test_no_tally_and_no_rates(self, context, catalogs, mock_count_rates,
+                                   rateable):
+        mock_count_rates.return_value = {}
+        assert self.call_fut(context) == []
+
+    def test_tally_wrong(self, context, catalogs, mock_count_rates,
+                         rateable):
+        from adhocracy_core.resources.rate import RateTally
+        rateable._rate_tally = RateTally({1: 1})
+        assert self.call_fut(context) == [(rateable, {1: 1}, {1: 2})]
+        assert rateable._rate_tally.counts == {1: 1}
+        assert not catalogs.reindex_index.called
+
+    def test_tally_missing(self, context, catalogs, mock_count_rates,
+                           rateable):
+        assert self.call_fut(context) == [(rateable, None, {1: 2})]
+
+    def test_tally_wrong_repair(self, context, catalogs, mock_count_rates,
+                                rateable):
+        from adhocracy_core.resources.rate import RateTally
+        rateable._rate_tally = RateTally({1: 1})
+        self.call_fut(context, repair=True)
+        assert rateable._rate_tally.counts == {1: 2}
+        catalogs.reindex_index.assert_called_with(rateable, 'rates')
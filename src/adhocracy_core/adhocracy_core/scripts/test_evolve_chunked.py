@@ -0,0 +1,53 @@
+from unittest.mock import Mock
+from pyramid import testing
+from pytest import fixture
+
+
+class TestEvolveChunked:
+
+    def call_fut(self, *args, **kwargs):
+        from .evolve_chunked import _evolve_chunked
+        return _evolve_chunked(*args, **kwargs)
+
+    @fixture
+    def step(self, registry):
+        step = Mock()
+        step.side_effect = lambda root: self.flags.append(
+            registry.commit_migration_chunks)
+        return step
+
+    @fixture
+    def mock_manager(self, monkeypatch, step):
+        from . import evolve_chunked
+        manager = Mock()
+        manager.get_unfinished_steps.return_value = [('step', step)]
+        monkeypatch.setattr(evolve_chunked, 'EvolutionManager',
+                            Mock(return_value=manager))
+        return manager
+
+    @fixture
+    def mock_transaction(self, monkeypatch):
+        from . import evolve_chunked
+        mock = Mock()
+        monkeypatch.setattr(evolve_chunked, 'transaction', mock)
+        return mock
+
+    def setup_method(self, method):
+        self.flags = []
+
+    def test_run_and_commit_steps(self, registry, mock_manager, step,
+                                  mock_transaction):
+        root = testing.DummyResource()
+        assert self.call_fut(root, registry) == ['step']
+        step.assert_called_with(root)
+        mock_manager.add_finished_step.assert_called_with('step')
+        assert mock_transaction.commit.called
+        assert self.flags == [True]
+        assert registry.commit_migration_chunks is False
+
+    def test_dry_run(self, registry, mock_manager, step, mock_transaction):
+        root = testing.DummyResource()
+        assert self.call_fut(root, registry, commit=False) == ['step']
+        assert not mock_transaction.commit.called
+        assert mock_transaction.abort.called
+        assert self.flags == [False]
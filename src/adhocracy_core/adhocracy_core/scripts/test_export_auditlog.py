@@ -0,0 +1,70 @@
+from io import StringIO
+from unittest.mock import Mock
+from pytest import fixture
+
+
+class TestExportAuditlog:
+
+    @fixture
+    def auditlog(self):
+        from adhocracy_core.auditing import AuditLog
+        return AuditLog()
+
+    @fixture
+    def mock_get_auditlog(self, monkeypatch, auditlog):
+        from . import export_auditlog
+        mock = Mock(return_value=auditlog)
+        monkeypatch.setattr(export_auditlog, 'get_auditlog', mock)
+        return mock
+
+    def call_fut(self, *args, **kwargs):
+        from .export_auditlog import _export_auditlog
+        return _export_auditlog(*args, **kwargs)
+
+    def _add_entry(self, auditlog, day: int, name='created'):
+        from datetime import datetime
+        from adhocracy_core.interfaces import AuditlogEntry
+        key = (datetime(2015, 1, day), 0, day)
+        auditlog[key] = AuditlogEntry(name, '/{}'.format(day), 'user',
+                                      '/principals/users/0000000')
+
+    def test_ignore_if_no_auditlog(self, context, mock_get_auditlog):
+        mock_get_auditlog.return_value = None
+        output = StringIO()
+        self.call_fut(context, output)
+        assert output.getvalue() == ''
+
+    def test_export_entries(self, context, mock_get_auditlog, auditlog):
+        from adhocracy_core.interfaces import AuditlogAction
+        self._add_entry(auditlog, 1, name=AuditlogAction.created)
+        output = StringIO()
+        self.call_fut(context, output)
+        assert output.getvalue() == \
+            '2015-01-01T00:00:00,created,/1,user,/principals/users/0000000\r\n'
+
+    def test_export_entries_with_legacy_action_name(
+            self, context, mock_get_auditlog, auditlog):
+        from adhocracy_core.interfaces import AuditlogAction
+        self._add_entry(auditlog, 1, name=(AuditlogAction.modified,))
+        output = StringIO()
+        self.call_fut(context, output)
+        assert ',modified,' in output.getvalue()
+
+    def test_export_entries_in_pages(self, context, mock_get_auditlog,
+                                     auditlog):
+        for day in range(1, 6):
+            self._add_entry(auditlog, day)
+        output = StringIO()
+        self.call_fut(context, output, page_size=2)
+        assert len(output.getvalue().splitlines()) == 5
+
+    def test_export_entries_with_start_and_end(self, context,
+                                               mock_get_auditlog, auditlog):
+        from datetime import datetime
+        for day in range(1, 6):
+            self._add_entry(auditlog, day)
+        output = StringIO()
+        self.call_fut(context, output, start=datetime(2015, 1, 2),
+                      end=datetime(2015, 1, 4))
+        lines = output.getvalue().splitlines()
+        assert [l.split(',')[2] for l in lines] == ['/2', '/3']
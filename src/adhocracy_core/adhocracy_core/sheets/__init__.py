@@ -1,7 +1,10 @@
 """Data structures/validation, set/get for an isolated set of resource data."""
 
 from logging import getLogger
+from collections import OrderedDict
 from collections import defaultdict
+from collections.abc import Iterable
+from itertools import islice
 
 from persistent.mapping import PersistentMapping
 from pyramid.decorator import reify
@@ -14,6 +17,7 @@ from zope.interface import implementer
 import colander
 
 from adhocracy_core.events import ResourceSheetModified
+from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IResourceSheet
 from adhocracy_core.interfaces import ISheet
 from adhocracy_core.interfaces import SheetMetadata
@@ -21,13 +25,28 @@ from adhocracy_core.interfaces import Reference
 from adhocracy_core.interfaces import SearchQuery
 from adhocracy_core.interfaces import search_query
 from adhocracy_core import schema
+from adhocracy_core.schema import get_sheet_schema
 from adhocracy_core.utils import remove_keys_from_dict
 from adhocracy_core.utils import normalize_to_tuple
 from adhocracy_core.utils import find_graph
+from adhocracy_core.utils import get_iresource
 
 logger = getLogger(__name__)
 
 
+CONTENT_BATCH_SIZE = 100
+"""Number of resources serialized together by
+   :func:`iter_resources_content_cstructs`.
+"""
+
+references_query = search_query._replace(only_visible=False,
+                                         resolve=True,
+                                         allows=(),
+                                         references=[],
+                                         )
+"""Default search query to get the sheet references."""
+
+
 @implementer(IResourceSheet)
 class BaseResourceSheet:
 
@@ -40,14 +59,19 @@ class BaseResourceSheet:
 
     def __init__(self, meta, context, registry=None):
         """Initialize self."""
-        self.schema = meta.schema_class()
-        """:class:`colander.MappingSchema` to define the data structure."""
+        if registry is None:
+            registry = get_current_registry(context)
+        self.schema = get_sheet_schema(meta.schema_class, registry)
+        """:class:`colander.MappingSchema` to define the data structure.
+
+        The schema instance is shared between all sheets with the same
+        schema class, use :meth:`colander.SchemaNode.bind` to get a copy
+        before modifying it.
+        """
         self.context = context
         """Resource to adapt."""
         self.meta = meta
         """SheetMetadata"""
-        if registry is None:
-            registry = get_current_registry(context)
         self.registry = registry
         """Pyramid :class:`pyramid.registry.Registry`. If `None`
            :func:`pyramid.threadlocal.get_current_registry` is used get it.
@@ -88,19 +112,30 @@ class BaseResourceSheet:
             property.
         :param add_back_references: allow to omit back references
         """
+        query = self._get_references_query(params)
+        return self._get(query, add_back_references=add_back_references)
+
+    def _get(self, query: SearchQuery, add_back_references=True,
+             prefetched: dict=None) -> dict:
+        """Return appstruct data, see :meth:`get`.
+
+        :param prefetched: mapping :class:`Reference` to the search
+            result elements for the default query, references in this
+            mapping are not searched again.
+        """
+        prefetched = prefetched or {}
         appstruct = self._get_default_appstruct()
         appstruct.update(self._get_data_appstruct())
-        query = self._get_references_query(params)
-        appstruct.update(self._get_reference_appstruct(query))
+        appstruct.update(self._get_reference_appstruct(query, prefetched))
         if add_back_references:
-            appstruct.update(self._get_back_reference_appstruct(query))
+            appstruct.update(self._get_back_reference_appstruct(query,
+                                                                prefetched))
         return appstruct
 
     def _get_default_appstruct(self) -> dict:
-        schema = self.schema.bind(context=self.context,
-                                  registry=self.registry)
-        items = [(n.name, n.default) for n in schema]
-        return dict(items)
+        return get_schema_defaults(self.schema,
+                                   context=self.context,
+                                   registry=self.registry)
 
     def _get_data_appstruct(self) -> dict:
         """Get data appstruct."""
@@ -108,40 +143,52 @@ class BaseResourceSheet:
 
     def _get_references_query(self, params: dict) -> SearchQuery:
         """Might be overridden in subclasses."""
-        default_params = {'only_visible': False,
-                          'resolve': True,
-                          'allows': (),
-                          'references': [],
-                          }
-        query = search_query._replace(**default_params)
+        query = references_query
         if params:
             query = query._replace(**params)
         return query
 
-    def _get_reference_appstruct(self, query: SearchQuery) -> iter:
+    def _get_reference_appstruct(self, query: SearchQuery,
+                                 prefetched: dict=None) -> iter:
         """Might be overridden in subclasses."""
         fields = self._fields['reference'].items()
-        get_ref = lambda node: Reference(self.context, self.meta.isheet,
-                                         node.name, None)
-        return self._yield_references(self._catalogs, fields, query, get_ref)
+        return self._yield_references(self._catalogs, fields, query,
+                                      self._create_reference, prefetched)
 
-    def _get_back_reference_appstruct(self, query: SearchQuery) -> dict:
+    def _get_back_reference_appstruct(self, query: SearchQuery,
+                                      prefetched: dict=None) -> dict:
         fields = self._fields['back_reference'].items()
-
-        def get_ref(node):
-            isheet = node.reftype.getTaggedValue('source_isheet')
-            isheet_field = node.reftype.getTaggedValue('source_isheet_field')
-            return Reference(None, isheet, isheet_field, self.context)
-
-        return self._yield_references(self._catalogs, fields, query, get_ref)
-
-    def _yield_references(self, catalogs, fields, query, create_ref) -> iter:
+        return self._yield_references(self._catalogs, fields, query,
+                                      self._create_back_reference, prefetched)
+
+    def _create_reference(self, node: colander.SchemaNode) -> Reference:
+        return Reference(self.context, self.meta.isheet, node.name, None)
+
+    def _create_back_reference(self, node: colander.SchemaNode) -> Reference:
+        isheet = node.reftype.getTaggedValue('source_isheet')
+        isheet_field = node.reftype.getTaggedValue('source_isheet_field')
+        return Reference(None, isheet, isheet_field, self.context)
+
+    def _get_all_references(self) -> list:
+        """Return references and back references of all reference fields."""
+        references = [self._create_reference(x)
+                      for x in self._fields['reference'].values()]
+        references += [self._create_back_reference(x)
+                       for x in self._fields['back_reference'].values()]
+        return references
+
+    def _yield_references(self, catalogs, fields, query, create_ref,
+                          prefetched: dict=None) -> iter:
         if not catalogs:
             return iter([])  # ease testing
+        prefetched = prefetched or {}
         for field, node in fields:
             reference = create_ref(node)
-            query_field = query._replace(references=[reference])
-            elements = self._catalogs.search(query_field).elements
+            if reference in prefetched:
+                elements = prefetched[reference]
+            else:
+                query_field = query._replace(references=[reference])
+                elements = self._catalogs.search(query_field).elements
             if len(elements) == 0:
                 continue
             if isinstance(node, schema.Reference):
@@ -224,9 +271,26 @@ class BaseResourceSheet:
 
     def _get_schema_for_cstruct(self, request, params: dict):
         """Might be overridden in subclasses."""
-        schema = self.schema.bind(context=self.context,
-                                  registry=self.registry,
-                                  request=request)
+        return self._bind_schema(request)
+
+    def _bind_schema(self, request: Request, **kw) -> colander.MappingSchema:
+        """Return the schema bound to `self.context` and `request`.
+
+        The schema is bound once per request, sheet and context, the bound
+        schema is shared. Clone it before modifying it.
+
+        :param kw: additional bindings
+        """
+        bound_schemas = vars(request).setdefault('__bound_sheet_schemas__',
+                                                 {})
+        key = (self.meta.isheet, id(self.context))
+        schema = bound_schemas.get(key, None)
+        if schema is None or schema.bindings['context'] is not self.context:
+            schema = self.schema.bind(context=self.context,
+                                      registry=self.registry,
+                                      request=request,
+                                      **kw)
+            bound_schemas[key] = schema
         return schema
 
     def delete_field_values(self, fields: [str]):
@@ -297,6 +361,87 @@ class AttributeResourceSheet(BaseResourceSheet):
                 delattr(self.context, key)
 
 
+def get_resources_content_cstructs(resources: list, request: Request) -> list:
+    """Serialize path, content type and `viewable` sheet data of resources.
+
+    This is the batch version of :class:`adhocracy_core.schema.ResourceObject`
+    with serialization form `content`. The resources are grouped by
+    resource type, the path schema is bound once per resource type.
+    The sheet schemas are bound for every resource, their bindings may
+    depend on the context. The references of all resources are searched
+    with one catalog search. The sheet view permissions are checked for
+    every resource, local roles make them resource specific.
+    """
+    return list(iter_resources_content_cstructs(resources, request))
+
+
+def iter_resources_content_cstructs(resources: Iterable,
+                                    request: Request) -> Iterable:
+    """Like :func:`get_resources_content_cstructs` but return a generator.
+
+    The resources are serialized in batches of `CONTENT_BATCH_SIZE`.
+    """
+    resources = iter(resources)
+    while True:
+        batch = list(islice(resources, CONTENT_BATCH_SIZE))
+        if not batch:
+            return
+        yield from _get_batch_content_cstructs(batch, request)
+
+
+def _get_batch_content_cstructs(resources: list, request: Request) -> list:
+    groups = OrderedDict()
+    for index, resource in enumerate(resources):
+        iresource = get_iresource(resource)
+        groups.setdefault(iresource, []).append(index)
+    sheets_read = [_get_sheets_read(x, request) for x in resources]
+    prefetched = _prefetch_references(resources, sheets_read)
+    cstructs = [None] * len(resources)
+    for indexes in groups.values():
+        first = resources[indexes[0]]
+        path_schema = schema.ResourcePathAndContentSchema()\
+            .bind(request=request, context=first)
+        for index in indexes:
+            resource = resources[index]
+            cstruct = path_schema.serialize({'path': resource})
+            cstruct['data'] = {}
+            for sheet in sheets_read[index]:
+                sheet_schema = sheet._get_schema_for_cstruct(request, {})
+                query = sheet._get_references_query({})
+                appstruct = sheet._get(query, prefetched=prefetched)
+                name = sheet.meta.isheet.__identifier__
+                cstruct['data'][name] = sheet_schema.serialize(appstruct)
+            cstructs[index] = cstruct
+    return cstructs
+
+
+def _get_sheets_read(resource: IResource, request: Request) -> list:
+    """Return new readable sheets for `resource`.
+
+    The sheets returned by the content registry are shared, the batch
+    serialization needs one sheet instance per resource.
+    """
+    registry = request.registry
+    sheets = registry.content.get_sheets_read(resource, request)
+    return [x.meta.sheet_class(x.meta, resource, registry) for x in sheets]
+
+
+def _prefetch_references(resources: list, sheets_read: list) -> dict:
+    """Search the references of all readable sheets with one query.
+
+    :returns: mapping :class:`Reference` to the search result elements
+    """
+    catalogs = find_service(resources[0], 'catalogs')
+    if catalogs is None:
+        return {}  # ease testing
+    references = []
+    for sheets in sheets_read:
+        for sheet in sheets:
+            references.extend(sheet._get_all_references())
+    elements = catalogs.search_references(references_query, references)
+    return elements
+
+
 sheet_meta = SheetMetadata(isheet=ISheet,
                            sheet_class=AnnotationRessourceSheet,
                            schema_class=colander.MappingSchema,
@@ -312,6 +457,22 @@ sheet_meta = SheetMetadata(isheet=ISheet,
                            )
 
 
+def get_schema_defaults(schema: colander.MappingSchema, **kw) -> dict:
+    """Return the default values of the `schema` children.
+
+    Deferred default values are resolved with the bindings `kw`.
+    This is the same as binding the schema and reading the default values,
+    but does not copy the schema node tree.
+    """
+    defaults = {}
+    for node in schema.children:
+        default = node.default
+        if isinstance(default, colander.deferred):
+            default = default(node, kw)
+        defaults[node.name] = default
+    return defaults
+
+
 def add_sheet_to_registry(metadata: SheetMetadata, registry: Registry):
     """Register sheet adapter and metadata to registry.
 
@@ -322,7 +483,7 @@ def add_sheet_to_registry(metadata: SheetMetadata, registry: Registry):
     isheet = metadata.isheet
     if metadata.create_mandatory:
         assert metadata.creatable and metadata.create_mandatory
-    schema = metadata.schema_class()
+    schema = get_sheet_schema(metadata.schema_class, registry)
     for child in schema.children:
         assert child.default != colander.null
         assert child.default != colander.drop
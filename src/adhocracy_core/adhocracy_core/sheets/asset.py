@@ -7,7 +7,6 @@ from PIL import Image
 from pyramid.registry import Registry
 from substanced.file import File
 import colander
-import transaction
 
 from adhocracy_core.interfaces import Dimensions
 from adhocracy_core.interfaces import IResource
@@ -98,6 +97,9 @@ class AssetFileDownload(Persistent):
 
     """Wrapper for a File object that allows downloading the asset data."""
 
+    image_variant_key = None
+    """Key of the shared image variant, see :meth:`generate_image_variant`."""
+
     def __init__(self, dimensions: Dimensions=None):
         """
         Create a new instance.
@@ -108,31 +110,63 @@ class AssetFileDownload(Persistent):
         self.dimensions = dimensions
         self.file = None
 
+    @property
+    def is_pending(self) -> bool:
+        """Return True if this is an image variant not generated yet."""
+        return self.file is None and self.dimensions is not None
+
     def get_response(self,
                      context: IResource,
                      registry: Registry=None) -> FileResponse:
         """
         Return a response object with the binary content of the asset.
 
+        Image variants that are not generated yet are served with the
+        binary content of the parent asset, see
+        :func:`adhocracy_core.resources.asset.generate_image_variants`.
+
         :param parent: the parent of the current resource, used as fallback
                if this view doesn't manage the image by itself
         :param registry: the registry
         """
         if self.file is None:
-            if self.dimensions is None:
-                # retrieve file from parent
-                file = retrieve_asset_file(context.__parent__, registry)
-            else:
-                file = self._crop_and_resize_image(context, registry)
+            # retrieve file from parent
+            file = retrieve_asset_file(context.__parent__, registry)
         else:
             # use locally stored file
             file = self.file
         return file.get_response()
 
-    def _crop_and_resize_image(self,
-                               context: IResource,
-                               registry: Registry) -> File:
-        parent_file = retrieve_asset_file(context.__parent__, registry)
+    def generate_image_variant(self,
+                               parent_file: File,
+                               cache: dict=None,
+                               content_hash: str=None) -> File:
+        """Crop and resize `parent_file` to the dimensions and store it.
+
+        :param cache: cache to share image variants, see
+            :class:`adhocracy_core.resources.asset.ImageVariantsCache`.
+            The key is (`content_hash`, width, height).
+        :param content_hash: hash of the binary content of `parent_file`.
+        """
+        use_cache = cache is not None and content_hash is not None
+        key = (content_hash, self.dimensions.width, self.dimensions.height)
+        file = cache.acquire(key) if use_cache else None
+        if file is None:
+            file = self._crop_and_resize_image(parent_file)
+            if use_cache:
+                cache.add(key, file)
+        self.file = file
+        self.image_variant_key = key if use_cache else None
+        return file
+
+    def release_image_variant(self, cache):
+        """Release the shared image variant from `cache`."""
+        if self.image_variant_key is None:
+            return
+        cache.release(self.image_variant_key)
+        self.image_variant_key = None
+
+    def _crop_and_resize_image(self, parent_file: File) -> File:
         # Crop and resize image via PIL
         with parent_file.blob.open('r') as blobdata:
             mimetype = parent_file.mimetype
@@ -143,10 +177,7 @@ class AssetFileDownload(Persistent):
             bytestream = io.BytesIO()
             resized_image.save(bytestream, image.format)
             bytestream.seek(0)
-        # Store as substanced File and return
-        self.file = File(stream=bytestream, mimetype=mimetype)
-        transaction.commit()  # to avoid BlobError: Uncommitted changes
-        return self.file
+        return File(stream=bytestream, mimetype=mimetype)
 
     def _crop_if_needed(self, image: Image) -> Image:
         """
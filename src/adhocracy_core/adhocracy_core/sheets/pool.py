@@ -1,5 +1,4 @@
 """List, search and filter child resources."""
-from copy import deepcopy
 from pyramid.request import Request
 import colander
 
@@ -8,6 +7,8 @@ from adhocracy_core.interfaces import SheetToSheet
 from adhocracy_core.sheets import AnnotationRessourceSheet
 from adhocracy_core.sheets import sheet_meta
 from adhocracy_core.sheets import add_sheet_to_registry
+from adhocracy_core.sheets import get_resources_content_cstructs
+from adhocracy_core.sheets import iter_resources_content_cstructs
 from adhocracy_core.schema import UniqueReferences
 from adhocracy_core.interfaces import search_query
 from adhocracy_core.interfaces import search_result
@@ -19,7 +20,8 @@ class PoolSheet(AnnotationRessourceSheet):
 
     """Pool resource sheet that allows filtering and aggregating elements."""
 
-    _additional_params = ('serialization_form', 'show_frequency', 'show_count')
+    _additional_params = ('serialization_form', 'show_frequency', 'show_count',
+                          'stream')
 
     def get(self, params: dict={}, add_back_references=True) -> dict:
         """Return child references or arbitrary search for descendants.
@@ -52,7 +54,8 @@ class PoolSheet(AnnotationRessourceSheet):
             query = query._replace(**params)
         return query
 
-    def _get_reference_appstruct(self, query: SearchQuery) -> dict:
+    def _get_reference_appstruct(self, query: SearchQuery,
+                                 prefetched: dict=None) -> dict:
         if not self._catalogs:
             return {}  # ease testing
         default_query = self._get_references_query({})
@@ -68,6 +71,7 @@ class PoolSheet(AnnotationRessourceSheet):
                      'count': result.count,
                      'frequency_of': result.frequency_of,
                      'group_by': result.group_by,
+                     'next_cursor': result.next_cursor,
                      }
         return appstruct
 
@@ -93,6 +97,12 @@ class PoolSheet(AnnotationRessourceSheet):
             add 'count` field, defaults to False.
         show_frequency (bool):
             add 'aggregateby` field. defaults to False.
+        stream (bool):
+            with serialization form `content` the `elements` field is a
+            generator, to serialize the elements one by one. Defaults to False.
+
+        If `cursor` is set the 'next_cursor` field is added, an empty string
+        if there is no next page.
         """
         params = params or {}
         filter_view_permission = self.registry.settings.get(
@@ -105,36 +115,53 @@ class PoolSheet(AnnotationRessourceSheet):
             params['only_visible'] = True
         params_query = remove_keys_from_dict(params, self._additional_params)
         appstruct = self.get(params=params_query)
-        if params.get('serialization_form', False) == 'omit':
+        serialization_form = params.get('serialization_form', False)
+        if serialization_form == 'omit':
             appstruct['elements'] = []
+        if serialization_form == 'content':
+            elements = appstruct.pop('elements', [])
         if params.get('show_frequency', False):
             index_name = params.get('frequency_of', '')
             frequency = appstruct['frequency_of']
             appstruct['aggregateby'] = {index_name: frequency}
+        if appstruct.get('next_cursor', None) is None:
+            appstruct['next_cursor'] = colander.null
         # TODO: rename aggregateby in frequency_of
         schema = self._get_schema_for_cstruct(request, params)
         cstruct = schema.serialize(appstruct)
+        if serialization_form == 'content' and params.get('stream', False):
+            cstruct['elements'] = iter_resources_content_cstructs(elements,
+                                                                  request)
+        elif serialization_form == 'content':
+            cstruct['elements'] = get_resources_content_cstructs(elements,
+                                                                 request)
         return cstruct
 
     def _get_schema_for_cstruct(self, request, params: dict):
         schema = super()._get_schema_for_cstruct(request, params)
-        if params.get('serialization_form', False) == 'content':
-            elements = schema['elements']
-            typ_copy = deepcopy(elements.children[0].typ)
-            typ_copy.serialization_form = 'content'
-            elements.children[0].typ = typ_copy
+        children = []
         if params.get('show_count', False):
             child = colander.SchemaNode(colander.Integer(),
                                         default=0,
                                         missing=colander.drop,
                                         name='count')
-            schema.add(child)
+            children.append(child)
         if params.get('show_frequency', False):
             child = colander.SchemaNode(colander.Mapping(unknown='preserve'),
                                         default={},
                                         missing=colander.drop,
                                         name='aggregateby')
-            schema.add(child)
+            children.append(child)
+        if params.get('cursor', None) is not None:
+            child = colander.SchemaNode(colander.String(),
+                                        default='',
+                                        missing=colander.drop,
+                                        name='next_cursor')
+            children.append(child)
+        if children:
+            schema = schema.clone()  # the bound schema is shared
+            for child in children:
+                schema.add(child)
         return schema
 
 
@@ -1,6 +1,8 @@
 """Rate sheet."""
-from pyramid.traversal import resource_path
+from pyramid.traversal import resource_path_tuple
 from substanced.util import find_catalog
+from substanced.util import find_objectmap
+from substanced.util import get_oid
 from zope.interface import implementer
 import colander
 
@@ -9,7 +11,6 @@ from adhocracy_core.interfaces import IPredicateSheet
 from adhocracy_core.interfaces import IRateValidator
 from adhocracy_core.interfaces import ISheetReferenceAutoUpdateMarker
 from adhocracy_core.interfaces import SheetToSheet
-from adhocracy_core.interfaces import Reference
 from adhocracy_core.sheets import add_sheet_to_registry
 from adhocracy_core.sheets import AttributeResourceSheet
 from adhocracy_core.schema import Integer
@@ -140,17 +141,17 @@ class RateSchema(colander.MappingSchema):
         # Other rates with the same subject and object may occur below the
         # current context (earlier versions of the same rate item).
         # If they occur elsewhere, an error is thrown.
-        adhocracy_catalog = find_catalog(request.context, 'adhocracy')
-        index = adhocracy_catalog['reference']
-        reference_subject = Reference(None, IRate, 'subject', value['subject'])
-        query = index.eq(reference_subject)
-        reference_object = Reference(None, IRate, 'object', value['object'])
-        query &= index.eq(reference_object)
-        system_catalog = find_catalog(request.context, 'system')
-        path_index = system_catalog['path']
-        query &= path_index.noteq(resource_path(request.context), depth=None)
-        elements = query.execute(resolver=None)
-        if elements:
+        oids = find_rate_versions(request.context, value['subject'],
+                                  value['object'])
+        if not oids:
+            return
+        objectmap = find_objectmap(request.context)
+        context_path = resource_path_tuple(request.context)
+        depth = len(context_path)
+        for oid in oids:
+            path = objectmap.path_for(oid)
+            if path is None or path[:depth] == context_path:
+                continue
             err = colander.Invalid(node)
             err['object'] = 'Another rate by the same user already exists'
             raise err
@@ -164,6 +165,32 @@ class RateSchema(colander.MappingSchema):
             raise err
 
 
+def get_rate_key(subject: object, object: object) -> str:
+    """Return the `private_rate_subject_object` index value of a rate.
+
+    The value is build with the oids of `subject` and `object`, or is None if
+    one of them has no oid.
+    """
+    subject_oid = get_oid(subject, None)
+    object_oid = get_oid(object, None)
+    if subject_oid is None or object_oid is None:
+        return None
+    return '{0}:{1}'.format(subject_oid, object_oid)
+
+
+def find_rate_versions(context, subject: object, object: object) -> [int]:
+    """Return the oids of all rate versions with `subject` and `object`.
+
+    This is a single lookup in the `private_rate_subject_object` index.
+    """
+    key = get_rate_key(subject, object)
+    if key is None:
+        return []
+    catalog = find_catalog(context, 'adhocracy')
+    index = catalog['private_rate_subject_object']
+    return list(index.eq(key).execute().ids)
+
+
 rate_meta = sheet_meta._replace(isheet=IRate,
                                 schema_class=RateSchema,
                                 sheet_class=AttributeResourceSheet,
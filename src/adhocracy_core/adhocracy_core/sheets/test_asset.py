@@ -147,19 +147,77 @@ class TestAssetFileDownload:
 
     def test_get_response_with_dimensions_and_without_file(
             self, inst_with_dimensions, context, registry, monkeypatch):
-        from adhocracy_core.sheets.asset import AssetFileDownload
+        from adhocracy_core.sheets import asset
         from substanced.file import File
+        parent = testing.DummyResource()
+        context.__parent__ = parent
         file = Mock(spec=File)
         dummy_response = testing.DummyResource()
         file.get_response.return_value = dummy_response
-        mock_crop_and_resize_image = Mock(
-            spec=AssetFileDownload._crop_and_resize_image, return_value=file)
-        monkeypatch.setattr(inst_with_dimensions, '_crop_and_resize_image',
-                            mock_crop_and_resize_image)
+        mock_retrieve_asset_file = Mock(spec=asset.retrieve_asset_file,
+                                        return_value=file)
+        monkeypatch.setattr(asset, 'retrieve_asset_file',
+                            mock_retrieve_asset_file)
+        inst_with_dimensions._crop_and_resize_image = Mock()
         assert inst_with_dimensions.get_response(context,
                                                  registry) == dummy_response
-        assert mock_crop_and_resize_image.called
-        assert mock_crop_and_resize_image.call_args[0] == (context, registry)
+        assert mock_retrieve_asset_file.call_args[0] == (parent, registry)
+        assert not inst_with_dimensions._crop_and_resize_image.called
+
+    def test_is_pending_without_dimensions(self, inst):
+        assert inst.is_pending is False
+
+    def test_is_pending_with_dimensions_and_without_file(
+            self, inst_with_dimensions):
+        assert inst_with_dimensions.is_pending is True
+
+    def test_is_pending_with_dimensions_and_file(self, inst_with_dimensions):
+        inst_with_dimensions.file = Mock()
+        assert inst_with_dimensions.is_pending is False
+
+    def test_generate_image_variant(self, inst_with_dimensions):
+        parent_file = Mock()
+        file = Mock()
+        inst_with_dimensions._crop_and_resize_image = Mock(return_value=file)
+        assert inst_with_dimensions.generate_image_variant(parent_file) == file
+        assert inst_with_dimensions.file == file
+        inst_with_dimensions._crop_and_resize_image.assert_called_with(
+            parent_file)
+
+    @fixture
+    def cache(self):
+        from adhocracy_core.resources.asset import ImageVariantsCache
+        return ImageVariantsCache()
+
+    def test_generate_image_variant_add_to_cache(self, inst_with_dimensions,
+                                                 cache):
+        file = Mock()
+        inst_with_dimensions._crop_and_resize_image = Mock(return_value=file)
+        inst_with_dimensions.generate_image_variant(Mock(), cache, 'hash')
+        assert dict(cache.files) == {('hash', 200, 100): file}
+        assert inst_with_dimensions.image_variant_key == ('hash', 200, 100)
+
+    def test_generate_image_variant_use_cache(self, inst_with_dimensions,
+                                              cache):
+        file = Mock()
+        inst_with_dimensions._crop_and_resize_image = Mock()
+        cache.add(('hash', 200, 100), file)
+        inst_with_dimensions.generate_image_variant(Mock(), cache, 'hash')
+        assert inst_with_dimensions.file == file
+        assert cache.users[('hash', 200, 100)] == 2
+        assert not inst_with_dimensions._crop_and_resize_image.called
+
+    def test_release_image_variant(self, inst_with_dimensions, cache):
+        inst_with_dimensions._crop_and_resize_image = Mock()
+        inst_with_dimensions.generate_image_variant(Mock(), cache, 'hash')
+        inst_with_dimensions.release_image_variant(cache)
+        assert inst_with_dimensions.image_variant_key is None
+        assert len(cache.files) == 0
+
+    def test_release_image_variant_not_cached(self, inst_with_dimensions):
+        cache = Mock()
+        inst_with_dimensions.release_image_variant(cache)
+        assert not cache.release.called
 
     def test_get_response_with_file(self, inst, context, registry):
         from substanced.file import File
@@ -169,21 +227,15 @@ class TestAssetFileDownload:
         inst.file = file
         assert inst.get_response(context, registry) == dummy_response
 
-    def test_crop_and_resize_image(self, inst_with_dimensions, context,
-                                   registry, monkeypatch):
+    def test_crop_and_resize_image(self, inst_with_dimensions, monkeypatch):
         import io
         from PIL import Image
         from substanced.file import File
-        from adhocracy_core.sheets import asset
         from adhocracy_core.interfaces import Dimensions
         file = Mock(spec=File)
         file.blob = Mock()
         file.blob.open.return_value = io.BytesIO(b'dummy blob')
         file.mimetype = 'image/png'
-        mock_retrieve_asset_file = Mock(spec=asset.retrieve_asset_file,
-                                        return_value=file)
-        monkeypatch.setattr(asset, 'retrieve_asset_file',
-                            mock_retrieve_asset_file)
         mock_image = Mock()
         mock_image.size = (840, 700)
         mock_crop_image = Mock()
@@ -191,13 +243,14 @@ class TestAssetFileDownload:
         mock_open = Mock(spec=Image.open, return_value=mock_image)
         monkeypatch.setattr(Image, 'open', mock_open)
         dimensions = Dimensions(width=200, height=100)
-        result = inst_with_dimensions._crop_and_resize_image(context, registry)
+        result = inst_with_dimensions._crop_and_resize_image(file)
         assert file.blob.open.called
         assert mock_image.crop.called
         assert mock_crop_image.resize.called
         assert mock_crop_image.resize.call_args[0] == (dimensions,
                                                        Image.ANTIALIAS)
-        assert result == inst_with_dimensions.file
+        assert isinstance(result, File)
+        assert result.mimetype == 'image/png'
         assert result.mimetype == file.mimetype
 
     def test_crop_if_needed_crop_height(self, inst_with_dimensions):
@@ -76,6 +76,12 @@ class TestBaseResourceSheet:
         assert IResourceSheet.providedBy(inst)
         assert verifyObject(IResourceSheet, inst)
 
+    def test_create_valid_share_schema(self, sheet_meta, context, registry):
+        inst = self.get_class()(sheet_meta, context, registry=registry)
+        inst_b = self.get_class()(sheet_meta, context, registry=registry)
+        assert isinstance(inst.schema, sheet_meta.schema_class)
+        assert inst.schema is inst_b.schema
+
     def test_create_valid_set_registry_if_available(self, sheet_meta, context,
                                                     registry):
         inst = self.get_class()(sheet_meta, context)
@@ -249,6 +255,21 @@ class TestBaseResourceSheet:
         cstruct = inst.get_cstruct(request_, params={'name': 'child'})
         assert 'name' in inst.get.call_args[1]['params']
 
+    def test_get_schema_for_cstruct_bind_once_per_request(self, inst,
+                                                          request_):
+        schema = inst._get_schema_for_cstruct(request_, {})
+        assert schema.bindings['context'] is inst.context
+        assert schema.bindings['request'] is request_
+        assert inst._get_schema_for_cstruct(request_, {}) is schema
+        assert schema is not inst.schema
+
+    def test_get_schema_for_cstruct_bind_per_context(self, inst, request_):
+        schema = inst._get_schema_for_cstruct(request_, {})
+        inst.context = testing.DummyResource()
+        other = inst._get_schema_for_cstruct(request_, {})
+        assert other is not schema
+        assert other.bindings['context'] is inst.context
+
     def test_get_cstruct_filter_by_view_permission(self, inst, request_):
         inst.get = Mock()
         inst.get.return_value = {}
@@ -508,3 +529,137 @@ class TestAddSheetToRegistry:
                                      schema_class=SheetABSchema)
         with raises(AssertionError):
             self.call_fut(meta_b, registry)
+
+
+class TestGetSchemaDefaults:
+
+    def call_fut(self, schema, **kw):
+        from adhocracy_core.sheets import get_schema_defaults
+        return get_schema_defaults(schema, **kw)
+
+    def test_get_defaults(self):
+        class SchemaA(colander.MappingSchema):
+            count = colander.SchemaNode(colander.Int(), default=1)
+        assert self.call_fut(SchemaA()) == {'count': 1}
+
+    def test_get_deferred_defaults(self):
+        @colander.deferred
+        def deferred_default(node, kw):
+            return kw['count']
+
+        class SchemaA(colander.MappingSchema):
+            count = colander.SchemaNode(colander.Int(),
+                                        default=deferred_default)
+        schema = SchemaA()
+        assert self.call_fut(schema, count=2) == {'count': 2}
+        assert schema['count'].default is deferred_default
+
+
+
+
+class TestGetResourcesContentCstructs:
+
+    @fixture
+    def request(self, mock_content_registry):
+        request = testing.DummyRequest()
+        request.registry.content = mock_content_registry
+        return request
+
+    @fixture
+    def mock_sheet(self, mock_sheet):
+        sheet_class = Mock(return_value=mock_sheet)
+        mock_sheet.meta = mock_sheet.meta._replace(sheet_class=sheet_class)
+        return mock_sheet
+
+    def call_fut(self, resources, request):
+        from adhocracy_core.sheets import get_resources_content_cstructs
+        return get_resources_content_cstructs(resources, request)
+
+    def test_call_without_resources(self, request):
+        assert self.call_fut([], request) == []
+
+    def test_call_with_resources(self, context, request,
+                                 mock_content_registry, mock_sheet):
+        mock_sheet._get.return_value = {}
+        mock_sheet._get_schema_for_cstruct.return_value = \
+            colander.MappingSchema()
+        isheet = mock_sheet.meta.isheet
+        mock_content_registry.get_sheets_read.return_value = [mock_sheet]
+        context['child'] = testing.DummyResource()
+        result = self.call_fut([context, context['child']], request)
+        from adhocracy_core.interfaces import IResource
+        assert result == [{'content_type': IResource.__identifier__,
+                           'data': {isheet.__identifier__: {}},
+                           'path': 'http://example.com/'},
+                          {'content_type': IResource.__identifier__,
+                           'data': {isheet.__identifier__: {}},
+                           'path': 'http://example.com/child/'},
+                          ]
+
+    def test_call_with_resources_create_sheet_per_resource(
+            self, context, request, mock_content_registry, sheet_meta):
+        from . import AnnotationRessourceSheet
+        meta = sheet_meta._replace(
+            sheet_class=Mock(wraps=AnnotationRessourceSheet))
+        original = testing.DummyResource()
+        shared = AnnotationRessourceSheet(meta, original,
+                                          registry=request.registry)
+        mock_content_registry.get_sheets_read.return_value = [shared]
+        context['child'] = testing.DummyResource()
+        result = self.call_fut([context, context['child']], request)
+        contexts = [x[0][1] for x in meta.sheet_class.call_args_list]
+        assert contexts == [context, context['child']]
+        assert shared.context is original
+        assert [x['data'] for x in result] == \
+            [{meta.isheet.__identifier__: {}}] * 2
+
+    def test_call_with_resources_search_references_once(
+            self, context, request, mock_content_registry, sheet_catalogs,
+            sheet_meta):
+        from adhocracy_core.schema import UniqueReferences
+        from adhocracy_core.schema import SheetReference
+
+        class SchemaA(colander.MappingSchema):
+            references = UniqueReferences(reftype=SheetReference)
+        meta = sheet_meta._replace(schema_class=SchemaA)
+        sheet = meta.sheet_class(meta, context, registry=request.registry)
+        mock_content_registry.get_sheets_read.return_value = [sheet]
+        sheet_catalogs.search_references = Mock()
+        sheet_catalogs.search_references.side_effect = \
+            lambda query, refs: {x: [] for x in refs}
+        context['child'] = testing.DummyResource()
+        result = self.call_fut([context, context['child']], request)
+        references = sheet_catalogs.search_references.call_args[0][1]
+        assert [x.source for x in references] == [context, context['child']]
+        assert sheet_catalogs.search_references.call_count == 1
+        assert not sheet_catalogs.search.called
+        assert [x['data'][meta.isheet.__identifier__] for x in result] ==\
+            [{'references': []}, {'references': []}]
+
+    def test_call_with_resources_pass_prefetched_references(
+            self, context, request, mock_content_registry, mock_sheet,
+            sheet_catalogs):
+        mock_sheet._get.return_value = {}
+        mock_sheet._get_schema_for_cstruct.return_value = \
+            colander.MappingSchema()
+        mock_sheet._get_all_references.return_value = []
+        mock_content_registry.get_sheets_read.return_value = [mock_sheet]
+        sheet_catalogs.search_references = Mock(return_value={'ref': []})
+        self.call_fut([context], request)
+        query = mock_sheet._get_references_query.return_value
+        mock_sheet._get.assert_called_with(query, prefetched={'ref': []})
+        mock_sheet._get_references_query.assert_called_with({})
+
+    def test_iter_resources_in_batches(self, context, request, monkeypatch,
+                                       mock_content_registry):
+        from adhocracy_core import sheets
+        from . import iter_resources_content_cstructs
+        monkeypatch.setattr(sheets, 'CONTENT_BATCH_SIZE', 1)
+        mock_content_registry.get_sheets_read.return_value = []
+        context['child'] = testing.DummyResource()
+        result = iter_resources_content_cstructs(iter([context,
+                                                       context['child']]),
+                                                 request)
+        assert next(result)['path'] == 'http://example.com/'
+        assert mock_content_registry.get_sheets_read.call_count == 1
+        assert next(result)['path'] == 'http://example.com/child/'
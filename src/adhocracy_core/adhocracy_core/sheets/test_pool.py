@@ -59,6 +59,7 @@ class TestFilteringPoolSheet:
                              'frequency_of': {},
                              'group_by': {},
                              'count': 0,
+                             'next_cursor': None,
                              }
 
     def test_get_with_children(self, inst, context,  sheet_catalogs):
@@ -89,6 +90,7 @@ class TestFilteringPoolSheet:
                              'frequency_of': {'y': 1},
                              'group_by': {'y': [child]},
                              'count': 1,
+                             'next_cursor': None,
                              }
 
     def test_get_cstruct(self, inst, request_):
@@ -104,6 +106,12 @@ class TestFilteringPoolSheet:
         cstruct = inst.get_cstruct(request_, params={'name': 'child'})
         assert 'name' in inst.get.call_args[1]['params']
 
+    def test_get_schema_for_cstruct_keep_shared_schema(self, inst, request_):
+        schema = inst._get_schema_for_cstruct(request_, {'show_count': True})
+        assert 'count' in schema
+        shared = inst._get_schema_for_cstruct(request_, {})
+        assert 'count' not in shared
+
     def test_get_cstruct_filter_by_view_permission(self, inst, request_):
         inst.get = Mock()
         inst.get.return_value = {'elements': []}
@@ -143,6 +151,33 @@ class TestFilteringPoolSheet:
               'data': {},
               'path': 'http://example.com/'}]
 
+    def test_get_cstruct_with_serialization_content_and_stream(self, inst,
+                                                               request_):
+        from types import GeneratorType
+        inst.get = Mock()
+        child = testing.DummyResource()
+        inst.get.return_value = {'elements': [child]}
+        cstruct = inst.get_cstruct(request_,
+                                   params={'serialization_form': 'content',
+                                           'stream': True})
+        assert 'stream' not in inst.get.call_args[1]['params']
+        assert isinstance(cstruct['elements'], GeneratorType)
+        assert list(cstruct['elements']) == \
+            [{'content_type': 'adhocracy_core.interfaces.IResource',
+              'data': {},
+              'path': 'http://example.com/'}]
+
+    def test_get_cstruct_with_serialization_content_and_show_count(
+            self, inst, request_):
+        inst.get = Mock()
+        child = testing.DummyResource()
+        inst.get.return_value = {'elements': [child, child], 'count': 2}
+        cstruct = inst.get_cstruct(request_,
+                                   params={'serialization_form': 'content',
+                                           'show_count': True})
+        assert cstruct['count'] == '2'
+        assert len(cstruct['elements']) == 2
+
     def test_get_cstruct_with_serialization_omit(self, inst, request_):
         inst.get = Mock()
         child = testing.DummyResource()
@@ -159,6 +194,25 @@ class TestFilteringPoolSheet:
                                    params={'show_count': True})
         assert cstruct['count'] == '1'
 
+    def test_get_cstruct_with_cursor(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'next_cursor': 'next'}
+        cstruct = inst.get_cstruct(request_, params={'cursor': ''})
+        assert inst.get.call_args[1]['params']['cursor'] == ''
+        assert cstruct['next_cursor'] == 'next'
+
+    def test_get_cstruct_with_cursor_last_page(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'next_cursor': None}
+        cstruct = inst.get_cstruct(request_, params={'cursor': 'current'})
+        assert cstruct['next_cursor'] == ''
+
+    def test_get_cstruct_without_cursor(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'next_cursor': None}
+        cstruct = inst.get_cstruct(request_)
+        assert 'next_cursor' not in cstruct
+
     def test_get_cstruct_with_show_aggregate(self, inst, request_):
         inst.get = Mock()
         child = testing.DummyResource()
@@ -199,8 +253,21 @@ class TestIntegrationPoolSheet:
                               'frequency_of': {},
                               'group_by': {},
                               'count': 0,
+                              'next_cursor': None,
                               }
 
+    def test_get_custom_search_with_cursor(self, registry, pool):
+        child = self._make_resource(registry, parent=pool, name='child')
+        child2 = self._make_resource(registry, parent=pool, name='child2')
+        inst = self._get_pool_sheet(pool)
+        params = {'sort_by': 'name', 'limit': 1, 'cursor': ''}
+        appstruct = inst.get(params)
+        params['cursor'] = appstruct['next_cursor']
+        appstruct2 = inst.get(params)
+        assert appstruct['elements'] == [child]
+        assert appstruct2['elements'] == [child2]
+        assert appstruct2['next_cursor'] is None
+
     def test_get_custom_search_empty(self, registry, pool):
         child = self._make_resource(registry, parent=pool, name='child')
         inst = self._get_pool_sheet(pool)
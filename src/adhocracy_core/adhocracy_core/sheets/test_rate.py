@@ -71,36 +71,13 @@ class TestRateSheet:
                               }
 
 
-class DummyQuery:
-
-    def __init__(self, result=[]):
-        self.result = result
-
-    def __iand__(self, other):
-        return self
-
-    def execute(self, **kwargs):
-        return self.result
-
-
-class DummyIndex:
-
-    def __init__(self, result=[]):
-        self.result = result
-
-    def eq(self, *args, **kwargs):
-        return DummyQuery(self.result)
-
-    def noteq(self, *args, **kwargs):
-        return DummyQuery(self.result)
-
-
 @mark.usefixtures('integration')
 class TestRateSchema:
 
     @fixture
     def schema_with_mock_ensure_rate(self, request_, context):
         from adhocracy_core.sheets.rate import RateSchema
+        request_.context = context
         schema = RateSchema().bind(request=request_, context=context)
         schema._ensure_rate_is_unique = Mock()
         return schema
@@ -213,36 +190,61 @@ class TestRateSchema:
         with raises(colander.Invalid):
             schema_with_mock_ensure_rate.deserialize(data)
 
-    def test_ensure_rate_is_unique_ok(self, monkeypatch, request_,
-                                      context, subject):
-        from adhocracy_core.sheets.rate import RateSchema
+    @fixture
+    def mock_find_rate_versions(self, monkeypatch):
         from adhocracy_core.sheets import rate
-        mock_find_catalog = Mock(return_value={'reference': DummyIndex(),
-                                               'path': DummyIndex()})
-        monkeypatch.setattr(rate, 'find_catalog', mock_find_catalog)
+        mock = Mock(spec=rate.find_rate_versions, return_value=[])
+        monkeypatch.setattr(rate, 'find_rate_versions', mock)
+        return mock
+
+    def test_ensure_rate_is_unique_ok(self, request_, context, subject,
+                                      mock_find_rate_versions):
+        from adhocracy_core.sheets.rate import RateSchema
+        request_.context = context
         schema = RateSchema().bind(request=request_, context=context)
         object = _make_rateable()
         node = Mock()
         value = {'subject': subject, 'object': object, 'rate': '1'}
         result = schema._ensure_rate_is_unique(node, value, request_)
         assert result is None
+        mock_find_rate_versions.assert_called_with(context, subject, object)
 
-    def test_ensure_rate_is_unique_error(self, monkeypatch, request_,
-                                         context, subject):
-        from adhocracy_core.sheets.rate import RateSchema
+
+class TestFindRateVersions:
+
+    @fixture
+    def catalog(self, monkeypatch):
+        from hypatia.field import FieldIndex
         from adhocracy_core.sheets import rate
-        from adhocracy_core.utils import named_object
-        mock_find_catalog = Mock(
-            return_value={'reference': DummyIndex(['dummy']),
-                          'path': DummyIndex()})
-        monkeypatch.setattr(rate, 'find_catalog', mock_find_catalog)
-        schema = RateSchema().bind(request=request_, context=context)
-        object = _make_rateable()
-        node = Mock()
-        node.children = [named_object('object')]
-        value = {'subject': subject, 'object': object, 'rate': '1'}
-        with raises(colander.Invalid):
-            schema._ensure_rate_is_unique(node, value, request_)
+        catalog = {'private_rate_subject_object': FieldIndex('key')}
+        monkeypatch.setattr(rate, 'find_catalog', lambda x, y: catalog)
+        return catalog
+
+    def test_get_rate_key(self):
+        from .rate import get_rate_key
+        subject = testing.DummyResource(__oid__=1)
+        object = testing.DummyResource(__oid__=2)
+        assert get_rate_key(subject, object) == '1:2'
+
+    def test_get_rate_key_without_oid(self):
+        from .rate import get_rate_key
+        subject = testing.DummyResource(__oid__=1)
+        assert get_rate_key(subject, testing.DummyResource()) is None
+
+    def test_find_rate_versions_empty(self, context, catalog):
+        from .rate import find_rate_versions
+        subject = testing.DummyResource(__oid__=1)
+        object = testing.DummyResource(__oid__=2)
+        assert find_rate_versions(context, subject, object) == []
+
+    def test_find_rate_versions(self, context, catalog):
+        from .rate import find_rate_versions
+        subject = testing.DummyResource(__oid__=1)
+        object = testing.DummyResource(__oid__=2)
+        index = catalog['private_rate_subject_object']
+        index.index_doc(5, testing.DummyResource(key='1:2'))
+        index.index_doc(6, testing.DummyResource(key='1:3'))
+        assert find_rate_versions(context, subject, object) == [5]
 
 
 @mark.usefixtures('integration')
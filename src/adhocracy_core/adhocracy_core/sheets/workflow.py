@@ -19,6 +19,7 @@ from adhocracy_core.schema import AdhocracySequenceNode
 from adhocracy_core.sheets import add_sheet_to_registry
 from adhocracy_core.sheets import sheet_meta
 from adhocracy_core.sheets import AnnotationRessourceSheet
+from adhocracy_core.sheets import get_schema_defaults
 from adhocracy_core.interfaces import IResourceSheet
 
 
@@ -183,19 +184,14 @@ class WorkflowAssignmentSheet(AnnotationRessourceSheet):
 
     def _get_default_appstruct(self) -> dict:
         workflow = self.registry.content.get_workflow(self.context)
-        schema = self.schema.bind(context=self.context,
-                                  registry=self.registry,
-                                  workflow=workflow)
-        items = [(n.name, n.default) for n in schema]
-        return dict(items)
+        return get_schema_defaults(self.schema,
+                                   context=self.context,
+                                   registry=self.registry,
+                                   workflow=workflow)
 
     def _get_schema_for_cstruct(self, request, params: dict):
         workflow = self.registry.content.get_workflow(self.context)
-        schema = self.schema.bind(context=self.context,
-                                  registry=self.registry,
-                                  workflow=workflow,
-                                  request=request)
-        return schema
+        return self._bind_schema(request, workflow=workflow)
 
     def _store_data(self, appstruct: dict):
         if 'workflow_state' in appstruct:
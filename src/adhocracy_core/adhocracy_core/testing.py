@@ -579,7 +579,7 @@ def add_user_token(root, userid: str, token: str, registry):
     from adhocracy_core.interfaces import ITokenManger
     timestamp = datetime.now()
     token_manager = registry.getAdapter(root, ITokenManger)
-    token_manager.token_to_user_id_timestamp[token] = (userid, timestamp)
+    token_manager.add_token(token, userid, timestamp)
 
 
 def add_user(root, login: str=None, password: str=None, email: str=None,
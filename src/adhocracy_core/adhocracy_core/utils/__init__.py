@@ -2,7 +2,11 @@
 from collections import namedtuple
 from collections.abc import Iterable
 from collections.abc import Sequence
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
 from functools import reduce
 from pytz import UTC
 import os
@@ -309,6 +313,40 @@ def unflatten_multipart_request(request: Request) -> dict:
     return result
 
 
+def get_item_versions(item: IItem) -> [IItemVersion]:
+    """Return the item versions of `item` sorted by name."""
+    index = getattr(item, '_versions_index', None)
+    if index is None:  # no versions or not indexed yet
+        return [x for x in item.values() if IItemVersion.providedBy(x)]
+    return [item[name] for name in index]
+
+
+def get_first_item_version(item: IItem) -> IItemVersion:
+    """Return the first item version of `item` or None."""
+    index = getattr(item, '_versions_index', None)
+    if index is None:  # no versions or not indexed yet
+        versions = get_item_versions(item)
+        return versions[0] if versions else None
+    return item[index.first] if index.first is not None else None
+
+
+def get_last_item_version(item: IItem) -> IItemVersion:
+    """Return the last added item version of `item` or None."""
+    index = getattr(item, '_versions_index', None)
+    if index is None:  # no versions or not indexed yet
+        versions = get_item_versions(item)
+        return versions[-1] if versions else None
+    return item[index.last] if index.last is not None else None
+
+
+def count_item_versions(item: IItem) -> int:
+    """Return the number of item versions of `item`."""
+    index = getattr(item, '_versions_index', None)
+    if index is None:  # no versions or not indexed yet
+        return len(get_item_versions(item))
+    return len(index)
+
+
 def get_last_version(resource: IItemVersion,
                      registry: Registry) -> IItemVersion:
     """Get last version of  resource' according to the last tag."""
@@ -461,6 +499,52 @@ def now() -> datetime:
     return date
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(value: object, docid: int) -> str:
+    """Return opaque search cursor for sort index `value` and `docid`.
+
+    :raises TypeError: if `value` is not None, bool, int, float, str or
+        datetime.
+    """
+    if isinstance(value, datetime):
+        kind = 'naive_datetime' if value.tzinfo is None else 'datetime'
+        epoch = _EPOCH if value.tzinfo is None else _EPOCH_UTC
+        delta = value - epoch
+        value = (delta.days * 86400 + delta.seconds) * 10 ** 6\
+            + delta.microseconds
+    elif value is None or isinstance(value, (int, float, str)):
+        kind = 'value'
+    else:
+        msg = 'Cannot use {0} as search cursor value.'.format(repr(value))
+        raise TypeError(msg)
+    data = json.dumps([kind, value, docid]).encode()
+    return urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Return (sort index value, docid) for the search `cursor`.
+
+    :raises ValueError: if `cursor` is not valid.
+    """
+    try:
+        data = urlsafe_b64decode(cursor.encode()).decode()
+        kind, value, docid = json.loads(data)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid search cursor {0}.'.format(cursor))
+    if not isinstance(docid, int):
+        raise ValueError('Invalid search cursor {0}.'.format(cursor))
+    if kind in ('datetime', 'naive_datetime') and isinstance(value, int):
+        epoch = _EPOCH_UTC if kind == 'datetime' else _EPOCH
+        value = epoch + timedelta(microseconds=value)
+    elif kind != 'value':
+        raise ValueError('Invalid search cursor {0}.'.format(cursor))
+    return value, docid
+
+
 def get_modification_date(registry: Registry) -> datetime:
     """Get the shared modification date for the current transaction.
 
@@ -563,3 +563,123 @@ class TestLoadJson:
     def teardown_method(self, method):
         if hasattr(self, 'tempfd'):
             os.close(self._tempfd)
+
+
+class TestItemVersions:
+
+    @fixture
+    def item(self):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.resources.pool import Pool
+        item = Pool()
+        item.__provides__ = IItem
+        return item
+
+    @fixture
+    def version(self):
+        from adhocracy_core.interfaces import IItemVersion
+        return testing.DummyResource(__provides__=IItemVersion)
+
+    @fixture
+    def version1(self):
+        from adhocracy_core.interfaces import IItemVersion
+        return testing.DummyResource(__provides__=IItemVersion)
+
+    def test_get_item_versions(self, item, version, version1):
+        from . import get_item_versions
+        item['VERSION_0000000'] = version
+        item['VERSION_0000001'] = version1
+        item['LAST'] = testing.DummyResource()
+        assert get_item_versions(item) == [version, version1]
+
+    def test_get_item_versions_not_indexed(self, version, version1):
+        from . import get_item_versions
+        item = testing.DummyResource()
+        item['VERSION_0000000'] = version
+        item['LAST'] = testing.DummyResource()
+        assert get_item_versions(item) == [version]
+
+    def test_get_first_item_version(self, item, version, version1):
+        from . import get_first_item_version
+        item['VERSION_0000000'] = version
+        item['VERSION_0000001'] = version1
+        assert get_first_item_version(item) is version
+
+    def test_get_first_item_version_not_indexed(self, version):
+        from . import get_first_item_version
+        item = testing.DummyResource()
+        item['LAST'] = testing.DummyResource()
+        item['VERSION_0000000'] = version
+        assert get_first_item_version(item) is version
+
+    def test_get_first_item_version_no_versions(self, item):
+        from . import get_first_item_version
+        assert get_first_item_version(item) is None
+
+    def test_get_last_item_version(self, item, version, version1):
+        from . import get_last_item_version
+        item['VERSION_0000000'] = version
+        item['VERSION_0000001'] = version1
+        assert get_last_item_version(item) is version1
+
+    def test_get_last_item_version_not_indexed(self, version):
+        from . import get_last_item_version
+        item = testing.DummyResource()
+        item['VERSION_0000000'] = version
+        item['LAST'] = testing.DummyResource()
+        assert get_last_item_version(item) is version
+
+    def test_get_last_item_version_no_versions(self, item):
+        from . import get_last_item_version
+        assert get_last_item_version(item) is None
+
+    def test_count_item_versions(self, item, version, version1):
+        from . import count_item_versions
+        item['VERSION_0000000'] = version
+        item['VERSION_0000001'] = version1
+        item['LAST'] = testing.DummyResource()
+        assert count_item_versions(item) == 2
+
+    def test_count_item_versions_not_indexed(self, version):
+        from . import count_item_versions
+        item = testing.DummyResource()
+        item['VERSION_0000000'] = version
+        assert count_item_versions(item) == 1
+
+
+class TestCursor:
+
+    def call_fut(self, value, docid):
+        from adhocracy_core.utils import decode_cursor
+        from adhocracy_core.utils import encode_cursor
+        return decode_cursor(encode_cursor(value, docid))
+
+    def test_encode_decode_value(self):
+        assert self.call_fut('name', 1) == ('name', 1)
+        assert self.call_fut(2, 1) == (2, 1)
+        assert self.call_fut(None, 1) == (None, 1)
+
+    def test_encode_decode_datetime(self):
+        from datetime import datetime
+        from pytz import UTC
+        value = datetime(2015, 3, 1, 12, 30, 10, 123456, tzinfo=UTC)
+        assert self.call_fut(value, 1) == (value, 1)
+
+    def test_encode_decode_naive_datetime(self):
+        from datetime import datetime
+        value = datetime(2015, 3, 1, 12, 30, 10, 123456)
+        assert self.call_fut(value, 1) == (value, 1)
+
+    def test_encode_raise_if_wrong_value_type(self):
+        with raises(TypeError):
+            self.call_fut(object(), 1)
+
+    def test_decode_raise_if_invalid(self):
+        from base64 import urlsafe_b64encode
+        from adhocracy_core.utils import decode_cursor
+        with raises(ValueError):
+            decode_cursor('wrong')
+        with raises(ValueError):
+            decode_cursor(urlsafe_b64encode(b'["wrong", 1, 1]').decode())
+        with raises(ValueError):
+            decode_cursor(urlsafe_b64encode(b'["value", 1, "1"]').decode())
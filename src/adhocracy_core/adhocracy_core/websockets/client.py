@@ -1,4 +1,6 @@
 """Our own Websocket client that notifies the server of changes."""
+from collections import OrderedDict
+from threading import Condition
 from threading import Thread
 import json
 import logging
@@ -8,7 +10,6 @@ from websocket import ABNF
 from websocket import create_connection
 from websocket import WebSocketException
 from websocket import WebSocketConnectionClosedException
-from websocket import WebSocketTimeoutException
 
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.utils import exception_to_str
@@ -21,24 +22,48 @@ logger = logging.getLogger(__name__)
 
 class Client:
 
-    """Websocket Client."""
+    """Websocket Client.
+
+    Notifications are added to a bounded outbound queue and send by a
+    sender thread, so committing transactions never blocks on the websocket
+    server. Queued notifications with the same resource path and event type
+    are deduplicated. If the queue is full the oldest ones are dropped.
+    """
+
+    max_queue_size = 10000
+    """Maximal number of queued notifications."""
+    max_batch_size = 100
+    """Maximal number of notifications send with one message."""
 
     def __init__(self, ws_url):
-        """Create instance with running thread that talks to the server.
+        """Create instance with running threads that talk to the server.
 
         :param ws_url: the URL of the websocket server to connect to;
                if None, no connection will be set up (useful for testing)
         """
-        self.changelog_metadata_messages_to_send = set()
-        """Set with :class:`adhocracy_core.resources.subscriber.ChangelogMetadata`
-        that will be send to the websocket server with
-        :func:`Client.send_messages`."""
+        self.stats = {'queued': 0,
+                      'deduplicated': 0,
+                      'dropped': 0,
+                      'sent': 0,
+                      'failed': 0,
+                      }
+        """Counters for queued/deduplicated/dropped/sent notifications and
+        failed send attempts."""
+        self._queue = OrderedDict()
+        self._queue_condition = Condition()
+        self._schema = ServerNotification().bind(context=None)
         self._ws_url = ws_url
         self._ws_connection = None
         self._is_running = False
         self._is_stopped = False
         if ws_url is not None:
             self._init_listener_thread()
+            self._init_sender_thread()
+
+    @property
+    def queue_size(self) -> int:
+        """Return the number of queued notifications."""
+        return len(self._queue)
 
     def _init_listener_thread(self):
         """Init thread that keeps the connection alive."""
@@ -47,6 +72,12 @@ class Client:
         runner.start()
         self._wait_a_bit_until_connected()
 
+    def _init_sender_thread(self):
+        """Init thread that sends the queued notifications."""
+        sender = Thread(target=self._run_sender)
+        sender.daemon = True
+        sender.start()
+
     def _run(self):
         """Start and keep alive connection to the websocket server."""
         assert self._ws_url
@@ -111,43 +142,107 @@ class Client:
             self._is_running = False
 
     def send_messages(self, changelog_metadata=[]):
-        """Send all changelog messages to the websocket server.
+        """Queue changelog messages to be send to the websocket server.
 
         :param changelog_metadata: list of :class:'ChangelogMetadata',
                                    metadata.resource == None is ignored.
 
-        All websocket exceptions are catched, hoping the problems
-        will be solved when you run this method again.
+        This does not block, the messages are send by the sender thread.
         """
-        if not self._is_running:
-            return
-        try:
-            self._send_messages(changelog_metadata)
-        except WebSocketTimeoutException:  # pragma: no cover
-            logger.warning('Could not send message, connection timeout,'
-                           ' try again later')
-        except OSError:  # pragma: no cover
-            logger.warning('Could not send message, connection is broken,'
-                           ' try again later')
-
-    def _send_messages(self, changelog_metadata: list):
-        self.changelog_metadata_messages_to_send.update(changelog_metadata)
-        while self.changelog_metadata_messages_to_send:
-            meta = self.changelog_metadata_messages_to_send.pop()
+        messages = []
+        for meta in changelog_metadata:
             events = extract_events_from_changelog_metadata(meta)
             for event in events:
-                self._send_resource_event(meta.resource, event)
+                message = self._serialize_resource_event(meta.resource, event)
+                messages.append(message)
+        if not messages:
+            return
+        with self._queue_condition:
+            for message in messages:
+                self._add_to_queue(message)
+            self._queue_condition.notify()
+
+    def _serialize_resource_event(self, resource: IResource,
+                                  event_type: str) -> dict:
+        return self._schema.serialize({'event': event_type,
+                                       'resource': resource})
+
+    def _add_to_queue(self, message: dict):
+        key = (message['resource'], message['event'])
+        if key in self._queue:
+            self.stats['deduplicated'] += 1
+            return
+        if len(self._queue) >= self.max_queue_size:
+            self._queue.popitem(last=False)
+            self.stats['dropped'] += 1
+            logger.debug('Websocket notification queue is full, dropped the'
+                         ' oldest notification')
+        self._queue[key] = message
+        self.stats['queued'] += 1
+
+    def _run_sender(self):
+        """Send queued notifications until the client is stopped."""
+        while not self._is_stopped:
+            with self._queue_condition:
+                if not self._queue or not self._is_running:
+                    self._queue_condition.wait(timeout=1)
+            self._send_queued_messages()
 
-    def _send_resource_event(self, resource: IResource, event_type: str):
-        schema = ServerNotification().bind(context=resource)
-        message = schema.serialize({'event': event_type, 'resource': resource})
-        message_text = json.dumps(message)
+    def _send_queued_messages(self):
+        """Send all queued notifications, `max_batch_size` per message.
+
+        All websocket exceptions are catched and the notifications are
+        queued again, hoping the problems will be solved later.
+        """
+        while self._is_running:
+            batch = self._pop_batch()
+            if not batch:
+                return
+            try:
+                self._send_batch(batch)
+            except (WebSocketException, OSError) as err:
+                logger.warning('Could not send message to the Websocket'
+                               ' server, try again later: %s',
+                               exception_to_str(err))
+                self.stats['failed'] += 1
+                self._requeue(batch)
+                return
+
+    def _pop_batch(self) -> list:
+        with self._queue_condition:
+            size = min(self.max_batch_size, len(self._queue))
+            return [self._queue.popitem(last=False) for x in range(size)]
+
+    def _requeue(self, batch: list):
+        with self._queue_condition:
+            queue = OrderedDict(batch)
+            for key, message in self._queue.items():
+                queue.setdefault(key, message)
+            while len(queue) > self.max_queue_size:
+                queue.popitem(last=False)
+                self.stats['dropped'] += 1
+            self._queue = queue
+
+    def _send_batch(self, batch: list):
+        """Send notifications with one message.
+
+        Multiple notifications are send as JSON array, a single one as JSON
+        object.
+        """
+        messages = [message for key, message in batch]
+        if len(messages) == 1:
+            message_text = json.dumps(messages[0])
+        else:
+            message_text = json.dumps(messages)
         logger.debug('Sending message to Websocket server: %s', message_text)
         self._ws_connection.send(message_text)
+        self.stats['sent'] += len(messages)
 
     def stop(self):
         """Stop the client."""
         self._is_stopped = True
+        with self._queue_condition:
+            self._queue_condition.notify()
         try:
             if self._is_connected():
                 self._close_connection(b'done')
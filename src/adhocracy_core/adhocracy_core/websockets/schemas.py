@@ -10,7 +10,11 @@ class Action(colander.SchemaNode):
     """An action requested by a client."""
 
     schema_type = colander.String
-    validator = colander.OneOf(['subscribe', 'unsubscribe'])
+    validator = colander.OneOf(['subscribe',
+                                'unsubscribe',
+                                'subscribe_subtree',
+                                'unsubscribe_subtree',
+                                ])
 
 
 class ClientRequestSchema(colander.MappingSchema):
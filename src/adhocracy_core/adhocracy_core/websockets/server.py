@@ -1,5 +1,9 @@
 """Classes used by the standalone Websocket server."""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 import time
+from collections import OrderedDict
 from collections import defaultdict
 from collections import Hashable
 from collections import Iterable
@@ -9,8 +13,12 @@ import logging
 
 from autobahn.asyncio.websocket import WebSocketServerProtocol
 from autobahn.websocket.protocol import ConnectionRequest
+from pyramid.traversal import find_resource
+from pyramid.traversal import lineage
 from pyramid.traversal import resource_path
+from substanced.util import get_oid
 from ZODB import Connection
+from ZODB import DB
 import colander
 
 from adhocracy_core.interfaces import IResource
@@ -29,47 +37,62 @@ logger = logging.getLogger(__name__)
 
 class ClientTracker():
 
-    """Keeps track of the clients that want notifications."""
+    """Keeps track of the clients that want notifications.
+
+    Subscriptions are stored by resource oid. Clients may subscribe to a
+    single resource or to a resource and all its descendants (`subtree`).
+    """
 
     def __init__(self):
         """Initialize self."""
-        self._clients2resource_paths = defaultdict(set)
-        self._resource_paths2clients = defaultdict(set)
+        self._clients2resource_oids = defaultdict(set)
+        self._resource_oids2clients = defaultdict(set)
+        self._clients2subtree_oids = defaultdict(set)
+        self._subtree_oids2clients = defaultdict(set)
+
+    def _get_mappings(self, subtree: bool) -> tuple:
+        if subtree:
+            return self._clients2subtree_oids, self._subtree_oids2clients
+        else:
+            return self._clients2resource_oids, self._resource_oids2clients
 
-    def is_subscribed(self, client: Hashable, resource: IResource) -> bool:
+    def is_subscribed(self, client: Hashable, resource: IResource,
+                      subtree=False) -> bool:
         """Check whether a client is subscribed to a resource."""
-        path = resource_path(resource)
-        return (client in self._clients2resource_paths and
-                path in self._clients2resource_paths[client])
+        clients2oids, oids2clients = self._get_mappings(subtree)
+        oid = get_oid(resource)
+        return client in clients2oids and oid in clients2oids[client]
 
-    def subscribe(self, client: Hashable, resource: IResource) -> bool:
+    def subscribe(self, client: Hashable, resource: IResource,
+                  subtree=False) -> bool:
         """Subscribe a client to a resource, if necessary.
 
+        :param subtree: subscribe to the resource and all descendants
         :return: True if the subscription was successful, False if it was
                  unnecessary (the client was already subscribed).
         """
-        if self.is_subscribed(client, resource):
+        if self.is_subscribed(client, resource, subtree=subtree):
             return False
-        path = resource_path(resource)
-        self._clients2resource_paths[client].add(path)
-        self._resource_paths2clients[path].add(client)
+        clients2oids, oids2clients = self._get_mappings(subtree)
+        oid = get_oid(resource)
+        clients2oids[client].add(oid)
+        oids2clients[oid].add(client)
         return True
 
-    def unsubscribe(self, client: Hashable, resource: IResource) -> bool:
+    def unsubscribe(self, client: Hashable, resource: IResource,
+                    subtree=False) -> bool:
         """Unsubscribe a client from a resource, if necessary.
 
+        :param subtree: unsubscribe from the resource and all descendants
         :return: True if the unsubscription was successful, False if it was
                  unnecessary (the client was not subscribed).
         """
-        if not self.is_subscribed(client, resource):
+        if not self.is_subscribed(client, resource, subtree=subtree):
             return False
-        path = resource_path(resource)
-        self._discard_from_set_valued_dict(self._clients2resource_paths,
-                                           client,
-                                           path)
-        self._discard_from_set_valued_dict(self._resource_paths2clients,
-                                           path,
-                                           client)
+        clients2oids, oids2clients = self._get_mappings(subtree)
+        oid = get_oid(resource)
+        self._discard_from_set_valued_dict(clients2oids, client, oid)
+        self._discard_from_set_valued_dict(oids2clients, oid, client)
         return True
 
     def _discard_from_set_valued_dict(self, set_valued_dict, key, value):
@@ -83,26 +106,100 @@ class ClientTracker():
 
     def delete_subscriptions_for_client(self, client: Hashable):
         """Delete all subscriptions for a client."""
-        path_set = self._clients2resource_paths.pop(client, set())
-        for path in path_set:
-            self._discard_from_set_valued_dict(self._resource_paths2clients,
-                                               path, client)
+        for subtree in (False, True):
+            clients2oids, oids2clients = self._get_mappings(subtree)
+            oid_set = clients2oids.pop(client, set())
+            for oid in oid_set:
+                self._discard_from_set_valued_dict(oids2clients, oid, client)
 
     def delete_subscriptions_to_resource(self, resource: IResource):
         """Delete all subscriptions to a resource."""
-        path = resource_path(resource)
-        client_set = self._resource_paths2clients.pop(path, set())
-        for client in client_set:
-            self._discard_from_set_valued_dict(self._clients2resource_paths,
-                                               client, path)
+        oid = get_oid(resource)
+        for subtree in (False, True):
+            clients2oids, oids2clients = self._get_mappings(subtree)
+            client_set = oids2clients.pop(oid, set())
+            for client in client_set:
+                self._discard_from_set_valued_dict(clients2oids, client, oid)
 
     def iterate_subscribers(self, resource: IResource) -> Iterable:
-        """Return an iterator over all clients subscribed to a resource."""
-        path = resource_path(resource)
+        """Return an iterator over all clients subscribed to a resource.
+
+        This includes clients subscribed to the subtree of the resource
+        or one of its parents.
+        """
+        clients = set()
+        oid = get_oid(resource)
         # 'if' check is necessary to avoid creating spurious empty sets
-        if path in self._resource_paths2clients:
-            for client in self._resource_paths2clients[path]:
-                yield client
+        if oid in self._resource_oids2clients:
+            clients.update(self._resource_oids2clients[oid])
+        if self._subtree_oids2clients:
+            for location in lineage(resource):
+                location_oid = get_oid(location, None)
+                if location_oid in self._subtree_oids2clients:
+                    clients.update(self._subtree_oids2clients[location_oid])
+        yield from clients
+
+
+class ZODBExecutor:
+
+    """Run ZODB reads in worker threads with one connection per worker.
+
+    This keeps slow ZODB/ZEO round trips out of the asyncio event loop.
+    Persistent objects must not be passed between threads, so resources
+    returned by :meth:`resolve` should only be used in later jobs of the
+    same executor. With the default of one worker all jobs run in the same
+    thread and connection, in the order they were submitted.
+    """
+
+    def __init__(self, database: DB, loop=None, max_workers=1):
+        """Initialize self."""
+        self.database = database
+        self.loop = loop or asyncio.get_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._local = threading.local()
+        self._connections = []
+
+    def get_connection(self) -> Connection:
+        """Return the zodb connection of the current worker thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self.database.open()
+            self._local.connection = connection
+            self._connections.append(connection)
+        return connection
+
+    def submit(self, func, *args) -> asyncio.Future:
+        """Run `func` in a worker thread with a synchronized connection."""
+        return self.loop.run_in_executor(self._executor, self._call, func,
+                                         args)
+
+    def _call(self, func, args):
+        self.get_connection().sync()
+        return func(*args)
+
+    @asyncio.coroutine
+    def resolve(self, path: str) -> IResource:
+        """Return the resource with `path`, the lookup runs in a worker.
+
+        :raises KeyError: if the resource does not exist
+        """
+        resource = yield from self.submit(self._find_resource, path)
+        return resource
+
+    def _find_resource(self, path: str) -> IResource:
+        root = self.get_connection().root()['app_root']
+        return find_resource(root, path)
+
+    def call_in_loop(self, func, *args):
+        """Schedule `func` to run in the event loop thread."""
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def shutdown(self):
+        """Wait for pending jobs and close all zodb connections."""
+        self._executor.shutdown(wait=True)
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
 
 
 class DummyRequest:
@@ -132,12 +229,21 @@ class ClientCommunicator(WebSocketServerProtocol):
 
     Note that the `zodb_connection` attribute **must** be set
     instances of this class can be used!
+
+    If the `zodb_executor` attribute is set, messages are handled in the
+    executor worker thread and outgoing messages are send from the event
+    loop. Otherwise messages are handled directly in the event loop.
     """
 
     # All instances of this class share the same zodb database object
     zodb_database = None
+    # All instances of this class share the same zodb executor
+    zodb_executor = None
     # All instances of this class share the same tracker
     _tracker = ClientTracker()
+    # Mapping client to notifications that are send as one message after
+    # dispatching a batch of server notifications, None if not dispatching
+    _pending_notifications = None
     # All instances of this class share the same rest server url
     # This is used to generate the resource URLs. It is equal to the
     # url the adhocracy frontend is using to communicate with the rest server.
@@ -173,6 +279,9 @@ class ClientCommunicator(WebSocketServerProtocol):
                 connection.sync()
 
     def _get_zodb_connection(self) -> Connection:
+        if self.zodb_executor is not None:
+            # the executor synchronizes the connection once per message
+            return self.zodb_executor.get_connection()
         connection = getattr(self, '_zodb_connection', None)
         if connection is None:
             connection = self.zodb_database.open()
@@ -195,6 +304,13 @@ class ClientCommunicator(WebSocketServerProtocol):
         logger.debug('WebSocket connection to %s open', self._client)
 
     def onMessage(self, payload: bytes, is_binary: bool):  # noqa
+        if self.zodb_executor is None:
+            self._handle_message(payload, is_binary)
+        else:
+            self.zodb_executor.submit(self._handle_message, payload,
+                                      is_binary)
+
+    def _handle_message(self, payload: bytes, is_binary: bool):
         try:
             json_object = self._parse_message(payload, is_binary)
             if self._handle_if_server_notification(json_object):
@@ -227,14 +343,18 @@ class ClientCommunicator(WebSocketServerProtocol):
         :return: True if the message is a valid event notification from our
                  Pyramid app and has been handled; False otherwise
         """
-        if (self._client_may_send_notifications and
-                self._looks_like_event_notification(json_object)):
-            notification = self._parse_json_via_schema(json_object,
-                                                       ServerNotification)
-            self._dispatch_event_notification_to_subscribers(notification)
-            return True
+        if not self._client_may_send_notifications:
+            return False
+        if self._looks_like_event_notification(json_object):
+            json_objects = [json_object]
+        elif self._looks_like_event_notifications(json_object):
+            json_objects = json_object
         else:
             return False
+        notifications = [self._parse_json_via_schema(x, ServerNotification)
+                         for x in json_objects]
+        self._dispatch_event_notifications_to_subscribers(notifications)
+        return True
 
     def _parse_json_via_schema(self, json_object, schema_class) -> dict:
         try:
@@ -268,6 +388,30 @@ class ClientCommunicator(WebSocketServerProtocol):
     def _looks_like_event_notification(self, json_object) -> bool:
         return isinstance(json_object, dict) and 'event' in json_object
 
+    def _looks_like_event_notifications(self, json_object) -> bool:
+        return isinstance(json_object, list) and len(json_object) > 0 and\
+            all(self._looks_like_event_notification(x) for x in json_object)
+
+    def _dispatch_event_notifications_to_subscribers(self,
+                                                     notifications: list):
+        """Dispatch `notifications` and send one message per client.
+
+        All notifications for one client are send as JSON array, a single
+        notification is send as JSON object.
+        """
+        pending = OrderedDict()
+        ClientCommunicator._pending_notifications = pending
+        try:
+            for notification in notifications:
+                self._dispatch_event_notification_to_subscribers(notification)
+        finally:
+            ClientCommunicator._pending_notifications = None
+        for client, messages in pending.items():
+            if len(messages) == 1:
+                client._send_json_message(messages[0])
+            else:
+                client._send_json_message(messages)
+
     def _dispatch_event_notification_to_subscribers(self, notification: dict):
         event = notification['event']
         resource = notification['resource']
@@ -312,10 +456,11 @@ class ClientCommunicator(WebSocketServerProtocol):
         :return: True if the request was necessary, False if it was an
                  unnecessary no-op
         """
-        if action == 'subscribe':
-            return self._tracker.subscribe(self, resource)
+        subtree = action.endswith('_subtree')
+        if action.startswith('subscribe'):
+            return self._tracker.subscribe(self, resource, subtree=subtree)
         else:
-            return self._tracker.unsubscribe(self, resource)
+            return self._tracker.unsubscribe(self, resource, subtree=subtree)
 
     def _send_status_confirmation(self, update_was_necessary: bool,
                                   action: str, resource: IResource):
@@ -329,7 +474,10 @@ class ClientCommunicator(WebSocketServerProtocol):
         """Send a JSON object as message to the client."""
         text = dumps(json_message)
         logger.debug('Sending message to client %s: %s', self._client, text)
-        self.sendMessage(text.encode())
+        if self.zodb_executor is None:
+            self.sendMessage(text.encode())
+        else:
+            self.zodb_executor.call_in_loop(self.sendMessage, text.encode())
 
     def _dispatch_created_event(self, resource: IResource):
         if IItemVersion.providedBy(resource):
@@ -385,7 +533,7 @@ class ClientCommunicator(WebSocketServerProtocol):
         """Send notification about an event affecting a resource."""
         schema = self._create_schema(Notification)
         data = schema.serialize({'event': event_type, 'resource': resource})
-        self._send_json_message(data)
+        self._send_or_add_pending_notification(data)
 
     def send_child_notification(self, status: str, resource: IResource,
                                 child: IResource):
@@ -397,7 +545,7 @@ class ClientCommunicator(WebSocketServerProtocol):
         data = schema.serialize({'event': status + '_child',
                                  'resource': resource,
                                  'child': child})
-        self._send_json_message(data)
+        self._send_or_add_pending_notification(data)
 
     def send_new_version_notification(self, resource: IResource,
                                       new_version: IResource):
@@ -406,10 +554,27 @@ class ClientCommunicator(WebSocketServerProtocol):
         data = schema.serialize({'event': 'new_version',
                                  'resource': resource,
                                  'version': new_version})
-        self._send_json_message(data)
+        self._send_or_add_pending_notification(data)
+
+    def _send_or_add_pending_notification(self, data: dict):
+        """Send notification or add to pending notifications if batching.
+
+        Duplicated pending notifications are ignored.
+        """
+        pending = self._pending_notifications
+        if pending is None:
+            self._send_json_message(data)
+            return
+        messages = pending.setdefault(self, [])
+        if data not in messages:
+            messages.append(data)
 
     def onClose(self, was_clean: bool, code: int, reason: str):  # noqa
-        self._tracker.delete_subscriptions_for_client(self)
+        if self.zodb_executor is None:
+            self._tracker.delete_subscriptions_for_client(self)
+        else:
+            self.zodb_executor.submit(
+                self._tracker.delete_subscriptions_for_client, self)
         clean_str = 'Clean' if was_clean else 'Unclean'
         logger.debug('%s close of WebSocket connection to %s; reason: %s',
                      clean_str, self._client, reason)
@@ -11,6 +11,7 @@ import sys
 from autobahn.asyncio.websocket import WebSocketServerFactory
 from ZODB import DB
 from adhocracy_core.websockets.server import ClientCommunicator
+from adhocracy_core.websockets.server import ZODBExecutor
 from zodburi import resolve_uri
 import asyncio
 
@@ -83,19 +84,24 @@ def _register_sigterm_handler(pid_file: str):
 
 
 def _start_loop(config: ConfigParser, port: int, pid_file: str):
+    executor = None
     try:
         database = _get_zodb_database(config)
         ClientCommunicator.zodb_database = database
+        loop = asyncio.get_event_loop()
+        executor = ZODBExecutor(database, loop=loop)
+        ClientCommunicator.zodb_executor = executor
         rest_url = _get_rest_url(config)
         ClientCommunicator.rest_url = rest_url
         factory = WebSocketServerFactory('ws://localhost:{}'.format(port))
         factory.protocol = ClientCommunicator
-        loop = asyncio.get_event_loop()
         coro = loop.create_server(factory, port=port)
         logger.debug('Started WebSocket server listening on port %i', port)
         server = loop.run_until_complete(coro)
         _run_loop_until_interrupted(loop, server)
     finally:
+        if executor is not None:
+            executor.shutdown()
         logger.info('Stopped WebSocket server')
         _remove_pid_file(pid_file)
 
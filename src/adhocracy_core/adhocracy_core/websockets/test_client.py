@@ -136,6 +136,7 @@ class TestClient:
         client = self.make_one(None)
         client._is_running = True
         client.send_messages()
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
 
     def test_send_messages_nonempty_queue(self, changelog_meta):
@@ -143,6 +144,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta._replace(created=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
@@ -152,6 +154,7 @@ class TestClient:
         client._is_running = False
         metadata = [changelog_meta._replace(created=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
 
     def test_send_messages_not_modified_or_created(self, changelog_meta):
@@ -159,6 +162,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -168,6 +172,7 @@ class TestClient:
         metadata = [changelog_meta._replace(resource=None,
                                             created=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -180,23 +185,27 @@ class TestClient:
         metadata = [changelog_meta._replace(created=True,
                                             modified=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
 
     def test_send_messages_changed_descendants_and_modified(self, changelog_meta):
         """If a resource has changed_descendants amd is modified, both
-         events should be sent.
+         events should be sent with one message.
         """
+        import json
         client = self.make_one(None)
         client._is_running = True
         metadata = [changelog_meta._replace(changed_descendants=True,
                                             modified=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
-        assert len(self._dummy_connection.queue) == 2
-        assert 'modified' in self._dummy_connection.queue[0]
-        assert 'changed_descendants' in self._dummy_connection.queue[1]
+        assert len(self._dummy_connection.queue) == 1
+        messages = json.loads(self._dummy_connection.queue[0])
+        assert messages[0]['event'] == 'modified'
+        assert messages[1]['event'] == 'changed_descendants'
 
     def test_send_messages_changed_backrefs_and_modified(self, changelog_meta):
         """No additional event is sent if a backreferenced resource
@@ -207,6 +216,7 @@ class TestClient:
         metadata = [changelog_meta._replace(modified=True,
                                             changed_backrefs=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'modified' in self._dummy_connection.queue[0]
@@ -220,6 +230,7 @@ class TestClient:
             modified=True,
             visibility=VisibilityChange.invisible)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -232,6 +243,7 @@ class TestClient:
         metadata = [changelog_meta._replace(
             visibility=VisibilityChange.concealed)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'removed' in self._dummy_connection.queue[0]
@@ -242,6 +254,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta._replace(changed_backrefs=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'modified' in self._dummy_connection.queue[0]
@@ -256,6 +269,7 @@ class TestClient:
         metadata = [changelog_meta._replace(created=True,
                                             changed_backrefs=True)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
@@ -269,10 +283,71 @@ class TestClient:
         metadata = [changelog_meta._replace(modified=True,
                                             resource=resource)]
         client.send_messages(metadata)
+        client._send_queued_messages()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
 
+    def test_send_messages_keep_queue_if_not_running(self, changelog_meta):
+        client = self.make_one(None)
+        metadata = [changelog_meta._replace(created=True)]
+        client.send_messages(metadata)
+        client._send_queued_messages()
+        assert client.queue_size == 1
+        client._is_running = True
+        client._send_queued_messages()
+        assert client.queue_size == 0
+        assert len(self._dummy_connection.queue) == 1
+
+    def test_send_messages_deduplicate(self, changelog_meta):
+        client = self.make_one(None)
+        client._is_running = True
+        metadata = [changelog_meta._replace(modified=True)]
+        client.send_messages(metadata)
+        client.send_messages(metadata)
+        client._send_queued_messages()
+        assert len(self._dummy_connection.queue) == 1
+        assert client.stats['deduplicated'] == 1
+        assert client.stats['sent'] == 1
+
+    def test_send_messages_drop_oldest_if_queue_full(self, changelog_meta,
+                                                     pool_graph):
+        import json
+        client = self.make_one(None)
+        client._is_running = True
+        client.max_queue_size = 1
+        other = self._make_resource(pool_graph, name='other')
+        client.send_messages([changelog_meta._replace(modified=True)])
+        client.send_messages([changelog_meta._replace(modified=True,
+                                                      resource=other)])
+        client._send_queued_messages()
+        message = json.loads(self._dummy_connection.queue[0])
+        assert message['resource'] == '/other'
+        assert client.stats['dropped'] == 1
+
+    def test_send_messages_in_batches(self, changelog_meta, pool_graph):
+        client = self.make_one(None)
+        client._is_running = True
+        client.max_batch_size = 2
+        other = self._make_resource(pool_graph, name='other')
+        client.send_messages([
+            changelog_meta._replace(modified=True, changed_descendants=True),
+            changelog_meta._replace(modified=True, resource=other)])
+        client._send_queued_messages()
+        assert len(self._dummy_connection.queue) == 2
+        assert client.stats['sent'] == 3
+
+    def test_send_messages_requeue_if_sending_fails(self, changelog_meta):
+        from websocket import WebSocketException
+        client = self.make_one(None)
+        client._is_running = True
+        self._dummy_connection.send = Mock(side_effect=WebSocketException)
+        client.send_messages([changelog_meta._replace(modified=True)])
+        client._send_queued_messages()
+        assert client.queue_size == 1
+        assert client.stats['failed'] == 1
+
+
 @mark.websocket
 class TestFunctionalClient:
 
@@ -298,9 +373,10 @@ class TestFunctionalClient:
         context = DummyResource()
         child = DummyResource()
         context['child'] = child
-        metadata = [changelog_meta._replace(resource=child)]
-        websocket_client._send_messages(metadata)
-        assert websocket_client.changelog_metadata_messages_to_send == set()
+        metadata = [changelog_meta._replace(resource=child, created=True)]
+        websocket_client.send_messages(metadata)
+        websocket_client._send_queued_messages()
+        assert websocket_client.queue_size == 0
 
     def test_includeme_without_ws_url_setting(self, config):
         from adhocracy_core.websockets.client import includeme
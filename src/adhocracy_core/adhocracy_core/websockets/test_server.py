@@ -34,6 +34,9 @@ class DummyZODBConnection:
     def sync(self):
         pass
 
+    def close(self):
+        pass
+
     def root(self):
         return self.zodb_root or {}
 
@@ -55,8 +58,8 @@ class QueueingClientCommunicator(ClientCommunicator):
 class ClientCommunicatorUnitTests(unittest.TestCase):
 
     def setUp(self):
-        app_root = testing.DummyResource()
-        app_root['child'] = testing.DummyResource()
+        app_root = testing.DummyResource(__oid__=1)
+        app_root['child'] = testing.DummyResource(__oid__=2)
         zodb_root = testing.DummyResource()
         zodb_root['app_root'] = app_root
         app_root.__name__ = app_root.__parent__ = None
@@ -264,9 +267,9 @@ class EventDispatchUnitTests(unittest.TestCase):
     """Test event dispatch from one ClientCommunicator to others."""
 
     def setUp(self):
-        app_root = testing.DummyResource()
-        app_root['child'] = testing.DummyResource()
-        app_root['child']['grandchild'] = testing.DummyResource()
+        app_root = testing.DummyResource(__oid__=1)
+        app_root['child'] = testing.DummyResource(__oid__=2)
+        app_root['child']['grandchild'] = testing.DummyResource(__oid__=3)
         zodb_root = testing.DummyResource()
         zodb_root['app_root'] = app_root
         app_root.__name__ = app_root.__parent__ = None
@@ -357,6 +360,44 @@ class EventDispatchUnitTests(unittest.TestCase):
             'event': 'changed_descendants',
             'resource': self.request.application_url + '/child/'}
 
+    def test_dispatch_multiple_notifications_with_one_message(self):
+        msg = build_message([{'event': 'modified', 'resource': '/child'},
+                             {'event': 'changed_descendants',
+                              'resource': '/child'}])
+        self._dispatcher.onMessage(msg, False)
+        assert len(self._dispatcher.queue) == 0
+        assert self._subscriber.queue[-1] == [
+            {'event': 'modified',
+             'resource': self.request.application_url + '/child/'},
+            {'event': 'changed_descendants',
+             'resource': self.request.application_url + '/child/'}]
+
+    def test_dispatch_multiple_notifications_ignore_duplicates(self):
+        msg = build_message([{'event': 'modified', 'resource': '/child'},
+                             {'event': 'modified', 'resource': '/child'}])
+        self._dispatcher.onMessage(msg, False)
+        assert self._subscriber.queue[-1] == {
+            'event': 'modified',
+            'resource': self.request.application_url + '/child/'}
+
+    def test_dispatch_notification_to_subtree_subscriber(self):
+        subscriber = QueueingClientCommunicator()
+        subscriber.onConnect(DummyConnectionRequest('websocket peer2'))
+        msg = build_message({'action': 'subscribe_subtree',
+                             'resource': self.request.application_url + '/'})
+        subscriber.onMessage(msg, False)
+        assert subscriber.queue[-1]['status'] == 'ok'
+        msg = build_message({'event': 'modified',
+                             'resource': '/child/grandchild'})
+        self._dispatcher.onMessage(msg, False)
+        assert subscriber.queue[-1] == [
+            {'event': 'modified',
+             'resource': self.request.application_url + '/child/grandchild/'},
+            {'event': 'modified_child',
+             'resource': self.request.application_url + '/child/',
+             'child': self.request.application_url + '/child/grandchild/'}]
+        subscriber.onClose(True, 0, 'teardown')
+
     def test_dispatch_invalid_event_notification(self):
         msg = build_message({'event': 'new_child',
                              'resource': '/child/grandchild'})
@@ -373,13 +414,14 @@ class ClientTrackerUnitTests(unittest.TestCase):
 
     def setUp(self):
         from adhocracy_core.websockets.server import ClientTracker
-        app_root = testing.DummyResource()
-        app_root['child'] = testing.DummyResource()
+        app_root = testing.DummyResource(__oid__=1)
+        app_root['child'] = testing.DummyResource(__oid__=2)
         self._child = app_root['child']
         self._tracker = ClientTracker()
 
     def _make_child2(self):
-        result = self._child.__parent__['child2'] = testing.DummyResource()
+        result = self._child.__parent__['child2'] = testing.DummyResource(
+            __oid__=3)
         return result
 
     def test_subscribe(self):
@@ -387,10 +429,10 @@ class ClientTrackerUnitTests(unittest.TestCase):
         resource = self._child
         result = self._tracker.subscribe(client, resource)
         assert result is True
-        assert len(self._tracker._clients2resource_paths) == 1
-        assert len(self._tracker._resource_paths2clients) == 1
-        assert self._tracker._clients2resource_paths[client] == {'/child'}
-        assert self._tracker._resource_paths2clients['/child'] == {client}
+        assert len(self._tracker._clients2resource_oids) == 1
+        assert len(self._tracker._resource_oids2clients) == 1
+        assert self._tracker._clients2resource_oids[client] == {2}
+        assert self._tracker._resource_oids2clients[2] == {client}
 
     def test_subscribe_redundant(self):
         """Test client subscribing same resource twice."""
@@ -409,12 +451,11 @@ class ClientTrackerUnitTests(unittest.TestCase):
         result2 = self._tracker.subscribe(client, resource2)
         assert result1 is True
         assert result2 is True
-        assert len(self._tracker._clients2resource_paths) == 1
-        assert len(self._tracker._resource_paths2clients) == 2
-        assert self._tracker._clients2resource_paths[client] == {'/child',
-                                                                 '/child2'}
-        assert self._tracker._resource_paths2clients['/child'] == {client}
-        assert self._tracker._resource_paths2clients['/child2'] == {client}
+        assert len(self._tracker._clients2resource_oids) == 1
+        assert len(self._tracker._resource_oids2clients) == 2
+        assert self._tracker._clients2resource_oids[client] == {2, 3}
+        assert self._tracker._resource_oids2clients[2] == {client}
+        assert self._tracker._resource_oids2clients[3] == {client}
 
     def test_subscribe_two_clients(self):
         """Test two clients subscribing to same resource."""
@@ -425,11 +466,11 @@ class ClientTrackerUnitTests(unittest.TestCase):
         result2 = self._tracker.subscribe(client2, resource)
         assert result1 is True
         assert result2 is True
-        assert len(self._tracker._clients2resource_paths) == 2
-        assert len(self._tracker._resource_paths2clients) == 1
-        assert self._tracker._clients2resource_paths[client1] == {'/child'}
-        assert self._tracker._clients2resource_paths[client2] == {'/child'}
-        assert self._tracker._resource_paths2clients['/child'] == {client1, client2}
+        assert len(self._tracker._clients2resource_oids) == 2
+        assert len(self._tracker._resource_oids2clients) == 1
+        assert self._tracker._clients2resource_oids[client1] == {2}
+        assert self._tracker._clients2resource_oids[client2] == {2}
+        assert self._tracker._resource_oids2clients[2] == {client1, client2}
 
     def test_unsubscribe(self):
         client = self._make_client()
@@ -437,8 +478,8 @@ class ClientTrackerUnitTests(unittest.TestCase):
         self._tracker.subscribe(client, resource)
         result = self._tracker.unsubscribe(client, resource)
         assert result is True
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_unsubscribe_redundant(self):
         """Test client unsubscribing from the same resource twice."""
@@ -453,8 +494,8 @@ class ClientTrackerUnitTests(unittest.TestCase):
         """Test deleting all subscriptions for a client that has none."""
         client = self._make_client()
         self._tracker.delete_subscriptions_for_client(client)
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_delete_subscriptions_for_client_two_resources(self):
         """Test deleting all subscriptions for a client that has two."""
@@ -464,8 +505,8 @@ class ClientTrackerUnitTests(unittest.TestCase):
         self._tracker.subscribe(client, resource1)
         self._tracker.subscribe(client, resource2)
         self._tracker.delete_subscriptions_for_client(client)
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_delete_subscriptions_for_client_two_clients(self):
         """Test deleting all subscriptions for one client subscribed to the
@@ -477,31 +518,31 @@ class ClientTrackerUnitTests(unittest.TestCase):
         self._tracker.subscribe(client1, resource)
         self._tracker.subscribe(client2, resource)
         self._tracker.delete_subscriptions_for_client(client1)
-        assert len(self._tracker._clients2resource_paths) == 1
-        assert len(self._tracker._resource_paths2clients) == 1
-        assert self._tracker._clients2resource_paths[client2] == {'/child'}
-        assert self._tracker._resource_paths2clients['/child'] == {client2}
-        assert client1 not in self._tracker._clients2resource_paths
+        assert len(self._tracker._clients2resource_oids) == 1
+        assert len(self._tracker._resource_oids2clients) == 1
+        assert self._tracker._clients2resource_oids[client2] == {2}
+        assert self._tracker._resource_oids2clients[2] == {client2}
+        assert client1 not in self._tracker._clients2resource_oids
 
     def test_delete_subscriptions_to_resource_empty(self):
         """Test deleting all subscriptions to a resource that has none."""
         resource = self._child
         self._tracker.delete_subscriptions_to_resource(resource)
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_delete_subscriptions_to_resource_two_clients(self):
         """Test deleting all subscriptions to a resource that has two."""
         client1 = self._make_client()
         client2 = self._make_client()
         resource = self._child
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
         self._tracker.subscribe(client1, resource)
         self._tracker.subscribe(client2, resource)
         self._tracker.delete_subscriptions_to_resource(resource)
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_delete_subscriptions_to_resource_two_resources(self):
         """Test deleting all subscriptions to a resource if the client has
@@ -513,18 +554,56 @@ class ClientTrackerUnitTests(unittest.TestCase):
         self._tracker.subscribe(client, resource1)
         self._tracker.subscribe(client, resource2)
         self._tracker.delete_subscriptions_to_resource(resource1)
-        assert len(self._tracker._clients2resource_paths) == 1
-        assert len(self._tracker._resource_paths2clients) == 1
-        assert self._tracker._clients2resource_paths[client] == {'/child2'}
-        assert self._tracker._resource_paths2clients['/child2'] == {client}
+        assert len(self._tracker._clients2resource_oids) == 1
+        assert len(self._tracker._resource_oids2clients) == 1
+        assert self._tracker._clients2resource_oids[client] == {3}
+        assert self._tracker._resource_oids2clients[3] == {client}
+
+    def test_subscribe_subtree(self):
+        client = self._make_client()
+        result = self._tracker.subscribe(client, self._child, subtree=True)
+        assert result is True
+        assert self._tracker._clients2subtree_oids[client] == {2}
+        assert self._tracker._subtree_oids2clients[2] == {client}
+        assert len(self._tracker._clients2resource_oids) == 0
+
+    def test_subscribe_subtree_redundant(self):
+        client = self._make_client()
+        self._tracker.subscribe(client, self._child, subtree=True)
+        result = self._tracker.subscribe(client, self._child, subtree=True)
+        assert result is False
+
+    def test_unsubscribe_subtree(self):
+        client = self._make_client()
+        self._tracker.subscribe(client, self._child, subtree=True)
+        self._tracker.subscribe(client, self._child)
+        result = self._tracker.unsubscribe(client, self._child, subtree=True)
+        assert result is True
+        assert len(self._tracker._clients2subtree_oids) == 0
+        assert len(self._tracker._subtree_oids2clients) == 0
+        assert self._tracker.is_subscribed(client, self._child)
+
+    def test_delete_subscriptions_for_client_with_subtree(self):
+        client = self._make_client()
+        self._tracker.subscribe(client, self._child, subtree=True)
+        self._tracker.delete_subscriptions_for_client(client)
+        assert len(self._tracker._clients2subtree_oids) == 0
+        assert len(self._tracker._subtree_oids2clients) == 0
+
+    def test_delete_subscriptions_to_resource_with_subtree(self):
+        client = self._make_client()
+        self._tracker.subscribe(client, self._child, subtree=True)
+        self._tracker.delete_subscriptions_to_resource(self._child)
+        assert len(self._tracker._clients2subtree_oids) == 0
+        assert len(self._tracker._subtree_oids2clients) == 0
 
     def test_iterate_subscribers_empty(self):
         """Test iterating subscribers for a resource that has none."""
         resource = self._child
         result = list(self._tracker.iterate_subscribers(resource))
         assert len(result) == 0
-        assert len(self._tracker._clients2resource_paths) == 0
-        assert len(self._tracker._resource_paths2clients) == 0
+        assert len(self._tracker._clients2resource_oids) == 0
+        assert len(self._tracker._resource_oids2clients) == 0
 
     def test_iterate_subscribers_two(self):
         """Test iterating subscribers for a resource that has two."""
@@ -538,6 +617,128 @@ class ClientTrackerUnitTests(unittest.TestCase):
         assert client1 in result
         assert client2 in result
 
+    def test_iterate_subscribers_subtree(self):
+        """Test iterating subscribers of descendants and the resource."""
+        client1 = self._make_client()
+        client2 = self._make_client()
+        root = self._child.__parent__
+        grandchild = self._child['grandchild'] = testing.DummyResource(
+            __oid__=4)
+        self._tracker.subscribe(client1, root, subtree=True)
+        self._tracker.subscribe(client2, grandchild)
+        self._tracker.subscribe(client2, self._child, subtree=True)
+        result = list(self._tracker.iterate_subscribers(grandchild))
+        assert len(result) == 2
+        assert client1 in result
+        assert client2 in result
+        assert list(self._tracker.iterate_subscribers(root)) == [client1]
+
+
+class TestZODBExecutor:
+
+    @pytest.fixture
+    def loop(self, request):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        request.addfinalizer(loop.close)
+        return loop
+
+    @pytest.fixture
+    def app_root(self):
+        app_root = testing.DummyResource(__oid__=1)
+        app_root['child'] = testing.DummyResource(__oid__=2)
+        return app_root
+
+    @pytest.fixture
+    def inst(self, request, loop, app_root):
+        from adhocracy_core.websockets.server import ZODBExecutor
+        database = DummyZODBDatabase(zodb_root={'app_root': app_root})
+        inst = ZODBExecutor(database, loop=loop)
+        request.addfinalizer(inst.shutdown)
+        return inst
+
+    def test_submit(self, inst, loop):
+        import threading
+        thread = loop.run_until_complete(
+            inst.submit(threading.current_thread))
+        assert thread is not threading.current_thread()
+
+    def test_get_connection_one_per_worker(self, inst, loop):
+        connection = loop.run_until_complete(inst.submit(inst.get_connection))
+        assert loop.run_until_complete(inst.submit(inst.get_connection))\
+            is connection
+        assert inst.get_connection() is not connection
+
+    def test_resolve(self, inst, loop, app_root):
+        resource = loop.run_until_complete(inst.resolve('/child'))
+        assert resource is app_root['child']
+
+    def test_resolve_not_existing(self, inst, loop):
+        with pytest.raises(KeyError):
+            loop.run_until_complete(inst.resolve('/wrong'))
+
+    def test_call_in_loop(self, inst, loop):
+        result = []
+        loop.run_until_complete(inst.submit(inst.call_in_loop,
+                                            result.append, 1))
+        loop.run_until_complete(inst.submit(lambda: None))
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        assert result == [1]
+
+
+class TestClientCommunicatorWithZODBExecutor:
+
+    @pytest.fixture
+    def loop(self, request):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        request.addfinalizer(loop.close)
+        return loop
+
+    @pytest.fixture
+    def inst(self, request, loop):
+        from adhocracy_core.websockets.server import ZODBExecutor
+        app_root = testing.DummyResource(__oid__=1)
+        app_root['child'] = testing.DummyResource(__oid__=2)
+        app_root.__name__ = app_root.__parent__ = None
+        database = DummyZODBDatabase(zodb_root={'app_root': app_root})
+        executor = ZODBExecutor(database, loop=loop)
+        request.addfinalizer(executor.shutdown)
+        QueueingClientCommunicator.zodb_database = database
+        QueueingClientCommunicator.zodb_executor = executor
+        QueueingClientCommunicator.rest_url = 'http://localhost:6541'
+        inst = QueueingClientCommunicator()
+        inst.onConnect(DummyConnectionRequest('websocket peer'))
+
+        def tearDown():
+            QueueingClientCommunicator.zodb_executor = None
+        request.addfinalizer(tearDown)
+        return inst
+
+    def _wait_for_pending_jobs(self, inst, loop):
+        loop.run_until_complete(inst.zodb_executor.submit(lambda: None))
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+
+    def test_onMessage(self, inst, loop):
+        msg = build_message({'action': 'subscribe',
+                             'resource': 'http://localhost:6541/child/'})
+        inst.onMessage(msg, False)
+        assert inst.queue == []
+        self._wait_for_pending_jobs(inst, loop)
+        assert inst.queue == [{'status': 'ok',
+                               'action': 'subscribe',
+                               'resource': 'http://localhost:6541/child/'}]
+
+    def test_onClose(self, inst, loop):
+        msg = build_message({'action': 'subscribe',
+                             'resource': 'http://localhost:6541/child/'})
+        inst.onMessage(msg, False)
+        inst.onClose(True, 0, 'teardown')
+        self._wait_for_pending_jobs(inst, loop)
+        assert inst not in inst._tracker._clients2resource_oids
+
 
 @pytest.mark.websocket
 @pytest.mark.functional
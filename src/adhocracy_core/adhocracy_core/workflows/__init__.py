@@ -1,8 +1,10 @@
 """Finite state machines for resources."""
+from collections.abc import Iterable
 from colander import Invalid
 
 from pyramid.interfaces import IRequest
 from pyramid.registry import Registry
+from substanced.workflow import ACLState
 from substanced.workflow import ACLWorkflow
 from substanced.workflow import WorkflowError
 from substanced.workflow import IWorkflow
@@ -11,9 +13,14 @@ from zope.interface import implementer
 from zope.interface import Interface
 
 from adhocracy_core.authorization import acm_to_acl
+from adhocracy_core.authorization import bulk_acl_changes
 from adhocracy_core.authorization import create_fake_god_request
+from adhocracy_core.authorization import set_acl
 from adhocracy_core.exceptions import ConfigurationError
+from adhocracy_core.exceptions import RuntimeConfigurationError
 from adhocracy_core.interfaces import IAdhocracyWorkflow
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.sheets.workflow import IWorkflowAssignment
 from adhocracy_core.workflows.schemas import create_workflow_meta_schema
 
 
@@ -25,11 +32,27 @@ class ISample(Interface):
 deprecated('ISample', 'Backward compatible code, remove after migration')
 
 
+class AdhocracyACLState(ACLState):
+
+    """State that sets the :term:`acl` when entering it.
+
+    The acl is set with :func:`adhocracy_core.authorization.set_acl`
+    to support :func:`adhocracy_core.authorization.bulk_acl_changes`.
+    """
+
+    def __call__(self, content, request, transition, workflow):
+        """Set the state acl."""
+        if self.acl is not None:
+            set_acl(content, self.acl)
+
+
 @implementer(IAdhocracyWorkflow)
 class AdhocracyACLWorkflow(ACLWorkflow):
 
     """Workflow that sets the :term:`acl` when entering a State."""
 
+    _state_factory = AdhocracyACLState
+
     def get_next_states(self, context, request: IRequest) -> list:
         """Get states you can trigger a transition to."""
         state = self.state_of(context)
@@ -78,6 +101,52 @@ def transition_to_states(context, states: [str], registry: Registry,
         workflow.transition_to_state(context, request, state)
 
 
+def transition_resources_to_state(resources: Iterable, to_state: str,
+                                  request: IRequest, from_state: str=None,
+                                  state_data: dict=None) -> [IResource]:
+    """Do transitions to the state `to_state` for many resources at once.
+
+    :param from_state: only do transitions for resources in this state
+    :param state_data: data to store for `to_state` in the `state_data`
+        field of the workflow assignment sheet.
+    :returns: resources with transition
+
+    The state and state data are set with one workflow assignment sheet
+    modification per resource, resources without this sheet are ignored.
+    The acls of the new states are set with
+    :func:`adhocracy_core.authorization.bulk_acl_changes`.
+    """
+    registry = request.registry
+    changed = []
+    with bulk_acl_changes(registry):
+        for resource in resources:
+            try:
+                sheet = registry.content.get_sheet(resource,
+                                                   IWorkflowAssignment)
+            except RuntimeConfigurationError:
+                continue
+            appstruct = sheet.get()
+            if from_state is not None \
+                    and appstruct['workflow_state'] != from_state:
+                continue
+            new_appstruct = {'workflow_state': to_state}
+            if state_data:
+                new_appstruct['state_data'] = _update_state_data(
+                    appstruct['state_data'], to_state, state_data)
+            sheet.set(new_appstruct, request=request)
+            changed.append(resource)
+    return changed
+
+
+def _update_state_data(state_data: [dict], name: str, data: dict) -> [dict]:
+    datas = [x for x in state_data if x['name'] == name]
+    if datas == []:
+        state_data.append(dict(name=name, **data))
+    else:
+        datas[0].update(data)
+    return state_data
+
+
 def _validate_workflow_cstruct(cstruct: dict) -> dict:
     """Deserialize workflow :term:`cstruct` and return :term:`appstruct`."""
     schema = create_workflow_meta_schema(cstruct)
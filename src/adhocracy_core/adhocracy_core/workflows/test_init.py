@@ -57,6 +57,104 @@ class TestAdhocracyACLWorkflow:
                                                          from_state='draft')
 
 
+class TestAdhocracyACLState:
+
+    @fixture
+    def inst(self):
+        from . import AdhocracyACLState
+        return AdhocracyACLState(acl=[('Allow', 'role:reader', 'view')])
+
+    def test_call_set_acl(self, inst, context, monkeypatch):
+        from adhocracy_core import workflows
+        mock_set_acl = Mock()
+        monkeypatch.setattr(workflows, 'set_acl', mock_set_acl)
+        inst(context, None, {}, None)
+        mock_set_acl.assert_called_with(context, inst.acl)
+
+    def test_call_ignore_if_no_acl(self, context, monkeypatch):
+        from adhocracy_core import workflows
+        from . import AdhocracyACLState
+        mock_set_acl = Mock()
+        monkeypatch.setattr(workflows, 'set_acl', mock_set_acl)
+        AdhocracyACLState()(context, None, {}, None)
+        assert not mock_set_acl.called
+
+    def test_workflow_state_factory(self):
+        from . import AdhocracyACLState
+        from . import AdhocracyACLWorkflow
+        assert AdhocracyACLWorkflow._state_factory is AdhocracyACLState
+
+
+class TestTransitionResourcesToState:
+
+    @fixture
+    def registry(self, registry, mock_sheet):
+        mock_sheet.get.return_value = {'workflow_state': 'draft',
+                                       'state_data': []}
+        registry.content.get_sheet.return_value = mock_sheet
+        return registry
+
+    @fixture
+    def mock_bulk_acl_changes(self, monkeypatch):
+        from contextlib import contextmanager
+        from adhocracy_core import workflows
+        calls = []
+
+        @contextmanager
+        def bulk_acl_changes(registry):
+            calls.append(registry)
+            yield
+        monkeypatch.setattr(workflows, 'bulk_acl_changes', bulk_acl_changes)
+        return calls
+
+    def call_fut(self, *args, **kwargs):
+        from . import transition_resources_to_state
+        return transition_resources_to_state(*args, **kwargs)
+
+    def test_ignore_if_no_workflow(self, context, request_, registry):
+        from adhocracy_core.exceptions import RuntimeConfigurationError
+        registry.content.get_sheet.side_effect = RuntimeConfigurationError
+        assert self.call_fut([context], 'announced', request_) == []
+
+    def test_ignore_if_not_from_state(self, context, request_, registry,
+                                      mock_sheet):
+        assert self.call_fut([context], 'announced', request_,
+                             from_state='announced') == []
+        assert not mock_sheet.set.called
+
+    def test_set_workflow_state(self, context, request_, registry,
+                                mock_sheet):
+        result = self.call_fut([context], 'announced', request_,
+                               from_state='draft')
+        assert result == [context]
+        mock_sheet.set.assert_called_with({'workflow_state': 'announced'},
+                                          request=request_)
+
+    def test_set_workflow_state_and_state_data(self, context, request_,
+                                               registry, mock_sheet):
+        self.call_fut([context], 'announced', request_,
+                      state_data={'start_date': 1})
+        mock_sheet.set.assert_called_with(
+            {'workflow_state': 'announced',
+             'state_data': [{'name': 'announced', 'start_date': 1}]},
+            request=request_)
+
+    def test_update_existing_state_data(self, context, request_, registry,
+                                        mock_sheet):
+        mock_sheet.get.return_value = {
+            'workflow_state': 'draft',
+            'state_data': [{'name': 'announced', 'description': 'text'}]}
+        self.call_fut([context], 'announced', request_,
+                      state_data={'start_date': 1})
+        assert mock_sheet.set.call_args[0][0]['state_data'] == \
+            [{'name': 'announced', 'description': 'text', 'start_date': 1}]
+
+    def test_set_acls_in_bulk(self, context, request_, registry,
+                              mock_bulk_acl_changes):
+        self.call_fut([context, context], 'announced', request_)
+        assert mock_bulk_acl_changes == [request_.registry]
+
+
 class TestAddWorkflow:
 
     @fixture
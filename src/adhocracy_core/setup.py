@@ -96,6 +96,12 @@ setup(name='adhocracy_core',
           adhocracy_core.scripts.set_workflow_state:set_workflow_state
       delete_stale_login_data =\
           adhocracy_core.scripts.delete_stale_login_data:delete_stale_login_data
+      export_auditlog =\
+          adhocracy_core.scripts.export_auditlog:export_auditlog
+      check_rate_tallies =\
+          adhocracy_core.scripts.check_rate_tallies:check_rate_tallies
+      evolve_chunked =\
+          adhocracy_core.scripts.evolve_chunked:evolve_chunked
       [pyramid.scaffold]
       adhocracy=adhocracy_core.scaffolds:AdhocracyExtensionTemplate
       """,
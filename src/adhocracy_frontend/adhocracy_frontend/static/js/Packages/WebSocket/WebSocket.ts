@@ -145,8 +145,17 @@ export class Service {
     }
 
     private onmessage(event) : void {
-        var msg : IResponseOk | IResponseError | IServerEvent = JSON.parse(event.data);
+        var data = JSON.parse(event.data);
 
+        // notifications of one transaction are sent as one array
+        if (_.isArray(data)) {
+            _.forEach(data, (msg) => this.handleMessage(msg));
+        } else {
+            this.handleMessage(data);
+        }
+    }
+
+    private handleMessage(msg : IResponseOk | IResponseError | IServerEvent) : void {
         if (msg.hasOwnProperty("event")) {
             var serverEvent = <IServerEvent>msg;
             this.messageEventManager.trigger(serverEvent.resource, serverEvent);
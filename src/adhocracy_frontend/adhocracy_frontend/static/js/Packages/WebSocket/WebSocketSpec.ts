@@ -78,6 +78,24 @@ export var register = () => {
                 expect(adhEventManagerMocks[0].trigger).toHaveBeenCalledWith(resource, msg);
             });
 
+            it("calls eventManager.trigger for each event in an array", () => {
+                var resource = "/adhocracy/sidty";
+                var msg1 = {
+                    resource: resource,
+                    event: "modified"
+                };
+                var msg2 = {
+                    resource: resource,
+                    event: "changed_descendants"
+                };
+
+                adhRawWebSocketMock.onmessage({
+                    data: JSON.stringify([msg1, msg2])
+                });
+                expect(adhEventManagerMocks[0].trigger).toHaveBeenCalledWith(resource, msg1);
+                expect(adhEventManagerMocks[0].trigger).toHaveBeenCalledWith(resource, msg2);
+            });
+
             it("throws an exception on error", () => {
                 expect(() => adhRawWebSocketMock.onmessage({
                     data: JSON.stringify({
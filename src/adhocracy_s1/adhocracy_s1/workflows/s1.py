@@ -6,13 +6,14 @@ from pytz import UTC
 from pyramid.request import Request
 from pyrsistent import freeze
 from substanced.util  import find_service
-from adhocracy_core.exceptions import RuntimeConfigurationError
+from adhocracy_core.authorization import bulk_acl_changes
 from adhocracy_core.interfaces import IPool
 from adhocracy_core.interfaces import search_query
 from adhocracy_core.sheets.rate import IRateable
 from adhocracy_core.sheets.versions import IVersionable
 from adhocracy_core.sheets.workflow import IWorkflowAssignment
 from adhocracy_core.workflows import add_workflow
+from adhocracy_core.workflows import transition_resources_to_state
 from adhocracy_core.utils import get_sheet
 
 
@@ -23,9 +24,8 @@ def do_transition_to_propose(context: IPool, request: Request, **kwargs):
 
 def do_transition_to_voteable(context: IPool, request: Request, **kwargs):
     """Do transition from state proposed to voteable for all children."""
-    for child in context.values():
-        _do_transition(child, request, from_state='proposed',
-                       to_state='voteable')
+    transition_resources_to_state(context.values(), 'voteable', request,
+                                  from_state='proposed')
 
 
 def do_transition_to_result(context: IPool, request: Request, **kwargs):
@@ -43,14 +43,15 @@ def _change_children_to_rejected_or_selected(context: IPool, request: Request,
     The most rated child does transition to state selected, the other to rejected.
     Save decision_date in state assignment data.
     """
-    rated_children = _get_children_sort_by_rates(context)
-    for pos,child in enumerate(rated_children):
-        if pos == 0:
-            _do_transition(child, request, from_state='voteable',
-                           to_state='selected', start_date=start_date)
-        else:
-            _do_transition(child, request, from_state='voteable',
-                           to_state='rejected', start_date=start_date)
+    rated_children = list(_get_children_sort_by_rates(context))
+    state_data = start_date and {'start_date': start_date}
+    with bulk_acl_changes(request.registry):
+        transition_resources_to_state(rated_children[:1], 'selected', request,
+                                      from_state='voteable',
+                                      state_data=state_data)
+        transition_resources_to_state(rated_children[1:], 'rejected', request,
+                                      from_state='voteable',
+                                      state_data=state_data)
 
 
 def _store_state_data(context: IWorkflowAssignment, state_name: str,
@@ -96,21 +97,6 @@ def _get_children_sort_by_rates(context) -> []:
     return (r.__parent__ for r in result.elements)
 
 
-def _do_transition(context, request: Request, from_state: str, to_state: str,
-                   start_date: datetime=None):
-    try:
-        sheet = request.registry.content.get_sheet(context, IWorkflowAssignment)
-    except RuntimeConfigurationError:
-        pass
-    else:
-        current_state = sheet.get()['workflow_state']
-        if current_state == from_state:
-            sheet.set({'workflow_state': to_state}, request=request)
-            if start_date is not None:
-                _store_state_data(context, to_state, request,
-                                  start_date=start_date)
-
-
 s1_meta = freeze({
     'initial_state': 'propose',
     'states': {